@@ -13,24 +13,62 @@
 - Простой онлайн-калькулятор
 - Генератор случайных чисел и паролей
 
-Важное замечание: на данный момент все данные сервисов хранятся только
-в оперативной памяти сервера и будут утеряны при его перезапуске.
-В будущем планируется переход на полноценную базу данных.
+Важное замечание: по умолчанию данные сервисов хранятся только в оперативной
+памяти сервера и будут утеряны при его перезапуске. Чтобы данные сохранялись
+(и были общими для нескольких процессов-воркеров), запустите приложение
+с переменной окружения PORTAL_STORAGE_BACKEND=sqlite (см. storage.py).
+Для одного процесса есть бэкенд PORTAL_STORAGE_BACKEND=journal: данные
+остаются в памяти, а на диск пишутся журнал изменений и снимки
+(см. journal_storage.py).
 """
 from functools import wraps
 import datetime
-import random
+import gc
+import math
+import os
+import time
 import string
-import json # Если понадобится json.dumps для более сложного форматирования
+import hashlib # Для ETag заранее сериализованных ответов и ответов по версии хранилища
+import json # json.dumps нужен для потоковой выдачи коллекций
 
 from flask import (
     Flask,
+    Response,
     jsonify,
+    make_response,
     redirect,
     render_template,
     request,
     url_for,
 )
+from werkzeug.exceptions import RequestEntityTooLarge
+
+from bloom_filter import ShortCodeBloomFilter
+from bulk_import import (
+    CATALOG_CSV_COLUMNS, TASK_CSV_COLUMNS, BulkImportError, CatalogItemValidator, TaskValidator,
+    bulk_format_for_mimetype, import_records,
+)
+from calculator import (
+    DIVISION_BY_ZERO_MESSAGE, INVALID_NUMBER_MESSAGE, MISSING_PARAMETERS_MESSAGE, OPERATION_FUNCTIONS,
+    RESULT_OVERFLOW_MESSAGE, CalculatorBatchError, evaluate_batch, parse_batch_payload, parse_operand,
+    resolve_operation_symbol,
+)
+from catalog_query import CatalogQueryError, parse_catalog_query, parse_facet_request
+from click_analytics import SECONDS_PER_HOUR, ClickRecorder
+from json_provider import PortalJSONProvider
+from metrics import PROMETHEUS_CONTENT_TYPE, ROUTE_ENVIRON_KEY, MetricsMiddleware, RequestMetrics
+from page_cache import RenderedPageCache
+from shortcodes import ShortCodeAllocationError, create_code_allocator
+from storage import create_storage
+from streaming import (
+    CSV_MIMETYPE, EVENT_STREAM_MIMETYPE, NDJSON_MIMETYPE, format_server_sent_event, iter_csv, iter_json_array,
+    iter_ndjson, wants_ndjson,
+)
+from redirect_fast_path import SHORT_URL_NOT_FOUND_MESSAGE, BufferedAccessLog, RedirectFastPath
+from secure_random import secure_random
+from unit_conversion import (
+    CONVERSION_OVERFLOW_MESSAGE, ConversionBatchError, ConversionTable, iter_converted_values, parse_conversion_batch,
+)
 
 # Инициализация основного экземпляра Flask-приложения.
 # Использование `__name__` помогает Flask правильно определять пути к шаблонам и статическим файлам.
@@ -39,9 +77,89 @@ app = Flask(__name__)
 # --- Настройки конфигурации приложения ---
 # Обеспечиваем корректное отображение кириллицы и других не-ASCII символов в JSON-ответах.
 app.config['JSON_AS_ASCII'] = False
-# Включаем форматированный (pretty-print) вывод JSON для удобства чтения во время разработки.
-# Для боевого сервера это можно отключить для экономии трафика.
-app.config['JSONIFY_PRETTYPRINT_REGULAR'] = True
+# Форматированный (pretty-print) вывод JSON: по умолчанию только в режиме отладки, а на боевом
+# сервере ответы компактные. Отдельный запрос может попросить отступы параметром ?pretty=1.
+# PORTAL_JSON_PRETTYPRINT=1 или 0 включает или выключает форматирование для всех ответов.
+app.config['JSONIFY_PRETTYPRINT_REGULAR'] = (
+    os.environ['PORTAL_JSON_PRETTYPRINT'] != '0' if 'PORTAL_JSON_PRETTYPRINT' in os.environ else None
+)
+# Сериализатор JSON: 'auto' (orjson или ujson, если установлены, иначе стандартный json),
+# 'orjson', 'ujson' или 'stdlib' (см. json_provider.py).
+app.config['JSON_BACKEND'] = os.environ.get('PORTAL_JSON_BACKEND', 'auto')
+# Начиная с Flask 2.3 настройки JSON_* и JSONIFY_* не читаются — передаем их провайдеру JSON.
+app.json = PortalJSONProvider(app)
+app.json.set_backend(app.config['JSON_BACKEND'])
+app.json.ensure_ascii = app.config['JSON_AS_ASCII']
+if app.config['JSONIFY_PRETTYPRINT_REGULAR'] is not None:
+    app.json.compact = not app.config['JSONIFY_PRETTYPRINT_REGULAR']
+# Коллекции длиннее этого порога отдаются потоком (по частям), а не одной строкой.
+app.config['JSON_STREAMING_THRESHOLD'] = 1000
+# Пакетная загрузка задач и каталога (NDJSON/CSV): сколько записей добавлять в хранилище за раз
+# и сколько ошибок перечислять в ответе (остальные только считаются).
+app.config['BULK_IMPORT_BATCH_SIZE'] = 1000
+app.config['BULK_IMPORT_MAX_REPORTED_ERRORS'] = 100
+# Максимальный размер тела запроса в байтах (по умолчанию 256 МиБ): тело пакетной загрузки
+# читается потоком, но без предела один запрос может занимать воркер сколько угодно долго.
+app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('PORTAL_MAX_CONTENT_LENGTH', 256 * 1024 * 1024))
+# Сколько секунд клиент может не перепроверять справочник единиц конвертера (он меняется только с релизом).
+app.config['CONVERTER_UNITS_MAX_AGE'] = 3600
+# Как часто (в секундах) поток изменений задач шлет комментарий-"пульс", чтобы соединение не закрылось по простою.
+app.config['TASK_EVENTS_KEEPALIVE_SECONDS'] = 15
+# Сколько секунд живет один поток изменений задач. Поток занимает воркер (или поток воркера) целиком,
+# поэтому он не бесконечен: по истечении срока ответ завершается, и браузер сам переподключается
+# (через 'retry' мс, с Last-Event-ID), продолжая с той же версии. С синхронными воркерами gunicorn
+# срок должен быть меньше их --timeout (30 с по умолчанию), иначе воркер убьют посреди потока.
+app.config['TASK_EVENTS_MAX_STREAM_SECONDS'] = float(os.environ.get('PORTAL_TASK_EVENTS_MAX_SECONDS', '300'))
+# Быстрый путь редиректов /s/<код>: сколько готовых ответов кешировать и какую долю переходов
+# записывать в журнал (журнал пишется пачками из фонового потока, раз в REDIRECT_ACCESS_LOG_FLUSH_SECONDS).
+app.config['REDIRECT_CACHE_SIZE'] = 100_000
+app.config['REDIRECT_ACCESS_LOG_SAMPLE_RATE'] = float(os.environ.get('PORTAL_REDIRECT_LOG_SAMPLE_RATE', '1.0'))
+app.config['REDIRECT_ACCESS_LOG_FLUSH_SECONDS'] = 1.0
+# Статистика переходов: как часто сводить счетчики в почасовые корзины и за сколько часов ее отдавать.
+app.config['CLICK_STATS_FLUSH_SECONDS'] = 1.0
+app.config['CLICK_STATS_MAX_HOURS'] = 7 * 24
+# Срок жизни коротких ссылок: наибольшее допустимое значение ttl_seconds (год).
+app.config['SHORT_URL_MAX_TTL_SECONDS'] = 365 * 24 * 3600
+# Лимит числа коротких ссылок в памяти процесса (пусто — без лимита; только для бэкенда 'memory')
+# и политика вытеснения при его превышении: 'lru' (давно не использованные) или 'lfu' (редко используемые).
+app.config['SHORT_URL_MAX_ENTRIES'] = (
+    int(os.environ['PORTAL_SHORT_URL_MAX_ENTRIES']) if os.environ.get('PORTAL_SHORT_URL_MAX_ENTRIES') else None
+)
+app.config['SHORT_URL_EVICTION_POLICY'] = os.environ.get('PORTAL_SHORT_URL_EVICTION_POLICY', 'lru')
+# Максимум паролей/чисел за один запрос генератора (параметр count).
+app.config['RANDOM_MAX_BATCH_COUNT'] = 100_000
+# Способ выдачи коротких кодов: 'counter' (счетчик в base62 с перемешиванием),
+# 'counter-sequential' (без перемешивания) или 'random' (прежний случайный подбор).
+app.config['SHORT_CODE_ALLOCATOR'] = 'counter'
+# Где хранить данные сервисов: 'memory' (в памяти процесса), 'sqlite' (в файле базы)
+# или 'journal' (в памяти процесса с журналом изменений и снимками на диске).
+app.config['STORAGE_BACKEND'] = os.environ.get('PORTAL_STORAGE_BACKEND', 'memory')
+app.config['SQLITE_DATABASE_PATH'] = os.environ.get(
+    'PORTAL_SQLITE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'portal.sqlite3')
+)
+app.config['JOURNAL_DIRECTORY'] = os.environ.get(
+    'PORTAL_JOURNAL_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'portal_data')
+)
+# Ждать ли записи изменения на диск (fsync) перед ответом. PORTAL_JOURNAL_SYNC=0 — журнал
+# сбрасывается раз в секунду: запись быстрее, но при сбое теряется последняя секунда изменений.
+app.config['JOURNAL_SYNC_COMMITS'] = os.environ.get('PORTAL_JOURNAL_SYNC', '1') != '0'
+# Фильтр Блума по выданным коротким кодам: запросы /s/<код> с кодами, которых точно нет,
+# получают готовый 404 без обращения к хранилищу. Фильтр живет в памяти процесса и пополняется
+# при создании ссылок, поэтому для SQLite по умолчанию выключен: коды, выданные другими
+# процессами с той же базой, он бы не увидел. Включить/выключить явно: PORTAL_SHORT_CODE_FILTER=1/0.
+app.config['SHORT_CODE_FILTER_ENABLED'] = os.environ.get(
+    'PORTAL_SHORT_CODE_FILTER', '0' if app.config['STORAGE_BACKEND'] == 'sqlite' else '1'
+) != '0'
+app.config['SHORT_CODE_FILTER_CAPACITY'] = 100_000
+app.config['SHORT_CODE_FILTER_FALSE_POSITIVE_RATE'] = 0.01
+# Кеш отрендеренных HTML-страниц (см. page_cache.py). В режиме отладки не используется,
+# чтобы правки шаблонов были видны сразу. Отключить: PORTAL_PAGE_CACHE=0.
+app.config['PAGE_CACHE_ENABLED'] = os.environ.get('PORTAL_PAGE_CACHE', '1') != '0'
+# Степень сжатия gzip для закешированных страниц: сжимаются один раз, поэтому максимальная.
+app.config['PAGE_CACHE_COMPRESS_LEVEL'] = 9
+# Метрики запросов для Prometheus на /metrics (см. metrics.py). Накладные расходы — несколько
+# микросекунд на запрос, поэтому по умолчанию включены; отключить: PORTAL_METRICS=0.
+app.config['METRICS_ENABLED'] = os.environ.get('PORTAL_METRICS', '1') != '0'
 
 # --- Контекстный процессор: делаем переменные доступными во всех шаблонах ---
 @app.context_processor
@@ -52,25 +170,60 @@ def inject_global_template_vars():
     """
     return {'current_year': datetime.datetime.now().year}
 
-# --- Внутрисерверные хранилища данных (временно, в оперативной памяти) ---
-# TODO: Критически важно! Заменить эти in-memory хранилища на базу данных
-#       (например, SQLite для простоты или PostgreSQL для масштабируемости)
-#       для обеспечения постоянства данных между перезапусками сервера.
+# --- Хранилища данных сервисов ---
+# Бэкенд выбирается настройкой STORAGE_BACKEND: в памяти процесса, в SQLite или в памяти с журналом.
+# Обработчики работают с хранилищами только через их методы (create/get/update/...),
+# поэтому не зависят от выбранного бэкенда.
+
+# Стартовое наполнение сервисов "Цитаты дня" и "Каталог". SQLite- и journal-бэкенды
+# добавляют эти записи один раз — при создании базы.
+INITIAL_QUOTES = [
+    {"id": 1, "text": "Жизнь - это то, что с тобой происходит, пока ты строишь другие планы.", "author": "Джон Леннон"},
+    {"id": 2, "text": "Единственный способ делать великие дела – любить то, что вы делаете.", "author": "Стив Джобс"},
+    {"id": 3, "text": "Чтобы дойти до цели, надо прежде всего идти.", "author": "Оноре де Бальзак"}
+]
+INITIAL_CATALOG_ITEMS = [
+    {"id": 1, "type": "book", "title": "1984", "author": "Джордж Оруэлл", "year": 1949, "genre": "Антиутопия"},
+    {"id": 2, "type": "movie", "title": "Начало", "director": "Кристофер Нолан", "year": 2010, "genre": "Научная фантастика"},
+    {"id": 3, "type": "book", "title": "Мастер и Маргарита", "author": "Михаил Булгаков", "year": 1967, "genre": "Роман"},
+]
+
+# Сборщик мусора выключен до конца старта: загрузка хранилищ создает миллионы объектов, которые
+# живут до конца процесса, и сборки посреди загрузки только обходили бы их (см. gc.freeze ниже).
+gc.disable()
+portal_storage = create_storage(
+    app.config['STORAGE_BACKEND'],
+    sqlite_path=app.config['SQLITE_DATABASE_PATH'],
+    initial_quotes=INITIAL_QUOTES,
+    initial_catalog_items=INITIAL_CATALOG_ITEMS,
+    short_url_max_entries=app.config['SHORT_URL_MAX_ENTRIES'],
+    short_url_eviction_policy=app.config['SHORT_URL_EVICTION_POLICY'],
+    journal_directory=app.config['JOURNAL_DIRECTORY'],
+    journal_sync_commits=app.config['JOURNAL_SYNC_COMMITS'],
+)
 
 # Сервис 1: Список Задач (To-Do List)
-tasks_db = []  # Более "базоподобное" имя вместо tasks_data
-_next_task_id_counter = 1 # Явное указание, что это счетчик
+# Поиск, изменение и удаление задачи по ID — O(1) в памяти и поиск по первичному ключу в SQLite;
+# порядок выдачи совпадает с порядком добавления. ID выдает само хранилище.
+tasks_db = portal_storage.tasks
 
 # Сервис 2: Сокращатель URL-адресов
-url_shortener_mappings = {} # Более описательное имя
+# Хранит и прямой (код -> URL), и обратный (URL -> код) индексы,
+# поэтому проверка на повторное сокращение не требует перебора всех ссылок.
+url_shortener_mappings = portal_storage.short_urls
+# Почасовая статистика переходов; пополняется пачками из ClickRecorder (см. click_analytics.py).
+click_stats = portal_storage.click_stats
+# Аллокатор выдает уникальные коды без повторных попыток (см. shortcodes.py).
+# Номера он берет из последовательности хранилища, общей для всех воркеров.
+short_code_allocator = create_code_allocator(
+    app.config['SHORT_CODE_ALLOCATOR'],
+    sequence=portal_storage.short_code_sequence,
+    is_taken=url_shortener_mappings.__contains__,
+    count_taken=url_shortener_mappings.__len__,
+)
 
 # Сервис 3: Цитаты дня
-quotes_collection = [ # "Коллекция" звучит лучше для набора цитат
-    {"id": 1, "text": "Жизнь - это то, что с тобой происходит, пока ты строишь другие планы.", "author": "Джон Леннон"},
-    {"id": 2, "text": "Единственный способ делать великие дела – любить то, что вы делаете.", "author": "Стив Джобс"},
-    {"id": 3, "text": "Чтобы дойти до цели, надо прежде всего идти.", "author": "Оноре де Бальзак"}
-]
-_next_quote_id_counter = 4
+quotes_collection = portal_storage.quotes # "Коллекция" звучит лучше для набора цитат
 
 # Учетные данные для Basic Authentication (только для добавления цитат)
 # ВАЖНО: В реальном приложении эти данные НИКОГДА не должны храниться в коде.
@@ -79,33 +232,167 @@ BASIC_AUTH_USERNAME = 'admin' # ЗАМЕНИТЬ на безопасное зн
 BASIC_AUTH_PASSWORD = 'supersecretpassword123' # ЗАМЕНИТЬ и использовать хеширование
 
 # Сервис 4: Каталог книг и фильмов
-media_catalog_db = [
-    {"id": 1, "type": "book", "title": "1984", "author": "Джордж Оруэлл", "year": 1949, "genre": "Антиутопия"},
-    {"id": 2, "type": "movie", "title": "Начало", "director": "Кристофер Нолан", "year": 2010, "genre": "Научная фантастика"},
-    {"id": 3, "type": "book", "title": "Мастер и Маргарита", "author": "Михаил Булгаков", "year": 1967, "genre": "Роман"},
-]
-_next_catalog_item_id_counter = 4
+media_catalog_db = portal_storage.catalog
 
 # Сервисы 5 (Калькулятор) и 6 (Генератор) не требуют серверного хранения состояния,
 # вся логика их API stateless (обрабатывается в рамках одного запроса).
 
-# --- Вспомогательные (утилитные) функции ---
+# --- Условные GET-запросы к изменяемым коллекциям ---
+# Версии хранилищ начинаются заново с каждым процессом (память, журнал) или с новой базой (SQLite),
+# поэтому в ETag входит метка набора версий: ETag старых ответов не совпадут с ETag новых данных.
+# У SQLite метка хранится в самой базе и одна у всех воркеров.
+STORE_ETAG_EPOCH = portal_storage.instance_id
+
+def store_version_etag(store_name: str, version: int) -> str:
+    """
+    Слабый ETag ответа из хранилища: имя и версия хранилища плюс нормализованный запрос.
+
+    Пока версия хранилища не изменилась, ответ на тот же запрос тот же. В запрос
+    входят путь, непустые параметры в отсортированном порядке (порядок параметров
+    в URL не важен) и то, что меняет представление: NDJSON по заголовку Accept и отступы.
+    """
+    query = '&'.join(f'{name}={value}' for name, value in sorted(request.args.items(multi=True)) if value)
+    representation = 'ndjson' if wants_ndjson(request.accept_mimetypes) else 'json'
+    variant = f'{request.path}?{query}|{representation}|{int(app.json.pretty_requested())}'
+    return f"{store_name}-{STORE_ETAG_EPOCH}-{version}-{hashlib.sha256(variant.encode('utf-8')).hexdigest()[:16]}"
+
+def conditional_store_response(store, store_name: str, build_response):
+    """
+    Ответ с проверкой If-None-Match по версии хранилища.
+
+    ETag сверяется до чтения данных и сериализации: при совпадении сразу
+    отдается 304 без тела. Версия читается раньше данных, поэтому изменение,
+    попавшее между ними, клиент просто получит целиком при следующем запросе.
+
+    Args:
+        store: Хранилище с атрибутом version.
+        store_name (str): Имя хранилища для ETag.
+        build_response: Функция без аргументов, собирающая полный ответ.
+
+    Returns:
+        Response: 304 без тела или ответ build_response(); успешный ответ получает ETag.
+    """
+    etag = store_version_etag(store_name, store.version)
+    if request.if_none_match.contains_weak(etag):
+        response = app.response_class(status=304)
+    else:
+        response = make_response(build_response())
+        if response.status_code != 200:
+            return response
+    response.set_etag(etag, weak=True)
+    # Клиент может хранить ответ, но перед использованием обязан сверить ETag.
+    response.cache_control.no_cache = True
+    response.vary.add('Accept')
+    return response
+
+# --- Потоковая выдача больших коллекций ---
+def stream_collection_response(items, total_count, envelope_key=None, envelope_fields=None, allow_ndjson=True):
+    """
+    Отдает коллекцию потоком: JSON-массивом по частям или NDJSON (по заголовку Accept).
+
+    Args:
+        items: Итерируемая коллекция элементов (например, хранилище).
+        total_count (int): Число элементов — передается в заголовке X-Total-Count.
+        envelope_key (str | None): Если задан, массив оборачивается в объект
+            под этим ключом (например, {"count": ..., "tasks": [...]}).
+        envelope_fields (dict | None): Остальные поля объекта-обертки.
+        allow_ndjson (bool): Можно ли отдать NDJSON. False для ответов, у которых
+            поля обертки обязательны (в NDJSON они бы потерялись).
+
+    Returns:
+        Response: Потоковый ответ Flask.
+    """
+    if allow_ndjson and wants_ndjson(request.accept_mimetypes):
+        # В NDJSON каждый элемент — ровно одна строка, поэтому без отступов.
+        body = iter_ndjson(items, app.json.item_dumps(pretty=False))
+        mimetype = NDJSON_MIMETYPE
+    else:
+        pretty = app.json.pretty_requested()
+        prefix, suffix = '', ''
+        if envelope_key:
+            # Поля обертки сериализуем заранее, а массив ставим последним ключом объекта.
+            item_separator, key_separator = (', ', ': ') if pretty else (',', ':')
+            prefix = '{' + ''.join(
+                json.dumps(key) + key_separator + json.dumps(value, ensure_ascii=app.config['JSON_AS_ASCII']) + item_separator
+                for key, value in sorted((envelope_fields or {}).items())
+            ) + json.dumps(envelope_key) + key_separator
+            suffix = '}'
+        dumps = app.json.item_dumps(pretty=pretty)
+        body = iter_json_array(items, dumps, prefix=prefix, suffix=suffix)
+        mimetype = 'application/json'
+    response = Response(body, mimetype=mimetype)
+    response.headers['X-Total-Count'] = str(total_count)
+    return response
+
+def should_stream_collection(total_count):
+    """Нужно ли отдавать коллекцию потоком: она велика или клиент просит NDJSON."""
+    return total_count > app.config['JSON_STREAMING_THRESHOLD'] or wants_ndjson(request.accept_mimetypes)
 
-def generate_random_short_code(length=6):
+# --- Пакетная загрузка и выгрузка (задачи, каталог) ---
+def bulk_import_response(store, validate):
     """
-    Создает случайную алфавитно-цифровую строку заданной длины.
-    Используется в качестве короткого кода для сервиса сокращения URL.
+    Загружает записи из тела запроса (NDJSON или CSV — по Content-Type) пачками.
 
     Args:
-        length (int): Желаемая длина короткого кода. По умолчанию 6.
+        store: Хранилище с методом create_many.
+        validate: Валидатор записи (см. bulk_import.py).
 
     Returns:
-        str: Сгенерированный короткий код.
+        Response: Сводка загрузки или ошибка 400/413/415.
+    """
+    bulk_format = bulk_format_for_mimetype(request.mimetype)
+    if bulk_format is None:
+        return error_response(
+            "Тело запроса должно быть в формате NDJSON (application/x-ndjson) или CSV (text/csv).", 415
+        )
+    try:
+        summary = import_records(
+            request.stream, bulk_format, validate, store.create_many,
+            loads=app.json.item_loads(),
+            batch_size=app.config['BULK_IMPORT_BATCH_SIZE'],
+            max_reported_errors=app.config['BULK_IMPORT_MAX_REPORTED_ERRORS'],
+        )
+    except BulkImportError as import_error:
+        return jsonify({"error": str(import_error)}), 400
+    except RequestEntityTooLarge:
+        # Тело без Content-Length обрывается на пределе посреди загрузки: пачки до этого места уже добавлены.
+        return jsonify({"error": f"Тело запроса больше {app.config['MAX_CONTENT_LENGTH']} байт; "
+                                 f"записи, прочитанные до предела, могли быть добавлены."}), 413
+    return jsonify(summary)
+
+def bulk_export_response(store, csv_columns, file_name):
+    """
+    Выгружает все записи хранилища потоком: NDJSON или CSV (?format=csv или Accept: text/csv).
+
+    Args:
+        store: Хранилище (обходится пачками, в память целиком не копируется).
+        csv_columns: Колонки CSV.
+        file_name (str): Имя файла для заголовка Content-Disposition (без расширения).
+
+    Returns:
+        Response: Потоковый ответ или ошибка 400 при неизвестном формате.
+    """
+    export_format = request.args.get('format')
+    if export_format is None:
+        best_match = request.accept_mimetypes.best_match((NDJSON_MIMETYPE, CSV_MIMETYPE))
+        export_format = 'csv' if best_match == CSV_MIMETYPE else 'ndjson'
+    if export_format == 'ndjson':
+        response = Response(iter_ndjson(store, app.json.item_dumps(pretty=False)), mimetype=NDJSON_MIMETYPE)
+    elif export_format == 'csv':
+        response = Response(iter_csv(store, csv_columns), mimetype=CSV_MIMETYPE)
+    else:
+        return error_response("Параметр 'format' должен быть 'ndjson' или 'csv'.", 400)
+    response.headers['Content-Disposition'] = f'attachment; filename={file_name}.{export_format}'
+    return response
+
+def error_response(message: str, status_code: int):
     """
-    # Используем буквы ASCII (верхний и нижний регистр) и цифры для кода.
-    possible_chars = string.ascii_letters + string.digits
-    # Собираем строку из случайно выбранных символов.
-    return ''.join(random.choice(possible_chars) for _ in range(length))
+    Ответ {"error": message} с телом, сериализованным один раз на сообщение.
+
+    Только для постоянных сообщений: сообщения с подставленными значениями
+    (ID, код) каждый раз разные, и их по-прежнему отдает jsonify.
+    """
+    return app.json.prebuilt_response({'error': message}, status_code)
 
 # --- Функционал Basic Authentication ---
 def verify_credentials(username, password):
@@ -121,8 +408,7 @@ def require_authentication_response():
         'error': "Аутентификация не пройдена.",
         'message': "Для доступа к этому ресурсу необходимы имя пользователя и пароль."
     }
-    response = jsonify(error_message)
-    response.status_code = 401
+    response = app.json.prebuilt_response(error_message, 401)
     # 'WWW-Authenticate' заголовок инициирует диалог Basic Auth в браузере.
     response.headers['WWW-Authenticate'] = 'Basic realm="Доступ к этому разделу требует аутентификации"'
     return response
@@ -150,7 +436,28 @@ def protected_by_auth(function_to_protect):
 
 # --- Маршруты для отображения HTML-страниц ---
 
+rendered_pages = RenderedPageCache(compress_level=app.config['PAGE_CACHE_COMPRESS_LEVEL'])
+
+def cached_page(view):
+    """
+    Декоратор для страниц, не зависящих от запроса: HTML рендерится один раз.
+
+    Ключ кеша — имя страницы и значения глобальных переменных шаблонов
+    (inject_global_template_vars): если там появится, например, язык,
+    он автоматически станет частью ключа. Ответ отдается заранее сжатым
+    (если клиент принимает gzip) и с ETag, на совпавший If-None-Match — 304.
+    """
+    @wraps(view)
+    def cached_view(*args, **kwargs):
+        if not app.config['PAGE_CACHE_ENABLED'] or app.debug:
+            return view(*args, **kwargs)
+        variant = tuple(sorted(inject_global_template_vars().items()))
+        page = rendered_pages.get_or_render(request.endpoint, variant, lambda: view(*args, **kwargs))
+        return rendered_pages.build_response(page, request, app.response_class)
+    return cached_view
+
 @app.route('/')
+@cached_page
 def home_page():
     """Отображает главную (лендинговую) страницу сайта."""
     # Заголовок страницы, который будет отображаться в теге <title> и, возможно, в хедере.
@@ -158,6 +465,7 @@ def home_page():
     return render_template('index.html', page_title=page_specific_title)
 
 @app.route('/services')
+@cached_page
 def list_all_services_page(): # Описательное имя
     """Отображает страницу со списком всех доступных на сайте сервисов."""
     # Список сервисов, который будет передан в шаблон для генерации виджетов.
@@ -175,6 +483,7 @@ def list_all_services_page(): # Описательное имя
     return render_template('services.html', services=services_summary, page_title="Наши онлайн-сервисы")
 
 @app.route('/service/todo')
+@cached_page
 def service_todo_page():
     """Отображает интерактивную страницу для сервиса 'Список Задач' и документацию по его API."""
     service_page_data = {
@@ -183,15 +492,20 @@ def service_todo_page():
         "page_url_name": "service_todo_page", # Может использоваться для активной навигации
         "endpoints": [
             {"method": "POST", "path": url_for('tasks_api_create'), "description": "Создать новую задачу.", "example_request": {"text": "Прочитать главу книги"}},
-            {"method": "GET", "path": url_for('tasks_api_get_all'), "description": "Получить текущий список всех задач."},
+            {"method": "GET", "path": url_for('tasks_api_get_all'), "description": "Получить текущий список всех задач. С заголовком Accept: application/x-ndjson список отдается потоком в формате NDJSON (по задаче на строку)."},
+            {"method": "GET", "path": f"{url_for('tasks_api_get_all')}?since=VERSION", "description": "Получить только изменения после версии VERSION (поле 'version' любого ответа со списком): новые и измененные задачи в 'changed', ID удаленных в 'deleted'."},
+            {"method": "GET", "path": url_for('tasks_api_events'), "description": "Поток изменений списка задач (Server-Sent Events): событие 'changes' с той же дельтой после каждого изменения, 'reset' — если список нужно перечитать целиком."},
             {"method": "GET", "path": "/api/tasks/<id>", "description": "Получить детальную информацию о конкретной задаче по её ID."},
             {"method": "PUT", "path": "/api/tasks/<id>", "description": "Обновить существующую задачу (например, изменить текст или отметить как выполненную).", "example_request": {"text": "Прочитать две главы книги", "done": False}},
-            {"method": "DELETE", "path": "/api/tasks/<id>", "description": "Удалить задачу из списка по её ID."}
+            {"method": "DELETE", "path": "/api/tasks/<id>", "description": "Удалить задачу из списка по её ID."},
+            {"method": "POST", "path": url_for('tasks_api_bulk_import'), "description": "Пакетная загрузка задач: тело в формате NDJSON (Content-Type: application/x-ndjson, по объекту {\"text\": ..., \"done\": ...} на строку) или CSV с заголовком (Content-Type: text/csv, колонки text и done). Ответ — сводка с номерами строк, которые не прошли проверку."},
+            {"method": "GET", "path": url_for('tasks_api_export'), "description": "Выгрузка всех задач потоком: NDJSON по умолчанию, CSV — с ?format=csv или заголовком Accept: text/csv."}
         ]
     }
     return render_template('service_todo.html', service_data=service_page_data, page_title=service_page_data["name"])
 
 @app.route('/service/shortener')
+@cached_page
 def service_shortener_page():
     """Отображает интерактивную страницу для сервиса 'Сокращатель URL' и документацию по API."""
     service_page_data = {
@@ -199,13 +513,17 @@ def service_shortener_page():
         "intro": "Устали от бесконечных и сложных веб-ссылок? Наш 'Сокращатель URL' мигом превратит любую длинную ссылку в короткую, аккуратную и легко запоминающуюся. Просто вставьте ваш адрес в поле ниже, нажмите кнопку, и получите элегантную короткую версию для удобного обмена.",
         "page_url_name": "service_shortener_page",
         "endpoints": [
-            {"method": "POST", "path": url_for('url_shortener_api_create'), "description": "Сократить предоставленный URL-адрес.", "example_request": {"long_url": "https://www.example.com/путь/к/очень/длинному/и/сложному/ресурсу"}},
+            {"method": "POST", "path": url_for('url_shortener_api_create'), "description": "Сократить предоставленный URL-адрес. Необязательное поле ttl_seconds задает срок жизни ссылки в секундах.", "example_request": {"long_url": "https://www.example.com/путь/к/очень/длинному/и/сложному/ресурсу", "ttl_seconds": 86400}},
+            {"method": "GET", "path": "/api/shorten/<short_code>/stats?hours=24", "description": "Статистика переходов по короткой ссылке: общее число и почасовые корзины за последние N часов (до недели)."},
+            {"method": "GET", "path": url_for('url_shortener_api_keyspace_stats'), "description": "Получить метрики заполненности пространства коротких кодов (сколько кодов выдано и не пора ли увеличить их длину)."},
+            {"method": "GET", "path": url_for('url_shortener_api_filter_stats'), "description": "Получить метрики фильтра Блума по выданным кодам: занимаемую память, расчетную и наблюдаемую долю ложных срабатываний."},
             {"method": "GET", "path": "/s/<short_code>", "description": "Перенаправление на оригинальный URL при переходе по короткой ссылке (например, /s/xYz123). Обратите внимание на префикс /s/."},
         ]
     }
     return render_template('service_shortener.html', service_data=service_page_data, page_title=service_page_data["name"])
 
 @app.route('/service/quote')
+@cached_page
 def service_quote_page():
     """Отображает интерактивную страницу для сервиса 'Цитаты Дня' и документацию по API."""
     service_page_data = {
@@ -221,6 +539,7 @@ def service_quote_page():
     return render_template('service_quote.html', service_data=service_page_data, page_title=service_page_data["name"])
 
 @app.route('/service/catalog')
+@cached_page
 def service_catalog_page():
     """Отображает интерактивную страницу для 'Каталога Книг и Фильмов' и документацию по API."""
     service_page_data = {
@@ -229,13 +548,16 @@ def service_catalog_page():
         "page_url_name": "service_catalog_page",
         "endpoints": [
             {"method": "POST", "path": url_for('catalog_api_add_item'), "description": "Добавить новый элемент (книгу или фильм) в каталог.", "example_request": {"type": "book", "title": "Автостопом по галактике", "author": "Дуглас Адамс", "year": 1979, "genre":"Научная фантастика"}},
-            {"method": "GET", "path": url_for('catalog_api_get_items'), "description": "Получить список всех элементов каталога. Поддерживается фильтрация по GET-параметрам: ?type=book&author=...&year=...&genre=...&title=...&creator=..."},
-            {"method": "GET", "path": "/api/catalog/<id>", "description": "Получить детальную информацию об элементе каталога по его ID."}
+            {"method": "GET", "path": url_for('catalog_api_get_items'), "description": "Получить список всех элементов каталога. Поддерживается фильтрация по GET-параметрам: ?type=book&author=...&year=...&genre=...&title=...&creator=... Постраничная выдача: ?limit=N (до 1000) и ?cursor=... — курсор следующей страницы приходит в заголовке X-Next-Cursor. С заголовком Accept: application/x-ndjson элементы отдаются потоком в формате NDJSON."},
+            {"method": "GET", "path": "/api/catalog/<id>", "description": "Получить детальную информацию об элементе каталога по его ID."},
+            {"method": "POST", "path": url_for('catalog_api_bulk_import'), "description": "Пакетная загрузка каталога: NDJSON (Content-Type: application/x-ndjson, по элементу на строку, поля как у POST /api/catalog) или CSV с заголовком (Content-Type: text/csv, колонки type, title, author, director, year, genre). Ответ — сводка с номерами строк, которые не прошли проверку."},
+            {"method": "GET", "path": url_for('catalog_api_export'), "description": "Выгрузка всего каталога потоком: NDJSON по умолчанию, CSV — с ?format=csv или заголовком Accept: text/csv."}
         ]
     }
     return render_template('service_catalog.html', service_data=service_page_data, page_title=service_page_data["name"])
 
 @app.route('/service/calculator')
+@cached_page
 def service_calculator_page():
     """Отображает интерактивную страницу 'Калькулятора' и документацию по его API."""
     service_page_data = {
@@ -244,12 +566,14 @@ def service_calculator_page():
         "page_url_name": "service_calculator_page",
         "endpoints": [
             {"method": "GET", "path": f"{url_for('calculator_api_process')}?num1=X&num2=Y&operation=OP", "description": "Выполнить операцию. 'OP' может быть: add, subtract, multiply, divide."},
-            {"method": "POST", "path": url_for('calculator_api_process'), "description": "Тело запроса в формате JSON: {\"num1\": X, \"num2\": Y, \"operation\": \"OP\"}", "example_request": {"num1": 25, "num2": 4, "operation": "multiply"}}
+            {"method": "POST", "path": url_for('calculator_api_process'), "description": "Тело запроса в формате JSON: {\"num1\": X, \"num2\": Y, \"operation\": \"OP\"}", "example_request": {"num1": 25, "num2": 4, "operation": "multiply"}},
+            {"method": "POST", "path": url_for('calculator_api_process_batch'), "description": "Пакет операций за один запрос: {\"operations\": [{\"num1\": X, \"num2\": Y, \"operation\": \"OP\"}, ...]} или по столбцам {\"num1\": [...], \"num2\": [...], \"operation\": [...] или \"OP\"}. Ошибки сообщаются для каждой строки отдельно.", "example_request": {"num1": [1, 10, 7], "num2": [2, 0, 3], "operation": ["add", "divide", "*"]}}
         ]
     }
     return render_template('service_calculator.html', service_data=service_page_data, page_title=service_page_data["name"])
 
 @app.route('/service/random')
+@cached_page
 def service_random_page():
     """Отображает интерактивную страницу 'Генератора случайных данных' и документацию по его API."""
     service_page_data = {
@@ -258,7 +582,8 @@ def service_random_page():
         "page_url_name": "service_random_page",
         "endpoints": [
             {"method": "GET", "path": f"{url_for('random_data_api_get_number')}?min=X&max=Y", "description": "Генерация случайного целого числа в диапазоне от X до Y."},
-            {"method": "GET", "path": f"{url_for('random_data_api_get_password')}?length=L&use_symbols=true/false", "description": "Генерация случайного пароля указанной длины."}
+            {"method": "GET", "path": f"{url_for('random_data_api_get_password')}?length=L&use_symbols=true/false", "description": "Генерация случайного пароля указанной длины."},
+            {"method": "GET", "path": f"{url_for('random_data_api_get_password')}?length=L&count=N", "description": "Пакетный режим: N паролей за один запрос (до {app.config['RANDOM_MAX_BATCH_COUNT']}). Параметр count работает и для /api/random/number; большие пакеты отдаются потоком, с заголовком Accept: application/x-ndjson — по одному значению на строку."}
         ]
     }
     return render_template('service_random.html', service_data=service_page_data, page_title=service_page_data["name"])
@@ -271,35 +596,135 @@ def service_random_page():
 @app.route('/api/tasks', methods=['POST'])
 def tasks_api_create():
     """API: Создает новую задачу."""
-    global _next_task_id_counter
     if not request.is_json:
-        return jsonify({"error": "Некорректный формат запроса: ожидается JSON."}), 400
+        return error_response("Некорректный формат запроса: ожидается JSON.", 400)
     
     json_data = request.get_json()
     task_description_text = json_data.get('text')
 
     if not task_description_text or not isinstance(task_description_text, str) or not task_description_text.strip():
-        return jsonify({"error": "Поле 'text' для задачи обязательно и не может быть пустым."}), 400
+        return error_response("Поле 'text' для задачи обязательно и не может быть пустым.", 400)
     
-    new_task_item = {
-        'id': _next_task_id_counter,
+    new_task_item = tasks_db.create({
         'text': task_description_text.strip(),
         'done': False # Новые задачи по умолчанию не выполнены
-    }
-    tasks_db.append(new_task_item)
-    _next_task_id_counter += 1
+    })
     
     return jsonify({'message': 'Задача успешно создана.', 'task': new_task_item}), 201
 
+def parse_task_version(version_str, parameter_name):
+    """
+    Разбирает номер версии списка задач из параметра или заголовка.
+
+    Returns:
+        tuple[int | None, str | None]: Версия и текст ошибки (None, если версия корректна).
+    """
+    try:
+        version = int(version_str)
+    except ValueError:
+        version = -1
+    if version < 0:
+        return None, f"Параметр '{parameter_name}' должен быть целым неотрицательным числом (версией списка задач)."
+    return version, None
+
 @app.route('/api/tasks', methods=['GET'])
 def tasks_api_get_all():
-    """API: Возвращает список всех задач."""
-    return jsonify({'count': len(tasks_db),'tasks': tasks_db})
+    """
+    API: Возвращает список всех задач (большие списки и NDJSON — потоком).
+
+    С параметром ?since=<версия> возвращает только изменения после этой версии:
+    измененные/новые задачи ('changed') и ID удаленных ('deleted'). Если
+    изменения с такой версии уже не восстановить, отдается полный список
+    с флагом 'reset': true.
+
+    Ответ несет слабый ETag версии списка; на совпавший If-None-Match — 304.
+    """
+    def build_response():
+        extra_fields = {}
+        since_str = request.args.get('since')
+        if since_str is not None:
+            since_version, version_error = parse_task_version(since_str, 'since')
+            if version_error:
+                return jsonify({"error": version_error}), 400
+            task_changes = tasks_db.changes_since(since_version)
+            if task_changes is not None:
+                return jsonify({
+                    'since': since_version,
+                    'version': task_changes.version,
+                    'changed': task_changes.changed,
+                    'deleted': task_changes.deleted_ids
+                })
+            extra_fields['reset'] = True
+
+        # Версию читаем до списка: изменения, попавшие между ними, клиент просто получит в следующей дельте еще раз.
+        tasks_version = tasks_db.version
+        tasks_count = len(tasks_db)
+        envelope_fields = {'count': tasks_count, 'version': tasks_version, **extra_fields}
+        if should_stream_collection(tasks_count):
+            return stream_collection_response(tasks_db, tasks_count, envelope_key='tasks', envelope_fields=envelope_fields)
+        return jsonify({**envelope_fields, 'tasks': tasks_db.all()})
+
+    return conditional_store_response(tasks_db, 'tasks', build_response)
+
+@app.route('/api/tasks/events', methods=['GET'])
+def tasks_api_events():
+    """
+    API: Поток изменений списка задач в формате Server-Sent Events.
+
+    Каждое событие 'changes' содержит то же, что и ответ GET /api/tasks?since=...,
+    а его ID — версия списка, так что браузер после обрыва связи сам продолжит
+    с нужного места (заголовок Last-Event-ID). Событие 'reset' означает, что
+    дельту собрать нельзя и список нужно перечитать целиком. Поток закрывается
+    через TASK_EVENTS_MAX_STREAM_SECONDS секунд — браузер переподключается сам.
+    """
+    start_version_str = request.headers.get('Last-Event-ID') or request.args.get('since')
+    if start_version_str is None:
+        start_version = tasks_db.version
+    else:
+        start_version, version_error = parse_task_version(start_version_str, 'since')
+        if version_error:
+            return jsonify({"error": version_error}), 400
+
+    keepalive_seconds = app.config['TASK_EVENTS_KEEPALIVE_SECONDS']
+    stream_deadline = time.monotonic() + app.config['TASK_EVENTS_MAX_STREAM_SECONDS']
+    ensure_ascii = app.config['JSON_AS_ASCII']
+
+    def generate_task_events():
+        last_version = start_version
+        yield 'retry: 3000\n\n' # Через сколько миллисекунд браузеру переподключаться после обрыва
+        while True:
+            remaining_seconds = stream_deadline - time.monotonic()
+            if remaining_seconds <= 0:
+                # Срок потока вышел: освобождаем воркер, браузер переподключится с последней версии.
+                return
+            current_version = tasks_db.wait_for_change(last_version, min(keepalive_seconds, remaining_seconds))
+            if current_version == last_version:
+                yield ': keepalive\n\n'
+                continue
+            task_changes = tasks_db.changes_since(last_version)
+            if task_changes is None:
+                yield format_server_sent_event({'version': current_version}, event='reset',
+                                               event_id=current_version, ensure_ascii=ensure_ascii)
+                last_version = current_version
+                continue
+            yield format_server_sent_event({
+                'since': last_version,
+                'version': task_changes.version,
+                'changed': task_changes.changed,
+                'deleted': task_changes.deleted_ids
+            }, event='changes', event_id=task_changes.version, ensure_ascii=ensure_ascii)
+            last_version = task_changes.version
+
+    response = Response(generate_task_events(), mimetype=EVENT_STREAM_MIMETYPE)
+    response.headers['Cache-Control'] = 'no-cache'
+    # Просим прокси (например, nginx) не буферизовать поток событий.
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
 
 @app.route('/api/tasks/<int:task_id>', methods=['GET'])
 def tasks_api_get_one(task_id: int):
     """API: Возвращает одну задачу по ее ID."""
-    found_task = next((task for task in tasks_db if task['id'] == task_id), None)
+    found_task = tasks_db.get(task_id)
     if found_task is None:
         return jsonify({"error": f"Задача с идентификатором {task_id} не найдена."}), 404
     return jsonify({'task': found_task})
@@ -307,21 +732,20 @@ def tasks_api_get_one(task_id: int):
 @app.route('/api/tasks/<int:task_id>', methods=['PUT'])
 def tasks_api_update_one(task_id: int):
     """API: Обновляет существующую задачу (текст и/или статус выполнения)."""
-    task_to_modify = next((task for task in tasks_db if task['id'] == task_id), None)
+    task_to_modify = tasks_db.get(task_id)
     if task_to_modify is None:
         return jsonify({"error": f"Задача с ID {task_id} не найдена и не может быть обновлена."}), 404
     
     if not request.is_json:
-        return jsonify({"error": "Тело запроса для обновления должно быть в формате JSON."}), 400
+        return error_response("Тело запроса для обновления должно быть в формате JSON.", 400)
     
     update_data = request.get_json()
-    fields_updated_count = 0
+    validated_changes = {}
 
     if 'text' in update_data:
         new_text = update_data['text']
         if isinstance(new_text, str) and new_text.strip():
-            task_to_modify['text'] = new_text.strip()
-            fields_updated_count += 1
+            validated_changes['text'] = new_text.strip()
         elif new_text is not None: # Если text передан, но он невалидный
              app.logger.warning(f"При обновлении задачи {task_id} получено невалидное значение для 'text': {new_text}")
              # Можно вернуть ошибку 400, если это строгое требование.
@@ -330,108 +754,211 @@ def tasks_api_update_one(task_id: int):
     if 'done' in update_data:
         new_status = update_data['done']
         if isinstance(new_status, bool):
-            task_to_modify['done'] = new_status
-            fields_updated_count += 1
+            validated_changes['done'] = new_status
         elif new_status is not None: # Если done передано, но не булево
             app.logger.warning(f"При обновлении задачи {task_id} получено невалидное значение для 'done': {new_status}")
             # return jsonify({"error": "Если поле 'done' передано, оно должно быть булевым значением (true/false)."}), 400
 
-    if fields_updated_count == 0 and update_data: # Если тело запроса было, но ничего валидного не найдено
+    if not validated_changes and update_data: # Если тело запроса было, но ничего валидного не найдено
         return jsonify({"message": "Не было предоставлено валидных данных для обновления.", 'task': task_to_modify}), 200 # или 400, если это считать ошибкой клиента
-        
+
+    task_to_modify = tasks_db.update(task_id, validated_changes)
     return jsonify({'message': f'Задача {task_id} была успешно обновлена.', 'task': task_to_modify})
 
 @app.route('/api/tasks/<int:task_id>', methods=['DELETE'])
 def tasks_api_delete_one(task_id: int):
     """API: Удаляет задачу по ее ID."""
-    global tasks_db # Так как мы модифицируем сам список
-    
-    original_length = len(tasks_db)
-    tasks_db = [task for task in tasks_db if task['id'] != task_id]
-    
-    if len(tasks_db) == original_length: # Значит, задача не была найдена и удалена
+    if not tasks_db.delete(task_id): # Значит, задача не была найдена и удалена
         return jsonify({"error": f"Задача с идентификатором {task_id} не найдена для удаления."}), 404
         
     # Статус 200 OK с сообщением или 204 No Content с пустым телом. Выберем 200 для единообразия с сообщением.
     return jsonify({"message": f"Задача {task_id} успешно удалена из списка."}), 200
 
+@app.route('/api/tasks/bulk', methods=['POST'])
+def tasks_api_bulk_import():
+    """
+    API: Пакетная загрузка задач из NDJSON или CSV.
+
+    Тело разбирается потоком, по мере чтения; корректные задачи добавляются
+    пачками, а строки с ошибками перечисляются в 'errors' с номером строки.
+    """
+    return bulk_import_response(tasks_db, TaskValidator())
+
+@app.route('/api/tasks/export', methods=['GET'])
+def tasks_api_export():
+    """API: Выгрузка всех задач потоком (NDJSON или CSV) — в формате, который принимает пакетная загрузка."""
+    return bulk_export_response(tasks_db, TASK_CSV_COLUMNS, 'tasks')
+
 # Сервис 2: Сокращатель URL - API
 @app.route('/api/shorten', methods=['POST'])
 def url_shortener_api_create():
     """API: Создает короткую ссылку для переданного длинного URL."""
     if not request.is_json:
-        return jsonify({'error': 'Тело запроса должно быть в формате JSON.'}), 400
+        return error_response('Тело запроса должно быть в формате JSON.', 400)
     
     data = request.get_json()
     original_long_url = data.get('long_url')
 
     if not original_long_url or not isinstance(original_long_url, str):
-        return jsonify({'error': 'Обязательное поле "long_url" отсутствует или имеет неверный тип (ожидается строка).'}), 400
+        return error_response('Обязательное поле "long_url" отсутствует или имеет неверный тип (ожидается строка).', 400)
+
+    # Необязательный срок жизни ссылки в секундах; после него ссылка удаляется.
+    ttl_seconds = data.get('ttl_seconds')
+    max_ttl_seconds = app.config['SHORT_URL_MAX_TTL_SECONDS']
+    if ttl_seconds is not None and (
+            isinstance(ttl_seconds, bool) or not isinstance(ttl_seconds, int) or not 0 < ttl_seconds <= max_ttl_seconds):
+        return error_response(f'Поле "ttl_seconds" должно быть целым числом от 1 до {max_ttl_seconds}.', 400)
     
     # TODO: Реализовать более строгую валидацию URL, например, с использованием urllib.parse.
     #       Например, `from urllib.parse import urlparse; parsed = urlparse(original_long_url); if not (parsed.scheme and parsed.netloc): ...`
 
     # Проверка на существующие сокращения для данного URL – для избежания дублирования.
-    for short_code, mapped_url in url_shortener_mappings.items():
-        if mapped_url == original_long_url:
-            # Формируем полный URL для уже существующей короткой ссылки.
-            # request.host_url обычно включает слеш в конце, например, 'http://127.0.0.1:5001/'
-            # url_for('redirect_by_short_code', ...) вернет '/s/short_code'
-            # Убираем лишний слеш, если он есть.
-            full_existing_short_url = request.host_url.rstrip('/') + url_for('redirect_by_short_code', short_code=short_code)
-            return jsonify({
-                'message': 'Этот URL уже был сокращен ранее.',
-                'short_url': full_existing_short_url,
-                'original_url': original_long_url
-            }), 200 # 200 OK, так как ресурс уже существует.
-
-    generated_code = generate_random_short_code()
-    # Цикл для гарантии уникальности кода (маловероятно при длине 6, но лучшая практика).
-    # Ограничим количество попыток, чтобы избежать бесконечного цикла в теории.
-    MAX_CODE_GENERATION_ATTEMPTS = 10 
-    current_attempt = 0
-    while generated_code in url_shortener_mappings and current_attempt < MAX_CODE_GENERATION_ATTEMPTS:
-        generated_code = generate_random_short_code()
-        current_attempt += 1
-    
-    if generated_code in url_shortener_mappings:
-        # Этот сценарий очень маловероятен с достаточной длиной кода.
-        app.logger.error("Не удалось сгенерировать уникальный короткий код для URL после нескольких попыток.")
-        return jsonify({'error': 'Внутренняя ошибка сервера: не удалось создать короткую ссылку. Пожалуйста, попробуйте позже.'}), 500
+    # Поиск идет по обратному индексу хранилища за O(1). Ссылка со сроком жизни всегда
+    # создается заново, а обратный индекс знает только бессрочные ссылки.
+    existing_short_code = url_shortener_mappings.find_code(original_long_url) if ttl_seconds is None else None
+    if existing_short_code is not None:
+        # Формируем полный URL для уже существующей короткой ссылки.
+        # request.host_url обычно включает слеш в конце, например, 'http://127.0.0.1:5001/'
+        # url_for('redirect_by_short_code', ...) вернет '/s/short_code'
+        # Убираем лишний слеш, если он есть.
+        full_existing_short_url = request.host_url.rstrip('/') + url_for('redirect_by_short_code', short_code=existing_short_code)
+        return jsonify({
+            'message': 'Этот URL уже был сокращен ранее.',
+            'short_url': full_existing_short_url,
+            'original_url': original_long_url
+        }), 200 # 200 OK, так как ресурс уже существует.
+
+    try:
+        # Счетчиковый аллокатор не знает коллизий; ошибка возможна только у случайного.
+        generated_code = short_code_allocator.allocate()
+    except ShortCodeAllocationError as error:
+        app.logger.error(f"Не удалось сгенерировать уникальный короткий код для URL: {error}")
+        return error_response('Внутренняя ошибка сервера: не удалось создать короткую ссылку. Пожалуйста, попробуйте позже.', 500)
     
-    url_shortener_mappings[generated_code] = original_long_url
+    expires_at = time.time() + ttl_seconds if ttl_seconds is not None else None
+    url_shortener_mappings.add(generated_code, original_long_url, expires_at=expires_at)
+    if short_code_filter is not None:
+        short_code_filter.add(generated_code)
     # Формируем полный короткий URL для ответа клиенту.
     # Используем /s/ префикс для коротких ссылок, чтобы они не конфликтовали с другими маршрутами.
     full_new_short_url = request.host_url.rstrip('/') + url_for('redirect_by_short_code', short_code=generated_code)
     
-    return jsonify({
+    response_data = {
         'message': 'URL-адрес успешно сокращен!',
         'short_url': full_new_short_url,
         'original_url': original_long_url
-    }), 201
+    }
+    if expires_at is not None:
+        response_data['expires_at'] = datetime.datetime.fromtimestamp(expires_at, datetime.timezone.utc).isoformat()
+    return jsonify(response_data), 201
+
+@app.route('/api/shorten/keyspace', methods=['GET'])
+def url_shortener_api_keyspace_stats():
+    """API: Возвращает метрики заполненности пространства коротких кодов."""
+    # Флаг 'should_lengthen_codes' подсказывает, что пора увеличить длину кода.
+    return jsonify(short_code_allocator.keyspace_stats())
+
+@app.route('/api/shorten/filter', methods=['GET'])
+def url_shortener_api_filter_stats():
+    """API: Возвращает метрики фильтра Блума по выданным кодам (память, доля ложных срабатываний)."""
+    if short_code_filter is None:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, **short_code_filter.stats()})
 
 @app.route('/s/<short_code>', methods=['GET']) # Изменен маршрут на /s/ для ясности
 def redirect_by_short_code(short_code: str):
     """Перенаправляет с короткого URL на оригинальный длинный URL."""
+    # Существующие коды обычно обслуживает RedirectFastPath (см. ниже) еще до Flask;
+    # сюда доходят неизвестные коды и запросы, если быстрый путь отключен.
     destination_url = url_shortener_mappings.get(short_code)
     
     if destination_url:
-        # TODO: Добавить логирование переходов или подсчет статистики использования ссылок.
-        app.logger.info(f"Редирект: короткий код '{short_code}' -> '{destination_url}'")
+        click_recorder.record(short_code)
+        redirect_access_log.record(short_code, destination_url)
         return redirect(destination_url, code=302) # 302 Found - стандарт для временного редиректа.
     else:
         # FIXME: Возможно, стоит рендерить красивую HTML-страницу 404, а не JSON,
         #        так как по этой ссылке будут переходить обычные пользователи.
-        return jsonify({'error': f'Короткая ссылка с кодом "{short_code}" не найдена или устарела.'}), 404
+        return jsonify({'error': SHORT_URL_NOT_FOUND_MESSAGE.format(short_code=short_code)}), 404
+
+redirect_access_log = BufferedAccessLog(
+    app.logger,
+    sample_rate=app.config['REDIRECT_ACCESS_LOG_SAMPLE_RATE'],
+    flush_interval=app.config['REDIRECT_ACCESS_LOG_FLUSH_SECONDS'],
+)
+click_recorder = ClickRecorder(
+    portal_storage.click_stats, flush_interval=app.config['CLICK_STATS_FLUSH_SECONDS'], logger=app.logger
+)
+short_code_filter = None
+if app.config['SHORT_CODE_FILTER_ENABLED']:
+    short_code_filter = ShortCodeBloomFilter(
+        lambda: (short_code for short_code, _ in url_shortener_mappings.items()),
+        capacity=app.config['SHORT_CODE_FILTER_CAPACITY'],
+        false_positive_rate=app.config['SHORT_CODE_FILTER_FALSE_POSITIVE_RATE'],
+    )
+# Редиректы по существующим кодам отдаются готовыми ответами, минуя Flask;
+# коды, которых точно нет (по фильтру), — готовым 404. Истекшие и вытесненные
+# ссылки убираются из кеша готовых ответов через слушатель удаления хранилища.
+redirect_fast_path = RedirectFastPath(
+    app.wsgi_app,
+    url_shortener_mappings.get,
+    prefix='/s/',
+    cache_size=app.config['REDIRECT_CACHE_SIZE'],
+    access_log=redirect_access_log,
+    click_recorder=click_recorder,
+    code_filter=short_code_filter,
+    touch_code=url_shortener_mappings.touch,
+    render_not_found=lambda short_code: app.json.encode(
+        {'error': SHORT_URL_NOT_FOUND_MESSAGE.format(short_code=short_code)}
+    ) + b'\n',
+)
+url_shortener_mappings.add_removal_listener(redirect_fast_path.invalidate)
+app.wsgi_app = redirect_fast_path
+
+@app.route('/api/shorten/<short_code>/stats', methods=['GET'])
+def url_shortener_api_click_stats(short_code: str):
+    """
+    API: Статистика переходов по короткой ссылке.
+
+    Возвращает общее число переходов и непустые почасовые корзины за последние
+    ?hours=N часов (по умолчанию 24). Переходы попадают в статистику с
+    задержкой в одну-две секунды (см. click_analytics.py).
+    """
+    destination_url = url_shortener_mappings.get(short_code)
+    if destination_url is None:
+        return jsonify({'error': SHORT_URL_NOT_FOUND_MESSAGE.format(short_code=short_code)}), 404
+
+    max_hours = app.config['CLICK_STATS_MAX_HOURS']
+    try:
+        window_hours = int(request.args.get('hours', '24'))
+    except ValueError:
+        window_hours = 0
+    if not 1 <= window_hours <= max_hours:
+        return error_response(f"Параметр 'hours' должен быть целым числом от 1 до {max_hours}.", 400)
+
+    current_hour = int(datetime.datetime.now(datetime.timezone.utc).timestamp()) // SECONDS_PER_HOUR
+    hourly_clicks = click_stats.hourly_clicks(short_code, current_hour - window_hours + 1)
+    return jsonify({
+        'short_code': short_code,
+        'long_url': destination_url,
+        'total_clicks': click_stats.total_clicks(short_code),
+        'hours': window_hours,
+        'hourly_clicks': [
+            {
+                'hour': datetime.datetime.fromtimestamp(hour * SECONDS_PER_HOUR, datetime.timezone.utc).isoformat(),
+                'clicks': clicks
+            }
+            for hour, clicks in hourly_clicks
+        ]
+    })
 
 # Сервис 3: Цитаты дня - API
 @app.route('/api/quotes', methods=['POST']) # Изменил путь на /api/quotes для REST-подобности
 @protected_by_auth # Этот эндпоинт защищен Basic Authentication.
 def quotes_api_add_new():
     """API: Добавляет новую цитату в коллекцию (требует аутентификации)."""
-    global _next_quote_id_counter
     if not request.is_json:
-        return jsonify({"error": "Запрос должен быть в формате JSON."}), 400
+        return error_response("Запрос должен быть в формате JSON.", 400)
     
     data = request.get_json()
     quote_text = data.get("text")
@@ -441,95 +968,59 @@ def quotes_api_add_new():
         quote_author = "Аноним"
 
     if not quote_text or not isinstance(quote_text, str) or not quote_text.strip():
-        return jsonify({"error": "Поле 'text' для цитаты является обязательным и не может быть пустым."}), 400
+        return error_response("Поле 'text' для цитаты является обязательным и не может быть пустым.", 400)
     
     # Предотвращение дублирования (опционально, но полезно)
     # for existing_quote in quotes_collection:
     #     if existing_quote["text"].lower() == quote_text.lower() and existing_quote["author"].lower() == quote_author.lower():
     #         return jsonify({"warning": "Такая цитата от этого автора уже существует.", "quote": existing_quote}), 409 # Conflict
 
-    new_quote_entry = {
-        "id": _next_quote_id_counter,
+    new_quote_entry = quotes_collection.create({
         "text": quote_text.strip(),
         "author": quote_author # Уже .strip() выше
-    }
-    quotes_collection.append(new_quote_entry)
-    _next_quote_id_counter += 1
+    })
     return jsonify({'message': 'Цитата успешно добавлена в коллекцию.', 'quote': new_quote_entry}), 201
 
 @app.route('/api/quotes/random', methods=['GET']) # Путь /api/quotes/random
 def quotes_api_get_random():
     """API: Возвращает случайную цитату из имеющихся."""
-    if not quotes_collection:
-        return jsonify({"error": "В данный момент нет доступных цитат для отображения."}), 404 # Not Found
-    
-    randomly_selected_quote = random.choice(quotes_collection)
+    randomly_selected_quote = quotes_collection.random_record()
+    if randomly_selected_quote is None:
+        return error_response("В данный момент нет доступных цитат для отображения.", 404) # Not Found
     return jsonify(randomly_selected_quote)
 
 @app.route('/api/quotes/<int:quote_id>', methods=['GET']) # Путь /api/quotes/<id>
 def quotes_api_get_one_by_id(quote_id: int):
-    """API: Возвращает цитату по ее уникальному идентификатору."""
-    found_quote = next((q for q in quotes_collection if q['id'] == quote_id), None)
-    if found_quote:
-        return jsonify(found_quote)
-    else:
-        return jsonify({"error": f"Цитата с идентификатором {quote_id} не найдена в коллекции."}), 404
+    """API: Возвращает цитату по ее уникальному идентификатору (с ETag версии коллекции цитат)."""
+    def build_response():
+        found_quote = quotes_collection.get(quote_id)
+        if found_quote:
+            return jsonify(found_quote)
+        else:
+            return jsonify({"error": f"Цитата с идентификатором {quote_id} не найдена в коллекции."}), 404
+
+    return conditional_store_response(quotes_collection, 'quotes', build_response)
 
 # Сервис 4: Каталог книг и фильмов - API
 @app.route('/api/catalog', methods=['POST'])
 def catalog_api_add_item():
     """API: Добавляет новый элемент (книгу или фильм) в медиа-каталог."""
-    global _next_catalog_item_id_counter
     if not request.is_json:
-        return jsonify({"error": "Тело запроса должно быть в формате JSON."}), 400
+        return error_response("Тело запроса должно быть в формате JSON.", 400)
     
     data = request.get_json()
-    
-    item_type = data.get('type')
-    title = data.get('title')
-    year_str = data.get('year')
-    genre = data.get("genre", "Не указан").strip() # Жанр опционален, по умолчанию "Не указан"
-
-    # --- Валидация входных данных ---
-    if not item_type or item_type not in ['book', 'movie']:
-        return jsonify({"error": "Обязательное поле 'type' должно иметь значение 'book' или 'movie'."}), 400
-    if not title or not isinstance(title, str) or not title.strip():
-        return jsonify({"error": "Обязательное поле 'title' не может быть пустым."}), 400
-    
-    try:
-        year = int(year_str) if year_str is not None else None # None если не передано
-        # Проверка корректности года (реалистичные рамки)
-        current_real_year = datetime.datetime.now().year
-        # Позволяем указывать год на несколько лет вперед (для будущих релизов)
-        if year is None or not (1800 <= year <= current_real_year + 10): 
-             return jsonify({"error": f"Поле 'year' ({year_str}) содержит некорректное значение. Ожидается год в диапазоне 1800-{current_real_year + 10}."}), 400
-    except ValueError: # Если year_str не может быть преобразован в int
-        return jsonify({"error": f"Значение года '{year_str}' должно быть целым числом."}), 400
-
-    new_catalog_entry = {
-        "id": _next_catalog_item_id_counter,
-        "type": item_type,
-        "title": title.strip(),
-        "year": year,
-        "genre": genre if genre else "Не указан" # Убедимся, что пустая строка тоже станет "Не указан"
-    }
+    if not isinstance(data, dict):
+        return error_response("Тело запроса должно быть JSON-объектом.", 400)
+
+    # Правила проверки общие с пакетной загрузкой (см. bulk_import.py).
+    new_catalog_entry, validation_error = CatalogItemValidator(datetime.datetime.now().year)(data)
+    if validation_error:
+        return jsonify({"error": validation_error}), 400
 
-    if item_type == 'book':
-        author = data.get('author')
-        if not author or not isinstance(author, str) or not author.strip():
-            return jsonify({"error": "Для элемента типа 'book' обязательно указание автора (непустая строка в поле 'author')."}), 400
-        new_catalog_entry['author'] = author.strip()
-    elif item_type == 'movie':
-        director = data.get('director')
-        if not director or not isinstance(director, str) or not director.strip():
-            return jsonify({"error": "Для элемента типа 'movie' обязательно указание режиссера (непустая строка в поле 'director')."}), 400
-        new_catalog_entry['director'] = director.strip()
-    
     # TODO: Рассмотреть возможность добавления уникальности (например, по title + author/director + year),
     #       чтобы избежать полного дублирования записей в каталоге.
 
-    media_catalog_db.append(new_catalog_entry)
-    _next_catalog_item_id_counter += 1
+    new_catalog_entry = media_catalog_db.create(new_catalog_entry)
     return jsonify({'message': 'Новый элемент успешно добавлен в каталог.', 'item': new_catalog_entry}), 201
 
 @app.route('/api/catalog', methods=['GET'])
@@ -537,62 +1028,94 @@ def catalog_api_get_items():
     """
     API: Возвращает список элементов каталога.
     Поддерживает фильтрацию по GET-параметрам: type, author, director, year, genre, title, creator.
+    Постраничная выдача: limit (размер страницы) и cursor (из заголовка X-Next-Cursor предыдущей страницы).
+    Ответ несет слабый ETag версии каталога и запроса; на совпавший If-None-Match — 304.
     """
-    # Начинаем с полной копии каталога, которую будем фильтровать.
-    filtered_results = list(media_catalog_db) 
-
-    # Получаем параметры фильтрации из запроса.
-    # `request.args.get` безопасно возвращает None, если параметр отсутствует.
-    filter_type = request.args.get('type')
-    filter_author = request.args.get('author', type=str) # type=str для приведения, если параметр есть
-    filter_director = request.args.get('director', type=str)
-    filter_year_str = request.args.get('year')
-    filter_genre = request.args.get('genre', type=str)
-    filter_title = request.args.get('title', type=str)
-    filter_creator = request.args.get('creator', type=str) # Универсальный фильтр по автору ИЛИ режиссеру
-
-    # Применяем фильтры последовательно.
-    if filter_type:
-        filtered_results = [item for item in filtered_results if item.get('type') == filter_type]
-    
-    # Для текстовых полей (автор, режиссер, жанр, название) используем поиск по части строки без учета регистра.
-    if filter_author:
-        filtered_results = [item for item in filtered_results if filter_author.lower() in item.get('author', '').lower()]
-    if filter_director:
-        filtered_results = [item for item in filtered_results if filter_director.lower() in item.get('director', '').lower()]
-    if filter_genre:
-        filtered_results = [item for item in filtered_results if filter_genre.lower() in item.get('genre', '').lower()]
-    if filter_title:
-        filtered_results = [item for item in filtered_results if filter_title.lower() in item.get('title', '').lower()]
-    
-    if filter_creator:
-        creator_query = filter_creator.lower()
-        filtered_results = [
-            item for item in filtered_results if 
-            (creator_query in item.get('author', '').lower()) or 
-            (creator_query in item.get('director', '').lower())
-        ]
-    
-    if filter_year_str:
+    def build_response():
+        # Параметры разбираются один раз: текстовые фильтры сразу переводятся в нижний регистр,
+        # а сам поиск идет по индексам хранилища (см. catalog_query.py), без перебора всего каталога.
+        # Для текстовых полей (автор, режиссер, жанр, название) ищется часть строки без учета регистра;
+        # creator — универсальный фильтр по автору ИЛИ режиссеру.
         try:
-            year_to_filter = int(filter_year_str)
-            filtered_results = [item for item in filtered_results if item.get('year') == year_to_filter]
-        except ValueError:
-            # Если год передан, но он не является числом, можно либо игнорировать фильтр, либо вернуть ошибку.
-            # Пока просто игнорируем, но можно добавить app.logger.warning или return jsonify(...) 400
-            app.logger.info(f"Получен нечисловой параметр года для фильтрации каталога: {filter_year_str}")
-            
-    # API каталога часто возвращает напрямую список элементов, а не объект с ключом 'items'.
-    return jsonify(filtered_results)
+            catalog_query = parse_catalog_query(
+                request.args,
+                # Нечисловой год не считается ошибкой — фильтр по году просто не применяется.
+                on_invalid_year=lambda year_str: app.logger.info(
+                    f"Получен нечисловой параметр года для фильтрации каталога: {year_str}"
+                ),
+            )
+        except CatalogQueryError as error:
+            return jsonify({"error": str(error)}), 400
+
+        page_items, next_cursor = media_catalog_db.query(catalog_query)
+
+        # API каталога часто возвращает напрямую список элементов, а не объект с ключом 'items',
+        # поэтому курсор следующей страницы передается в заголовках.
+        if should_stream_collection(len(page_items)):
+            response = stream_collection_response(page_items, len(page_items))
+        else:
+            response = jsonify(page_items)
+        if next_cursor is not None:
+            response.headers['X-Next-Cursor'] = str(next_cursor)
+            next_page_args = request.args.to_dict()
+            next_page_args['cursor'] = next_cursor
+            response.headers['Link'] = f'<{url_for("catalog_api_get_items", **next_page_args)}>; rel="next"'
+        return response
+
+    return conditional_store_response(media_catalog_db, 'catalog', build_response)
+
+@app.route('/api/catalog/facets', methods=['GET'])
+def catalog_api_get_facets():
+    """
+    API: Число элементов каталога по типу, жанру, году, десятилетию и создателю (автору или режиссеру).
+    Принимает те же фильтры, что и GET /api/catalog (для уточняющих счетчиков), а также
+    facets — список нужных фасетов через запятую и facet_limit — сколько самых частых значений выдать.
+    """
+    # Счетчики поддерживаются хранилищем при каждом изменении каталога, так что без фильтров
+    # ответ собирается по числу различных значений, а не перебором каталога.
+    # Курсор и размер страницы к фасетам не относятся и не проверяются.
+    filter_args = {name: value for name, value in request.args.items() if name not in ('limit', 'cursor')}
+    try:
+        catalog_query = parse_catalog_query(
+            filter_args,
+            on_invalid_year=lambda year_str: app.logger.info(
+                f"Получен нечисловой параметр года для фасетов каталога: {year_str}"
+            ),
+        )
+        facet_names, facet_limit = parse_facet_request(request.args)
+    except CatalogQueryError as error:
+        return jsonify({"error": str(error)}), 400
+    return conditional_store_response(
+        media_catalog_db, 'catalog',
+        lambda: jsonify(media_catalog_db.facets(catalog_query, facet_names, facet_limit)),
+    )
 
 @app.route('/api/catalog/<int:item_id>', methods=['GET'])
 def catalog_api_get_one_by_id(item_id: int):
-    """API: Возвращает элемент каталога по его уникальному ID."""
-    catalog_entry = next((item for item in media_catalog_db if item['id'] == item_id), None)
-    if catalog_entry:
-        return jsonify(catalog_entry)
-    else:
-        return jsonify({"error": f"Элемент каталога с идентификатором {item_id} не найден."}), 404
+    """API: Возвращает элемент каталога по его уникальному ID (с ETag версии каталога)."""
+    def build_response():
+        catalog_entry = media_catalog_db.get(item_id)
+        if catalog_entry:
+            return jsonify(catalog_entry)
+        else:
+            return jsonify({"error": f"Элемент каталога с идентификатором {item_id} не найден."}), 404
+
+    return conditional_store_response(media_catalog_db, 'catalog', build_response)
+
+@app.route('/api/catalog/bulk', methods=['POST'])
+def catalog_api_bulk_import():
+    """
+    API: Пакетная загрузка элементов каталога из NDJSON или CSV.
+
+    Правила проверки — те же, что у POST /api/catalog, но текущий год
+    берется один раз на весь запрос.
+    """
+    return bulk_import_response(media_catalog_db, CatalogItemValidator(datetime.datetime.now().year))
+
+@app.route('/api/catalog/export', methods=['GET'])
+def catalog_api_export():
+    """API: Выгрузка всего каталога потоком (NDJSON или CSV) — в формате, который принимает пакетная загрузка."""
+    return bulk_export_response(media_catalog_db, CATALOG_CSV_COLUMNS, 'catalog')
 
 # Сервис 5: Калькулятор - API
 @app.route('/api/calculate', methods=['GET', 'POST'])
@@ -610,7 +1133,7 @@ def calculator_api_process():
         request_source_info = "GET-параметры"
     elif request.method == 'POST':
         if not request.is_json:
-            return jsonify({"error": "Для POST-запросов ожидается тело в формате JSON."}), 400
+            return error_response("Для POST-запросов ожидается тело в формате JSON.", 400)
         input_data = request.get_json()
         request_source_info = "JSON (тело запроса)"
 
@@ -621,43 +1144,32 @@ def calculator_api_process():
     # Валидация наличия всех обязательных полей
     if None in [num1_str, num2_str, operation_name]: # Проверяем на None, а не только на falsy значения
         missing = [p for p in ['num1', 'num2', 'operation'] if input_data.get(p) is None]
-        return jsonify({"error": f"Отсутствуют обязательные параметры: {', '.join(missing)}."}), 400
-
-    # Отображение псевдонимов операций на символы для внутренней логики
-    # и проверка корректности операции.
-    operation_symbols_map = {
-        'add': '+', '+': '+', 'сложение': '+', 'сложить': '+',
-        'subtract': '-', '-': '-', 'вычитание': '-', 'вычесть': '-',
-        'multiply': '*', '*': '*', 'умножение': '*', 'умножить': '*',
-        'divide': '/', '/': '/', 'деление': '/', 'разделить': '/'
-    }
-    actual_operation_symbol = operation_symbols_map.get(str(operation_name).lower()) # Приводим к нижнему регистру для гибкости
+        return jsonify({"error": MISSING_PARAMETERS_MESSAGE.format(missing=', '.join(missing))}), 400
+
+    # Псевдонимы операций (add, '+', 'сложение', ...) общие с пакетным API, см. calculator.py.
+    actual_operation_symbol = resolve_operation_symbol(operation_name) # Регистр не учитывается
 
     if not actual_operation_symbol:
         return jsonify({"error": f"Недопустимая или неизвестная операция: '{operation_name}'. Поддерживаемые операции: add, subtract, multiply, divide (и их синонимы/символы)."}), 400
 
-    # Преобразование строковых представлений чисел в float с обработкой ошибок.
-    try:
-        operand1 = float(num1_str)
-        operand2 = float(num2_str)
-    except (ValueError, TypeError): # TypeError может быть, если numX_str это None (хотя мы проверили выше)
-        return jsonify({"error": "Параметры 'num1' и 'num2' должны быть корректно введенными числами."}), 400
+    # Преобразование строковых представлений чисел в float. inf и nan числами не считаются:
+    # в JSON их не записать (см. calculator.py).
+    operand1 = parse_operand(num1_str)
+    operand2 = parse_operand(num2_str)
+    if operand1 is None or operand2 is None:
+        return error_response(INVALID_NUMBER_MESSAGE, 400)
 
     # Выполнение самой арифметической операции.
     calculation_result = None
     specific_error_message = None
 
-    if actual_operation_symbol == '+':
-        calculation_result = operand1 + operand2
-    elif actual_operation_symbol == '-':
-        calculation_result = operand1 - operand2
-    elif actual_operation_symbol == '*':
-        calculation_result = operand1 * operand2
-    elif actual_operation_symbol == '/':
-        if operand2 == 0: # Важнейшая проверка при делении!
-            specific_error_message = "Ошибка: деление на ноль невозможно."
-        else:
-            calculation_result = operand1 / operand2
+    if actual_operation_symbol == '/' and operand2 == 0: # Важнейшая проверка при делении!
+        specific_error_message = DIVISION_BY_ZERO_MESSAGE
+    else:
+        calculation_result = OPERATION_FUNCTIONS[actual_operation_symbol](operand1, operand2)
+        if not math.isfinite(calculation_result): # Переполнение, например 1e308 * 1e308
+            specific_error_message = RESULT_OVERFLOW_MESSAGE
+            calculation_result = None
     
     if specific_error_message:
         # Возвращаем ошибку 400 (Bad Request), так как входные данные привели к ошибке вычисления.
@@ -674,7 +1186,55 @@ def calculator_api_process():
         "result": calculation_result
     })
 
+@app.route('/api/calculate/batch', methods=['POST'])
+def calculator_api_process_batch():
+    """
+    API: Выполняет пакет арифметических операций за один запрос.
+
+    Принимает построчный формат {"operations": [{"num1", "num2", "operation"}, ...]}
+    или столбцовый {"num1": [...], "num2": [...], "operation": [...] | "OP"}.
+    Ошибка в одной строке (деление на ноль, не число, неизвестная операция)
+    не прерывает пакет: в 'results' на ее месте будет null, а описание
+    попадет в 'errors' вместе с индексом строки.
+    """
+    if not request.is_json:
+        return error_response("Для POST-запросов ожидается тело в формате JSON.", 400)
+    try:
+        first_operands, second_operands, operation_names = parse_batch_payload(request.get_json())
+    except CalculatorBatchError as batch_error:
+        return jsonify({"error": str(batch_error)}), 400
+
+    calculation_results, row_errors = evaluate_batch(first_operands, second_operands, operation_names)
+    return jsonify({
+        "message": "Пакет операций обработан.",
+        "count": len(calculation_results),
+        "succeeded": len(calculation_results) - len(row_errors),
+        "failed": len(row_errors),
+        "results": calculation_results,
+        "errors": row_errors
+    })
+
 # Сервис 6: Генератор случайных чисел/паролей - API
+def parse_generation_count():
+    """
+    Читает параметр пакетного режима генератора 'count'.
+
+    Returns:
+        tuple[int | None, str | None]: Число значений (None — параметр не задан,
+        одиночный режим) и текст ошибки (None, если параметр корректен).
+    """
+    count_str = request.args.get('count')
+    if count_str is None:
+        return None, None
+    max_count = app.config['RANDOM_MAX_BATCH_COUNT']
+    try:
+        count = int(count_str)
+    except ValueError:
+        return None, "Параметр 'count' должен быть целым числом."
+    if not 1 <= count <= max_count:
+        return None, f"Параметр 'count' должен быть в диапазоне от 1 до {max_count}."
+    return count, None
+
 @app.route('/api/random/number', methods=['GET'])
 def random_data_api_get_number():
     """API: Генерирует случайное целое число в заданном диапазоне [min_val, max_val]."""
@@ -686,19 +1246,35 @@ def random_data_api_get_number():
         min_value = int(min_val_str)
         max_value = int(max_val_str)
     except ValueError:
-        return jsonify({"error": "Параметры 'min' и 'max' должны быть корректными целыми числами."}), 400
+        return error_response("Параметры 'min' и 'max' должны быть корректными целыми числами.", 400)
     
     if min_value > max_value:
-        return jsonify({"error": "Минимальное значение ('min') не может быть больше максимального ('max')."}), 400
+        return error_response("Минимальное значение ('min') не может быть больше максимального ('max').", 400)
     
     # Ограничиваем диапазон для предотвращения чрезмерной нагрузки или нереалистичных запросов.
     # FIXME: Эти "магические числа" (пределы) лучше вынести в конфигурационные константы.
     MAX_RANGE_DIFFERENCE = 1_000_000
     MAX_ABSOLUTE_VALUE = 5_000_000 # Ограничение на сами min/max
     if abs(max_value - min_value) > MAX_RANGE_DIFFERENCE or abs(min_value) > MAX_ABSOLUTE_VALUE or abs(max_value) > MAX_ABSOLUTE_VALUE:
-        return jsonify({"error": f"Запрошен слишком большой диапазон чисел. Максимальная разница между min и max: {MAX_RANGE_DIFFERENCE}, максимальное абсолютное значение для min/max: {MAX_ABSOLUTE_VALUE}."}), 400
+        return error_response(f"Запрошен слишком большой диапазон чисел. Максимальная разница между min и max: {MAX_RANGE_DIFFERENCE}, максимальное абсолютное значение для min/max: {MAX_ABSOLUTE_VALUE}.", 400)
         
-    generated_num = random.randint(min_value, max_value)
+    numbers_count, count_error = parse_generation_count()
+    if count_error:
+        return jsonify({"error": count_error}), 400
+    if numbers_count is not None:
+        # Пакетный режим: числа создаются блоками по мере отправки ответа.
+        generated_numbers = secure_random.iter_integers(min_value, max_value, numbers_count)
+        envelope_fields = {
+            "message": "Случайные числа успешно сгенерированы.",
+            "count": numbers_count,
+            "requested_min_bound": min_value,
+            "requested_max_bound": max_value
+        }
+        if should_stream_collection(numbers_count):
+            return stream_collection_response(generated_numbers, numbers_count, envelope_key='random_numbers', envelope_fields=envelope_fields)
+        return jsonify({**envelope_fields, "random_numbers": list(generated_numbers)})
+
+    generated_num = next(secure_random.iter_integers(min_value, max_value, 1))
     return jsonify({
         "message": "Случайное число успешно сгенерировано.",
         "requested_min_bound": min_value,
@@ -713,19 +1289,19 @@ def random_data_api_get_password():
         # Более безопасная длина пароля по умолчанию.
         password_length = int(request.args.get('length', '16')) 
     except ValueError:
-        return jsonify({"error": "Параметр 'length' (длина пароля) должен быть целым числом."}), 400
+        return error_response("Параметр 'length' (длина пароля) должен быть целым числом.", 400)
 
     # Разумные ограничения на длину генерируемого пароля.
     MIN_PASS_LENGTH = 6
     MAX_PASS_LENGTH = 128
     if not (MIN_PASS_LENGTH <= password_length <= MAX_PASS_LENGTH):
-        return jsonify({"error": f"Длина пароля ('length') должна быть в диапазоне от {MIN_PASS_LENGTH} до {MAX_PASS_LENGTH} символов."}), 400
+        return error_response(f"Длина пароля ('length') должна быть в диапазоне от {MIN_PASS_LENGTH} до {MAX_PASS_LENGTH} символов.", 400)
         
     # Обработка булева параметра для использования спецсимволов.
     # Приводим к нижнему регистру для гибкости ('True', 'true', 'False', 'false').
     use_special_symbols_str = request.args.get('use_symbols', 'true').lower()
     if use_special_symbols_str not in ['true', 'false']:
-        return jsonify({"error": "Параметр 'use_symbols' должен иметь значение 'true' или 'false'."}), 400
+        return error_response("Параметр 'use_symbols' должен иметь значение 'true' или 'false'.", 400)
     include_special_chars = use_special_symbols_str == 'true'
 
     # Формируем пул символов для генерации пароля.
@@ -742,7 +1318,24 @@ def random_data_api_get_password():
     #       Это потребует более сложной логики, например, сначала выбрать по одному символу
     #       каждого требуемого типа, а затем добирать оставшиеся случайно.
 
-    generated_password_str = ''.join(random.choice(character_pool) for _ in range(password_length))
+    passwords_count, count_error = parse_generation_count()
+    if count_error:
+        return jsonify({"error": count_error}), 400
+    if passwords_count is not None:
+        # Пакетный режим: пароли создаются блоками по мере отправки ответа.
+        generated_passwords = secure_random.iter_strings(character_pool, password_length, passwords_count)
+        envelope_fields = {
+            "message": "Пароли успешно сгенерированы.",
+            "count": passwords_count,
+            "requested_length": password_length,
+            "special_symbols_included": include_special_chars
+        }
+        if should_stream_collection(passwords_count):
+            return stream_collection_response(generated_passwords, passwords_count, envelope_key='passwords', envelope_fields=envelope_fields)
+        return jsonify({**envelope_fields, "passwords": list(generated_passwords)})
+
+    # Символы берутся из криптографически стойкого источника (os.urandom) без смещения распределения.
+    generated_password_str = next(secure_random.iter_strings(character_pool, password_length, 1))
     
     return jsonify({
         "message": "Пароль успешно сгенерирован.",
@@ -796,8 +1389,12 @@ CONVERSION_RATES = {
     }
     # TODO: Добавить другие категории (вес, температура и т.д.)
 }
+# Коэффициенты для каждой пары единиц внутри категории считаются один раз при старте
+# и используются пакетной конвертацией.
+conversion_table = ConversionTable(CONVERSION_RATES)
 
 @app.route('/service/converter')
+@cached_page
 def service_converter_page():
     """Отображает интерактивную страницу и документацию для сервиса "Конвертер Единиц"."""
     service_page_data = {
@@ -808,14 +1405,27 @@ def service_converter_page():
             {"method": "GET", "path": url_for('converter_api_get_units'), 
              "description": "Получить список доступных категорий и единиц измерения в них."},
             {"method": "GET", "path": f"{url_for('converter_api_convert')}?category=CATEGORY&from_unit=UNIT_A&to_unit=UNIT_B&value=X", 
-             "description": "Выполнить конвертацию. Например: ?category=length&from_unit=meter&to_unit=foot&value=10"}
+             "description": "Выполнить конвертацию. Например: ?category=length&from_unit=meter&to_unit=foot&value=10"},
+            {"method": "POST", "path": url_for('converter_api_convert_batch'),
+             "description": "Пакетная конвертация: одна пара единиц и массив значений {\"from_unit\": A, \"to_unit\": B, \"values\": [...]} или массив троек {\"conversions\": [[A, B, X], ...]}. Ошибки сообщаются для каждой строки отдельно, большие пакеты отдаются потоком.",
+             "example_request": {"from_unit": "kilometer", "to_unit": "mile", "values": [1, 5, 42.195]}}
         ]
     }
     return render_template('service_converter.html', service_data=service_page_data, page_title=service_page_data["name"])
 
-@app.route('/api/converter/units', methods=['GET'])
-def converter_api_get_units():
-    """API: Возвращает доступные категории и единицы для конвертации."""
+def build_converter_units_body(pretty: bool):
+    """
+    Сериализует ответ /api/converter/units.
+
+    CONVERSION_RATES во время работы не меняется, поэтому ответ строится один
+    раз при старте, а не на каждый запрос: компактный и форматированный (?pretty=1).
+
+    Args:
+        pretty (bool): Форматировать ли вывод с отступами.
+
+    Returns:
+        str: JSON-документ с названиями категорий и единицами в каждой из них.
+    """
     # Формируем данные для ответа, чтобы UI было удобно их использовать
     categories_for_response = {}
     for category_key, units_dict in CONVERSION_RATES.items():
@@ -829,11 +1439,35 @@ def converter_api_get_units():
         "data_storage_binary": "Размер данных (двоичная)",
         "data_storage_decimal": "Размер данных (десятичная)"
     }
-    
-    return jsonify({
+
+    dumps = app.json.item_dumps(pretty=pretty)
+    return dumps({
         "category_names": category_display_names,
         "units_by_category": categories_for_response
-        })
+        }) + '\n'
+
+# Форматирование (pretty) -> тело ответа. У каждого варианта свой сильный ETag: тело побайтно
+# одинаково, пока не изменится CONVERSION_RATES, но компактное и форматированное различаются.
+CONVERTER_UNITS_BODIES = {pretty: build_converter_units_body(pretty).encode('utf-8') for pretty in (False, True)}
+CONVERTER_UNITS_ETAGS = {
+    pretty: hashlib.sha256(body).hexdigest()[:32] for pretty, body in CONVERTER_UNITS_BODIES.items()
+}
+
+@app.route('/api/converter/units', methods=['GET'])
+def converter_api_get_units():
+    """
+    API: Возвращает доступные категории и единицы для конвертации.
+
+    Отдает заранее сериализованный ответ (компактный или форматированный — как
+    у остальных JSON-ответов) с ETag и Cache-Control; если If-None-Match
+    совпадает с ETag, отвечает 304 без тела.
+    """
+    pretty = app.json.pretty_requested()
+    response = Response(CONVERTER_UNITS_BODIES[pretty], mimetype='application/json')
+    response.set_etag(CONVERTER_UNITS_ETAGS[pretty])
+    response.cache_control.public = True
+    response.cache_control.max_age = app.config['CONVERTER_UNITS_MAX_AGE']
+    return response.make_conditional(request)
 
 @app.route('/api/converter/convert', methods=['GET'])
 def converter_api_convert():
@@ -845,9 +1479,11 @@ def converter_api_convert():
         value_str = request.args.get('value')
 
         if not all([category, from_unit_id, to_unit_id, value_str]):
-            return jsonify({"error": "Необходимо указать все параметры: category, from_unit, to_unit, value."}), 400
+            return error_response("Необходимо указать все параметры: category, from_unit, to_unit, value.", 400)
 
         value = float(value_str) # Преобразуем значение в число
+        if not math.isfinite(value): # inf и nan в JSON не записать
+            raise ValueError(value_str)
 
         if category not in CONVERSION_RATES:
             return jsonify({"error": f"Неизвестная категория: {category}."}), 400
@@ -862,7 +1498,9 @@ def converter_api_convert():
         # Конвертируем значение в базовую единицу категории, затем в целевую единицу
         value_in_base_unit = value * from_unit_data["factor"]
         converted_value = value_in_base_unit / to_unit_data["factor"]
-        
+        if not math.isfinite(converted_value):
+            return error_response(CONVERSION_OVERFLOW_MESSAGE, 400)
+
         return jsonify({
             "original_value": value,
             "original_unit_id": from_unit_id,
@@ -874,11 +1512,70 @@ def converter_api_convert():
         })
 
     except ValueError:
-        return jsonify({"error": "Параметр 'value' должен быть числом."}), 400
+        return error_response("Параметр 'value' должен быть числом.", 400)
     except Exception as e:
         app.logger.error(f"Ошибка конвертации: {e}", exc_info=True)
-        return jsonify({"error": "Внутренняя ошибка сервера при конвертации."}), 500
+        return error_response("Внутренняя ошибка сервера при конвертации.", 500)
+
+
+@app.route('/api/converter/convert/batch', methods=['POST'])
+def converter_api_convert_batch():
+    """
+    API: Конвертирует пакет значений за один запрос.
+
+    Каждая пара единиц — одно умножение на заранее вычисленный множитель
+    (см. unit_conversion.py). Строки с ошибкой дают null в 'results' и запись
+    в 'errors'; большие пакеты отдаются потоком.
+    """
+    if not request.is_json:
+        return error_response("Для POST-запросов ожидается тело в формате JSON.", 400)
+    try:
+        values, factors, row_errors = parse_conversion_batch(request.get_json(), conversion_table)
+    except ConversionBatchError as batch_error:
+        return jsonify({"error": str(batch_error)}), 400
+
+    values_count = len(values)
+    summary = {"count": values_count, "succeeded": values_count - len(row_errors), "failed": len(row_errors), "errors": row_errors}
+    converted_values = iter_converted_values(values, factors)
+    if values_count > app.config['JSON_STREAMING_THRESHOLD']:
+        # Ошибки известны после первого прохода, поэтому идут в обертку, а результаты — потоком.
+        return stream_collection_response(converted_values, values_count, envelope_key='results',
+                                          envelope_fields=summary, allow_ndjson=False)
+    return jsonify({**summary, "results": list(converted_values)})
+
+# --- Метрики запросов (Prometheus) ---
+request_metrics = RequestMetrics()
+
+@app.before_request
+def remember_route_for_metrics():
+    """Кладет шаблон маршрута запроса в окружение — по нему MetricsMiddleware группирует метрики."""
+    if request.url_rule is not None:
+        request.environ[ROUTE_ENVIRON_KEY] = request.url_rule.rule
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """
+    Метрики в текстовом формате Prometheus: гистограммы длительности и счетчики
+    ответов по маршрутам, число запросов в обработке и размеры хранилищ.
+    """
+    if not app.config['METRICS_ENABLED']:
+        return error_response("Сбор метрик отключен (PORTAL_METRICS=0).", 404)
+    store_sizes = {
+        'tasks': len(tasks_db),
+        'short_urls': len(url_shortener_mappings),
+        'catalog': len(media_catalog_db),
+        'quotes': len(quotes_collection),
+    }
+    return Response(request_metrics.render_prometheus(store_sizes), content_type=PROMETHEUS_CONTENT_TYPE)
+
+# Прослойка метрик — самая внешняя, чтобы учитывать и запросы, которые отдал быстрый путь редиректов.
+if app.config['METRICS_ENABLED']:
+    app.wsgi_app = MetricsMiddleware(app.wsgi_app, request_metrics, prefix_routes=(('/s/', '/s/<short_code>'),))
 
+# Все, что создано при старте (модули, маршруты, загруженные хранилища), живет до конца процесса:
+# gc.freeze переносит эти объекты в постоянное поколение, и сборки мусора больше их не обходят.
+gc.freeze()
+gc.enable()
 
 # --- Блок запуска Flask-приложения ---
 # Этот код выполняется только тогда, когда скрипт app.py запускается напрямую
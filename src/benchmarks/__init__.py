@@ -0,0 +1,6 @@
+"""
+Микро-бенчмарки для хранилищ и API-эндпоинтов портала.
+
+Каждый модуль запускается отдельно из каталога src, например:
+    python -m benchmarks.bench_task_store
+"""
@@ -0,0 +1,36 @@
+"""Общие помощники для замеров времени в бенчмарках."""
+import time
+
+
+def measure_latencies(operation, arguments):
+    """
+    Вызывает `operation` для каждого аргумента и замеряет время каждого вызова.
+
+    Args:
+        operation: Замеряемая функция одного аргумента.
+        arguments: Последовательность аргументов.
+
+    Returns:
+        list[float]: Отсортированные длительности вызовов в секундах.
+    """
+    timer = time.perf_counter
+    latencies = []
+    for argument in arguments:
+        started_at = timer()
+        operation(argument)
+        latencies.append(timer() - started_at)
+    latencies.sort()
+    return latencies
+
+
+def percentile(sorted_values, fraction):
+    """Возвращает перцентиль (fraction от 0 до 1) уже отсортированного списка."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+def format_microseconds(seconds):
+    """Форматирует длительность в микросекундах для вывода в таблицу."""
+    return f"{seconds * 1e6:8.2f} мкс"
@@ -0,0 +1,373 @@
+"""
+Нагрузочный набор по всем API-маршрутам портала с сохранением результатов и сравнением с эталоном.
+
+Для каждого размера данных (--sizes) хранилища задач, каталога, цитат и
+коротких ссылок дозаполняются до нужного числа записей, после чего каждый
+маршрут из ROUTE_CASES прогоняется двумя способами:
+- 'client' — тестовый клиент Flask (без сети: маршрутизация, обработчик,
+  сериализация);
+- 'server' — локальный WSGI-сервер werkzeug в отдельном потоке и
+  HTTP-соединение с keep-alive (добавляются разбор HTTP и сокет).
+
+Для каждой пары (маршрут, способ) выводятся запросы в секунду, p50/p95/p99
+и пиковый RSS процесса после прогона. Случайные параметры запросов (ID,
+числа) берутся из генератора с фиксированным зерном (--seed), поэтому
+повторный запуск делает ровно те же запросы. Маршруты, создающие записи,
+немного увеличивают хранилища. DELETE удаляет только задачи, созданные
+перед его прогоном (вне замера), поэтому размеры данных не уменьшаются.
+
+Результаты можно сохранить в JSON (--output) и сравнить с сохраненными
+ранее (--baseline): регрессией считается падение пропускной способности
+или рост p95 больше чем на --threshold (по умолчанию 10%). При регрессиях
+процесс завершается с кодом 1 — так набор можно запускать в CI.
+
+Запуск из каталога src:
+    python -m benchmarks.bench_api_routes [--sizes 1000,100000,1000000] [--drivers client,server]
+        [--requests 500] [--route-seconds 10] [--output results.json] [--baseline baseline.json]
+"""
+import argparse
+import base64
+import collections
+import datetime
+import http.client
+import importlib.metadata
+import json
+import logging
+import os
+import platform
+import random
+import sys
+import threading
+import time
+import urllib.parse
+
+from werkzeug.serving import make_server
+
+import app as portal
+from benchmarks._timing import percentile
+
+try:
+    import resource
+except ImportError:  # Windows: пиковый RSS не измеряется
+    resource = None
+
+GENRES = ('Роман', 'Антиутопия', 'Научная фантастика', 'Детектив', 'Драма', 'Комедия')
+DRIVERS = ('client', 'server')
+
+# path(rng, seed) -> путь с параметрами; body(rng) -> тело JSON или None;
+# disposable — на каждый запрос тратится одна задача из seed.disposable_task_ids.
+RouteCase = collections.namedtuple('RouteCase', ('name', 'method', 'path', 'body', 'auth', 'disposable'),
+                                   defaults=(None, False, False))
+
+ROUTE_CASES = (
+    RouteCase('tasks: список', 'GET', lambda rng, seed: '/api/tasks'),
+    RouteCase('tasks: по ID', 'GET', lambda rng, seed: f'/api/tasks/{rng.choice(seed.task_ids)}'),
+    RouteCase('tasks: изменения', 'GET', lambda rng, seed: f'/api/tasks?since={max(portal.tasks_db.version - 10, 0)}'),
+    RouteCase('tasks: создание', 'POST', lambda rng, seed: '/api/tasks',
+              lambda rng: {'text': f'Задача из бенчмарка {rng.randrange(10 ** 6)}'}),
+    RouteCase('tasks: изменение', 'PUT', lambda rng, seed: f'/api/tasks/{rng.choice(seed.task_ids)}',
+              lambda rng: {'done': rng.random() < 0.5}),
+    RouteCase('tasks: удаление', 'DELETE', lambda rng, seed: f'/api/tasks/{seed.disposable_task_ids.pop()}',
+              disposable=True),
+    RouteCase('shortener: создание', 'POST', lambda rng, seed: '/api/shorten',
+              lambda rng: {'long_url': f'https://example.com/bench/{rng.randrange(10 ** 9)}'}),
+    RouteCase('shortener: редирект', 'GET', lambda rng, seed: f'/s/{rng.choice(seed.short_codes)}'),
+    RouteCase('shortener: статистика', 'GET', lambda rng, seed: f'/api/shorten/{rng.choice(seed.short_codes)}/stats'),
+    RouteCase('shortener: ключи', 'GET', lambda rng, seed: '/api/shorten/keyspace'),
+    RouteCase('shortener: фильтр', 'GET', lambda rng, seed: '/api/shorten/filter'),
+    RouteCase('quotes: случайная', 'GET', lambda rng, seed: '/api/quotes/random'),
+    RouteCase('quotes: по ID', 'GET', lambda rng, seed: f'/api/quotes/{rng.choice(seed.quote_ids)}'),
+    RouteCase('quotes: создание', 'POST', lambda rng, seed: '/api/quotes',
+              lambda rng: {'text': f'Цитата из бенчмарка {rng.randrange(10 ** 6)}', 'author': 'Бенчмарк'}, True),
+    RouteCase('catalog: страница', 'GET', lambda rng, seed: '/api/catalog?limit=100'),
+    RouteCase('catalog: фильтр', 'GET', lambda rng, seed: f'/api/catalog?genre={rng.choice(GENRES)}&limit=100'),
+    RouteCase('catalog: год', 'GET', lambda rng, seed: f'/api/catalog?year={1900 + rng.randrange(120)}&limit=100'),
+    RouteCase('catalog: фасеты', 'GET', lambda rng, seed: '/api/catalog/facets'),
+    RouteCase('catalog: фасеты, фильтр', 'GET', lambda rng, seed: f'/api/catalog/facets?genre={rng.choice(GENRES)}'),
+    RouteCase('catalog: по ID', 'GET', lambda rng, seed: f'/api/catalog/{rng.choice(seed.catalog_ids)}'),
+    RouteCase('catalog: создание', 'POST', lambda rng, seed: '/api/catalog',
+              lambda rng: {'type': 'book', 'title': f'Книга из бенчмарка {rng.randrange(10 ** 6)}',
+                           'author': 'Бенчмарк', 'year': 2000, 'genre': rng.choice(GENRES)}),
+    RouteCase('calculator: GET', 'GET',
+              lambda rng, seed: f'/api/calculate?num1={rng.randrange(1000)}&num2={rng.randrange(1, 1000)}&operation=divide'),
+    RouteCase('calculator: пакет', 'POST', lambda rng, seed: '/api/calculate/batch',
+              lambda rng: {'num1': [rng.randrange(1000) for _ in range(100)],
+                           'num2': [rng.randrange(1, 1000) for _ in range(100)], 'operation': 'multiply'}),
+    RouteCase('random: число', 'GET', lambda rng, seed: '/api/random/number?min=1&max=1000000'),
+    RouteCase('random: пароль', 'GET', lambda rng, seed: '/api/random/password?length=16&use_symbols=true'),
+    RouteCase('converter: единицы', 'GET', lambda rng, seed: '/api/converter/units'),
+    RouteCase('converter: конвертация', 'GET',
+              lambda rng, seed: f'/api/converter/convert?category=length&from_unit=meter&to_unit=foot&value={rng.random() * 100}'),
+    RouteCase('converter: пакет', 'POST', lambda rng, seed: '/api/converter/convert/batch',
+              lambda rng: {'from_unit': 'kilometer', 'to_unit': 'mile', 'values': [rng.random() * 100 for _ in range(1000)]}),
+)
+
+
+class SeededData:
+    """ID записей, созданных при заполнении хранилищ (из них выбираются параметры запросов)."""
+
+    def __init__(self):
+        self.task_ids = []
+        self.catalog_ids = []
+        self.quote_ids = [quote['id'] for quote in portal.quotes_collection]
+        self.short_codes = []
+        self.disposable_task_ids = []
+
+    def grow_to(self, size):
+        """Дозаполняет хранилища до size записей в каждом."""
+        for number in range(len(self.task_ids), size):
+            self.task_ids.append(portal.tasks_db.create({'text': f'Задача номер {number}', 'done': number % 3 == 0})['id'])
+        for number in range(len(self.catalog_ids), size):
+            if number % 3 == 0:
+                item = {'type': 'movie', 'title': f'Фильм номер {number}', 'director': f'Режиссер {number % 2000}',
+                        'year': 1950 + number % 70, 'genre': GENRES[number % len(GENRES)]}
+            else:
+                item = {'type': 'book', 'title': f'Книга номер {number}', 'author': f'Автор {number % 5000}',
+                        'year': 1900 + number % 120, 'genre': GENRES[number % len(GENRES)]}
+            self.catalog_ids.append(portal.media_catalog_db.create(item)['id'])
+        for number in range(len(self.quote_ids), size):
+            self.quote_ids.append(portal.quotes_collection.create({'text': f'Цитата номер {number}',
+                                                                   'author': f'Автор {number % 500}'})['id'])
+        for number in range(len(self.short_codes), size):
+            short_code = portal.short_code_allocator.allocate()
+            portal.url_shortener_mappings.add(short_code, f'https://example.com/articles/{number}')
+            if portal.short_code_filter is not None:
+                portal.short_code_filter.add(short_code)
+            self.short_codes.append(short_code)
+
+    def create_disposable_tasks(self, count):
+        """Создает count задач для маршрута, который их удаляет."""
+        self.disposable_task_ids = [portal.tasks_db.create({'text': f'Задача на удаление {number}', 'done': False})['id']
+                                    for number in range(count)]
+
+    def delete_disposable_tasks(self):
+        """Удаляет задачи, до которых прогон не дошел (его ограничило время)."""
+        for task_id in self.disposable_task_ids:
+            portal.tasks_db.delete(task_id)
+        self.disposable_task_ids = []
+
+
+def auth_headers():
+    token = base64.b64encode(f'{portal.BASIC_AUTH_USERNAME}:{portal.BASIC_AUTH_PASSWORD}'.encode()).decode()
+    return {'Authorization': f'Basic {token}'}
+
+
+class ClientDriver:
+    """Запросы через тестовый клиент Flask."""
+
+    name = 'client'
+
+    def __init__(self):
+        self._client = portal.app.test_client()
+
+    def request(self, method, path, body, headers):
+        response = self._client.open(path, method=method, headers=headers,
+                                     data=None if body is None else json.dumps(body),
+                                     content_type=None if body is None else 'application/json')
+        response.get_data()
+        response.close()
+        return response.status_code
+
+    def close(self):
+        pass
+
+
+class ServerDriver:
+    """Запросы к локальному WSGI-серверу werkzeug по одному HTTP-соединению с keep-alive."""
+
+    name = 'server'
+
+    def __init__(self):
+        # Многопоточный сервер werkzeug говорит по HTTP/1.1 и держит соединение открытым.
+        self._server = make_server('127.0.0.1', 0, portal.app, threaded=True)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        self._connection = http.client.HTTPConnection('127.0.0.1', self._server.port)
+
+    def request(self, method, path, body, headers):
+        headers = dict(headers)
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        # http.client требует ASCII в строке запроса.
+        self._connection.request(method, urllib.parse.quote(path, safe='/?&=:'), body=payload, headers=headers)
+        response = self._connection.getresponse()
+        response.read()
+        return response.status
+
+    def close(self):
+        self._connection.close()
+        self._server.shutdown()
+
+
+def peak_rss_megabytes():
+    """Пиковый RSS процесса в МиБ (None, если измерить нельзя)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux отдает килобайты, macOS — байты.
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
+
+
+def run_case(driver, case, seed, rng, request_count, warmup_count, time_budget):
+    """
+    Прогоняет один маршрут.
+
+    Returns:
+        dict: Результат (пропускная способность, перцентили, ошибки, пиковый RSS).
+    """
+    headers = auth_headers() if case.auth else {}
+    timer = time.perf_counter
+    if case.disposable:
+        seed.create_disposable_tasks(warmup_count + request_count)
+
+    def send():
+        body = case.body(rng) if case.body is not None else None
+        return driver.request(case.method, case.path(rng, seed), body, headers)
+
+    deadline = timer() + time_budget
+    for _ in range(warmup_count):
+        send()
+        if timer() > deadline:
+            break
+    latencies = []
+    errors = 0
+    started_at = timer()
+    deadline = started_at + time_budget
+    while len(latencies) < request_count:
+        request_started_at = timer()
+        status = send()
+        finished_at = timer()
+        latencies.append(finished_at - request_started_at)
+        if status >= 400:
+            errors += 1
+        if finished_at > deadline:
+            break
+    elapsed = timer() - started_at
+    if case.disposable:
+        seed.delete_disposable_tasks()
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput': len(latencies) / elapsed,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'peak_rss_mb': peak_rss_megabytes(),
+    }
+
+
+def environment_description(args):
+    """Сведения об окружении, сохраняемые вместе с результатами (для честного сравнения прогонов)."""
+    return {
+        'date': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'flask': importlib.metadata.version('flask'),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'storage_backend': portal.app.config['STORAGE_BACKEND'],
+        'json_backend': portal.app.json.backend,
+        'metrics_enabled': portal.app.config['METRICS_ENABLED'],
+        'seed': args.seed,
+        'requests': args.requests,
+        'route_seconds': args.route_seconds,
+    }
+
+
+def result_key(result):
+    return result['size'], result['driver'], result['route']
+
+
+def compare_with_baseline(results, baseline_results, threshold):
+    """
+    Сравнивает результаты с эталоном.
+
+    Returns:
+        list[str]: Описания регрессий (пустой список — регрессий нет).
+    """
+    baseline_by_key = {result_key(result): result for result in baseline_results}
+    regressions = []
+    for result in results:
+        baseline = baseline_by_key.get(result_key(result))
+        if baseline is None:
+            continue
+        size, driver, route = result_key(result)
+        if result['throughput'] < baseline['throughput'] * (1 - threshold):
+            regressions.append(f"{route} [{driver}, {size:,}]: запросов/с {baseline['throughput']:,.0f} -> "
+                               f"{result['throughput']:,.0f}")
+        if result['p95_ms'] > baseline['p95_ms'] * (1 + threshold):
+            regressions.append(f"{route} [{driver}, {size:,}]: p95 {baseline['p95_ms']:.2f} мс -> "
+                               f"{result['p95_ms']:.2f} мс")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1000,100000,1000000', help='Размеры хранилищ через запятую.')
+    parser.add_argument('--drivers', default=','.join(DRIVERS), help='Способы запросов через запятую: client, server.')
+    parser.add_argument('--routes', default='', help='Прогонять только маршруты, в названии которых есть эта строка.')
+    parser.add_argument('--requests', type=int, default=500, help='Запросов на маршрут.')
+    parser.add_argument('--warmup', type=int, default=20, help='Запросов прогрева на маршрут.')
+    parser.add_argument('--route-seconds', type=float, default=10.0,
+                        help='Предельное время на маршрут: тяжелые маршруты делают меньше запросов.')
+    parser.add_argument('--seed', type=int, default=12345, help='Зерно генератора параметров запросов.')
+    parser.add_argument('--output', help='Куда сохранить результаты (JSON).')
+    parser.add_argument('--baseline', help='Эталонные результаты (JSON) для сравнения.')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='Допустимое ухудшение пропускной способности и p95 (доля, по умолчанию 0.10).')
+    args = parser.parse_args()
+
+    # Журналы запросов сервера и переходов по ссылкам не должны мешать замеру.
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    portal.app.logger.setLevel(logging.ERROR)
+    driver_names = [name for name in args.drivers.split(',') if name]
+    unknown_drivers = set(driver_names) - set(DRIVERS)
+    if unknown_drivers:
+        parser.error(f"неизвестные способы запросов: {', '.join(sorted(unknown_drivers))}")
+    cases = [case for case in ROUTE_CASES if args.routes in case.name]
+
+    seed = SeededData()
+    results = []
+    print(f"{'записей':>9} | {'способ':<6} | {'маршрут':<24} | {'запросов/с':>10} | {'p50, мс':>8} | "
+          f"{'p95, мс':>8} | {'p99, мс':>8} | {'ошибок':>6} | {'RSS, МиБ':>8}")
+    print('-' * 112)
+    for size in sorted(int(size) for size in args.sizes.split(',')):
+        seed.grow_to(size)
+        for driver_name in driver_names:
+            driver = ClientDriver() if driver_name == 'client' else ServerDriver()
+            try:
+                for case in cases:
+                    # Свой генератор на каждый прогон: те же запросы при любом наборе маршрутов и способов.
+                    rng = random.Random(f'{args.seed}:{size}:{driver_name}:{case.name}')
+                    result = run_case(driver, case, seed, rng, args.requests, args.warmup, args.route_seconds)
+                    result.update(size=size, driver=driver_name, route=case.name)
+                    results.append(result)
+                    rss = f"{result['peak_rss_mb']:>8,.0f}" if result['peak_rss_mb'] is not None else f"{'—':>8}"
+                    print(f"{size:>9,} | {driver_name:<6} | {case.name:<24} | {result['throughput']:>10,.0f} | "
+                          f"{result['p50_ms']:>8.2f} | {result['p95_ms']:>8.2f} | {result['p99_ms']:>8.2f} | "
+                          f"{result['errors']:>6} | {rss}")
+            finally:
+                driver.close()
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output_file:
+            json.dump({'environment': environment_description(args), 'results': results}, output_file,
+                      ensure_ascii=False, indent=2)
+        print(f"\nРезультаты сохранены в {args.output}")
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = compare_with_baseline(results, baseline['results'], args.threshold)
+        print(f"\nСравнение с {args.baseline} (порог {args.threshold:.0%}):")
+        for regression in regressions:
+            print(f"  регрессия: {regression}")
+        if not regressions:
+            print("  регрессий нет")
+        else:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
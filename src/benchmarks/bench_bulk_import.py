@@ -0,0 +1,143 @@
+"""
+Бенчмарк пакетной загрузки и выгрузки задач и каталога (NDJSON и CSV).
+
+Через WSGI-приложение (тестовый клиент Flask, хранилища того бэкенда,
+что задан PORTAL_STORAGE_BACKEND) сравнивает:
+- добавление по одной записи (POST /api/tasks, POST /api/catalog);
+- пакетную загрузку того же числа записей одним запросом
+  (POST /api/tasks/bulk, POST /api/catalog/bulk) в NDJSON и CSV;
+- выгрузку (GET /api/tasks/export, GET /api/catalog/export).
+
+Затем прогоняет загрузку каталога из NDJSON напрямую (import_records, без
+HTTP) на каждом бэкенде: память, SQLite и журнал с синхронной фиксацией.
+
+Выводит записей в секунду.
+
+Запуск из каталога src:
+    python -m benchmarks.bench_bulk_import [--records 200000] [--single-records 5000]
+"""
+import argparse
+import csv
+import datetime
+import io
+import json
+import os
+import tempfile
+import time
+
+import app as portal
+from bulk_import import CatalogItemValidator, import_records
+from storage import create_storage
+
+GENRES = ('Роман', 'Антиутопия', 'Научная фантастика', 'Детектив', 'Драма')
+
+
+def make_tasks(count):
+    return [{'text': f'Задача из пакета номер {number}', 'done': number % 3 == 0} for number in range(count)]
+
+
+def make_catalog_items(count):
+    items = []
+    for number in range(count):
+        item = {'type': 'book' if number % 2 else 'movie', 'title': f'Название произведения {number}',
+                'year': 1900 + number % 120, 'genre': GENRES[number % len(GENRES)]}
+        item['author' if number % 2 else 'director'] = f'Создатель {number % 5000}'
+        items.append(item)
+    return items
+
+
+def to_ndjson(records):
+    return ''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in records).encode('utf-8')
+
+
+def to_csv(records, columns):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, columns, extrasaction='ignore')
+    writer.writeheader()
+    writer.writerows({**record, 'done': 'true' if record.get('done') else 'false'} if 'done' in record else record
+                     for record in records)
+    return buffer.getvalue().encode('utf-8')
+
+
+def timed(operation):
+    started_at = time.perf_counter()
+    result = operation()
+    return time.perf_counter() - started_at, result
+
+
+def bench_routes(client, records_count, single_count):
+    """Строки таблицы (сервис, способ, записей, записей/с) для загрузки и выгрузки через HTTP-маршруты."""
+    rows = []
+    datasets = (
+        ('задачи', '/api/tasks', make_tasks, ('text', 'done')),
+        ('каталог', '/api/catalog', make_catalog_items, ('type', 'title', 'author', 'director', 'year', 'genre')),
+    )
+    for service_name, base_path, make_records, columns in datasets:
+        single_records = make_records(single_count)
+        elapsed, _ = timed(lambda: [client.post(base_path, json=record) for record in single_records])
+        rows.append((service_name, 'по одной (POST)', single_count, single_count / elapsed))
+
+        records = make_records(records_count)
+        for format_name, body, content_type in (
+            ('NDJSON', to_ndjson(records), 'application/x-ndjson'),
+            ('CSV', to_csv(records, columns), 'text/csv'),
+        ):
+            elapsed, response = timed(lambda: client.post(f'{base_path}/bulk', data=body, content_type=content_type))
+            summary = response.get_json()
+            assert summary['succeeded'] == records_count, summary
+            rows.append((service_name, f'пакетом, {format_name}', records_count, records_count / elapsed))
+
+        for format_name in ('ndjson', 'csv'):
+            def export():
+                response = client.get(f'{base_path}/export?format={format_name}')
+                return sum(1 for _ in response.response)
+            elapsed, _ = timed(export)
+            exported_count = len(client.get(f'{base_path}/export').get_data().splitlines())
+            rows.append((service_name, f'выгрузка, {format_name.upper()}', exported_count, exported_count / elapsed))
+    return rows
+
+
+def bench_backends(records_count):
+    """Загрузка каталога из NDJSON напрямую в хранилища каждого бэкенда: {бэкенд: записей/с}."""
+    body = to_ndjson(make_catalog_items(records_count))
+    validate = CatalogItemValidator(datetime.date.today().year)
+    results = {}
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        backends = (
+            ('memory', lambda: create_storage('memory')),
+            ('sqlite', lambda: create_storage('sqlite', sqlite_path=os.path.join(temporary_directory, 'bulk.sqlite3'))),
+            ('journal', lambda: create_storage('journal', journal_directory=os.path.join(temporary_directory, 'journal'))),
+        )
+        for backend_name, open_storage in backends:
+            catalog = open_storage().catalog
+            elapsed, summary = timed(lambda: import_records(
+                io.BytesIO(body), 'ndjson', validate, catalog.create_many, loads=portal.app.json.item_loads()
+            ))
+            assert summary['succeeded'] == records_count, summary
+            results[backend_name] = records_count / elapsed
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', type=int, default=200_000, help='Записей в пакетной загрузке.')
+    parser.add_argument('--single-records', type=int, default=5_000, help='Записей при добавлении по одной.')
+    args = parser.parse_args()
+
+    portal.app.logger.disabled = True
+    client = portal.app.test_client()
+    print(f"Бэкенд приложения: {portal.app.config['STORAGE_BACKEND']}, JSON: {portal.app.json.backend}")
+    print(f"{'сервис':<8} | {'способ':<20} | {'записей':>9} | {'записей/с':>11}")
+    print('-' * 58)
+    for service_name, method_name, count, rate in bench_routes(client, args.records, args.single_records):
+        print(f"{service_name:<8} | {method_name:<20} | {count:>9,} | {rate:>11,.0f}")
+
+    print()
+    print(f"{'бэкенд':<8} | {'каталог из NDJSON без HTTP, записей/с':>38}")
+    print('-' * 50)
+    for backend_name, rate in bench_backends(args.records).items():
+        print(f"{backend_name:<8} | {rate:>38,.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+Бенчмарк калькулятора: одиночные вызовы против пакетного API.
+
+Считает одинаковый набор операций двумя способами:
+- по одному запросу POST /api/calculate на операцию;
+- одним или несколькими запросами POST /api/calculate/batch.
+Запросы идут через тестовый клиент Flask, так что в замер входят разбор
+JSON, маршрутизация и сериализация ответа, но не сеть. Отдельно замеряется
+чистое вычисление evaluate_batch без HTTP.
+
+Запуск из каталога src:
+    python -m benchmarks.bench_calculator_batch [--sizes 1000,10000,100000]
+"""
+import argparse
+import logging
+import random
+import time
+
+from app import app
+from calculator import evaluate_batch
+
+OPERATION_NAMES = ('add', 'subtract', 'multiply', 'divide', '+', '-', '*', '/')
+# Одиночные вызовы медленные — на больших размерах меряем выборку и пересчитываем.
+SINGLE_CALL_MAX_OPERATIONS = 10_000
+
+
+def build_columns(size):
+    first_operands = [random.uniform(-1000, 1000) for _ in range(size)]
+    # Небольшая доля нулей проверяет обработку деления на ноль внутри пакета.
+    second_operands = [0 if random.random() < 0.01 else random.uniform(-1000, 1000) for _ in range(size)]
+    operation_names = [random.choice(OPERATION_NAMES) for _ in range(size)]
+    return first_operands, second_operands, operation_names
+
+
+def bench_single_calls(client, columns):
+    sample_size = min(len(columns[0]), SINGLE_CALL_MAX_OPERATIONS)
+    started = time.perf_counter()
+    for num1, num2, operation in zip(*(column[:sample_size] for column in columns)):
+        client.post('/api/calculate', json={'num1': num1, 'num2': num2, 'operation': operation})
+    return sample_size / (time.perf_counter() - started)
+
+
+def bench_batch_request(client, columns):
+    first_operands, second_operands, operation_names = columns
+    started = time.perf_counter()
+    response = client.post('/api/calculate/batch', json={
+        'num1': first_operands, 'num2': second_operands, 'operation': operation_names,
+    })
+    elapsed = time.perf_counter() - started
+    assert response.status_code == 200, response.status_code
+    return len(first_operands) / elapsed
+
+
+def bench_evaluate_only(columns):
+    started = time.perf_counter()
+    evaluate_batch(*columns)
+    return len(columns[0]) / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1000,10000,100000',
+                        help='Число операций в наборе через запятую.')
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(',')]
+
+    # Обработчики пишут в лог на каждый запрос — в замере это только шум.
+    app.logger.setLevel(logging.ERROR)
+    client = app.test_client()
+
+    print(f"{'операций':>10} | {'способ':<22} | {'операций/с':>14}")
+    print('-' * 54)
+    for size in sizes:
+        columns = build_columns(size)
+        rows = (
+            ('по одному запросу', bench_single_calls(client, columns)),
+            ('пакетный запрос', bench_batch_request(client, columns)),
+            ('evaluate_batch', bench_evaluate_only(columns)),
+        )
+        for label, operations_per_second in rows:
+            print(f"{size:>10} | {label:<22} | {operations_per_second:>14,.0f}")
+
+
+if __name__ == '__main__':
+    main()
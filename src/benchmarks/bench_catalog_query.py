@@ -0,0 +1,98 @@
+"""
+Бенчмарк поиска по каталогу: индексы против последовательных проходов по списку.
+
+Заполняет каталог синтетическими книгами и фильмами и сравнивает время
+фильтрованных запросов через InMemoryCatalogStore.query с прежним способом
+(копия списка и по проходу на каждый фильтр с повторным lower()).
+
+Запуск из каталога src:
+    python -m benchmarks.bench_catalog_query [--items 1000000]
+"""
+import argparse
+import random
+import time
+
+from catalog_query import CatalogQuery
+from storage import InMemoryCatalogStore
+
+GENRES = ['Антиутопия', 'Роман', 'Научная фантастика', 'Детектив', 'Драма', 'Комедия', 'Фэнтези', 'Триллер']
+TITLE_WORDS = ['тайна', 'путь', 'город', 'ночь', 'мастер', 'море', 'звезда', 'дорога', 'сад', 'остров', 'зима', 'песня']
+CREATOR_COUNT = 20_000
+
+QUERIES = {
+    'type + year': CatalogQuery(type='book', year=1987),
+    'creator (редкий)': CatalogQuery(creator='автор 1234'),
+    'title + genre': CatalogQuery(title='мастер ночь', genre='детект'),
+    'title (частый) + limit 50': CatalogQuery(title='город', limit=50),
+}
+
+
+def generate_items(count):
+    rng = random.Random(42)
+    for number in range(count):
+        item_type = 'book' if number % 2 else 'movie'
+        item = {
+            'id': number + 1,
+            'type': item_type,
+            'title': ' '.join(rng.sample(TITLE_WORDS, 2)).capitalize() + f' {number}',
+            'year': rng.randint(1900, 2025),
+            'genre': rng.choice(GENRES),
+        }
+        item['author' if item_type == 'book' else 'director'] = f'Автор {rng.randrange(CREATOR_COUNT)}'
+        yield item
+
+
+def scan_query(items, query):
+    """Прежняя реализация фильтрации: по проходу на каждый фильтр."""
+    results = list(items)
+    if query.type:
+        results = [item for item in results if item.get('type') == query.type]
+    if query.genre:
+        results = [item for item in results if query.genre in item.get('genre', '').lower()]
+    if query.title:
+        results = [item for item in results if query.title in item.get('title', '').lower()]
+    if query.creator:
+        results = [item for item in results
+                   if query.creator in item.get('author', '').lower() or query.creator in item.get('director', '').lower()]
+    if query.year is not None:
+        results = [item for item in results if item.get('year') == query.year]
+    results = [item for item in results if item['id'] > query.after_id]
+    return results[:query.limit] if query.limit else results
+
+
+def best_of(runs, operation):
+    timings = []
+    for _ in range(runs):
+        started_at = time.perf_counter()
+        result = operation()
+        timings.append(time.perf_counter() - started_at)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--items', type=int, default=1_000_000, help='Размер каталога.')
+    parser.add_argument('--runs', type=int, default=5, help='Сколько раз повторять каждый запрос (берется лучший).')
+    args = parser.parse_args()
+
+    started_at = time.perf_counter()
+    items = list(generate_items(args.items))
+    store = InMemoryCatalogStore(items)
+    print(f"Каталог из {args.items:,} элементов проиндексирован за {time.perf_counter() - started_at:.1f} с\n")
+
+    # Страница из середины каталога без фильтров: курсор указывает на его середину.
+    queries = dict(QUERIES)
+    queries['без фильтров, limit 50'] = CatalogQuery(limit=50, after_id=args.items // 2)
+
+    print(f"{'запрос':<26} | {'найдено':>8} | {'индексы':>11} | {'проходы':>11} | {'ускорение':>9}")
+    print('-' * 78)
+    for name, query in queries.items():
+        index_seconds, (page, _) = best_of(args.runs, lambda: store.query(query))
+        scan_seconds, scanned = best_of(max(1, args.runs // 2), lambda: scan_query(items, query))
+        assert [item['id'] for item in page] == [item['id'] for item in scanned], name
+        print(f"{name:<26} | {len(page):>8} | {index_seconds * 1e3:>8.2f} мс | {scan_seconds * 1e3:>8.1f} мс | "
+              f"{scan_seconds / index_seconds:>8.0f}x")
+
+
+if __name__ == '__main__':
+    main()
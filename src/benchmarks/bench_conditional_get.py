@@ -0,0 +1,66 @@
+"""
+Бенчмарк условных GET-запросов к коллекциям: полный ответ против 304.
+
+Заполняет задачи и каталог заданным числом записей и для каждого
+маршрута выполняет запросы к WSGI-приложению напрямую в двух режимах:
+полный ответ (чтение хранилища и сериализация) и повторный запрос с
+If-None-Match из предыдущего ответа (304 без тела — ETag сверяется по
+версии хранилища до чтения данных). Выводит запросы в секунду, p99 и
+размер ответа.
+
+Запуск из каталога src:
+    python -m benchmarks.bench_conditional_get [--records 10000] [--requests 500]
+"""
+import argparse
+import datetime
+
+import app as portal
+from benchmarks._timing import format_microseconds, measure_latencies, percentile
+from benchmarks.bench_bulk_import import make_catalog_items, make_tasks
+from benchmarks.bench_page_cache import make_request
+from bulk_import import CatalogItemValidator
+
+PATHS = (
+    '/api/tasks',
+    '/api/catalog?limit=100',
+    '/api/catalog?genre=роман&limit=100',
+    '/api/catalog/facets',
+    '/api/catalog/1',
+    '/api/quotes/1',
+)
+
+
+def fill_stores(records_count):
+    """Добавляет records_count задач и элементов каталога пачками (как пакетная загрузка)."""
+    validate = CatalogItemValidator(datetime.date.today().year)
+    portal.tasks_db.create_many(make_tasks(records_count))
+    portal.media_catalog_db.create_many([validate(item)[0] for item in make_catalog_items(records_count)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', type=int, default=10_000, help='Записей в задачах и в каталоге.')
+    parser.add_argument('--requests', type=int, default=500, help='Запросов на каждый случай.')
+    args = parser.parse_args()
+
+    portal.app.logger.disabled = True
+    fill_stores(args.records)
+    print(f"Бэкенд: {portal.app.config['STORAGE_BACKEND']}, записей: {args.records:,}")
+    print(f"{'маршрут':<36} | {'режим':<8} | {'статус':>6} | {'запросов/с':>11} | {'p99':>12} | {'ответ, КБ':>9}")
+    print('-' * 98)
+    for path in PATHS:
+        response = portal.app.test_client().get(path)
+        cases = (
+            ('полный', {}),
+            ('304', {'If-None-Match': response.headers['ETag']}),
+        )
+        for mode_name, headers in cases:
+            send = make_request(path, headers)
+            status, response_size = send(None)
+            latencies = measure_latencies(send, range(args.requests))
+            print(f"{path:<36} | {mode_name:<8} | {status:>6} | {len(latencies) / sum(latencies):>11,.0f} | "
+                  f"{format_microseconds(percentile(latencies, 0.99))} | {response_size / 1024:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
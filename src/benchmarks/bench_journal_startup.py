@@ -0,0 +1,204 @@
+"""
+Бенчмарк бэкенда 'journal': время старта с большим набором данных и пропускная способность записи.
+
+Старт. В каталоге данных собирается снимок с заданным числом записей
+(по умолчанию миллион: задачи, короткие ссылки, каталог и цитаты) и хвост
+журнала после него (--tail изменений задач). Затем восстановление
+запускается в отдельном процессе — как настоящий перезапуск сервера — и
+выводится время загрузки снимка, проигрывания журнала, общее время
+(включая импорт модулей) и RSS процесса после загрузки.
+
+Запись. Несколько потоков создают задачи с синхронной фиксацией (каждый
+ответ ждет fsync). Благодаря групповой фиксации один fsync покрывает
+изменения всех ожидающих потоков, поэтому с ростом числа потоков число
+изменений в секунду растет, а число fsync — нет.
+
+Запуск из каталога src:
+    python -m benchmarks.bench_journal_startup [--records 1000000] [--tail 100000] [--threads 1,8,32]
+"""
+import argparse
+import gc
+import json
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import journal_storage
+from journal_storage import JournalDatabase
+from storage import CATALOG_SCHEMA, QUOTES_SCHEMA, TASKS_SCHEMA, normalize_url
+
+# Доли хранилищ в наборе данных по умолчанию.
+DATASET_MIX = (('tasks', 0.4), ('short_urls', 0.3), ('catalog', 0.2), ('quotes', 0.1))
+GENRES = ('Роман', 'Антиутопия', 'Научная фантастика', 'Детектив', 'Драма', 'Комедия')
+
+
+def open_stores(directory, sync_commits=True):
+    """Создает хранилища так же, как create_storage для бэкенда 'journal'."""
+    database = JournalDatabase(directory, sync_commits=sync_commits)
+    stores = {
+        'tasks': database.record_store(TASKS_SCHEMA),
+        'short_urls': database.short_url_store(),
+        'sequence': database.sequence('short_codes'),
+        'quotes': database.record_store(QUOTES_SCHEMA),
+        'catalog': database.catalog_store(CATALOG_SCHEMA),
+    }
+    return database, stores
+
+
+def build_dataset(directory, counts, tail_entries):
+    """Записывает снимок с counts записей по хранилищам и хвост журнала из tail_entries изменений."""
+    database, stores = open_stores(directory, sync_commits=False)
+    database.recover()
+
+    def fill(store, rows):
+        layout = store._layout
+        packed = [tuple(layout.pack(row)) for row in rows]
+        store._restore([row['id'] for row in rows], packed, len(rows) + 1, 0)
+        store._last_id = len(rows)
+
+    fill(stores['tasks'], [{'id': i, 'text': f'Задача номер {i}', 'done': i % 3 == 0}
+                           for i in range(1, counts['tasks'] + 1)])
+    fill(stores['quotes'], [{'id': i, 'text': f'Цитата {i}: лучше поздно, чем никогда.', 'author': f'Автор {i % 500}'}
+                            for i in range(1, counts['quotes'] + 1)])
+    fill(stores['catalog'], [
+        {'id': i, 'type': 'book' if i % 2 else 'movie', 'title': f'Название {i}',
+         'author' if i % 2 else 'director': f'Создатель {i % 5000}', 'year': 1900 + i % 125, 'genre': GENRES[i % len(GENRES)]}
+        for i in range(1, counts['catalog'] + 1)
+    ])
+    urls = {f'c{i:07d}': f'https://example.com/articles/{i}?utm_source=bench' for i in range(counts['short_urls'])}
+    stores['short_urls']._restore(urls, {normalize_url(url): code for code, url in urls.items()}, {})
+    stores['sequence']._next_value = counts['short_urls']
+    database.snapshot()
+    tasks = stores['tasks']
+    for index in range(tail_entries):
+        if index % 2:
+            tasks.update(index, {'done': True})
+        else:
+            tasks.create({'text': f'Новая задача {index}', 'done': False})
+    database.close()
+
+
+def peak_rss_megabytes():
+    """Пиковый RSS процесса в МБ."""
+    # ru_maxrss на Linux наследуется через fork+exec от родителя, поэтому сначала
+    # смотрим VmHWM — он считается для адресного пространства самого процесса.
+    try:
+        with open('/proc/self/status') as status_file:
+            for line in status_file:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def recover_in_child(directory):
+    """Режим дочернего процесса: восстанавливает хранилища и печатает JSON с замерами."""
+    # Как при старте app.py: сборщик мусора выключен на время загрузки, затем объекты замораживаются.
+    gc.disable()
+    database, stores = open_stores(directory)
+    stats = database.recover()
+    gc.freeze()
+    gc.enable()
+    stats['records'] = sum(len(store) for name, store in stores.items() if name != 'sequence')
+    stats['max_rss_mb'] = peak_rss_megabytes()
+    database.close()
+    print(json.dumps(stats))
+
+
+def measure_startup(directory):
+    started_at = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.bench_journal_startup', '--recover-child', directory],
+        capture_output=True, text=True, check=True,
+    )
+    stats = json.loads(completed.stdout.strip().splitlines()[-1])
+    stats['process_seconds'] = time.perf_counter() - started_at
+    return stats
+
+
+def measure_group_commit(thread_count, seconds):
+    """Создает задачи из thread_count потоков с синхронной фиксацией; возвращает (изменений/с, fsync/с)."""
+    directory = tempfile.mkdtemp(prefix='bench-journal-')
+    sync_count = [0]
+    original_sync_file = journal_storage._sync_file
+
+    def counting_sync_file(file_descriptor):
+        sync_count[0] += 1
+        original_sync_file(file_descriptor)
+
+    journal_storage._sync_file = counting_sync_file
+    try:
+        database, stores = open_stores(directory)
+        database.recover()
+        tasks = stores['tasks']
+        deadline = time.perf_counter() + seconds
+        created = [0] * thread_count
+
+        def worker(index):
+            while time.perf_counter() < deadline:
+                tasks.create({'text': 'Запись из бенчмарка', 'done': False})
+                created[index] += 1
+
+        sync_count[0] = 0
+        started_at = time.perf_counter()
+        threads = [threading.Thread(target=worker, args=(index,)) for index in range(thread_count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started_at
+        syncs = sync_count[0]
+        database.close()
+    finally:
+        journal_storage._sync_file = original_sync_file
+        shutil.rmtree(directory, ignore_errors=True)
+    return sum(created) / elapsed, syncs / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', type=int, default=1_000_000, help='Число записей в снимке (всего по хранилищам).')
+    parser.add_argument('--tail', type=int, default=100_000, help='Изменений в журнале после снимка.')
+    parser.add_argument('--threads', default='1,8,32', help='Числа потоков для замера записи, через запятую.')
+    parser.add_argument('--write-seconds', type=float, default=3.0, help='Длительность каждого замера записи.')
+    parser.add_argument('--recover-child', metavar='DIR', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.recover_child:
+        recover_in_child(args.recover_child)
+        return
+
+    datasets = (
+        ('смешанный', {name: int(args.records * share) for name, share in DATASET_MIX}),
+        ('только задачи', {'tasks': args.records, 'short_urls': 0, 'catalog': 0, 'quotes': 0}),
+    )
+    print(f"{'набор данных':<14} | {'хвост':>7} | {'снимок, МБ':>10} | {'снимок, с':>9} | {'журнал, с':>9} | "
+          f"{'recover, с':>10} | {'процесс, с':>10} | {'RSS, МБ':>8}")
+    print('-' * 100)
+    for dataset_name, counts in datasets:
+        for tail_entries in (0, args.tail):
+            directory = tempfile.mkdtemp(prefix='bench-journal-')
+            try:
+                build_dataset(directory, counts, tail_entries)
+                stats = measure_startup(directory)
+            finally:
+                shutil.rmtree(directory, ignore_errors=True)
+            print(f"{dataset_name:<14} | {tail_entries:>7} | {stats['snapshot_bytes'] / 2 ** 20:>10.1f} | "
+                  f"{stats['snapshot_seconds']:>9.2f} | {stats['replay_seconds']:>9.2f} | "
+                  f"{stats['total_seconds']:>10.2f} | {stats['process_seconds']:>10.2f} | {stats['max_rss_mb']:>8.0f}")
+
+    print()
+    print(f"{'потоков':>7} | {'изменений/с':>12} | {'fsync/с':>8} | {'изменений на fsync':>18}")
+    print('-' * 56)
+    for thread_count in (int(value) for value in args.threads.split(',')):
+        commits_per_second, syncs_per_second = measure_group_commit(thread_count, args.write_seconds)
+        print(f"{thread_count:>7} | {commits_per_second:>12,.0f} | {syncs_per_second:>8,.0f} | "
+              f"{commits_per_second / max(syncs_per_second, 1):>18.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Бенчмарк сериализации JSON: списочные эндпоинты и ответы-ошибки.
+
+Для каждого доступного сериализатора (orjson, ujson, стандартный json) и
+формата (компактный / с отступами) выполняет запросы к WSGI-приложению
+напрямую и выводит число запросов в секунду, p99 и размер ответа:
+- GET /api/tasks и GET /api/catalog?limit=... — списки записей (ответ
+  одной строкой, без потоковой выдачи);
+- POST /api/tasks с телом не-JSON — постоянная ошибка 400, тело которой
+  сериализуется один раз.
+
+Запуск из каталога src:
+    python -m benchmarks.bench_json_serialization [--records 1000] [--requests 2000]
+"""
+import argparse
+
+from werkzeug.test import EnvironBuilder
+
+import app as portal
+from benchmarks._timing import format_microseconds, measure_latencies, percentile
+from json_provider import available_json_backends
+
+GENRES = ('Роман', 'Антиутопия', 'Научная фантастика', 'Детектив')
+
+
+def make_request(path, method='GET', data=None):
+    """Готовит WSGI-окружение и возвращает функцию, выполняющую запрос и возвращающую размер ответа."""
+    environ = EnvironBuilder(path=path, method=method, data=data,
+                             headers={'Accept': 'application/json'}).get_environ()
+
+    def send(_):
+        body = portal.app.wsgi_app(dict(environ), lambda status, headers, exc_info=None: None)
+        size = sum(len(chunk) for chunk in body)
+        if hasattr(body, 'close'):
+            body.close()
+        return size
+    return send
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', type=int, default=1000, help='Записей в задачах и каталоге (и размер страницы каталога).')
+    parser.add_argument('--requests', type=int, default=2000, help='Запросов на каждый случай.')
+    args = parser.parse_args()
+
+    for number in range(args.records):
+        portal.tasks_db.create({'text': f'Задача номер {number}', 'done': number % 3 == 0})
+        portal.media_catalog_db.create({'type': 'book', 'title': f'Книга номер {number}',
+                                        'author': f'Автор {number % 100}', 'year': 1900 + number % 120,
+                                        'genre': GENRES[number % len(GENRES)]})
+    # Списки отдаются одной строкой — меряется именно сериализатор, а не потоковая выдача.
+    portal.app.config['JSON_STREAMING_THRESHOLD'] = float('inf')
+    cases = (
+        ('GET /api/tasks', make_request('/api/tasks'), args.requests // 10 or 1),
+        ('GET /api/catalog', make_request(f'/api/catalog?limit={min(args.records, 1000)}'), args.requests // 10 or 1),
+        ('ошибка 400', make_request('/api/tasks', method='POST', data='не JSON'), args.requests),
+    )
+
+    print(f"Записей: {args.records:,}")
+    print(f"{'случай':<18} | {'сериализатор':<12} | {'формат':<10} | {'запросов/с':>11} | {'p99':>12} | {'ответ, КБ':>9}")
+    print('-' * 88)
+    for case_name, send, request_count in cases:
+        for backend in available_json_backends():
+            portal.app.json.set_backend(backend)
+            for pretty in (False, True):
+                portal.app.json.compact = not pretty
+                response_size = send(None)
+                latencies = measure_latencies(send, range(request_count))
+                throughput = len(latencies) / sum(latencies)
+                print(f"{case_name:<18} | {backend:<12} | {'отступы' if pretty else 'компактный':<10} | "
+                      f"{throughput:>11,.0f} | {format_microseconds(percentile(latencies, 0.99))} | "
+                      f"{response_size / 1024:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+Бенчмарк кеша HTML-страниц: запросов в секунду без кеша и с кешем.
+
+Для каждой страницы выполняет запросы к WSGI-приложению напрямую в трех
+режимах: без кеша (рендеринг шаблона на каждый запрос), с кешем (готовое
+тело, клиент принимает gzip) и повторный запрос с If-None-Match (ответ 304
+без тела). Выводит запросы в секунду, p99 и размер ответа.
+
+Запуск из каталога src:
+    python -m benchmarks.bench_page_cache [--requests 2000]
+"""
+import argparse
+
+from werkzeug.test import EnvironBuilder
+
+import app as portal
+from benchmarks._timing import format_microseconds, measure_latencies, percentile
+
+PAGES = ('/', '/services', '/service/todo', '/service/catalog', '/service/calculator', '/service/converter')
+
+
+def make_request(path, headers):
+    """Готовит WSGI-окружение и возвращает функцию, выполняющую запрос и возвращающую (статус, размер)."""
+    environ = EnvironBuilder(path=path, headers=headers).get_environ()
+    statuses = []
+
+    def send(_):
+        body = portal.app.wsgi_app(dict(environ), lambda status, headers, exc_info=None: statuses.append(status))
+        size = sum(len(chunk) for chunk in body)
+        if hasattr(body, 'close'):
+            body.close()
+        return statuses[-1].split()[0], size
+    return send
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000, help='Запросов на каждый случай.')
+    args = parser.parse_args()
+
+    print(f"{'страница':<20} | {'режим':<16} | {'статус':>6} | {'запросов/с':>11} | {'p99':>12} | {'ответ, КБ':>9}")
+    print('-' * 90)
+    for path in PAGES:
+        portal.app.config['PAGE_CACHE_ENABLED'] = True
+        portal.rendered_pages.clear()
+        environ = EnvironBuilder(path=path, headers={'Accept-Encoding': 'gzip'}).get_environ()
+        response_headers = {}
+        portal.app.wsgi_app(environ, lambda status, headers, exc_info=None: response_headers.update(headers))
+        etag = response_headers['ETag']
+        cases = (
+            ('без кеша', False, {'Accept-Encoding': 'gzip'}),
+            ('кеш + gzip', True, {'Accept-Encoding': 'gzip'}),
+            ('кеш, 304', True, {'Accept-Encoding': 'gzip', 'If-None-Match': etag}),
+        )
+        for mode_name, cache_enabled, headers in cases:
+            portal.app.config['PAGE_CACHE_ENABLED'] = cache_enabled
+            send = make_request(path, headers)
+            status, response_size = send(None)
+            latencies = measure_latencies(send, range(args.requests))
+            print(f"{path:<20} | {mode_name:<16} | {status:>6} | {len(latencies) / sum(latencies):>11,.0f} | "
+                  f"{format_microseconds(percentile(latencies, 0.99))} | {response_size / 1024:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Бенчмарк генератора паролей: пароли в секунду для одиночного и пакетного режимов.
+
+Сравнивает:
+- прежний способ (''.join(random.choice(pool) ...)), без HTTP;
+- буферизованный CSPRNG (secure_random.iter_strings), без HTTP;
+- GET /api/random/password по одному паролю на запрос;
+- GET /api/random/password?count=N (при большом N — потоковый ответ).
+Запросы идут через тестовый клиент Flask.
+
+Запуск из каталога src:
+    python -m benchmarks.bench_password_generation [--counts 1000,100000] [--length 16]
+"""
+import argparse
+import logging
+import random
+import string
+import time
+
+from app import app
+from secure_random import secure_random
+
+CHARACTER_POOL = string.ascii_letters + string.digits + string.punctuation
+# Одиночные запросы медленные — меряем выборку и пересчитываем.
+SINGLE_REQUEST_MAX_COUNT = 5000
+
+
+def passwords_per_second(count, generate):
+    started = time.perf_counter()
+    generate()
+    return count / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--counts', default='1000,100000', help='Число паролей через запятую.')
+    parser.add_argument('--length', type=int, default=16, help='Длина пароля.')
+    args = parser.parse_args()
+    counts = [int(count) for count in args.counts.split(',')]
+    length = args.length
+
+    app.logger.setLevel(logging.ERROR)
+    client = app.test_client()
+
+    def single_requests(count):
+        for _ in range(count):
+            client.get(f'/api/random/password?length={length}')
+
+    def batch_request(count):
+        response = client.get(f'/api/random/password?length={length}&count={count}')
+        assert response.status_code == 200, response.status_code
+        response.get_data()
+
+    print(f"{'паролей':>9} | {'способ':<30} | {'паролей/с':>12}")
+    print('-' * 59)
+    for count in counts:
+        single_count = min(count, SINGLE_REQUEST_MAX_COUNT)
+        rows = (
+            ('random.choice (без HTTP)', passwords_per_second(count, lambda: [
+                ''.join(random.choice(CHARACTER_POOL) for _ in range(length)) for _ in range(count)
+            ])),
+            ('CSPRNG пачками (без HTTP)', passwords_per_second(count, lambda: list(
+                secure_random.iter_strings(CHARACTER_POOL, length, count)
+            ))),
+            ('HTTP: по одному на запрос', passwords_per_second(single_count, lambda: single_requests(single_count))),
+            ('HTTP: count=N', passwords_per_second(count, lambda: batch_request(count))),
+        )
+        for label, rate in rows:
+            print(f"{count:>9} | {label:<30} | {rate:>12,.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Отчет о памяти на запись в хранилищах в памяти: словари против компактных записей.
+
+Записи создаются так же, как через API: каждая приходит отдельной
+JSON-строкой и разбирается json.loads, поэтому строки типа и жанра у каждой
+записи изначально свои (как у реальных запросов). Память меряется через
+tracemalloc: разница между занятым до и после наполнения хранилища,
+деленная на число записей. В нее входят и служебные структуры хранилища
+(словарь ID -> запись, плотный массив ID), одинаковые для обоих вариантов.
+
+С флагом --with-index меряется еще и каталог вместе с поисковыми индексами
+(InMemoryCatalogStore) — это заметно дольше.
+
+Запуск из каталога src:
+    python -m benchmarks.bench_record_memory [--records 1000000] [--with-index]
+"""
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+
+from storage import CATALOG_SCHEMA, TASKS_SCHEMA, InMemoryCatalogStore, InMemoryRecordStore
+
+GENRES = ('Роман', 'Антиутопия', 'Научная фантастика', 'Детектив', 'Драма', 'Комедия')
+
+
+def catalog_lines(count):
+    for number in range(count):
+        item = {'type': 'book', 'title': f'Книга номер {number}', 'author': f'Автор {number % 5000}',
+                'year': 1900 + number % 120, 'genre': GENRES[number % len(GENRES)]}
+        if number % 3 == 0:
+            item = {'type': 'movie', 'title': f'Фильм номер {number}', 'director': f'Режиссер {number % 2000}',
+                    'year': 1950 + number % 70, 'genre': GENRES[number % len(GENRES)]}
+        yield json.dumps(item, ensure_ascii=False)
+
+
+def task_lines(count):
+    for number in range(count):
+        yield json.dumps({'text': f'Задача номер {number}', 'done': number % 2 == 0}, ensure_ascii=False)
+
+
+def measure(build_store, lines):
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    started_at = time.perf_counter()
+    store = build_store()
+    for line in lines:
+        store.create(json.loads(line))
+    elapsed = time.perf_counter() - started_at
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    return store, used, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', type=int, default=1_000_000, help='Число записей.')
+    parser.add_argument('--with-index', action='store_true', help='Мерить и каталог с поисковыми индексами.')
+    args = parser.parse_args()
+    count = args.records
+
+    cases = [
+        ('каталог', 'словари', lambda: InMemoryRecordStore(), catalog_lines),
+        ('каталог', 'компактные', lambda: InMemoryRecordStore(schema=CATALOG_SCHEMA), catalog_lines),
+        ('задачи', 'словари', lambda: InMemoryRecordStore(), task_lines),
+        ('задачи', 'компактные', lambda: InMemoryRecordStore(schema=TASKS_SCHEMA), task_lines),
+    ]
+    if args.with_index:
+        cases += [
+            ('каталог+индексы', 'словари', lambda: InMemoryCatalogStore(), catalog_lines),
+            ('каталог+индексы', 'компактные', lambda: InMemoryCatalogStore(schema=CATALOG_SCHEMA), catalog_lines),
+        ]
+
+    print(f"Записей: {count:,}")
+    print(f"{'данные':<16} | {'записи':<10} | {'байт/запись':>11} | {'всего, МиБ':>10} | {'наполнение':>10}")
+    print('-' * 70)
+    for data_name, layout_name, build_store, lines in cases:
+        store, used, elapsed = measure(build_store, lines(count))
+        print(f"{data_name:<16} | {layout_name:<10} | {used / count:>11,.0f} | {used / 2 ** 20:>10,.1f} | "
+              f"{elapsed:>8.1f} с")
+        del store
+
+
+if __name__ == '__main__':
+    main()
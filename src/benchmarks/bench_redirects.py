@@ -0,0 +1,103 @@
+"""
+Микробенчмарк редиректов /s/<код>: запросов в секунду и p99 на одном ядре.
+
+Заполняет хранилище коротких ссылок и вызывает WSGI-приложение напрямую
+(без сети и HTTP-сервера), читая ответ целиком. Сравниваются:
+- быстрый путь (RedirectFastPath: готовый ответ из кеша);
+- он же вместе с прослойкой метрик (MetricsMiddleware), как в работе;
+- прежний путь через маршрутизацию Flask и redirect() — вызывается
+  приложение, которое обернуто быстрым путем.
+Отдельно меряются промахи (коды, которых нет): готовый 404 по фильтру
+Блума против 404 из обработчика Flask.
+Журнал переходов при редиректах пишется (буферизованно, в фоне), но его
+вывод отключен, чтобы не мешать замеру. Процесс по возможности
+привязывается к одному ядру.
+
+Запуск из каталога src:
+    python -m benchmarks.bench_redirects [--links 10000] [--requests 200000]
+"""
+import argparse
+import logging
+import os
+import random
+
+from werkzeug.test import EnvironBuilder
+
+import app as portal
+from benchmarks._timing import format_microseconds, measure_latencies, percentile
+
+
+def pin_to_single_core():
+    """Привязывает процесс к одному ядру (если ОС это поддерживает). Возвращает номер ядра или None."""
+    if not hasattr(os, 'sched_setaffinity'):
+        return None
+    core = min(os.sched_getaffinity(0))
+    os.sched_setaffinity(0, {core})
+    return core
+
+
+def make_requester(wsgi_app, environs):
+    def start_response(status, headers, exc_info=None):
+        pass
+
+    def request(index):
+        body = wsgi_app(dict(environs[index]), start_response)
+        try:
+            for _ in body:
+                pass
+        finally:
+            if hasattr(body, 'close'):
+                body.close()
+    return request
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--links', type=int, default=10_000, help='Сколько коротких ссылок создать.')
+    parser.add_argument('--requests', type=int, default=200_000, help='Сколько редиректов выполнить в каждом режиме.')
+    args = parser.parse_args()
+
+    core = pin_to_single_core()
+    portal.app.logger.setLevel(logging.ERROR)
+
+    short_codes = []
+    for number in range(args.links):
+        short_code = portal.short_code_allocator.allocate()
+        portal.url_shortener_mappings.add(short_code, f'https://example.com/articles/{number}?utm_source=bench')
+        if portal.short_code_filter is not None:
+            portal.short_code_filter.add(short_code)
+        short_codes.append(short_code)
+    environs = [EnvironBuilder(path=f'/s/{short_code}').get_environ() for short_code in short_codes]
+    # Коды длиннее выдаваемых заведомо не существуют.
+    missing_environs = [EnvironBuilder(path=f'/s/{short_code}x').get_environ() for short_code in short_codes]
+    request_indexes = [random.randrange(len(environs)) for _ in range(args.requests)]
+
+    fast_path = portal.redirect_fast_path
+    modes = {
+        'быстрый путь': make_requester(fast_path, environs),
+    }
+    if portal.app.config['METRICS_ENABLED']:
+        # Так запрос обрабатывается на самом деле: снаружи стоит прослойка метрик.
+        modes['быстрый путь + метрики'] = make_requester(portal.app.wsgi_app, environs)
+    modes.update({
+        'Flask + redirect()': make_requester(fast_path.wsgi_app, environs),
+    })
+    if portal.short_code_filter is not None:
+        modes['промах: фильтр Блума'] = make_requester(fast_path, missing_environs)
+    modes['промах: Flask 404'] = make_requester(fast_path.wsgi_app, missing_environs)
+
+    print(f"Ядро: {core if core is not None else 'не закреплено'}; ссылок: {args.links}; запросов: {args.requests}")
+    print(f"{'режим':<24} | {'запросов/с':>13} | {'p50':>12} | {'p99':>12}")
+    print('-' * 70)
+    for label, request in modes.items():
+        # Прогрев: заполняет кеш готовых ответов и кеши интерпретатора.
+        for index in range(len(environs)):
+            request(index)
+        latencies = measure_latencies(request, request_indexes)
+        requests_per_second = len(latencies) / sum(latencies)
+        print(f"{label:<24} | {requests_per_second:>13,.0f} | {format_microseconds(percentile(latencies, 0.5))} | "
+              f"{format_microseconds(percentile(latencies, 0.99))}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""
+Бенчмарк хранилища коротких ссылок: массовое сокращение уникальных URL.
+
+Проходит тот же путь, что и POST /api/shorten (проверка дубликата по обратному
+индексу, затем сохранение кода), и печатает время на каждый очередной блок
+URL. При линейной общей сложности время блока не растет с размером хранилища.
+
+Запуск из каталога src:
+    python -m benchmarks.bench_shortener_store [--total 1000000] [--block 100000]
+"""
+import argparse
+import time
+
+from storage import ShortUrlStore
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--total', type=int, default=1_000_000, help='Сколько уникальных URL сократить.')
+    parser.add_argument('--block', type=int, default=100_000, help='Размер блока для промежуточных замеров.')
+    args = parser.parse_args()
+
+    store = ShortUrlStore()
+    timer = time.perf_counter
+    started_at = timer()
+    block_started_at = started_at
+
+    print(f"{'сокращено':>10} | {'время блока':>12} | {'URL/с в блоке':>14}")
+    print('-' * 44)
+    for number in range(1, args.total + 1):
+        long_url = f'https://example.com/articles/{number}?ref=bench'
+        if store.find_code(long_url) is None:
+            # Код берем из номера: бенчмарк меряет индексы, а не генератор кодов.
+            store.add(format(number, 'x'), long_url)
+        if number % args.block == 0:
+            now = timer()
+            block_seconds = now - block_started_at
+            print(f"{number:>10} | {block_seconds:>10.3f} с | {args.block / block_seconds:>14,.0f}")
+            block_started_at = now
+
+    total_seconds = timer() - started_at
+    print(f"Итого: {args.total:,} URL за {total_seconds:.2f} с ({args.total / total_seconds:,.0f} URL/с)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Сравнение пропускной способности бэкендов хранилища: память и SQLite.
+
+Для каждого бэкенда прогоняет на хранилище задач создание, чтение по ID,
+изменение, выдачу всего списка и удаление, и печатает число операций в
+секунду. Отдельно замеряется вставка из нескольких процессов в одну базу
+SQLite — так работают несколько воркеров gunicorn с общими данными.
+
+Запуск из каталога src:
+    python -m benchmarks.bench_storage_backends [--records 20000] [--processes 4]
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+
+from storage import create_storage
+
+
+def run_operations(tasks, record_count):
+    """Возвращает {операция: операций в секунду} для хранилища задач."""
+    timer = time.perf_counter
+    results = {}
+
+    started_at = timer()
+    created_ids = [tasks.create({'text': f'Задача {number}', 'done': False})['id'] for number in range(record_count)]
+    results['create'] = record_count / (timer() - started_at)
+
+    started_at = timer()
+    for task_id in created_ids:
+        tasks.get(task_id)
+    results['get'] = record_count / (timer() - started_at)
+
+    started_at = timer()
+    for task_id in created_ids:
+        tasks.update(task_id, {'done': True})
+    results['update'] = record_count / (timer() - started_at)
+
+    listing_rounds = 5
+    started_at = timer()
+    for _ in range(listing_rounds):
+        tasks.all()
+    results['list (записей/с)'] = listing_rounds * record_count / (timer() - started_at)
+
+    started_at = timer()
+    for task_id in created_ids:
+        tasks.delete(task_id)
+    results['delete'] = record_count / (timer() - started_at)
+    return results
+
+
+def _insert_worker(database_path, record_count):
+    tasks = create_storage('sqlite', sqlite_path=database_path).tasks
+    for number in range(record_count):
+        tasks.create({'text': f'Задача воркера {os.getpid()} №{number}', 'done': False})
+
+
+def run_multiprocess_inserts(database_path, process_count, records_per_process):
+    """Вставка из нескольких процессов в одну базу; возвращает (вставок в секунду, итоговое число записей)."""
+    create_storage('sqlite', sqlite_path=database_path)  # создаем таблицы заранее
+    workers = [
+        multiprocessing.Process(target=_insert_worker, args=(database_path, records_per_process))
+        for _ in range(process_count)
+    ]
+    started_at = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started_at
+    total_records = len(create_storage('sqlite', sqlite_path=database_path).tasks)
+    return process_count * records_per_process / elapsed, total_records
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', type=int, default=20_000, help='Сколько задач создавать в каждом прогоне.')
+    parser.add_argument('--processes', type=int, default=4, help='Число процессов для многопроцессной вставки.')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        backends = {
+            'memory': create_storage('memory'),
+            'sqlite': create_storage('sqlite', sqlite_path=os.path.join(temporary_directory, 'bench.sqlite3')),
+        }
+        results = {name: run_operations(storage.tasks, args.records) for name, storage in backends.items()}
+
+        print(f"{'операция':<20} | {'memory, оп/с':>14} | {'sqlite, оп/с':>14} | {'разница':>8}")
+        print('-' * 66)
+        for operation in results['memory']:
+            memory_rate = results['memory'][operation]
+            sqlite_rate = results['sqlite'][operation]
+            print(f"{operation:<20} | {memory_rate:>14,.0f} | {sqlite_rate:>14,.0f} | {memory_rate / sqlite_rate:>7.1f}x")
+
+        shared_path = os.path.join(temporary_directory, 'shared.sqlite3')
+        records_per_process = max(1, args.records // args.processes)
+        rate, total_records = run_multiprocess_inserts(shared_path, args.processes, records_per_process)
+        print(f"\nSQLite, {args.processes} процесса(ов): {rate:,.0f} вставок/с, "
+              f"в общей базе {total_records:,} записей (ожидалось {args.processes * records_per_process:,}).")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""
+Бенчмарк конкурентного доступа к хранилищам в памяти: 1, 8 и 32 потока.
+
+Каждый поток выполняет смесь операций над общим хранилищем задач
+(get 70%, update 20%, create 5%, delete 5%) и над каталогом (вместо get —
+страница запроса с фильтром по году). Для каждого числа потоков выводится
+суммарная пропускная способность и p99 одной операции, а после прогона
+проверяется целостность: ни один ID не выдан дважды, число записей
+сходится с числом созданных минус удаленные, плотный массив ID совпадает
+со словарем записей.
+
+Чтобы гонки проявлялись чаще, интервал переключения потоков интерпретатора
+можно уменьшить (--switch-interval); по умолчанию он стандартный.
+
+Запуск из каталога src:
+    python -m benchmarks.bench_store_contention [--threads 1,8,32] [--operations 200000] [--records 10000]
+"""
+import argparse
+import random
+import sys
+import threading
+import time
+
+from benchmarks._timing import format_microseconds, percentile
+from catalog_query import CatalogQuery
+from storage import InMemoryCatalogStore, InMemoryRecordStore
+
+GENRES = ('Роман', 'Антиутопия', 'Научная фантастика', 'Детектив')
+
+
+def build_task_store(size):
+    store = InMemoryRecordStore()
+    for number in range(size):
+        store.create({'text': f'Задача {number}', 'done': False})
+    return store
+
+
+def build_catalog_store(size):
+    store = InMemoryCatalogStore()
+    for number in range(size):
+        store.create({'type': 'book', 'title': f'Книга {number}', 'author': f'Автор {number % 100}',
+                      'year': 1900 + number % 120, 'genre': GENRES[number % len(GENRES)]})
+    return store
+
+
+def make_worker(store, read_operation, operation_count, record_count, created_ids, deleted_counter, latencies):
+    def work():
+        rng = random.Random()
+        timer = time.perf_counter
+        own_latencies = []
+        own_created_ids = []
+        own_deleted = 0
+        for _ in range(operation_count):
+            choice = rng.random()
+            record_id = rng.randint(1, record_count)
+            started_at = timer()
+            if choice < 0.70:
+                read_operation(record_id)
+            elif choice < 0.90:
+                store.update(record_id, {'done': True, 'year': 2000})
+            elif choice < 0.95:
+                own_created_ids.append(store.create({'text': 'Новая', 'done': False, 'type': 'book',
+                                                     'title': 'Новая', 'year': 2024, 'genre': 'Роман'})['id'])
+            else:
+                own_deleted += store.delete(record_id)
+            own_latencies.append(timer() - started_at)
+        with deleted_counter['lock']:
+            latencies.extend(own_latencies)
+            created_ids.extend(own_created_ids)
+            deleted_counter['value'] += own_deleted
+    return work
+
+
+def check_integrity(store, initial_count, created_ids, deleted_count):
+    problems = []
+    if len(created_ids) != len(set(created_ids)):
+        problems.append(f"повторные ID: {len(created_ids) - len(set(created_ids))}")
+    expected_count = initial_count + len(created_ids) - deleted_count
+    if len(store) != expected_count:
+        problems.append(f"записей {len(store)}, ожидалось {expected_count}")
+    if sorted(store._dense_ids) != sorted(store._records):
+        problems.append("плотный массив ID не совпадает с записями")
+    return ', '.join(problems) or 'в порядке'
+
+
+def run(store_name, build_store, read_operation_for, thread_count, operation_count, record_count):
+    store = build_store(record_count)
+    created_ids, latencies = [], []
+    deleted_counter = {'value': 0, 'lock': threading.Lock()}
+    per_thread = operation_count // thread_count
+    threads = [
+        threading.Thread(target=make_worker(store, read_operation_for(store), per_thread, record_count,
+                                           created_ids, deleted_counter, latencies))
+        for _ in range(thread_count)
+    ]
+    started_at = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started_at
+    latencies.sort()
+    integrity = check_integrity(store, record_count, created_ids, deleted_counter['value'])
+    print(f"{store_name:<8} | {thread_count:>7} | {len(latencies) / elapsed:>12,.0f} | "
+          f"{format_microseconds(percentile(latencies, 0.99))} | {integrity}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', default='1,8,32', help='Числа потоков через запятую.')
+    parser.add_argument('--operations', type=int, default=200_000, help='Всего операций на прогон.')
+    parser.add_argument('--records', type=int, default=10_000, help='Сколько записей создать заранее.')
+    parser.add_argument('--switch-interval', type=float, default=None,
+                        help='Интервал переключения потоков в секундах (sys.setswitchinterval).')
+    args = parser.parse_args()
+    if args.switch_interval is not None:
+        sys.setswitchinterval(args.switch_interval)
+
+    stores = (
+        ('задачи', build_task_store, lambda store: store.get),
+        ('каталог', build_catalog_store,
+         lambda store: lambda record_id: store.query(CatalogQuery(year=1900 + record_id % 120, limit=20))),
+    )
+    print(f"{'хранилище':<8} | {'потоков':>7} | {'операций/с':>12} | {'p99':>12} | целостность")
+    print('-' * 70)
+    for store_name, build_store, read_operation_for in stores:
+        for thread_count in (int(count) for count in args.threads.split(',')):
+            run(store_name, build_store, read_operation_for, thread_count, args.operations, args.records)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Бенчмарк потоковой выдачи: пиковая память на запрос GET /api/tasks.
+
+Заполняет хранилище задач и вызывает WSGI-приложение напрямую, читая ответ
+по кускам и сразу их отбрасывая (как это делает сервер). Пиковый объем
+выделенной во время запроса памяти (tracemalloc) сравнивается для
+обычного ответа одной строкой и для потоковых JSON/NDJSON.
+
+Запуск из каталога src:
+    python -m benchmarks.bench_streaming [--sizes 10000,100000,1000000]
+"""
+import argparse
+import time
+import tracemalloc
+
+from werkzeug.test import EnvironBuilder
+
+import app as portal
+
+MODES = {
+    'jsonify (одной строкой)': {'threshold': float('inf'), 'accept': 'application/json'},
+    'поток JSON': {'threshold': 0, 'accept': 'application/json'},
+    'поток NDJSON': {'threshold': 0, 'accept': 'application/x-ndjson'},
+}
+
+
+def consume_request(accept):
+    """Выполняет GET /api/tasks через WSGI и возвращает число байт ответа."""
+    environ = EnvironBuilder(path='/api/tasks', headers={'Accept': accept}).get_environ()
+    body = portal.app.wsgi_app(environ, lambda status, headers, exc_info=None: None)
+    received_bytes = 0
+    try:
+        for chunk in body:
+            received_bytes += len(chunk)
+    finally:
+        if hasattr(body, 'close'):
+            body.close()
+    return received_bytes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='10000,100000,1000000', help='Число задач через запятую.')
+    parser.add_argument('--pretty', action='store_true', help='Форматировать JSON с отступами.')
+    args = parser.parse_args()
+    portal.app.json.compact = not args.pretty
+
+    print(f"{'задач':>9} | {'режим':<24} | {'ответ, МБ':>9} | {'пик памяти, МБ':>14} | {'время, с':>8}")
+    print('-' * 78)
+    created = 0
+    for size in sorted(int(size) for size in args.sizes.split(',')):
+        for number in range(created, size):
+            portal.tasks_db.create({'text': f'Задача номер {number}', 'done': number % 3 == 0})
+        created = size
+        for mode_name, mode in MODES.items():
+            portal.app.config['JSON_STREAMING_THRESHOLD'] = mode['threshold']
+            tracemalloc.start()
+            started_at = time.perf_counter()
+            received_bytes = consume_request(mode['accept'])
+            elapsed = time.perf_counter() - started_at
+            _, peak_bytes = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"{size:>9} | {mode_name:<24} | {received_bytes / 2**20:>9.1f} | {peak_bytes / 2**20:>14.1f} | {elapsed:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Бенчмарк хранилища задач: задержка get/update/delete при росте числа задач.
+
+Сравнивает InMemoryRecordStore с прежним подходом (линейный поиск по списку)
+и показывает, что время одной операции не зависит от размера хранилища.
+
+Запуск из каталога src:
+    python -m benchmarks.bench_task_store [--sizes 1000,10000,100000,1000000]
+"""
+import argparse
+import random
+
+from benchmarks._timing import format_microseconds, measure_latencies, percentile
+from storage import InMemoryRecordStore
+
+OPERATIONS_PER_SIZE = 2000
+# Линейный поиск на миллионе записей слишком медленный, чтобы гонять его целиком.
+LIST_SCAN_MAX_SIZE = 100_000
+
+
+def build_store(size):
+    store = InMemoryRecordStore()
+    for number in range(size):
+        store.create({'text': f'Задача {number}', 'done': False})
+    return store
+
+
+def bench_store(size):
+    store = build_store(size)
+    sample_ids = [random.randint(1, size) for _ in range(OPERATIONS_PER_SIZE)]
+    results = {
+        'get': measure_latencies(store.get, sample_ids),
+        'update': measure_latencies(lambda task_id: store.update(task_id, {'done': True}), sample_ids),
+    }
+    # Для удаления берем уникальные ID, иначе повторные вызовы будут "промахами".
+    unique_ids = list(dict.fromkeys(sample_ids))
+    results['delete'] = measure_latencies(store.delete, unique_ids)
+    return results
+
+
+def bench_list_scan(size):
+    tasks = [{'id': number, 'text': f'Задача {number}', 'done': False} for number in range(1, size + 1)]
+    sample_ids = [random.randint(1, size) for _ in range(OPERATIONS_PER_SIZE // 10)]
+    return measure_latencies(
+        lambda task_id: next((task for task in tasks if task['id'] == task_id), None),
+        sample_ids,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1000,10000,100000,1000000',
+                        help='Размеры хранилища через запятую.')
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(',')]
+
+    print(f"{'размер':>10} | {'операция':<12} | {'p50':>12} | {'p99':>12}")
+    print('-' * 56)
+    for size in sizes:
+        for operation_name, latencies in bench_store(size).items():
+            print(f"{size:>10} | {operation_name:<12} | {format_microseconds(percentile(latencies, 0.5))} | "
+                  f"{format_microseconds(percentile(latencies, 0.99))}")
+        if size <= LIST_SCAN_MAX_SIZE:
+            latencies = bench_list_scan(size)
+            print(f"{size:>10} | {'list scan':<12} | {format_microseconds(percentile(latencies, 0.5))} | "
+                  f"{format_microseconds(percentile(latencies, 0.99))}")
+
+
+if __name__ == '__main__':
+    main()
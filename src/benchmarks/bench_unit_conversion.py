@@ -0,0 +1,83 @@
+"""
+Бенчмарк пакетной конвертации единиц: пропускная способность в значениях в секунду.
+
+Сравнивает:
+- одиночную конвертацию, как в GET /api/converter/convert (два обращения
+  к вложенному CONVERSION_RATES, умножение и деление) — только вычисление;
+- пакет "одна пара единиц + массив значений" и пакет из троек
+  (from_unit, to_unit, value) — разбор и вычисление без HTTP;
+- полный запрос POST /api/converter/convert/batch через тестовый клиент
+  (с разбором JSON и выдачей ответа, при большом пакете — потоком).
+
+Запуск из каталога src:
+    python -m benchmarks.bench_unit_conversion [--sizes 1000,100000,1000000]
+"""
+import argparse
+import logging
+import random
+import time
+
+from app import CONVERSION_RATES, app, conversion_table
+from unit_conversion import iter_converted_values, parse_conversion_batch
+
+
+def timed(function):
+    started = time.perf_counter()
+    function()
+    return time.perf_counter() - started
+
+
+def convert_one_by_one(triples):
+    for from_unit_id, to_unit_id, value in triples:
+        for category_units in CONVERSION_RATES.values():
+            if from_unit_id in category_units:
+                break
+        value_in_base_unit = value * category_units[from_unit_id]["factor"]
+        round(value_in_base_unit / category_units[to_unit_id]["factor"], 6)
+
+
+def convert_payload(payload):
+    values, factors, _ = parse_conversion_batch(payload, conversion_table)
+    for _ in iter_converted_values(values, factors):
+        pass
+
+
+def post_batch(client, payload):
+    response = client.post('/api/converter/convert/batch', json=payload)
+    assert response.status_code == 200, response.status_code
+    response.get_data()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1000,100000,1000000', help='Число значений через запятую.')
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(',')]
+
+    app.logger.setLevel(logging.ERROR)
+    client = app.test_client()
+    unit_pairs = [
+        (from_unit_id, to_unit_id)
+        for units in CONVERSION_RATES.values() for from_unit_id in units for to_unit_id in units
+    ]
+
+    print(f"{'значений':>10} | {'способ':<28} | {'значений/с':>14}")
+    print('-' * 60)
+    for size in sizes:
+        values = [random.uniform(0, 1e6) for _ in range(size)]
+        triples = [(*random.choice(unit_pairs), value) for value in values]
+        values_payload = {'from_unit': 'kilometer', 'to_unit': 'mile', 'values': values}
+        triples_payload = {'conversions': [list(triple) for triple in triples]}
+        rows = (
+            ('одиночная (вычисление)', timed(lambda: convert_one_by_one(triples))),
+            ('пакет значений', timed(lambda: convert_payload(values_payload))),
+            ('пакет троек', timed(lambda: convert_payload(triples_payload))),
+            ('HTTP: пакет значений', timed(lambda: post_batch(client, values_payload))),
+            ('HTTP: пакет троек', timed(lambda: post_batch(client, triples_payload))),
+        )
+        for label, elapsed in rows:
+            print(f"{size:>10} | {label:<28} | {size / elapsed:>14,.0f}")
+
+
+if __name__ == '__main__':
+    main()
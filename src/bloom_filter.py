@@ -0,0 +1,145 @@
+"""
+Фильтр Блума по выданным коротким кодам.
+
+Сканеры и боты перебирают /s/<случайный код>, и почти все такие запросы —
+промахи. Фильтр Блума отвечает на вопрос "выдавался ли этот код?" либо
+"точно нет", либо "возможно": на "точно нет" быстрый путь редиректов сразу
+отдает заранее собранный 404, не обращаясь к хранилищу и к Flask. Ложных
+"точно нет" у фильтра не бывает, ложные "возможно" (доля ~false_positive_rate)
+просто проходят обычный путь.
+
+Коды только добавляются (удалить код из фильтра Блума нельзя), поэтому
+фильтр пополняется в обработчике создания ссылки. Когда кодов становится
+больше расчетной емкости, фильтр перестраивается вдвое большим по полному
+списку кодов из хранилища — иначе доля ложных "возможно" быстро растет.
+
+Индексы битов считаются двойным хешированием (Кирш — Митценмахер):
+i-й индекс = (h1 + i * h2) mod m, где h1 и h2 — половины встроенного hash()
+строки. hash() строк случаен между процессами, но постоянен внутри процесса,
+а фильтр живет только в памяти процесса.
+"""
+import math
+import sys
+import threading
+
+DEFAULT_FILTER_CAPACITY = 100_000
+DEFAULT_FALSE_POSITIVE_RATE = 0.01
+_HASH_MASK = 2 ** 64 - 1
+_HALF_HASH_MASK = 2 ** 32 - 1
+
+
+class _FilterBits:
+    """Битовый массив фильтра с параметрами, под которые он рассчитан."""
+
+    __slots__ = ('bits', 'bit_count', 'hash_count', 'capacity')
+
+    def __init__(self, capacity, false_positive_rate):
+        self.capacity = capacity
+        # Оптимальные m и k для n элементов и доли ложных срабатываний p:
+        # m = -n * ln(p) / ln(2)^2, k = m / n * ln(2).
+        self.bit_count = max(64, math.ceil(-capacity * math.log(false_positive_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.bit_count / capacity * math.log(2)))
+        self.bits = bytearray((self.bit_count + 7) // 8)
+
+
+class ShortCodeBloomFilter:
+    """Фильтр Блума по выданным коротким кодам с автоматическим расширением."""
+
+    def __init__(self, load_codes, capacity: int = DEFAULT_FILTER_CAPACITY,
+                 false_positive_rate: float = DEFAULT_FALSE_POSITIVE_RATE):
+        """
+        Args:
+            load_codes: Функция без аргументов, возвращающая все выданные коды
+                (например, коды из ShortUrlStore.items()). Вызывается при создании
+                фильтра и при его расширении.
+            capacity (int): Сколько кодов фильтр вмещает до первого расширения.
+            false_positive_rate (float): Целевая доля ложных "возможно" (0 < p < 1).
+
+        Raises:
+            ValueError: Если емкость не положительна или доля вне (0, 1).
+        """
+        if capacity <= 0:
+            raise ValueError("Емкость фильтра должна быть больше нуля.")
+        if not 0 < false_positive_rate < 1:
+            raise ValueError("Доля ложных срабатываний должна быть в интервале (0, 1).")
+        self._load_codes = load_codes
+        self._false_positive_rate = false_positive_rate
+        self._lock = threading.Lock()
+        # Читатели берут ссылку на _state один раз, поэтому замена при расширении для них атомарна.
+        self._state = None
+        self._item_count = 0
+        # Счетчики наблюдаемых промахов (без блокировки, поэтому приблизительные).
+        self.definite_misses = 0
+        self.false_positives = 0
+        with self._lock:
+            self._rebuild(capacity)
+
+    @staticmethod
+    def _positions(code, state):
+        hashed = hash(code) & _HASH_MASK
+        first, step = hashed & _HALF_HASH_MASK, (hashed >> 32) | 1
+        bit_count = state.bit_count
+        for index in range(state.hash_count):
+            yield (first + index * step) % bit_count
+
+    def _set_bits(self, code, state):
+        bits = state.bits
+        for position in self._positions(code, state):
+            bits[position >> 3] |= 1 << (position & 7)
+
+    def _rebuild(self, capacity):
+        """Строит фильтр заново по кодам из хранилища; вызывается под блокировкой."""
+        codes = list(self._load_codes())
+        while len(codes) > capacity:
+            capacity *= 2
+        state = _FilterBits(capacity, self._false_positive_rate)
+        for code in codes:
+            self._set_bits(code, state)
+        self._state = state
+        self._item_count = len(codes)
+
+    def add(self, code: str):
+        """Добавляет выданный код; при переполнении расширяет фильтр вдвое."""
+        with self._lock:
+            if self._item_count >= self._state.capacity:
+                # Код к этому моменту уже сохранен в хранилище и попадет в новый фильтр.
+                self._rebuild(self._state.capacity * 2)
+                return
+            self._set_bits(code, self._state)
+            self._item_count += 1
+
+    def might_contain(self, code: str) -> bool:
+        """False — код точно не выдавался; True — возможно, выдавался."""
+        state = self._state
+        bits = state.bits
+        for position in self._positions(code, state):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def stats(self) -> dict:
+        """
+        Метрики фильтра.
+
+        Returns:
+            dict: Емкость, число кодов, размеры (биты, байты в памяти), число
+                хеш-функций, расчетная доля ложных срабатываний при текущем
+                заполнении и наблюдаемая доля среди промахов (ложные "возможно"
+                к общему числу запросов несуществующих кодов).
+        """
+        state = self._state
+        item_count = self._item_count
+        estimated_rate = (1 - math.exp(-state.hash_count * item_count / state.bit_count)) ** state.hash_count
+        missing_lookups = self.definite_misses + self.false_positives
+        return {
+            'capacity': state.capacity,
+            'codes': item_count,
+            'bit_count': state.bit_count,
+            'hash_count': state.hash_count,
+            'memory_bytes': sys.getsizeof(state.bits),
+            'target_false_positive_rate': self._false_positive_rate,
+            'estimated_false_positive_rate': round(estimated_rate, 6),
+            'definite_misses': self.definite_misses,
+            'false_positives': self.false_positives,
+            'observed_false_positive_rate': round(self.false_positives / missing_lookups, 6) if missing_lookups else None,
+        }
@@ -0,0 +1,362 @@
+"""
+Пакетная загрузка задач и элементов каталога из NDJSON и CSV.
+
+Тело запроса читается кусками по BULK_READ_CHUNK_SIZE байт и разбирается
+по строкам по мере чтения: целиком в памяти оно не собирается, и пиковая
+память на запрос — один кусок тела и одна пачка записей. Строка длиннее
+MAX_BULK_LINE_LENGTH байт отклоняется с ошибкой строки, а размер всего тела
+ограничен настройкой MAX_CONTENT_LENGTH приложения.
+
+Каждая строка проверяется валидатором (TaskValidator, CatalogItemValidator).
+Все, что не зависит от строки — допустимые типы, границы года (текущий год
+берется один раз на запрос, а не на запись), тексты ошибок, — валидатор
+готовит заранее, так что проверка строки сводится к нескольким проверкам
+типов и сравнениям. Ошибки запоминаются с номером строки, а корректные
+записи копятся в пачку и добавляются в хранилище одним вызовом create_many:
+одна блокировка (транзакция SQLite, fsync журнала) на пачку, а не на запись.
+Пачки, добавленные до строки с ошибкой, остаются добавленными — отчет
+перечисляет только отклоненные строки.
+"""
+import codecs
+import csv
+import json
+
+from streaming import NDJSON_MIMETYPE_ALIASES
+
+CSV_MIMETYPES = ('text/csv', 'application/csv')
+# Сколько байт тела читать за раз.
+BULK_READ_CHUNK_SIZE = 256 * 1024
+# Максимальная длина строки тела в байтах: более длинная строка отклоняется как ошибка строки,
+# а ее хвост отбрасывается при чтении (в памяти не копится).
+MAX_BULK_LINE_LENGTH = 64 * 1024
+# Сколько записей добавлять в хранилище одним вызовом create_many.
+DEFAULT_BULK_BATCH_SIZE = 1000
+# Сколько ошибок перечислять в ответе (остальные только считаются).
+DEFAULT_MAX_REPORTED_ERRORS = 100
+# Колонки CSV при выгрузке; при загрузке колонка id игнорируется (ID выдает хранилище).
+TASK_CSV_COLUMNS = ('id', 'text', 'done')
+CATALOG_CSV_COLUMNS = ('id', 'type', 'title', 'author', 'director', 'year', 'genre')
+# Допустимый год элемента каталога: от CATALOG_MIN_YEAR до текущего года + CATALOG_MAX_YEARS_AHEAD
+# (на несколько лет вперед — для будущих релизов).
+CATALOG_MIN_YEAR = 1800
+CATALOG_MAX_YEARS_AHEAD = 10
+DEFAULT_GENRE = 'Не указан'
+# Строковые значения логических полей (в CSV все значения — строки).
+BOOLEAN_STRINGS = {'true': True, '1': True, 'yes': True, 'false': False, '0': False, 'no': False}
+
+
+class BulkImportError(ValueError):
+    """Некорректная загрузка целиком (например, в заголовке CSV нет нужных колонок), а не ошибка в строке."""
+
+
+def bulk_format_for_mimetype(mimetype: str):
+    """
+    Определяет формат загрузки по Content-Type.
+
+    Returns:
+        str | None: 'ndjson', 'csv' или None, если формат не поддерживается.
+    """
+    if mimetype in NDJSON_MIMETYPE_ALIASES:
+        return 'ndjson'
+    if mimetype in CSV_MIMETYPES:
+        return 'csv'
+    return None
+
+
+class TaskValidator:
+    """Проверка задачи: те же правила, что у POST /api/tasks, плюс необязательное поле 'done'."""
+
+    csv_required_columns = ('text',)
+    TEXT_ERROR = "Поле 'text' для задачи обязательно и не может быть пустым."
+    DONE_ERROR = "Поле 'done' должно быть логическим значением (true/false)."
+
+    def __call__(self, fields: dict):
+        """
+        Args:
+            fields (dict): Поля из строки загрузки.
+
+        Returns:
+            tuple[dict | None, str | None]: Поля новой задачи и None или None и текст ошибки.
+        """
+        text = fields.get('text')
+        if not isinstance(text, str) or not text.strip():
+            return None, self.TEXT_ERROR
+        done = fields.get('done')
+        if type(done) is not bool:
+            if done is None:
+                done = False
+            else:
+                done = BOOLEAN_STRINGS.get(done.strip().lower()) if isinstance(done, str) else None
+                if done is None:
+                    return None, self.DONE_ERROR
+        return {'text': text.strip(), 'done': done}, None
+
+
+class CatalogItemValidator:
+    """Проверка элемента каталога: правила POST /api/catalog с заранее вычисленными границами года."""
+
+    csv_required_columns = ('type', 'title', 'year')
+    TYPE_ERROR = "Обязательное поле 'type' должно иметь значение 'book' или 'movie'."
+    TITLE_ERROR = "Обязательное поле 'title' не может быть пустым."
+    GENRE_ERROR = "Поле 'genre' должно быть строкой."
+    # Тип элемента -> поле создателя, ошибка, если оно не заполнено, и поле создателя другого типа.
+    CREATOR_FIELDS = {
+        'book': ('author', "Для элемента типа 'book' обязательно указание автора (непустая строка в поле 'author').",
+                 'director'),
+        'movie': ('director', "Для элемента типа 'movie' обязательно указание режиссера (непустая строка в поле 'director').",
+                  'author'),
+    }
+
+    def __init__(self, current_year: int):
+        """
+        Args:
+            current_year (int): Текущий год — от него считается верхняя граница года элемента.
+        """
+        self.max_year = current_year + CATALOG_MAX_YEARS_AHEAD
+        self._valid_years = range(CATALOG_MIN_YEAR, self.max_year + 1)
+
+    def __call__(self, fields: dict):
+        """
+        Поля нормализуются на месте (без нового словаря на каждую запись): сам
+        словарь и возвращается. Лишние ключи остаются — хранилища сохраняют
+        только поля схемы.
+
+        Args:
+            fields (dict): Поля из тела запроса или строки загрузки.
+
+        Returns:
+            tuple[dict | None, str | None]: Поля нового элемента и None или None и текст ошибки.
+        """
+        item_type = fields.get('type')
+        creator = self.CREATOR_FIELDS.get(item_type) if isinstance(item_type, str) else None
+        if creator is None:
+            return None, self.TYPE_ERROR
+        title = fields.get('title')
+        if not isinstance(title, str) or not title.strip():
+            return None, self.TITLE_ERROR
+        raw_year = fields.get('year')
+        if type(raw_year) is int:
+            year = raw_year
+        else:
+            try:
+                year = int(raw_year) if raw_year is not None else None
+            except (TypeError, ValueError):
+                return None, f"Значение года '{raw_year}' должно быть целым числом."
+        if year not in self._valid_years:
+            return None, (f"Поле 'year' ({raw_year}) содержит некорректное значение. "
+                          f"Ожидается год в диапазоне {CATALOG_MIN_YEAR}-{self.max_year}.")
+        creator_field, creator_error, other_creator_field = creator
+        creator_name = fields.get(creator_field)
+        if not isinstance(creator_name, str) or not creator_name.strip():
+            return None, creator_error
+        genre = fields.get('genre')
+        if genre is None:
+            genre = DEFAULT_GENRE
+        elif not isinstance(genre, str):
+            return None, self.GENRE_ERROR
+        fields['title'] = title.strip()
+        fields['year'] = year
+        fields['genre'] = genre.strip() or DEFAULT_GENRE
+        fields[creator_field] = creator_name.strip()
+        # Создатель другого типа (автор у фильма) не сохраняется — как и раньше.
+        fields.pop(other_creator_field, None)
+        return fields, None
+
+
+def _iter_byte_lines(stream, chunk_size, max_line_length):
+    """
+    Строки потока байт (без '\\n'), читаемого кусками.
+
+    Вместо строки длиннее max_line_length байт выдается None: ее хвост
+    отбрасывается по мере чтения, так что незавершенная строка в памяти
+    не длиннее max_line_length, а склейка кусков остается линейной.
+    """
+    pending = b''
+    # Текущая незавершенная строка уже длиннее max_line_length: отбрасываем все до '\n'.
+    oversized = False
+    first_chunk = True
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        if first_chunk:
+            first_chunk = False
+            if chunk.startswith(codecs.BOM_UTF8):
+                chunk = chunk[len(codecs.BOM_UTF8):]
+        lines = chunk.split(b'\n')
+        tail = lines.pop()
+        if lines:
+            if oversized or len(pending) + len(lines[0]) > max_line_length:
+                lines[0] = None
+            elif pending:
+                lines[0] = pending + lines[0]
+            for line in lines:
+                yield None if line is None or len(line) > max_line_length else line
+            pending = b''
+            oversized = False
+        if oversized:
+            continue
+        if len(pending) + len(tail) > max_line_length:
+            pending = b''
+            oversized = True
+        else:
+            pending += tail
+    if oversized:
+        yield None
+    elif pending:
+        yield pending
+
+
+def _iter_text_lines(stream, chunk_size, max_line_length, oversized_lines):
+    """
+    Строки потока байт в UTF-8 (с '\\n' на конце — он нужен csv внутри значений в кавычках).
+
+    Вместо слишком длинной строки выдается пустая, а ее номер добавляется в oversized_lines.
+    """
+    # Некорректные байты заменяются на U+FFFD: такая строка просто не пройдет проверку или
+    # сохранится с заменой, а загрузка не обрывается посередине.
+    line_number = 0
+    for line in _iter_byte_lines(stream, chunk_size, max_line_length):
+        line_number += 1
+        if line is None:
+            oversized_lines.append(line_number)
+            yield '\n'
+        else:
+            yield line.decode('utf-8', 'replace') + '\n'
+
+
+def _line_too_long_error(max_line_length):
+    """Текст ошибки строки длиннее max_line_length байт."""
+    return f"Строка длиннее {max_line_length} байт."
+
+
+def iter_ndjson_rows(stream, loads=json.loads, chunk_size: int = BULK_READ_CHUNK_SIZE,
+                     max_line_length: int = MAX_BULK_LINE_LENGTH):
+    """
+    Разбирает NDJSON по мере чтения.
+
+    Yields:
+        tuple: (номер строки, поля, None) или (номер строки, None, текст ошибки); пустые строки пропускаются.
+    """
+    line_number = 0
+    for line in _iter_byte_lines(stream, chunk_size, max_line_length):
+        line_number += 1
+        if line is None:
+            yield line_number, None, _line_too_long_error(max_line_length)
+            continue
+        if not line or line.isspace():
+            continue
+        try:
+            fields = loads(line)
+        except ValueError as error:
+            yield line_number, None, f"Некорректный JSON: {error}"
+            continue
+        if type(fields) is not dict:
+            yield line_number, None, "Строка должна быть JSON-объектом."
+            continue
+        yield line_number, fields, None
+
+
+def iter_csv_rows(stream, required_columns=(), chunk_size: int = BULK_READ_CHUNK_SIZE,
+                  max_line_length: int = MAX_BULK_LINE_LENGTH):
+    """
+    Разбирает CSV с заголовком по мере чтения. Пустые значения считаются отсутствующими.
+
+    Yields:
+        tuple: (номер строки, поля, None) или (номер строки, None, текст ошибки).
+
+    Raises:
+        BulkImportError: Если в заголовке нет обязательных колонок или он длиннее max_line_length байт.
+    """
+    oversized_lines = []
+    reader = csv.reader(_iter_text_lines(stream, chunk_size, max_line_length, oversized_lines))
+    header = None
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as error:
+            oversized_lines.clear()
+            yield reader.line_num, None, f"Некорректная строка CSV: {error}"
+            continue
+        if oversized_lines:
+            # Запись со слишком длинной строкой отклоняется. Если эта строка открывала значение
+            # в кавычках, его продолжение разбирается как отдельные записи (и обычно не проходит проверку).
+            if header is None:
+                raise BulkImportError(f"Заголовок CSV длиннее {max_line_length} байт.")
+            line_number = oversized_lines[0]
+            oversized_lines.clear()
+            yield line_number, None, _line_too_long_error(max_line_length)
+            continue
+        if not row:
+            continue
+        if header is None:
+            header = [name.strip() for name in row]
+            missing_columns = [name for name in required_columns if name not in header]
+            if missing_columns:
+                raise BulkImportError(f"В заголовке CSV нет обязательных колонок: {', '.join(missing_columns)}.")
+            continue
+        # Недостающие в конце строки значения считаются пустыми (как в csv.DictReader), а лишние — ошибка.
+        if len(row) > len(header):
+            yield reader.line_num, None, f"В строке {len(row)} значений, а в заголовке CSV — {len(header)}."
+            continue
+        yield reader.line_num, {name: value for name, value in zip(header, row) if value}, None
+
+
+def import_records(stream, bulk_format: str, validate, create_many, loads=json.loads,
+                   batch_size: int = DEFAULT_BULK_BATCH_SIZE,
+                   max_reported_errors: int = DEFAULT_MAX_REPORTED_ERRORS,
+                   chunk_size: int = BULK_READ_CHUNK_SIZE,
+                   max_line_length: int = MAX_BULK_LINE_LENGTH) -> dict:
+    """
+    Загружает записи из потока пачками.
+
+    Args:
+        stream: Поток байт тела запроса (request.stream).
+        bulk_format (str): 'ndjson' или 'csv'.
+        validate: Валидатор записи (TaskValidator, CatalogItemValidator).
+        create_many: Метод create_many хранилища.
+        loads: Функция разбора JSON одной строки.
+        batch_size (int): Записей в одной пачке.
+        max_reported_errors (int): Сколько ошибок перечислить в ответе.
+        chunk_size (int): Сколько байт тела читать за раз.
+        max_line_length (int): Максимальная длина строки в байтах; более длинные строки — ошибки строк.
+
+    Returns:
+        dict: Сводка, как у других пакетных API портала: count (строк с данными),
+        succeeded, failed, errors (первые max_reported_errors ошибок вида
+        {"line": n, "error": "..."}) и errors_truncated.
+
+    Raises:
+        BulkImportError: Если в заголовке CSV нет обязательных колонок (до добавления записей).
+    """
+    if bulk_format == 'ndjson':
+        rows = iter_ndjson_rows(stream, loads, chunk_size, max_line_length)
+    else:
+        rows = iter_csv_rows(stream, validate.csv_required_columns, chunk_size, max_line_length)
+    count = succeeded = failed = 0
+    errors = []
+    batch = []
+    for line_number, fields, error in rows:
+        count += 1
+        if error is None:
+            fields, error = validate(fields)
+        if error is not None:
+            failed += 1
+            if len(errors) < max_reported_errors:
+                errors.append({'line': line_number, 'error': error})
+            continue
+        batch.append(fields)
+        if len(batch) >= batch_size:
+            succeeded += len(create_many(batch))
+            batch = []
+    if batch:
+        succeeded += len(create_many(batch))
+    return {
+        'count': count,
+        'succeeded': succeeded,
+        'failed': failed,
+        'errors': errors,
+        'errors_truncated': failed > len(errors),
+    }
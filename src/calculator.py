@@ -0,0 +1,163 @@
+"""
+Логика сервиса "Калькулятор": одиночные и пакетные вычисления.
+
+Пакетное вычисление устроено "векторно": строки пакета группируются по
+операции, и каждая группа считается одним вызовом `map` с функцией из
+модуля `operator` — цикл идет внутри интерпретатора, без разбора операции
+и ветвлений на каждую строку. Ошибки (нечисловой операнд, неизвестная
+операция, деление на ноль, результат вне диапазона float) фиксируются
+для отдельных строк и не мешают вычислить остальные.
+
+NaN и бесконечности в JSON не представимы, поэтому ни операнды, ни
+результаты такими быть не могут: inf/nan на входе — "не число", а
+переполнение (например, 1e308 * 1e308) — отдельная ошибка строки.
+"""
+import math
+import operator
+
+# Отображение псевдонимов операций на символы для внутренней логики
+# и проверка корректности операции.
+OPERATION_SYMBOLS_MAP = {
+    'add': '+', '+': '+', 'сложение': '+', 'сложить': '+',
+    'subtract': '-', '-': '-', 'вычитание': '-', 'вычесть': '-',
+    'multiply': '*', '*': '*', 'умножение': '*', 'умножить': '*',
+    'divide': '/', '/': '/', 'деление': '/', 'разделить': '/'
+}
+OPERATION_FUNCTIONS = {'+': operator.add, '-': operator.sub, '*': operator.mul, '/': operator.truediv}
+
+DIVISION_BY_ZERO_MESSAGE = "Ошибка: деление на ноль невозможно."
+INVALID_NUMBER_MESSAGE = "Параметры 'num1' и 'num2' должны быть корректно введенными числами."
+MISSING_PARAMETERS_MESSAGE = "Отсутствуют обязательные параметры: {missing}."
+RESULT_OVERFLOW_MESSAGE = "Ошибка: результат выходит за пределы допустимых чисел."
+# Максимальное число строк в одном пакете.
+MAX_BATCH_SIZE = 1_000_000
+BATCH_FIELDS = ('num1', 'num2', 'operation')
+
+
+class CalculatorBatchError(ValueError):
+    """Некорректная структура пакета (а не ошибка в отдельной строке)."""
+
+
+def resolve_operation_symbol(operation_name):
+    """Возвращает символ операции по ее псевдониму (без учета регистра) или None."""
+    return OPERATION_SYMBOLS_MAP.get(str(operation_name).lower())
+
+
+def parse_operand(value):
+    """Операнд как конечное число float или None (не число, inf/nan, слишком большое целое)."""
+    try:
+        number = float(value)
+    except (ValueError, TypeError, OverflowError):
+        return None
+    return number if math.isfinite(number) else None
+
+
+def parse_batch_payload(payload):
+    """
+    Разбирает тело пакетного запроса в три столбца: num1, num2, operation.
+
+    Поддерживаются два формата:
+    - построчный: {"operations": [{"num1": X, "num2": Y, "operation": "OP"}, ...]};
+    - столбцовый: {"num1": [...], "num2": [...], "operation": [...]}, где
+      'operation' может быть и одной строкой — тогда она применяется ко всем строкам.
+
+    Ошибки внутри отдельных строк (нет поля, не число) здесь не проверяются —
+    их сообщает evaluate_batch для каждой строки.
+
+    Returns:
+        tuple[list, list, list]: Столбцы первых операндов, вторых операндов и операций.
+
+    Raises:
+        CalculatorBatchError: Если структура пакета не распознана, столбцы
+            разной длины или пакет превышает MAX_BATCH_SIZE.
+    """
+    if not isinstance(payload, dict):
+        raise CalculatorBatchError("Тело запроса должно быть JSON-объектом.")
+
+    if 'operations' in payload:
+        rows = payload['operations']
+        if not isinstance(rows, list):
+            raise CalculatorBatchError("Поле 'operations' должно быть массивом объектов.")
+        rows = [row if isinstance(row, dict) else {} for row in rows]
+        columns = tuple([row.get(field) for row in rows] for field in BATCH_FIELDS)
+    else:
+        missing = [field for field in BATCH_FIELDS if field not in payload]
+        if missing:
+            raise CalculatorBatchError(
+                f"Ожидается поле 'operations' или столбцы num1, num2, operation. Отсутствуют: {', '.join(missing)}."
+            )
+        first_operands, second_operands, operation_names = (payload[field] for field in BATCH_FIELDS)
+        if not isinstance(first_operands, list) or not isinstance(second_operands, list):
+            raise CalculatorBatchError("Столбцы 'num1' и 'num2' должны быть массивами.")
+        if not isinstance(operation_names, list):
+            operation_names = [operation_names] * len(first_operands)
+        if not len(first_operands) == len(second_operands) == len(operation_names):
+            raise CalculatorBatchError("Столбцы 'num1', 'num2' и 'operation' должны быть одной длины.")
+        columns = (first_operands, second_operands, operation_names)
+
+    if len(columns[0]) > MAX_BATCH_SIZE:
+        raise CalculatorBatchError(f"Пакет слишком большой: не более {MAX_BATCH_SIZE} операций за запрос.")
+    return columns
+
+
+def evaluate_batch(first_operands, second_operands, operation_names):
+    """
+    Вычисляет пакет операций.
+
+    Args:
+        first_operands (list): Первые операнды (числа или строки с числами).
+        second_operands (list): Вторые операнды, той же длины.
+        operation_names (list): Псевдонимы операций, той же длины.
+
+    Returns:
+        tuple[list, list]: Результаты (float или None для строк с ошибкой)
+        и список ошибок вида {"index": i, "error": "..."} по возрастанию индекса.
+    """
+    row_count = len(first_operands)
+    results = [None] * row_count
+    errors = {}
+
+    # Псевдонимов немного, поэтому разбираем каждый один раз.
+    symbol_cache = {}
+    rows_by_symbol = {}
+    for index, operation_name in enumerate(operation_names):
+        if operation_name is None or first_operands[index] is None or second_operands[index] is None:
+            # Как у одиночного вычисления: сначала перечисляются все отсутствующие поля строки.
+            row = (first_operands[index], second_operands[index], operation_name)
+            missing = ', '.join(field for field, value in zip(BATCH_FIELDS, row) if value is None)
+            errors[index] = MISSING_PARAMETERS_MESSAGE.format(missing=missing)
+            continue
+        cache_key = operation_name if isinstance(operation_name, str) else repr(operation_name)
+        symbol = symbol_cache.get(cache_key)
+        if symbol is None and cache_key not in symbol_cache:
+            symbol = symbol_cache[cache_key] = resolve_operation_symbol(operation_name)
+        if symbol is None:
+            errors[index] = f"Недопустимая или неизвестная операция: '{operation_name}'."
+        else:
+            rows_by_symbol.setdefault(symbol, []).append(index)
+
+    first_values = list(map(parse_operand, first_operands))
+    second_values = list(map(parse_operand, second_operands))
+
+    for symbol, row_indexes in rows_by_symbol.items():
+        valid_rows = []
+        for index in row_indexes:
+            if first_values[index] is None or second_values[index] is None:
+                errors[index] = INVALID_NUMBER_MESSAGE
+            elif symbol == '/' and second_values[index] == 0:
+                errors[index] = DIVISION_BY_ZERO_MESSAGE
+            else:
+                valid_rows.append(index)
+        group_results = map(
+            OPERATION_FUNCTIONS[symbol],
+            [first_values[index] for index in valid_rows],
+            [second_values[index] for index in valid_rows],
+        )
+        for index, value in zip(valid_rows, group_results):
+            if math.isfinite(value):
+                results[index] = value
+            else:
+                errors[index] = RESULT_OVERFLOW_MESSAGE
+
+    error_list = [{"index": index, "error": errors[index]} for index in sorted(errors)]
+    return results, error_list
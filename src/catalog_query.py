@@ -0,0 +1,524 @@
+"""
+Поисковый движок каталога книг и фильмов.
+
+Запрос к каталогу (`CatalogQuery`) разбирается из GET-параметров один раз,
+все текстовые значения сразу приводятся к нижнему регистру. Для бэкенда
+в памяти запрос выполняет `CatalogIndex` — набор индексов, которые
+обновляются при каждом добавлении/изменении элемента:
+
+- точные индексы по типу и году: значение -> множество ID;
+- индекс по жанру: жанр (в нижнем регистре) -> множество ID; поиск по части
+  жанра перебирает только различные жанры, которых немного;
+- триграммные индексы для поиска по части строки в названии, авторе и
+  режиссере: триграмма -> множество различных значений поля, значение ->
+  множество ID. Повторяющиеся значения (один автор у многих книг) хранятся
+  один раз. Триграммы поля строятся при первом поиске по нему и дальше
+  поддерживаются при изменениях, поэтому загрузка большого каталога (см.
+  `CatalogIndex.load_columns`) не тратит время на поля, по которым не ищут.
+
+Каждый фильтр дает точное множество ID, фильтры пересекаются начиная с
+самого маленького множества, так что стоимость запроса определяется
+размером результата, а не всего каталога. Выдача идет страницами по
+возрастанию ID: курсор — это ID последнего элемента предыдущей страницы.
+
+Фасеты — число элементов с каждым типом, жанром, годом, десятилетием и
+создателем (автором или режиссером) — хранит `CatalogFacetCounts`. Индекс
+обновляет счетчики вместе с остальными индексами, поэтому фасеты всего
+каталога собираются по числу различных значений, а не по числу элементов.
+С фильтрами счетчики считаются заново, но только по подходящим элементам.
+"""
+import bisect
+import heapq
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+
+# Максимальный размер одной страницы выдачи.
+CATALOG_MAX_PAGE_SIZE = 1000
+# Поля с поиском по части строки (через триграммный индекс).
+SUBSTRING_SEARCH_FIELDS = ('title', 'author', 'director')
+# Поля элемента, которые читают индексы (для загрузки индексов целиком, по столбцам).
+CATALOG_INDEXED_COLUMNS = ('type', 'year', 'genre') + SUBSTRING_SEARCH_FIELDS
+# Фасеты каталога в порядке выдачи.
+CATALOG_FACETS = ('type', 'genre', 'year', 'decade', 'creator')
+# Счетчик фасета -> поля элемента, значения которых он считает (десятилетия выводятся из годов).
+FACET_COUNTED_FIELDS = {'type': ('type',), 'genre': ('genre',), 'year': ('year',), 'creator': ('author', 'director')}
+# Сколько самых частых значений каждого фасета выдавать по умолчанию.
+CATALOG_FACET_DEFAULT_LIMIT = 20
+
+
+class CatalogQueryError(ValueError):
+    """Некорректные параметры запроса к каталогу (limit/cursor)."""
+
+
+@dataclass(frozen=True)
+class CatalogQuery:
+    """
+    Разобранный запрос к каталогу. Текстовые фильтры уже в нижнем регистре.
+
+    Attributes:
+        type (str | None): Точное значение типа ('book'/'movie').
+        year (int | None): Точный год.
+        genre, title, author, director (str | None): Подстроки для поиска.
+        creator (str | None): Подстрока для поиска по автору ИЛИ режиссеру.
+        after_id (int): Курсор — выдавать элементы с ID больше этого.
+        limit (int | None): Размер страницы; None — выдать все совпадения.
+    """
+    type: str = None
+    year: int = None
+    genre: str = None
+    title: str = None
+    author: str = None
+    director: str = None
+    creator: str = None
+    after_id: int = 0
+    limit: int = None
+
+
+def parse_catalog_query(args, on_invalid_year=None) -> CatalogQuery:
+    """
+    Строит CatalogQuery из GET-параметров запроса.
+
+    Пустые параметры игнорируются. Нечисловой год, как и раньше, не считается
+    ошибкой: фильтр по году просто не применяется.
+
+    Args:
+        args: Параметры запроса (например, `request.args`).
+        on_invalid_year: Необязательная функция, вызываемая с нечисловым
+            значением года (например, для записи в лог).
+
+    Raises:
+        CatalogQueryError: Если limit или cursor не являются корректными числами.
+    """
+    def text_filter(name):
+        value = args.get(name)
+        return value.lower() if value else None
+
+    year = None
+    year_str = args.get('year')
+    if year_str:
+        try:
+            year = int(year_str)
+        except ValueError:
+            if on_invalid_year:
+                on_invalid_year(year_str)
+
+    limit = None
+    limit_str = args.get('limit')
+    if limit_str:
+        try:
+            limit = int(limit_str)
+        except ValueError:
+            raise CatalogQueryError(f"Параметр 'limit' ({limit_str}) должен быть целым числом.") from None
+        if not 1 <= limit <= CATALOG_MAX_PAGE_SIZE:
+            raise CatalogQueryError(f"Параметр 'limit' должен быть в диапазоне от 1 до {CATALOG_MAX_PAGE_SIZE}.")
+
+    after_id = 0
+    cursor_str = args.get('cursor')
+    if cursor_str:
+        try:
+            after_id = int(cursor_str)
+        except ValueError:
+            raise CatalogQueryError(f"Некорректное значение курсора: '{cursor_str}'.") from None
+
+    return CatalogQuery(
+        type=args.get('type') or None,
+        year=year,
+        genre=text_filter('genre'),
+        title=text_filter('title'),
+        author=text_filter('author'),
+        director=text_filter('director'),
+        creator=text_filter('creator'),
+        after_id=after_id,
+        limit=limit,
+    )
+
+
+def parse_facet_request(args):
+    """
+    Разбирает параметры фасетов: facets (список через запятую) и facet_limit.
+
+    Returns:
+        tuple[tuple[str, ...], int]: Фасеты в порядке CATALOG_FACETS и число значений на фасет.
+
+    Raises:
+        CatalogQueryError: Если фасет неизвестен или facet_limit не является корректным числом.
+    """
+    facet_names = CATALOG_FACETS
+    facets_str = args.get('facets')
+    if facets_str:
+        requested = {name.strip() for name in facets_str.split(',') if name.strip()}
+        unknown = requested.difference(CATALOG_FACETS)
+        if unknown:
+            raise CatalogQueryError(
+                f"Неизвестные фасеты: {', '.join(sorted(unknown))}. Доступны: {', '.join(CATALOG_FACETS)}."
+            )
+        facet_names = tuple(name for name in CATALOG_FACETS if name in requested)
+
+    limit = CATALOG_FACET_DEFAULT_LIMIT
+    limit_str = args.get('facet_limit')
+    if limit_str:
+        try:
+            limit = int(limit_str)
+        except ValueError:
+            raise CatalogQueryError(f"Параметр 'facet_limit' ({limit_str}) должен быть целым числом.") from None
+        if not 1 <= limit <= CATALOG_MAX_PAGE_SIZE:
+            raise CatalogQueryError(
+                f"Параметр 'facet_limit' должен быть в диапазоне от 1 до {CATALOG_MAX_PAGE_SIZE}."
+            )
+    return facet_names, limit
+
+
+def top_facet_values(counts: dict, limit: int) -> list:
+    """Самые частые значения фасета: [{"value", "count"}] по убыванию числа, при равенстве — по значению."""
+    top = heapq.nsmallest(limit, counts.items(), key=lambda item: (-item[1], item[0]))
+    return [{'value': value, 'count': count} for value, count in top]
+
+
+def _merge_counts(counts, values, sign=1):
+    """Прибавляет (sign=-1 — вычитает) к счетчикам counts число вхождений каждого значения из values."""
+    for value, count in Counter(values).items():
+        if value is None or value == '':
+            continue
+        total = counts.get(value, 0) + sign * count
+        if total > 0:
+            counts[value] = total
+        else:
+            counts.pop(value, None)
+
+
+class CatalogFacetCounts:
+    """Счетчики фасетов: фасет -> значение -> число элементов с этим значением."""
+
+    def __init__(self):
+        self._counts = {facet: {} for facet in FACET_COUNTED_FIELDS}
+
+    def add(self, record, sign=1):
+        """Учитывает запись-словарь (sign=-1 — убирает ее из счетчиков)."""
+        for facet, fields in FACET_COUNTED_FIELDS.items():
+            counts = self._counts[facet]
+            for field in fields:
+                value = record.get(field)
+                if value is None or value == '':
+                    continue
+                total = counts.get(value, 0) + sign
+                if total > 0:
+                    counts[value] = total
+                else:
+                    counts.pop(value, None)
+
+    def remove(self, record):
+        """Убирает запись-словарь из счетчиков."""
+        self.add(record, sign=-1)
+
+    def add_many(self, records):
+        """Учитывает пачку записей-словарей: значения считаются по столбцам через Counter."""
+        for facet, fields in FACET_COUNTED_FIELDS.items():
+            for field in fields:
+                _merge_counts(self._counts[facet], [record.get(field) for record in records])
+
+    def load_columns(self, columns: dict):
+        """Учитывает записи, заданные столбцами (поле -> значения; отсутствующие поля пропускаются)."""
+        for facet, fields in FACET_COUNTED_FIELDS.items():
+            for field in fields:
+                values = columns.get(field)
+                if values is not None:
+                    _merge_counts(self._counts[facet], values)
+
+    def summary(self, facet_names=CATALOG_FACETS, limit: int = CATALOG_FACET_DEFAULT_LIMIT) -> dict:
+        """
+        Самые частые значения фасетов.
+
+        Args:
+            facet_names: Какие фасеты выдать (из CATALOG_FACETS).
+            limit (int): Сколько значений выдать на фасет.
+
+        Returns:
+            dict: Фасет -> список {"value": значение, "count": число элементов}.
+        """
+        result = {}
+        for facet in facet_names:
+            if facet == 'decade':
+                counts = {}
+                for year, count in self._counts['year'].items():
+                    if isinstance(year, int):
+                        decade = year // 10 * 10
+                        counts[decade] = counts.get(decade, 0) + count
+            else:
+                counts = self._counts[facet]
+            result[facet] = top_facet_values(counts, limit)
+        return result
+
+
+def _trigrams(text):
+    return {text[position:position + 3] for position in range(len(text) - 2)}
+
+
+def _group_ids(pairs):
+    """Пары (значение, ID) -> словарь значение -> множество ID (для загрузки индекса по столбцу)."""
+    groups = {}
+    for value, record_id in pairs:
+        ids = groups.get(value)
+        if ids is None:
+            groups[value] = {record_id}
+        else:
+            ids.add(record_id)
+    return groups
+
+
+class _SubstringIndex:
+    """Триграммный индекс одного текстового поля: поиск ID по подстроке значения."""
+
+    def __init__(self):
+        self._ids_by_value = {}
+        # Триграмма -> значения; строится при первом поиске (None — еще не построен).
+        self._values_by_trigram = None
+
+    def load(self, values, record_ids):
+        """Заполняет индекс столбцом значений поля (пустые значения пропускаются)."""
+        self._ids_by_value = _group_ids(
+            (value.lower(), record_id) for value, record_id in zip(values, record_ids) if value
+        )
+        self._values_by_trigram = None
+
+    def _trigram_postings(self):
+        if self._values_by_trigram is None:
+            values_by_trigram = defaultdict(set)
+            for value in self._ids_by_value:
+                for trigram in _trigrams(value):
+                    values_by_trigram[trigram].add(value)
+            self._values_by_trigram = values_by_trigram
+        return self._values_by_trigram
+
+    def add(self, value, record_id):
+        ids = self._ids_by_value.get(value)
+        if ids is None:
+            ids = self._ids_by_value[value] = set()
+            if self._values_by_trigram is not None:
+                for trigram in _trigrams(value):
+                    self._values_by_trigram[trigram].add(value)
+        ids.add(record_id)
+
+    def remove(self, value, record_id):
+        ids = self._ids_by_value.get(value)
+        if ids is None:
+            return
+        ids.discard(record_id)
+        if not ids:
+            del self._ids_by_value[value]
+            if self._values_by_trigram is not None:
+                for trigram in _trigrams(value):
+                    values = self._values_by_trigram[trigram]
+                    values.discard(value)
+                    if not values:
+                        del self._values_by_trigram[trigram]
+
+    def matching_ids(self, needle):
+        """Множество ID записей, у которых значение поля содержит `needle`."""
+        if len(needle) >= 3:
+            values_by_trigram = self._trigram_postings()
+            posting_lists = sorted(
+                (values_by_trigram.get(trigram, ()) for trigram in _trigrams(needle)), key=len
+            )
+            candidate_values = set(posting_lists[0]).intersection(*posting_lists[1:])
+        else:
+            # Для одной-двух букв триграмм нет — перебираем различные значения поля.
+            candidate_values = self._ids_by_value
+        # Совпадение всех триграмм еще не гарантирует подстроку — проверяем явно.
+        ids_by_value = self._ids_by_value
+        return set().union(*[ids_by_value[value] for value in candidate_values if needle in value])
+
+
+class CatalogIndex:
+    """Индексы каталога в памяти, обновляемые вместе с хранилищем."""
+
+    def __init__(self):
+        self._ids_by_type = defaultdict(set)
+        self._ids_by_year = defaultdict(set)
+        self._ids_by_genre = defaultdict(set)
+        self._substring_indexes = {field: _SubstringIndex() for field in SUBSTRING_SEARCH_FIELDS}
+        # ID в порядке возрастания. Элементы добавляются с растущими ID, поэтому
+        # список обычно только дописывается; удаленные ID из него вырезаются.
+        self._ordered_ids = []
+        self._facet_counts = CatalogFacetCounts()
+        # Столбцы из load_columns, по которым индексы еще не построены (None — построены).
+        self._pending_columns = None
+
+    def _ensure_built(self):
+        """Строит индексы по столбцам из load_columns, если это еще не сделано."""
+        if self._pending_columns is not None:
+            record_ids, columns = self._pending_columns
+            self._pending_columns = None
+            self._build_from_columns(record_ids, columns)
+
+    @property
+    def facet_counts(self):
+        """Счетчики фасетов (CatalogFacetCounts) по всем элементам."""
+        self._ensure_built()
+        return self._facet_counts
+
+    def add(self, record):
+        """Добавляет запись во все индексы."""
+        self._ensure_built()
+        record_id = record['id']
+        self._ids_by_type[record.get('type')].add(record_id)
+        self._ids_by_year[record.get('year')].add(record_id)
+        self._ids_by_genre[(record.get('genre') or '').lower()].add(record_id)
+        for field, index in self._substring_indexes.items():
+            if record.get(field):
+                index.add(record[field].lower(), record_id)
+        ordered_ids = self._ordered_ids
+        if not ordered_ids or record_id > ordered_ids[-1]:
+            ordered_ids.append(record_id)
+        else:
+            # Повторное добавление (после изменения записи) или ID из середины диапазона.
+            position = bisect.bisect_left(ordered_ids, record_id)
+            if position == len(ordered_ids) or ordered_ids[position] != record_id:
+                ordered_ids.insert(position, record_id)
+        self._facet_counts.add(record)
+
+    def add_many(self, record_ids, records):
+        """
+        Добавляет пачку новых записей — то же, что add для каждой, но поиск
+        индексов и методов идет один раз на пачку.
+
+        Args:
+            record_ids (list): ID записей.
+            records (list): Поля тех же записей словарями ('id' в них не нужен;
+                None равнозначно отсутствию поля).
+        """
+        self._ensure_built()
+        ids_by_type, ids_by_year, ids_by_genre = self._ids_by_type, self._ids_by_year, self._ids_by_genre
+        substring_indexes = tuple(self._substring_indexes.items())
+        added_ids = list(record_ids)
+        for record_id, record in zip(added_ids, records):
+            get = record.get
+            ids_by_type[get('type')].add(record_id)
+            ids_by_year[get('year')].add(record_id)
+            ids_by_genre[(get('genre') or '').lower()].add(record_id)
+            for field, index in substring_indexes:
+                value = get(field)
+                if value:
+                    index.add(value.lower(), record_id)
+        ordered_ids = self._ordered_ids
+        if added_ids and ordered_ids and added_ids[0] <= ordered_ids[-1]:
+            # ID из середины диапазона — пересобираем порядок целиком.
+            self._ordered_ids = sorted(set(ordered_ids).union(added_ids))
+        else:
+            ordered_ids.extend(added_ids)
+        self._facet_counts.add_many(records)
+
+    def load_columns(self, record_ids, columns: dict):
+        """
+        Заполняет пустые индексы целиком — по столбцам значений, а не по записям.
+
+        Сами индексы строятся при первом обращении к ним (поиск, фасеты,
+        изменение), а не здесь: так восстановление хранилища при старте не
+        ждет их сборки — она занимает больше времени, чем загрузка записей.
+
+        Args:
+            record_ids (list): ID записей по возрастанию.
+            columns (dict): Поле -> последовательность значений в порядке record_ids
+                (None — значения нет); отсутствующие поля считаются пустыми.
+        """
+        self._pending_columns = (record_ids, columns)
+
+    def _build_from_columns(self, record_ids, columns):
+        """Строит индексы по столбцам, отложенным load_columns."""
+        def column(field):
+            values = columns.get(field)
+            return values if values is not None else [None] * len(record_ids)
+
+        self._ids_by_type = defaultdict(set, _group_ids(zip(column('type'), record_ids)))
+        self._ids_by_year = defaultdict(set, _group_ids(zip(column('year'), record_ids)))
+        genres = ((genre or '').lower() for genre in column('genre'))
+        self._ids_by_genre = defaultdict(set, _group_ids(zip(genres, record_ids)))
+        for field, index in self._substring_indexes.items():
+            index.load(column(field), record_ids)
+        self._ordered_ids = sorted(record_ids)
+        self._facet_counts = CatalogFacetCounts()
+        self._facet_counts.load_columns(columns)
+
+    def remove(self, record):
+        """Убирает запись из всех индексов."""
+        self._ensure_built()
+        record_id = record['id']
+        self._ids_by_type[record.get('type')].discard(record_id)
+        self._ids_by_year[record.get('year')].discard(record_id)
+        self._ids_by_genre[(record.get('genre') or '').lower()].discard(record_id)
+        for field, index in self._substring_indexes.items():
+            if record.get(field):
+                index.remove(record[field].lower(), record_id)
+        ordered_ids = self._ordered_ids
+        position = bisect.bisect_left(ordered_ids, record_id)
+        if position < len(ordered_ids) and ordered_ids[position] == record_id:
+            del ordered_ids[position]
+        self._facet_counts.remove(record)
+
+    def _genre_ids(self, needle):
+        matched = set()
+        for genre, ids in self._ids_by_genre.items():
+            if needle in genre:
+                matched.update(ids)
+        return matched
+
+    def _filter_sets(self, query):
+        """Множества ID для каждого заданного фильтра запроса."""
+        if query.type:
+            yield self._ids_by_type.get(query.type, set())
+        if query.year is not None:
+            yield self._ids_by_year.get(query.year, set())
+        if query.genre:
+            yield self._genre_ids(query.genre)
+        for field in SUBSTRING_SEARCH_FIELDS:
+            needle = getattr(query, field)
+            if needle:
+                yield self._substring_indexes[field].matching_ids(needle)
+        if query.creator:
+            yield (self._substring_indexes['author'].matching_ids(query.creator)
+                   | self._substring_indexes['director'].matching_ids(query.creator))
+
+    def matching_ids(self, query: CatalogQuery):
+        """
+        Множество ID элементов, подходящих под фильтры запроса (курсор и limit не учитываются).
+
+        Множество может быть самим индексом — его читают под той же блокировкой, что и ищут.
+
+        Returns:
+            set | None: ID совпадений или None, если в запросе нет фильтров.
+        """
+        self._ensure_built()
+        filter_sets = sorted(self._filter_sets(query), key=len)
+        if not filter_sets:
+            return None
+        return filter_sets[0].intersection(*filter_sets[1:]) if len(filter_sets) > 1 else filter_sets[0]
+
+    def search(self, query: CatalogQuery):
+        """
+        Выполняет запрос.
+
+        Returns:
+            tuple[list[int], int | None]: ID элементов страницы по возрастанию
+            и курсор следующей страницы (None, если страница последняя).
+        """
+        matched = self.matching_ids(query)
+        page_size = query.limit
+
+        if matched is None:
+            # Без фильтров страница — срез упорядоченного списка ID прямо от курсора.
+            ordered_ids = self._ordered_ids
+            start = bisect.bisect_right(ordered_ids, query.after_id)
+            if page_size is None or start + page_size >= len(ordered_ids):
+                return ordered_ids[start:], None
+            page_ids = ordered_ids[start:start + page_size]
+            return page_ids, page_ids[-1]
+
+        after_id = query.after_id
+        matched_ids = (record_id for record_id in matched if record_id > after_id)
+        if page_size is None:
+            return sorted(matched_ids), None
+        # Для страницы не нужно сортировать все совпадения — достаточно page_size + 1 наименьших ID.
+        page_ids = heapq.nsmallest(page_size + 1, matched_ids)
+        if len(page_ids) <= page_size:
+            return page_ids, None
+        page_ids = page_ids[:page_size]
+        return page_ids, page_ids[-1]
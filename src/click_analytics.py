@@ -0,0 +1,115 @@
+"""
+Статистика переходов по коротким ссылкам.
+
+Переход учитывается прямо в обработчике редиректа, поэтому запись должна
+стоить почти ничего и не вызывать борьбы потоков за общий счетчик.
+`ClickRecorder` держит у каждого потока собственный словарь
+``{(код, час): переходы}``: запись — это одно увеличение значения в словаре
+своего потока, без блокировок.
+
+Фоновый агрегатор раз в flush_interval секунд подменяет словари потоков
+свежими, а снятые словари передает в хранилище статистики (почасовые
+корзины) только на следующем цикле. За эту паузу поток, который успел
+взять старый словарь перед подменой, гарантированно закончит увеличение,
+и переход не потеряется. Поэтому статистика отстает от редиректов на
+одну-две секунды.
+"""
+import os
+import threading
+import time
+import weakref
+
+SECONDS_PER_HOUR = 3600
+
+
+class _ThreadClicks:
+    """Счетчики одного потока."""
+
+    __slots__ = ('counts', 'thread')
+
+    def __init__(self, thread):
+        self.counts = {}
+        self.thread = weakref.ref(thread)
+
+
+class ClickRecorder:
+    """Учет переходов в счетчиках потоков с фоновой сводкой в почасовые корзины."""
+
+    def __init__(self, click_stats, flush_interval: float = 1.0, logger=None):
+        """
+        Args:
+            click_stats: Хранилище почасовой статистики (метод add_clicks,
+                см. storage.InMemoryClickStats).
+            flush_interval (float): Раз в сколько секунд сводить счетчики потоков.
+            logger (logging.Logger | None): Куда писать ошибки агрегатора.
+        """
+        self._click_stats = click_stats
+        self._flush_interval = flush_interval
+        self._logger = logger
+        self._reset_state()
+        if hasattr(os, 'register_at_fork'):
+            # В дочернем процессе нет ни потоков родителя, ни его агрегатора — начинаем с чистого листа.
+            os.register_at_fork(after_in_child=self._reset_state)
+
+    def _reset_state(self):
+        self._local = threading.local()
+        self._thread_states = []
+        self._retired_counts = []
+        self._registry_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._aggregator_started = False
+
+    def record(self, short_code: str):
+        """Учитывает один переход по коду в текущем часе."""
+        try:
+            counts = self._local.state.counts
+        except AttributeError:
+            counts = self._register_current_thread().counts
+        key = (short_code, int(time.time()) // SECONDS_PER_HOUR)
+        counts[key] = counts.get(key, 0) + 1
+
+    def _register_current_thread(self):
+        state = _ThreadClicks(threading.current_thread())
+        with self._registry_lock:
+            self._thread_states.append(state)
+            if not self._aggregator_started:
+                self._aggregator_started = True
+                threading.Thread(target=self._aggregate_periodically, name='click-aggregator', daemon=True).start()
+        self._local.state = state
+        return state
+
+    def _aggregate_periodically(self):
+        while True:
+            time.sleep(self._flush_interval)
+            try:
+                self.flush()
+            except Exception as error: # Агрегатор не должен умирать из-за одной неудачной записи
+                if self._logger:
+                    self._logger.error(f"Не удалось сохранить статистику переходов: {error}", exc_info=True)
+
+    def flush(self):
+        """
+        Один цикл агрегатора: сохраняет словари, снятые в прошлый раз, и снимает текущие.
+
+        Два вызова подряд сохраняют все переходы, учтенные до первого вызова.
+        """
+        with self._flush_lock:
+            merged_counts = {}
+            for counts in self._retired_counts:
+                for key, clicks in counts.items():
+                    merged_counts[key] = merged_counts.get(key, 0) + clicks
+            if merged_counts:
+                self._click_stats.add_clicks(merged_counts)
+
+            retired_counts = []
+            with self._registry_lock:
+                live_states = []
+                for state in self._thread_states:
+                    if state.counts:
+                        retired_counts.append(state.counts)
+                        state.counts = {}
+                    if state.thread() is not None and state.thread().is_alive():
+                        live_states.append(state)
+                # Счетчики завершившихся потоков уже сняты выше, сами потоки больше не нужны.
+                self._thread_states = live_states
+            self._retired_counts = retired_counts
@@ -0,0 +1,265 @@
+"""
+Истечение срока жизни и вытеснение записей для хранилища коротких ссылок.
+
+`HierarchicalTimingWheel` — иерархическое колесо таймеров. Время делится на
+тики (по умолчанию секунда). Уровень 0 — кольцо из `slots_per_level` ячеек
+по одному тику, уровень 1 — такое же кольцо, где ячейка покрывает целый
+оборот уровня 0, и т.д. Ключ со сроком через d тиков кладется на уровень,
+чей оборот вмещает d, в ячейку, соответствующую его сроку. Когда уровень 0
+завершает оборот, очередная ячейка уровня 1 "осыпается" — ее ключи
+раскладываются по уровню 0 (и так же выше). На каждом тике срабатывает
+одна ячейка уровня 0; тики, на которых нет ни ключей, ни осыпания непустой
+ячейки, пропускаются разом — продвижение после долгого простоя не шагает
+по каждому тику.
+
+В итоге постановка и отмена таймера стоят O(1), а продвижение — O(1)
+амортизированно на тик с работой и на истекший ключ: каждый ключ
+перекладывается не больше чем на число уровней, и полный обход всех записей
+не нужен никогда.
+
+`LRUEviction` и `LFUEviction` выбирают, какую запись вытеснить при
+превышении лимита числа записей: давно не использованную или реже всех
+использованную. Обе политики выполняют каждую операцию за O(1). Ни колесо,
+ни политики не потокобезопасны — их защищает блокировка хранилища.
+Очереди политик — OrderedDict, а не dict: у обычного словаря после многих
+удалений из начала поиск первого ключа становится линейным.
+"""
+import collections
+import math
+
+DEFAULT_TICK_SECONDS = 1.0
+DEFAULT_SLOTS_PER_LEVEL = 64
+# 4 уровня по 64 ячейки при тике в секунду покрывают 64**4 секунд (~194 дня);
+# более дальние сроки лежат на верхнем уровне и перекладываются при каждом его обороте.
+DEFAULT_LEVEL_COUNT = 4
+
+
+class HierarchicalTimingWheel:
+    """Иерархическое колесо таймеров: ключ -> момент истечения."""
+
+    def __init__(self, start_time: float, tick_seconds: float = DEFAULT_TICK_SECONDS,
+                 slots_per_level: int = DEFAULT_SLOTS_PER_LEVEL, level_count: int = DEFAULT_LEVEL_COUNT):
+        """
+        Args:
+            start_time (float): Текущее время (секунды UNIX), с которого колесо начинает отсчет.
+            tick_seconds (float): Длительность тика — точность срабатывания таймеров.
+            slots_per_level (int): Число ячеек в кольце каждого уровня.
+            level_count (int): Число уровней.
+        """
+        self._tick_seconds = tick_seconds
+        self._slots_per_level = slots_per_level
+        self._levels = [[{} for _ in range(slots_per_level)] for _ in range(level_count)]
+        # Ячейка (словарь ключ -> тик срока), в которой сейчас лежит ключ, — для отмены за O(1).
+        self._slot_by_key = {}
+        self._current_tick = int(start_time // tick_seconds)
+
+    def __len__(self):
+        return len(self._slot_by_key)
+
+    def __contains__(self, key):
+        return key in self._slot_by_key
+
+    def _place(self, key, deadline_tick):
+        slots_per_level = self._slots_per_level
+        delta = deadline_tick - self._current_tick
+        level = 0
+        span = slots_per_level
+        while delta >= span and level < len(self._levels) - 1:
+            level += 1
+            span *= slots_per_level
+        slot = self._levels[level][(deadline_tick // (span // slots_per_level)) % slots_per_level]
+        slot[key] = deadline_tick
+        self._slot_by_key[key] = slot
+
+    def schedule(self, key, expires_at: float):
+        """Ставит (или переставляет) таймер ключа на момент expires_at (секунды UNIX)."""
+        self.cancel(key)
+        # Срок округляется вверх до тика; уже истекшие ключи сработают на ближайшем тике.
+        deadline_tick = max(math.ceil(expires_at / self._tick_seconds), self._current_tick + 1)
+        self._place(key, deadline_tick)
+
+    def cancel(self, key):
+        """Снимает таймер ключа (если он был)."""
+        slot = self._slot_by_key.pop(key, None)
+        if slot is not None:
+            del slot[key]
+
+    def advance(self, now: float) -> list:
+        """
+        Продвигает колесо до момента now.
+
+        Returns:
+            list: Ключи, чей срок истек (их таймеры сняты).
+        """
+        target_tick = int(now // self._tick_seconds)
+        if target_tick <= self._current_tick:
+            return []
+        if not self._slot_by_key:
+            # Пустое колесо можно просто перевести на нужный тик.
+            self._current_tick = target_tick
+            return []
+        slots_per_level = self._slots_per_level
+        expired_keys = []
+        while self._current_tick < target_tick:
+            tick = self._current_tick + 1
+            if tick % slots_per_level and not self._levels[0][tick % slots_per_level]:
+                # На этом тике нет ни ключей, ни осыпания — пустые тики пропускаются разом.
+                tick = self._next_event_tick()
+                if tick > target_tick:
+                    self._current_tick = target_tick
+                    break
+            self._current_tick = tick
+            # Осыпание: начиная с верхнего уровня, чей оборот как раз завершился,
+            # чтобы переложенные вниз ключи успели попасть в обработку на этом же тике.
+            cascading_levels = []
+            span = slots_per_level
+            for level in range(1, len(self._levels)):
+                if tick % span:
+                    break
+                cascading_levels.append((level, (tick // span) % slots_per_level))
+                span *= slots_per_level
+            for level, slot_index in reversed(cascading_levels):
+                self._replace_slot(level, slot_index)
+            slot = self._levels[0][tick % slots_per_level]
+            if slot:
+                entries = list(slot.items())
+                slot.clear()
+                for key, deadline_tick in entries:
+                    del self._slot_by_key[key]
+                    if deadline_tick <= tick:
+                        expired_keys.append(key)
+                    else:
+                        self._place(key, deadline_tick)
+            if not self._slot_by_key:
+                self._current_tick = target_tick
+        return expired_keys
+
+    def _next_event_tick(self):
+        """
+        Ближайший тик после текущего, на котором есть работа: срабатывает непустая
+        ячейка уровня 0 или осыпается непустая ячейка выше. Колесо не должно быть пустым.
+        """
+        slots_per_level = self._slots_per_level
+        next_tick = None
+        span = 1
+        for ring in self._levels:
+            # Ячейка index уровня обрабатывается на тиках t, кратных span, у которых (t // span) % slots_per_level == index.
+            base = self._current_tick // span
+            for index, slot in enumerate(ring):
+                if slot:
+                    tick = (base + ((index - base) % slots_per_level or slots_per_level)) * span
+                    if next_tick is None or tick < next_tick:
+                        next_tick = tick
+            span *= slots_per_level
+        return next_tick
+
+    def _replace_slot(self, level, slot_index):
+        slot = self._levels[level][slot_index]
+        if not slot:
+            return
+        entries = list(slot.items())
+        slot.clear()
+        for key, deadline_tick in entries:
+            self._place(key, deadline_tick)
+
+
+class LRUEviction:
+    """Вытесняет запись, к которой дольше всех не обращались."""
+
+    name = 'lru'
+
+    def __init__(self):
+        # В начале — самые давние обращения.
+        self._keys = collections.OrderedDict()
+
+    def restore(self, keys):
+        """Заполняет очередь ключами в порядке от давних к свежим (при загрузке снимка)."""
+        self._keys = collections.OrderedDict.fromkeys(keys)
+
+    def record_insert(self, key):
+        self._keys[key] = None
+
+    def record_access(self, key):
+        if key in self._keys:
+            self._keys.move_to_end(key)
+
+    def discard(self, key):
+        self._keys.pop(key, None)
+
+    def pick_victim(self):
+        """Ключ для вытеснения (или None, если записей нет)."""
+        return next(iter(self._keys), None)
+
+
+class LFUEviction:
+    """
+    Вытесняет запись с наименьшим числом обращений (при равенстве — более давнюю).
+
+    Ключи разложены по корзинам "частота -> ключи в порядке поступления",
+    поэтому учет обращения и выбор жертвы стоят O(1).
+    """
+
+    name = 'lfu'
+
+    def __init__(self):
+        self._frequency_by_key = {}
+        self._keys_by_frequency = {}
+        self._min_frequency = 0
+
+    def _move(self, key, old_frequency, new_frequency):
+        bucket = self._keys_by_frequency[old_frequency]
+        del bucket[key]
+        if not bucket:
+            del self._keys_by_frequency[old_frequency]
+        if new_frequency is not None:
+            self._keys_by_frequency.setdefault(new_frequency, collections.OrderedDict())[key] = None
+
+    def restore(self, keys):
+        """Заполняет корзины ключами в порядке поступления, все с частотой 1 (при загрузке снимка)."""
+        self._frequency_by_key = dict.fromkeys(keys, 1)
+        self._keys_by_frequency = {1: collections.OrderedDict.fromkeys(keys)} if self._frequency_by_key else {}
+        self._min_frequency = 1
+
+    def record_insert(self, key):
+        self._frequency_by_key[key] = 1
+        self._keys_by_frequency.setdefault(1, collections.OrderedDict())[key] = None
+        self._min_frequency = 1
+
+    def record_access(self, key):
+        frequency = self._frequency_by_key.get(key)
+        if frequency is None:
+            return
+        self._move(key, frequency, frequency + 1)
+        self._frequency_by_key[key] = frequency + 1
+        if self._min_frequency == frequency and frequency not in self._keys_by_frequency:
+            self._min_frequency = frequency + 1
+
+    def discard(self, key):
+        frequency = self._frequency_by_key.pop(key, None)
+        if frequency is not None:
+            # Минимальная частота уточняется лениво, при выборе жертвы.
+            self._move(key, frequency, None)
+
+    def pick_victim(self):
+        """Ключ для вытеснения (или None, если записей нет)."""
+        if not self._keys_by_frequency:
+            return None
+        if self._min_frequency not in self._keys_by_frequency:
+            self._min_frequency = min(self._keys_by_frequency)
+        return next(iter(self._keys_by_frequency[self._min_frequency]))
+
+
+EVICTION_POLICIES = {policy.name: policy for policy in (LRUEviction, LFUEviction)}
+
+
+def create_eviction_policy(name: str):
+    """
+    Создает политику вытеснения по имени ('lru' или 'lfu').
+
+    Raises:
+        ValueError: Если политика неизвестна.
+    """
+    try:
+        return EVICTION_POLICIES[name]()
+    except KeyError:
+        raise ValueError(f"Неизвестная политика вытеснения: '{name}'.") from None
@@ -0,0 +1,761 @@
+"""
+Бэкенд 'journal': хранилища в памяти, переживающие перезапуск процесса.
+
+Данные живут в тех же структурах, что и у бэкенда 'memory' (storage.py),
+а на диск попадают двумя способами:
+
+- журнал — каждое изменение (создание/изменение/удаление записи, новая
+  короткая ссылка, номер кода) дописывается в конец файла-сегмента
+  кадром "длина, CRC32, данные". Запись на диск групповая: обработчик
+  ждет fsync своего изменения, но один fsync покрывает все изменения,
+  накопленные за время предыдущего (см. JournalWriter.flush);
+- снимок — периодически (по числу изменений или по времени) журнал
+  переключается на новый сегмент, а текущее состояние всех хранилищ
+  записывается во временный файл, который затем атомарно (os.replace)
+  подменяет прежний снимок. Сегменты старше снимка удаляются.
+
+При старте снимок отображается в память (mmap) и разбирается кусками
+(marshal — быстрый встроенный формат для списков, кортежей и строк),
+хранилища заполняются целиком, без поштучных вставок, а затем
+проигрывается хвост журнала после снимка. Изменения в журнале записаны
+полными значениями записей, поэтому повторное применение изменения,
+уже попавшего в снимок, ничего не портит.
+
+Бэкенд рассчитан на один процесс: каталог данных блокируется (flock), и
+второй процесс с тем же каталогом не запустится. Статистика переходов по
+коротким ссылкам на диск не пишется.
+"""
+import atexit
+import gc
+import itertools
+import logging
+import marshal
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+import zlib
+
+try:
+    import fcntl
+except ImportError:  # Windows: защиты от второго процесса нет
+    fcntl = None
+
+from records import RecordLayout
+from storage import InMemoryCatalogStore, InMemoryRecordStore, InMemorySequence, ShortUrlStore
+
+SNAPSHOT_FILE_NAME = 'snapshot.bin'
+SNAPSHOT_MAGIC = b'PORTSNP1'
+LOCK_FILE_NAME = 'lock'
+JOURNAL_SEGMENT_PATTERN = re.compile(r'^journal-(\d{8})\.log$')
+# Кадр журнала: длина и CRC32 данных; кадр снимка — то же, но длина 64-битная.
+_JOURNAL_FRAME = struct.Struct('<II')
+_SNAPSHOT_FRAME = struct.Struct('<QI')
+# Сколько записей хранилища класть в один кадр снимка: кадр сериализуется
+# одним вызовом marshal, который не отпускает GIL, поэтому кадры небольшие.
+SNAPSHOT_CHUNK_RECORDS = 50_000
+# Снимок пишется, когда в журнале после прошлого снимка накопилось столько изменений...
+DEFAULT_SNAPSHOT_EVERY_ENTRIES = 100_000
+# ...или прошло столько секунд (если изменения были).
+DEFAULT_SNAPSHOT_INTERVAL = 3600
+# Как часто фоновый поток проверяет, не пора ли писать снимок (и сбрасывает журнал без синхронной фиксации).
+MAINTENANCE_INTERVAL = 1.0
+
+logger = logging.getLogger(__name__)
+
+
+class JournalStorageError(Exception):
+    """Каталог данных занят другим процессом или его файлы повреждены."""
+
+
+def journal_segment_name(segment_number: int) -> str:
+    return f'journal-{segment_number:08d}.log'
+
+
+def _sync_file(file_descriptor):
+    # fdatasync не сбрасывает время изменения файла — на одну запись метаданных меньше.
+    getattr(os, 'fdatasync', os.fsync)(file_descriptor)
+
+
+def _sync_directory(directory):
+    """Фиксирует на диске создание, переименование и удаление файлов каталога (POSIX)."""
+    try:
+        directory_descriptor = os.open(directory, os.O_RDONLY)
+    except OSError:  # Windows не открывает каталоги как файлы
+        return
+    try:
+        os.fsync(directory_descriptor)
+    finally:
+        os.close(directory_descriptor)
+
+
+class JournalWriter:
+    """
+    Запись журнала изменений с групповой фиксацией.
+
+    append кладет кадр в буфер в памяти (под короткой блокировкой) и сразу
+    возвращается. flush дожидается, пока все дописанное к моменту вызова
+    окажется на диске: первый ожидающий поток сам пишет буфер и делает
+    fsync, а потоки, пришедшие во время этого, ждут и затем уходят одной
+    следующей группой.
+    """
+
+    def __init__(self, directory: str, segment_number: int, header_entry: tuple, sync_commits: bool = True):
+        """
+        Args:
+            directory (str): Каталог данных.
+            segment_number (int): Номер сегмента, в который писать.
+            header_entry (tuple): Первый кадр каждого сегмента (описание раскладки записей).
+            sync_commits (bool): Ждать ли в commit записи на диск. Без этого журнал
+                сбрасывается фоновым потоком раз в MAINTENANCE_INTERVAL секунд, и при
+                сбое теряются изменения за последнюю секунду.
+        """
+        self._directory = directory
+        self._header_entry = header_entry
+        self._sync_commits = sync_commits
+        self._condition = threading.Condition()
+        self._buffer = bytearray()
+        # Байт дописано в буфер и гарантированно записано на диск — за все время.
+        self._appended = 0
+        self._durable = 0
+        self._flushing = False
+        self._error = None
+        self.entries_since_snapshot = 0
+        self.segment_number = segment_number
+        self._file = self._open_segment(segment_number)
+
+    def _open_segment(self, segment_number):
+        segment_file = open(os.path.join(self._directory, journal_segment_name(segment_number)), 'ab')
+        segment_file.write(self._frame(self._header_entry))
+        segment_file.flush()
+        _sync_file(segment_file.fileno())
+        _sync_directory(self._directory)
+        return segment_file
+
+    @staticmethod
+    def _frame(entry):
+        payload = marshal.dumps(entry)
+        return _JOURNAL_FRAME.pack(len(payload), zlib.crc32(payload)) + payload
+
+    def append(self, entry: tuple):
+        """Дописывает изменение в буфер журнала (на диск оно попадет при ближайшем flush)."""
+        frame = self._frame(entry)
+        with self._condition:
+            self._buffer += frame
+            self._appended += len(frame)
+            self.entries_since_snapshot += 1
+
+    def append_many(self, entries):
+        """Дописывает пачку изменений в буфер журнала одним заходом под блокировку."""
+        frames = b''.join(map(self._frame, entries))
+        with self._condition:
+            self._buffer += frames
+            self._appended += len(frames)
+            self.entries_since_snapshot += len(entries)
+
+    def commit(self):
+        """Фиксирует дописанные изменения: при синхронной фиксации ждет записи на диск."""
+        if self._sync_commits:
+            self.flush()
+
+    def flush(self):
+        """
+        Ждет, пока все дописанное к моменту вызова не будет записано на диск.
+
+        Raises:
+            JournalStorageError: Если запись журнала на диск не удалась.
+        """
+        with self._condition:
+            target = self._appended
+            while self._durable < target:
+                if self._error is not None:
+                    raise JournalStorageError(f"Журнал изменений не записан на диск: {self._error}")
+                if self._flushing:
+                    self._condition.wait()
+                else:
+                    self._write_pending()
+
+    def _write_pending(self):
+        """Пишет буфер в файл и делает fsync; вызывается под блокировкой, на время записи отпускает ее."""
+        data, self._buffer = self._buffer, bytearray()
+        flushed_to = self._appended
+        segment_file = self._file
+        self._flushing = True
+        self._condition.release()
+        try:
+            segment_file.write(data)
+            segment_file.flush()
+            _sync_file(segment_file.fileno())
+        except BaseException as error:
+            self._condition.acquire()
+            self._error = error
+            self._flushing = False
+            self._condition.notify_all()
+            raise
+        self._condition.acquire()
+        self._durable = flushed_to
+        self._flushing = False
+        self._condition.notify_all()
+
+    def rotate(self, segment_number: int):
+        """Дописывает на диск текущий сегмент и переключает журнал на новый."""
+        with self._condition:
+            while self._flushing or self._buffer:
+                if self._flushing:
+                    self._condition.wait()
+                else:
+                    self._write_pending()
+            self._file.close()
+            self._file = self._open_segment(segment_number)
+            self.segment_number = segment_number
+            self.entries_since_snapshot = 0
+
+    def close(self):
+        self.flush()
+        with self._condition:
+            self._file.close()
+
+
+def read_journal_segment(path: str):
+    """
+    Читает кадры сегмента журнала.
+
+    Оборванный или поврежденный кадр (сбой посреди записи) может быть только
+    последним: чтение на нем останавливается, а файл обрезается до последнего
+    целого кадра.
+
+    Returns:
+        list[tuple]: Записи журнала по порядку.
+    """
+    with open(path, 'rb') as segment_file:
+        data = segment_file.read()
+    entries = []
+    view = memoryview(data)
+    offset = 0
+    header_size = _JOURNAL_FRAME.size
+    while offset + header_size <= len(data):
+        length, checksum = _JOURNAL_FRAME.unpack_from(data, offset)
+        start = offset + header_size
+        payload = view[start:start + length]
+        if len(payload) < length or zlib.crc32(payload) != checksum:
+            break
+        entries.append(marshal.loads(payload))
+        offset = start + length
+    view.release()
+    if offset < len(data):
+        logger.warning("Журнал %s обрезан до %d байт: последний кадр неполный.", path, offset)
+        with open(path, 'r+b') as segment_file:
+            segment_file.truncate(offset)
+    return entries
+
+
+def write_snapshot(directory: str, first_segment: int, parts):
+    """
+    Атомарно записывает снимок: во временный файл, fsync, затем os.replace.
+
+    Args:
+        directory (str): Каталог данных.
+        first_segment (int): Первый сегмент журнала, который проигрывается поверх снимка.
+        parts: Части снимка — кортежи (имя хранилища, вид части, данные).
+
+    Returns:
+        int: Размер снимка в байтах.
+    """
+    snapshot_path = os.path.join(directory, SNAPSHOT_FILE_NAME)
+    temporary_path = snapshot_path + '.tmp'
+    part_count = 0
+    with open(temporary_path, 'wb') as snapshot_file:
+        def write_frame(value):
+            payload = marshal.dumps(value)
+            snapshot_file.write(_SNAPSHOT_FRAME.pack(len(payload), zlib.crc32(payload)))
+            snapshot_file.write(payload)
+
+        snapshot_file.write(SNAPSHOT_MAGIC)
+        write_frame({'first_segment': first_segment, 'created_at': time.time()})
+        for part in parts:
+            write_frame(part)
+            part_count += 1
+        # Завершающий кадр: по нему видно, что снимок дописан целиком.
+        write_frame(('', 'end', part_count))
+        snapshot_file.flush()
+        _sync_file(snapshot_file.fileno())
+        snapshot_size = snapshot_file.tell()
+    os.replace(temporary_path, snapshot_path)
+    _sync_directory(directory)
+    return snapshot_size
+
+
+def read_snapshot(path: str):
+    """
+    Читает снимок через mmap: кадры разбираются прямо из отображенного файла, без копии в памяти.
+
+    Returns:
+        tuple[dict, list]: Заголовок и части снимка.
+
+    Raises:
+        JournalStorageError: Если снимок поврежден или недописан.
+    """
+    with open(path, 'rb') as snapshot_file:
+        with mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                if view[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+                    raise JournalStorageError(f"Файл {path} не является снимком хранилищ.")
+                frames = []
+                offset = len(SNAPSHOT_MAGIC)
+                header_size = _SNAPSHOT_FRAME.size
+                while offset + header_size <= len(view):
+                    length, checksum = _SNAPSHOT_FRAME.unpack_from(view, offset)
+                    # Срез нужно освободить до закрытия mmap, в том числе когда кадр поврежден.
+                    with view[offset + header_size:offset + header_size + length] as payload:
+                        if len(payload) < length or zlib.crc32(payload) != checksum:
+                            raise JournalStorageError(f"Снимок {path} поврежден (смещение {offset}).")
+                        frames.append(marshal.loads(payload))
+                    offset += header_size + length
+            finally:
+                view.release()
+    if len(frames) < 2 or frames[-1][:2] != ('', 'end') or frames[-1][2] != len(frames) - 2:
+        raise JournalStorageError(f"Снимок {path} недописан.")
+    return frames[0], frames[1:-1]
+
+
+class _JournaledRecordsMixin:
+    """
+    Журналирование для хранилищ записей: хуки _insert/_replace/_remove
+    дописывают изменение в журнал (под теми же блокировками, что упорядочивают
+    сами изменения), а create/update/delete перед возвратом фиксируют журнал.
+    """
+
+    # Журнал подключается после восстановления: вставки из снимка и журнала не журналируются.
+    _journal = None
+    # Наибольший выданный ID: следующий ID после перезапуска не должен повторить удаленный.
+    _last_id = 0
+
+    def __init__(self, name: str, schema, initial_records=()):
+        self.name = name
+        super().__init__(initial_records, schema=schema)
+
+    def _stored_row(self, record):
+        # marshal понимает только точные встроенные типы, а не именованные кортежи.
+        return tuple(record) if isinstance(self._layout, RecordLayout) else record
+
+    def _insert(self, record_id, record):
+        super()._insert(record_id, record)
+        if record_id > self._last_id:
+            self._last_id = record_id
+        if self._journal is not None:
+            self._journal.append((self.name, 'put', record_id, self._stored_row(record)))
+
+    def _insert_many(self, record_ids, records, fields_list):
+        super()._insert_many(record_ids, records, fields_list)
+        if record_ids and record_ids[-1] > self._last_id:
+            self._last_id = record_ids[-1]
+        if self._journal is not None:
+            name, stored_row = self.name, self._stored_row
+            self._journal.append_many([(name, 'put', record_id, stored_row(record))
+                                       for record_id, record in zip(record_ids, records)])
+
+    def _replace(self, record_id, old_record, new_record):
+        super()._replace(record_id, old_record, new_record)
+        if self._journal is not None:
+            self._journal.append((self.name, 'put', record_id, self._stored_row(new_record)))
+
+    def _remove(self, record_id):
+        record = super()._remove(record_id)
+        if record is not None and self._journal is not None:
+            self._journal.append((self.name, 'delete', record_id))
+        return record
+
+    def create(self, fields: dict) -> dict:
+        created = super().create(fields)
+        self._journal.commit()
+        return created
+
+    def create_many(self, fields_list) -> list:
+        # Пачка фиксируется одним fsync.
+        created_ids = super().create_many(fields_list)
+        self._journal.commit()
+        return created_ids
+
+    def update(self, record_id: int, changes: dict):
+        updated = super().update(record_id, changes)
+        self._journal.commit()
+        return updated
+
+    def delete(self, record_id: int) -> bool:
+        deleted = super().delete(record_id)
+        self._journal.commit()
+        return deleted
+
+    def layout_fields(self):
+        """Порядок полей в сохраняемых записях (None — записи хранятся словарями)."""
+        return self._layout.field_names if isinstance(self._layout, RecordLayout) else None
+
+    def _row_converter(self, stored_fields):
+        """Функция, переводящая запись из раскладки stored_fields в текущую (None — раскладка та же)."""
+        current_fields = self.layout_fields()
+        if stored_fields == current_fields or (stored_fields is not None and current_fields is not None
+                                               and tuple(stored_fields) == tuple(current_fields)):
+            return None
+        # Схема поменялась (добавили или убрали поле): перекладываем запись через словарь.
+        if stored_fields is None:
+            return lambda row: self._stored_row(self._layout.pack(row))
+        return lambda row: self._stored_row(self._layout.pack(dict(zip(stored_fields, row))))
+
+    def snapshot_parts(self):
+        """Части снимка: параметры хранилища и записи кусками по SNAPSHOT_CHUNK_RECORDS."""
+        # Копия словаря — одна операция на C под GIL, поэтому она согласована без блокировок;
+        # изменения, попавшие в нее повторно, безвредно проиграются из нового сегмента журнала.
+        records = dict(self._records)
+        yield self.name, 'meta', {'fields': self.layout_fields(), 'next_id': self._last_id + 1,
+                                  'version': self._version}
+        record_ids = list(records)
+        rows = list(map(tuple, records.values())) if self.layout_fields() else list(records.values())
+        for start in range(0, len(record_ids), SNAPSHOT_CHUNK_RECORDS):
+            yield self.name, 'rows', (record_ids[start:start + SNAPSHOT_CHUNK_RECORDS],
+                                      rows[start:start + SNAPSHOT_CHUNK_RECORDS])
+
+    def restore_parts(self, parts):
+        """Заполняет хранилище частями снимка."""
+        meta = {}
+        record_ids, rows = [], []
+        for part_name, data in parts:
+            if part_name == 'meta':
+                meta = data
+            elif part_name == 'rows':
+                record_ids += data[0]
+                rows += data[1]
+        converter = self._row_converter(meta.get('fields'))
+        if converter is not None:
+            rows = [converter(row) for row in rows]
+        next_id = meta['next_id'] if 'next_id' in meta else max(record_ids, default=0) + 1
+        self._restore(record_ids, rows, next_id, meta.get('version', 0))
+        self._last_id = next_id - 1
+
+    def replay(self, entries, stored_fields):
+        """Применяет изменения из журнала (до подключения журнала, в одном потоке)."""
+        converter = self._row_converter(stored_fields)
+        for entry in entries:
+            operation, record_id = entry[1], entry[2]
+            if operation == 'put':
+                row = entry[3] if converter is None else converter(entry[3])
+                existing = self._records.get(record_id)
+                if existing is None:
+                    self._insert(record_id, row)
+                else:
+                    self._replace(record_id, existing, row)
+            elif operation == 'delete':
+                self._remove(record_id)
+            self._version += 1
+        self._id_counter = itertools.count(self._last_id + 1)
+        self._change_log_floor = self._version
+
+
+class JournaledRecordStore(_JournaledRecordsMixin, InMemoryRecordStore):
+    """Хранилище записей в памяти с журналом изменений."""
+
+
+class JournaledCatalogStore(_JournaledRecordsMixin, InMemoryCatalogStore):
+    """Хранилище каталога в памяти (с поисковыми индексами) и журналом изменений."""
+
+
+class JournaledShortUrlStore(ShortUrlStore):
+    """Хранилище коротких ссылок в памяти с журналом изменений."""
+
+    _journal = None
+
+    def __init__(self, name: str, max_entries: int = None, eviction_policy: str = 'lru'):
+        self.name = name
+        super().__init__(max_entries=max_entries, eviction_policy=eviction_policy)
+
+    def _insert(self, short_code, long_url, expires_at):
+        super()._insert(short_code, long_url, expires_at)
+        if self._journal is not None:
+            self._journal.append((self.name, 'add', short_code, long_url, expires_at))
+
+    def _remove(self, short_code):
+        super()._remove(short_code)
+        # Истекшие ссылки удалились бы и при проигрывании, но вытесненные — только так.
+        if self._journal is not None:
+            self._journal.append((self.name, 'remove', short_code))
+
+    def add(self, short_code: str, long_url: str, expires_at: float = None):
+        super().add(short_code, long_url, expires_at)
+        self._journal.commit()
+
+    def layout_fields(self):
+        return None
+
+    def snapshot_parts(self):
+        """Части снимка: прямой и обратный индексы и сроки жизни, кусками."""
+        for part_name, mapping in (('urls', self._url_by_code), ('codes', self._code_by_url),
+                                   ('expires', self._expires_at_by_code)):
+            items = list(dict(mapping).items())
+            for start in range(0, len(items), SNAPSHOT_CHUNK_RECORDS):
+                yield self.name, part_name, items[start:start + SNAPSHOT_CHUNK_RECORDS]
+
+    def restore_parts(self, parts):
+        """Заполняет хранилище частями снимка."""
+        collected = {'urls': {}, 'codes': {}, 'expires': {}}
+        for part_name, items in parts:
+            collected[part_name].update(items)
+        self._restore(collected['urls'], collected['codes'], collected['expires'])
+
+    def replay(self, entries, stored_fields):
+        """Применяет изменения из журнала (до подключения журнала, в одном потоке)."""
+        for entry in entries:
+            operation, short_code = entry[1], entry[2]
+            if operation == 'add':
+                if short_code not in self._url_by_code:
+                    self._insert(short_code, entry[3], entry[4])
+            elif operation == 'remove':
+                if short_code in self._url_by_code:
+                    self._remove(short_code)
+
+
+class JournaledSequence(InMemorySequence):
+    """Последовательность номеров с журналом: выданный номер не будет выдан повторно после перезапуска."""
+
+    _journal = None
+
+    def __init__(self, name: str):
+        self.name = name
+        super().__init__()
+
+    def next_value(self) -> int:
+        # Номер не фиксируется отдельно: его фиксирует следующее за ним изменение
+        # (новая короткая ссылка), а журнал пишется на диск строго по порядку.
+        with self._lock:
+            value = self._next_value
+            self._next_value += 1
+            if self._journal is not None:
+                self._journal.append((self.name, 'next', value))
+            return value
+
+    def layout_fields(self):
+        return None
+
+    def snapshot_parts(self):
+        yield self.name, 'meta', self._next_value
+
+    def restore_parts(self, parts):
+        for part_name, next_value in parts:
+            if part_name == 'meta':
+                self._next_value = next_value
+
+    def replay(self, entries, stored_fields):
+        for entry in entries:
+            self._next_value = max(self._next_value, entry[2] + 1)
+
+
+class JournalDatabase:
+    """
+    Каталог данных бэкенда 'journal' и фабрика хранилищ.
+
+    Хранилища создаются методами record_store/catalog_store/short_url_store/
+    sequence, после чего `recover` загружает в них снимок и журнал и
+    подключает журналирование.
+    """
+
+    def __init__(self, directory: str, sync_commits: bool = True,
+                 snapshot_every_entries: int = DEFAULT_SNAPSHOT_EVERY_ENTRIES,
+                 snapshot_interval: float = DEFAULT_SNAPSHOT_INTERVAL):
+        """
+        Args:
+            directory (str): Каталог данных (создается при необходимости).
+            sync_commits (bool): Ждать ли записи изменения на диск перед ответом (см. JournalWriter).
+            snapshot_every_entries (int): Писать снимок после стольких изменений в журнале.
+            snapshot_interval (float): Писать снимок не реже, чем раз в столько секунд (если были изменения).
+
+        Raises:
+            JournalStorageError: Если каталог уже использует другой процесс.
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self._sync_commits = sync_commits
+        self._snapshot_every_entries = snapshot_every_entries
+        self._snapshot_interval = snapshot_interval
+        self._lock_file = self._lock_directory()
+        self._stores = {}
+        self._snapshot_lock = threading.Lock()
+        self._last_snapshot_at = time.monotonic()
+        self._closed = threading.Event()
+        self.journal = None
+        self.recovery_stats = {}
+        # Каталог новый — стартовые записи (цитаты, каталог) добавляются в хранилища.
+        self._is_new = not os.path.exists(self._snapshot_path()) and not self._segment_numbers()
+
+    def _lock_directory(self):
+        lock_file = open(os.path.join(self.directory, LOCK_FILE_NAME), 'a')
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                raise JournalStorageError(
+                    f"Каталог данных {self.directory} уже использует другой процесс: бэкенд 'journal' "
+                    f"рассчитан на один процесс (для нескольких воркеров используйте 'sqlite')."
+                ) from None
+        return lock_file
+
+    def _snapshot_path(self):
+        return os.path.join(self.directory, SNAPSHOT_FILE_NAME)
+
+    def _segment_numbers(self):
+        numbers = []
+        for file_name in os.listdir(self.directory):
+            match = JOURNAL_SEGMENT_PATTERN.match(file_name)
+            if match:
+                numbers.append(int(match.group(1)))
+        return sorted(numbers)
+
+    def _register(self, store):
+        if store.name in self._stores:
+            raise ValueError(f"Хранилище '{store.name}' уже создано.")
+        self._stores[store.name] = store
+        return store
+
+    def record_store(self, schema, initial_records=()):
+        """Возвращает хранилище записей по схеме (стартовые записи — только для нового каталога)."""
+        return self._register(JournaledRecordStore(schema.table, schema, initial_records if self._is_new else ()))
+
+    def catalog_store(self, schema, initial_records=()):
+        """Возвращает хранилище каталога с поисковыми индексами."""
+        return self._register(JournaledCatalogStore(schema.table, schema, initial_records if self._is_new else ()))
+
+    def short_url_store(self, max_entries: int = None, eviction_policy: str = 'lru'):
+        """Возвращает хранилище коротких ссылок."""
+        return self._register(JournaledShortUrlStore('short_urls', max_entries, eviction_policy))
+
+    def sequence(self, name: str):
+        """Возвращает именованную последовательность номеров."""
+        return self._register(JournaledSequence(f'sequence:{name}'))
+
+    def _segment_header(self):
+        return ('', 'header', {'fields': {name: store.layout_fields() for name, store in self._stores.items()}})
+
+    def recover(self):
+        """
+        Загружает снимок и проигрывает журнал, затем подключает журналирование.
+
+        Сборщик мусора на время загрузки выключается: миллионы новых кортежей
+        иначе запускали бы его многократно. Если он был выключен и до вызова
+        (app.py выключает его на время старта и затем делает gc.freeze), он
+        остается выключенным.
+
+        Raises:
+            JournalStorageError: Если снимок поврежден.
+        """
+        started_at = time.perf_counter()
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            first_segment = 1
+            snapshot_size = 0
+            if os.path.exists(self._snapshot_path()):
+                snapshot_size = os.path.getsize(self._snapshot_path())
+                header, parts = read_snapshot(self._snapshot_path())
+                first_segment = header['first_segment']
+                parts_by_store = {}
+                for store_name, part_name, data in parts:
+                    parts_by_store.setdefault(store_name, []).append((part_name, data))
+                del parts
+                for store_name, store in self._stores.items():
+                    store.restore_parts(parts_by_store.pop(store_name, ()))
+            loaded_at = time.perf_counter()
+
+            segment_numbers = [number for number in self._segment_numbers() if number >= first_segment]
+            replayed_entries = 0
+            for segment_number in segment_numbers:
+                entries = read_journal_segment(os.path.join(self.directory, journal_segment_name(segment_number)))
+                replayed_entries += self._replay_segment(entries)
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+        replayed_at = time.perf_counter()
+
+        next_segment = max(segment_numbers, default=first_segment - 1) + 1
+        self.journal = JournalWriter(self.directory, next_segment, self._segment_header(), self._sync_commits)
+        # Изменения, проигранные из журнала, еще не в снимке — они учитываются в пороге следующего снимка.
+        self.journal.entries_since_snapshot = replayed_entries
+        for store in self._stores.values():
+            store._journal = self.journal
+        self._remove_segments_before(first_segment)
+        if self._is_new:
+            # Стартовые записи нового каталога сохраняются сразу.
+            self.snapshot()
+        self.recovery_stats = {
+            'snapshot_bytes': snapshot_size,
+            'snapshot_seconds': loaded_at - started_at,
+            'replayed_entries': replayed_entries,
+            'replay_seconds': replayed_at - loaded_at,
+            'total_seconds': time.perf_counter() - started_at,
+        }
+        threading.Thread(target=self._maintenance_loop, name='journal-maintenance', daemon=True).start()
+        atexit.register(self.close)
+        return self.recovery_stats
+
+    def _replay_segment(self, entries):
+        """Проигрывает записи одного сегмента; возвращает число примененных изменений."""
+        stored_fields = {}
+        entries_by_store = {}
+        for entry in entries:
+            if entry[0] == '':
+                if entry[1] == 'header':
+                    stored_fields = entry[2]['fields']
+                continue
+            entries_by_store.setdefault(entry[0], []).append(entry)
+        # Изменения разных хранилищ независимы, поэтому каждое хранилище проигрывает свои разом.
+        for store_name, store_entries in entries_by_store.items():
+            store = self._stores.get(store_name)
+            if store is None:
+                logger.warning("В журнале есть изменения неизвестного хранилища '%s' — пропущены.", store_name)
+                continue
+            store.replay(store_entries, stored_fields.get(store_name, store.layout_fields()))
+        return sum(len(store_entries) for store_entries in entries_by_store.values())
+
+    def _remove_segments_before(self, segment_number):
+        for number in self._segment_numbers():
+            if number < segment_number:
+                os.remove(os.path.join(self.directory, journal_segment_name(number)))
+
+    def snapshot(self):
+        """
+        Пишет снимок всех хранилищ и удаляет сегменты журнала, которые он покрывает.
+
+        Returns:
+            int: Размер снимка в байтах.
+        """
+        with self._snapshot_lock:
+            # Сначала новый сегмент, потом копия состояния: все, что не попало в копию,
+            # окажется в сегменте, который будет проигран поверх снимка.
+            first_segment = self.journal.segment_number + 1
+            self.journal.rotate(first_segment)
+            parts = (part for store in self._stores.values() for part in store.snapshot_parts())
+            snapshot_size = write_snapshot(self.directory, first_segment, parts)
+            self._remove_segments_before(first_segment)
+            self._last_snapshot_at = time.monotonic()
+            return snapshot_size
+
+    def _maintenance_loop(self):
+        while not self._closed.wait(MAINTENANCE_INTERVAL):
+            try:
+                if not self._sync_commits:
+                    self.journal.flush()
+                pending_entries = self.journal.entries_since_snapshot
+                if pending_entries >= self._snapshot_every_entries or (
+                        pending_entries and time.monotonic() - self._last_snapshot_at >= self._snapshot_interval):
+                    self.snapshot()
+            except Exception:
+                logger.exception("Не удалось обслужить журнал хранилищ.")
+
+    def close(self):
+        """Дописывает журнал на диск и освобождает каталог данных."""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        if self.journal is not None:
+            self.journal.close()
+        self._lock_file.close()
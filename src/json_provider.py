@@ -0,0 +1,176 @@
+"""
+Провайдер JSON для Flask с подключаемым быстрым сериализатором.
+
+`PortalJSONProvider` заменяет стандартный провайдер приложения (`app.json`),
+поэтому через него идут все `jsonify` обработчиков. Сериализатор выбирается
+один раз при старте:
+- 'orjson' — если пакет установлен (в разы быстрее стандартного json);
+- 'ujson' — если установлен он, а orjson нет;
+- 'stdlib' — модуль json из стандартной библиотеки (всегда доступен).
+Результат не зависит от выбора: ключи сортируются, не-ASCII символы пишутся
+как есть, а типы, которые быстрый сериализатор не умеет (даты, Decimal,
+целые больше 64 бит), проходят через обработчик Flask по умолчанию или,
+в крайнем случае, через стандартный json.
+
+Исключение — NaN и бесконечности: в JSON их нет, и сериализаторы поступают
+с ними по-разному (orjson пишет null, стандартный json — невалидные NaN и
+Infinity). Поэтому API таких чисел не отдает: калькулятор и конвертер
+отвечают на них ошибкой 400 еще до сериализации (см. calculator.py и
+unit_conversion.py).
+
+Форматирование с отступами включается так же, как во Flask: в режиме
+отладки или явно (compact = False). Кроме того, отдельный запрос может
+попросить его параметром ?pretty=1 (или отказаться — ?pretty=0).
+
+Тела ответов с постоянным содержимым (например, ошибки "тело запроса
+должно быть JSON") сериализуются один раз: `prebuilt_response` хранит
+готовые байты и на каждый запрос только оборачивает их в Response.
+
+Разбор JSON во входящих запросах остается стандартным (request.get_json), но
+для пакетной загрузки NDJSON, где строк миллионы, `item_loads` отдает функцию
+разбора той же быстрой библиотеки.
+"""
+import json
+
+from flask import has_request_context, request
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # Необязательная зависимость
+    orjson = None
+try:
+    import ujson
+except ImportError:  # Необязательная зависимость
+    ujson = None
+
+JSON_BACKENDS = ('orjson', 'ujson', 'stdlib')
+# Значения параметра ?pretty=, включающие форматированный вывод.
+PRETTY_TRUE_VALUES = ('1', 'true', 'yes')
+
+
+def available_json_backends() -> list:
+    """Сериализаторы, доступные в текущем окружении, в порядке предпочтения."""
+    installed = {'orjson': orjson is not None, 'ujson': ujson is not None, 'stdlib': True}
+    return [name for name in JSON_BACKENDS if installed[name]]
+
+
+class PortalJSONProvider(DefaultJSONProvider):
+    """Провайдер JSON с быстрым сериализатором и заранее сериализованными ответами."""
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.backend = available_json_backends()[0]
+        self._prebuilt_bodies = {}
+
+    def set_backend(self, name: str):
+        """
+        Выбирает сериализатор.
+
+        Args:
+            name (str): 'auto' (самый быстрый из доступных), 'orjson', 'ujson' или 'stdlib'.
+
+        Raises:
+            ValueError: Если сериализатор неизвестен или не установлен.
+        """
+        available = available_json_backends()
+        if name == 'auto':
+            name = available[0]
+        if name not in available:
+            raise ValueError(f"Сериализатор JSON '{name}' недоступен. Доступны: {', '.join(available)}.")
+        self.backend = name
+        self._prebuilt_bodies.clear()
+
+    def _encode_stdlib(self, obj, pretty):
+        text = json.dumps(
+            obj, default=self.default, ensure_ascii=self.ensure_ascii, sort_keys=self.sort_keys,
+            indent=2 if pretty else None, separators=None if pretty else (',', ':'),
+        )
+        return text.encode('utf-8')
+
+    def encode(self, obj, pretty: bool = False) -> bytes:
+        """
+        Сериализует объект в JSON (UTF-8) выбранным сериализатором.
+
+        Args:
+            obj: Объект для сериализации.
+            pretty (bool): Форматировать ли вывод с отступом в 2 пробела.
+
+        Returns:
+            bytes: JSON-документ.
+        """
+        # orjson не умеет экранировать не-ASCII символы — при ensure_ascii остается стандартный json.
+        if self.backend == 'orjson' and not self.ensure_ascii:
+            option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+            if self.sort_keys:
+                option |= orjson.OPT_SORT_KEYS
+            if pretty:
+                option |= orjson.OPT_INDENT_2
+            try:
+                # Даты Flask пишет в формате HTTP (а не ISO, как orjson), поэтому они идут через default.
+                return orjson.dumps(obj, default=self.default, option=option)
+            except TypeError:
+                # Например, целое больше 64 бит — такое умеет только стандартный json.
+                return self._encode_stdlib(obj, pretty)
+        if self.backend == 'ujson':
+            try:
+                return ujson.dumps(
+                    obj, default=self.default, ensure_ascii=self.ensure_ascii, sort_keys=self.sort_keys,
+                    indent=2 if pretty else 0, escape_forward_slashes=False,
+                ).encode('utf-8')
+            except (TypeError, OverflowError):
+                return self._encode_stdlib(obj, pretty)
+        return self._encode_stdlib(obj, pretty)
+
+    def dumps(self, obj, **kwargs) -> str:
+        # Особые параметры (indent, separators, ...) умеет только стандартный json.
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return self.encode(obj).decode('utf-8')
+
+    def item_dumps(self, pretty: bool = False):
+        """Функция сериализации одного элемента в строку — для потоковой выдачи (см. streaming.py)."""
+        return lambda item: self.encode(item, pretty).decode('utf-8')
+
+    def item_loads(self):
+        """
+        Функция разбора одного JSON-документа (str или bytes) выбранной библиотекой — для пакетной загрузки.
+
+        Ошибки разбора у всех библиотек — подклассы ValueError.
+        """
+        if self.backend == 'orjson':
+            return orjson.loads
+        if self.backend == 'ujson':
+            return ujson.loads
+        return json.loads
+
+    def pretty_requested(self) -> bool:
+        """Нужен ли форматированный вывод для текущего запроса (?pretty=, режим отладки, compact)."""
+        if has_request_context():
+            pretty_argument = request.args.get('pretty')
+            if pretty_argument is not None:
+                return pretty_argument.lower() in PRETTY_TRUE_VALUES
+        return self.compact is False or (self.compact is None and self._app.debug)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.encode(obj, self.pretty_requested()) + b'\n', mimetype=self.mimetype)
+
+    def prebuilt_response(self, payload: dict, status: int = 200):
+        """
+        Ответ с постоянным телом, сериализованным один раз.
+
+        Args:
+            payload (dict): Тело ответа; значения должны быть хешируемыми
+                (строки, числа) — по ним ищется готовая сериализация.
+            status (int): HTTP-статус.
+
+        Returns:
+            Response: Новый объект ответа (заголовки можно менять).
+        """
+        pretty = self.pretty_requested()
+        key = (tuple(sorted(payload.items())), pretty)
+        body = self._prebuilt_bodies.get(key)
+        if body is None:
+            body = self._prebuilt_bodies[key] = self.encode(payload, pretty) + b'\n'
+        return self._app.response_class(body, status=status, mimetype=self.mimetype)
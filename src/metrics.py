@@ -0,0 +1,256 @@
+"""
+Метрики HTTP-запросов портала в формате Prometheus.
+
+`MetricsMiddleware` — WSGI-прослойка, которая стоит снаружи всего
+приложения (и быстрого пути редиректов) и для каждого запроса учитывает:
+- гистограмму длительности по маршруту и методу (от получения запроса до
+  отдачи последнего байта тела — для потоковых ответов это важно);
+- счетчик ответов по маршруту, методу и статусу;
+- число запросов, обрабатываемых прямо сейчас.
+
+Маршрут — шаблон правила Flask ('/api/tasks/<int:task_id>'), а не сам путь,
+чтобы число временных рядов не росло с числом ID. Его кладет в окружение
+запроса обработчик before_request приложения (см. ROUTE_ENVIRON_KEY);
+запросам, до Flask не дошедшим, маршрут подбирается по префиксу пути.
+
+Счетчики разложены по полосам (как блокировки записей в storage.py):
+поток пишет в полосу, выбранную по его идентификатору, под ее собственной
+блокировкой, поэтому потоки почти никогда не ждут друг друга, а отдельного
+состояния на поток (которое росло бы при сервере "поток на запрос") нет.
+Полосы складываются только при чтении метрик (GET /metrics).
+
+Метрики у каждого процесса свои: при нескольких воркерах Prometheus
+опрашивает их по отдельности или через общий агрегатор.
+"""
+import bisect
+import itertools
+import threading
+import time
+
+# Ключ окружения WSGI, в который приложение кладет шаблон маршрута запроса.
+ROUTE_ENVIRON_KEY = 'portal.route'
+# Маршрут запросов, не подошедших ни к одному правилу (404 маршрутизации).
+UNMATCHED_ROUTE = '<unmatched>'
+# Границы корзин гистограммы длительности, в секундах (как у клиентов Prometheus,
+# но с корзинами помельче: готовые ответы отдаются за десятки микросекунд).
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Число полос счетчиков. Простое, чтобы идентификаторы потоков (адреса, кратные
+# большой степени двойки) расходились по разным полосам.
+METRICS_STRIPES = 31
+# Методы, которые попадают в метки как есть; остальные (их присылает клиент) — как 'OTHER'.
+KNOWN_METHODS = frozenset(('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'))
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class _MetricsStripe:
+    """Одна полоса счетчиков со своей блокировкой."""
+
+    __slots__ = ('lock', 'series', 'finished')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # (метод, маршрут, статус) -> [счетчики корзин..., сумма длительностей, число запросов].
+        # Гистограмма по (метод, маршрут) и счетчик ответов по статусам собираются из них при чтении.
+        self.series = {}
+        self.finished = 0
+
+
+class RequestMetrics:
+    """Агрегатор метрик запросов."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS, stripe_count: int = METRICS_STRIPES):
+        """
+        Args:
+            buckets: Возрастающие границы корзин гистограммы в секундах.
+            stripe_count (int): Число полос счетчиков.
+        """
+        self.buckets = tuple(buckets)
+        self._stripes = [_MetricsStripe() for _ in range(stripe_count)]
+        # Начатые запросы считаются без блокировки: next() у itertools.count атомарен под GIL.
+        # Прочитать счетчик можно только через next(), поэтому чтения (snapshot) вычитаются.
+        self._started = itertools.count()
+        self._started_reads = 0
+        self._snapshot_lock = threading.Lock()
+
+    def request_started(self):
+        next(self._started)
+
+    def request_finished(self, method: str, route: str, status: str, duration: float):
+        """
+        Учитывает завершенный запрос.
+
+        Args:
+            method (str): HTTP-метод.
+            route (str): Шаблон маршрута.
+            status (str): Код статуса ('200').
+            duration (float): Длительность в секундах.
+        """
+        buckets = self.buckets
+        # Индекс первой корзины с границей >= duration (len — если ни в одну).
+        bucket_index = bisect.bisect_left(buckets, duration)
+        stripe = self._stripes[threading.get_ident() % len(self._stripes)]
+        key = (method, route, status)
+        with stripe.lock:
+            stripe.finished += 1
+            series = stripe.series.get(key)
+            if series is None:
+                series = stripe.series[key] = [0] * (len(buckets) + 2)
+            if bucket_index < len(buckets):
+                series[bucket_index] += 1
+            series[-2] += duration
+            series[-1] += 1
+
+    def snapshot(self):
+        """
+        Складывает полосы.
+
+        Returns:
+            tuple: (latencies, responses, in_flight): latencies — (метод, маршрут) ->
+                [накопительные счетчики корзин..., сумма, число] (корзины накопительные,
+                как требует Prometheus), responses — (метод, маршрут, статус) -> число ответов.
+        """
+        latencies, responses, finished = {}, {}, 0
+        for stripe in self._stripes:
+            with stripe.lock:
+                finished += stripe.finished
+                for (method, route, status), series in stripe.series.items():
+                    total = latencies.setdefault((method, route), [0] * len(series))
+                    for index, value in enumerate(series):
+                        total[index] += value
+                    responses[(method, route, status)] = responses.get((method, route, status), 0) + series[-1]
+        # Начатые читаются после завершенных, поэтому разность не бывает отрицательной.
+        with self._snapshot_lock:
+            started = next(self._started) - self._started_reads
+            self._started_reads += 1
+        for series in latencies.values():
+            for index in range(1, len(self.buckets)):
+                series[index] += series[index - 1]
+        return latencies, responses, started - finished
+
+    def render_prometheus(self, store_sizes=None) -> str:
+        """
+        Текст метрик в формате Prometheus (text exposition format 0.0.4).
+
+        Args:
+            store_sizes (dict, optional): Имя хранилища -> число записей.
+
+        Returns:
+            str: Текст для ответа GET /metrics.
+        """
+        latencies, responses, in_flight = self.snapshot()
+        lines = [
+            '# HELP portal_http_request_duration_seconds Длительность обработки HTTP-запросов.',
+            '# TYPE portal_http_request_duration_seconds histogram',
+        ]
+        for (method, route), series in sorted(latencies.items()):
+            labels = f'method="{method}",route="{_escape_label(route)}"'
+            for bound, cumulative_count in zip(self.buckets, series):
+                lines.append(f'portal_http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative_count}')
+            lines.append(f'portal_http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {series[-1]}')
+            lines.append(f'portal_http_request_duration_seconds_sum{{{labels}}} {series[-2]:.6f}')
+            lines.append(f'portal_http_request_duration_seconds_count{{{labels}}} {series[-1]}')
+        lines += [
+            '# HELP portal_http_responses_total Число HTTP-ответов по маршруту и статусу.',
+            '# TYPE portal_http_responses_total counter',
+        ]
+        for (method, route, status), count in sorted(responses.items()):
+            lines.append(
+                f'portal_http_responses_total{{method="{method}",route="{_escape_label(route)}",status="{status}"}} {count}'
+            )
+        lines += [
+            '# HELP portal_http_requests_in_flight Число запросов, обрабатываемых сейчас.',
+            '# TYPE portal_http_requests_in_flight gauge',
+            f'portal_http_requests_in_flight {in_flight}',
+        ]
+        if store_sizes:
+            lines += [
+                '# HELP portal_store_records Число записей в хранилищах сервисов.',
+                '# TYPE portal_store_records gauge',
+            ]
+            for store_name, size in sorted(store_sizes.items()):
+                lines.append(f'portal_store_records{{store="{_escape_label(store_name)}"}} {size}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape_label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class _MeasuredBody:
+    """Тело ответа, по завершении (исчерпании или close) отчитывающееся о длительности запроса."""
+
+    __slots__ = ('_body', '_finish')
+
+    def __init__(self, body, finish):
+        self._body = body
+        self._finish = finish
+
+    def __iter__(self):
+        try:
+            yield from self._body
+        finally:
+            self.close()
+
+    def close(self):
+        finish, self._finish = self._finish, None
+        if finish is None:
+            return
+        try:
+            if hasattr(self._body, 'close'):
+                self._body.close()
+        finally:
+            finish()
+
+
+class MetricsMiddleware:
+    """WSGI-прослойка, учитывающая каждый запрос в RequestMetrics."""
+
+    def __init__(self, wsgi_app, metrics: RequestMetrics, prefix_routes=()):
+        """
+        Args:
+            wsgi_app: Оборачиваемое приложение.
+            metrics (RequestMetrics): Куда писать метрики.
+            prefix_routes: Пары (префикс пути, маршрут) для запросов, на которые ответили,
+                не дойдя до Flask (например, ('/s/', '/s/<short_code>') для быстрого пути редиректов).
+        """
+        self.wsgi_app = wsgi_app
+        self.metrics = metrics
+        self._prefix_routes = tuple(prefix_routes)
+
+    def _route(self, environ):
+        route = environ.get(ROUTE_ENVIRON_KEY)
+        if route is not None:
+            return route
+        path = environ.get('PATH_INFO', '')
+        for prefix, prefix_route in self._prefix_routes:
+            if path.startswith(prefix):
+                return prefix_route
+        return UNMATCHED_ROUTE
+
+    def __call__(self, environ, start_response):
+        metrics = self.metrics
+        started_at = time.perf_counter()
+        status_holder = []
+
+        def recording_start_response(status, headers, exc_info=None):
+            status_holder.append(status)
+            return start_response(status, headers, exc_info)
+
+        def finish():
+            status = status_holder[-1][:3] if status_holder else '500'
+            method = environ.get('REQUEST_METHOD')
+            metrics.request_finished(method if method in KNOWN_METHODS else 'OTHER', self._route(environ), status,
+                                     time.perf_counter() - started_at)
+
+        metrics.request_started()
+        try:
+            body = self.wsgi_app(environ, recording_start_response)
+        except BaseException:
+            status_holder.append('500')
+            finish()
+            raise
+        if type(body) is list:
+            # Тело уже готово целиком (так отвечает быстрый путь редиректов) — обертка не нужна.
+            finish()
+            return body
+        return _MeasuredBody(body, finish)
@@ -0,0 +1,109 @@
+"""
+Кеш отрендеренных HTML-страниц сервисов.
+
+Страницы портала (главная, список сервисов, страницы сервисов) не зависят
+от запроса: обработчик каждый раз собирает один и тот же словарь с
+описанием API (несколько вызовов url_for) и рендерит шаблон на 8-15 КБ.
+Меняется результат только вместе с глобальными переменными шаблонов
+(сейчас это год в футере — см. inject_global_template_vars в app.py).
+
+`RenderedPageCache` хранит для каждой страницы готовый HTML, его сжатую
+gzip копию (сжимается один раз, с максимальной степенью) и ETag. Ключ —
+имя страницы и "вариант": значения глобальных переменных шаблонов. Когда
+вариант меняется (наступил новый год), страница рендерится заново, а
+старая запись заменяется.
+"""
+import collections
+import gzip
+import hashlib
+
+# Страницы короче этого размера не сжимаются: заголовки съедят выигрыш.
+MIN_COMPRESSED_SIZE = 500
+
+RenderedPage = collections.namedtuple('RenderedPage', ('body', 'gzip_body', 'etag'))
+
+
+def build_rendered_page(html: str, compress_level: int = 9) -> RenderedPage:
+    """
+    Готовит закешированную страницу: тело в UTF-8, его gzip-копию и ETag.
+
+    Args:
+        html (str): Отрендеренный HTML.
+        compress_level (int): Степень сжатия gzip (1-9).
+
+    Returns:
+        RenderedPage: Готовая страница (gzip_body — None, если сжимать не стоит).
+    """
+    body = html.encode('utf-8')
+    gzip_body = None
+    if len(body) >= MIN_COMPRESSED_SIZE:
+        # mtime=0: сжатое тело (и его ETag) не зависит от момента рендеринга.
+        gzip_body = gzip.compress(body, compresslevel=compress_level, mtime=0)
+    return RenderedPage(body, gzip_body, hashlib.sha256(body).hexdigest()[:32])
+
+
+class RenderedPageCache:
+    """Готовые ответы страниц: имя страницы -> (вариант, RenderedPage)."""
+
+    def __init__(self, compress_level: int = 9):
+        """
+        Args:
+            compress_level (int): Степень сжатия gzip (1-9).
+        """
+        self._compress_level = compress_level
+        self._pages = {}
+
+    def __len__(self):
+        return len(self._pages)
+
+    def get_or_render(self, name, variant, render) -> RenderedPage:
+        """
+        Возвращает закешированную страницу или рендерит ее.
+
+        Args:
+            name: Имя страницы (endpoint Flask).
+            variant: Хешируемое значение всего, от чего зависит HTML помимо страницы (год, язык).
+            render: Функция без аргументов, возвращающая HTML.
+
+        Returns:
+            RenderedPage: Готовая страница.
+        """
+        cached = self._pages.get(name)
+        if cached is not None and cached[0] == variant:
+            return cached[1]
+        # Два потока могут отрендерить страницу одновременно — результат одинаков,
+        # а присваивание в словарь атомарно, поэтому блокировка не нужна.
+        page = build_rendered_page(render(), self._compress_level)
+        self._pages[name] = (variant, page)
+        return page
+
+    def clear(self):
+        """Сбрасывает все страницы (например, после изменения шаблонов)."""
+        self._pages.clear()
+
+    @staticmethod
+    def build_response(page: RenderedPage, request, response_class):
+        """
+        Собирает ответ из готовой страницы с учетом Accept-Encoding и If-None-Match.
+
+        Клиенту, принимающему gzip, отдается сжатое тело. У сжатого и
+        несжатого вариантов разные ETag (это разные байты), и ответ помечен
+        Vary: Accept-Encoding, чтобы промежуточные кеши их не путали.
+
+        Args:
+            page (RenderedPage): Готовая страница.
+            request: Текущий запрос Flask.
+            response_class: Класс ответа приложения.
+
+        Returns:
+            Response: Ответ 200 или 304 без тела, если ETag совпал.
+        """
+        if page.gzip_body is not None and request.accept_encodings['gzip']:
+            response = response_class(page.gzip_body, mimetype='text/html')
+            response.headers['Content-Encoding'] = 'gzip'
+            response.set_etag(page.etag + '-gzip')
+        else:
+            response = response_class(page.body, mimetype='text/html')
+            response.set_etag(page.etag)
+        response.vary.add('Accept-Encoding')
+        return response.make_conditional(request)
@@ -0,0 +1,90 @@
+"""
+Компактное представление записей в хранилищах в памяти.
+
+Обычный словарь на запись из 3-7 полей занимает 200-360 байт только на
+саму хеш-таблицу, и каждая запись хранит собственную копию ключей-индексов.
+`RecordLayout` вместо этого строит по схеме класс записи — именованный
+кортеж (namedtuple, у которого `__slots__ = ()`): запись из N полей весит
+56 + 8·N байт, имена полей хранятся один раз в классе.
+
+Значения "перечислимых" полей (тип, жанр, год в каталоге) интернируются:
+одинаковые значения во всех записях — один и тот же объект, а не отдельная
+строка, разобранная из JSON каждого запроса.
+
+Наружу (обработчикам, в JSON) записи выходят обычными словарями: `to_dict`
+собирает словарь из кортежа одним zip, пропуская незаполненные поля, —
+так же, как они отсутствовали в исходном словаре.
+"""
+import collections
+
+
+class RecordLayout:
+    """Класс компактных записей одной схемы и пул интернированных значений."""
+
+    def __init__(self, name: str, field_names, interned_fields=()):
+        """
+        Args:
+            name (str): Имя схемы (для имени класса записей).
+            field_names: Поля записи без 'id'.
+            interned_fields: Поля с небольшим числом различных значений, которые интернируются.
+        """
+        self.field_names = ('id',) + tuple(field_names)
+        self._data_field_names = tuple(field_names)
+        self.record_class = collections.namedtuple(f'{name.title().replace("_", "")}Record', self.field_names)
+        self._interned_positions = tuple(self.field_names.index(field) for field in interned_fields)
+        self._interned_values = {}
+
+    def _intern(self, values):
+        interned_values = self._interned_values
+        for position in self._interned_positions:
+            value = values[position]
+            if value is not None:
+                values[position] = interned_values.setdefault(value, value)
+        return values
+
+    def pack(self, fields: dict):
+        """
+        Собирает компактную запись из словаря полей (с 'id').
+
+        Поля вне схемы отбрасываются — как и в SQLite-бэкенде, где у них нет колонок.
+        """
+        return self.record_class._make(self._intern([fields.get(name) for name in self.field_names]))
+
+    def pack_new(self, record_id: int, fields: dict):
+        """То же, что pack({**fields, 'id': record_id}), но без копии словаря полей."""
+        values = [record_id]
+        values.extend(map(fields.get, self._data_field_names))
+        return self.record_class._make(self._intern(values))
+
+    def replace(self, record, changes: dict):
+        """Новая запись: копия record с примененными изменениями (сама record не меняется)."""
+        values = list(record)
+        for position, name in enumerate(self.field_names):
+            if name in changes:
+                values[position] = changes[name]
+        return self.record_class._make(self._intern(values))
+
+    def to_dict(self, record) -> dict:
+        """Словарь для выдачи наружу: только заполненные поля."""
+        return {name: value for name, value in zip(self.field_names, record) if value is not None}
+
+
+class DictLayout:
+    """Записи-словари без схемы: тот же интерфейс, что у RecordLayout, для хранилищ без схемы."""
+
+    @staticmethod
+    def pack(fields: dict):
+        return dict(fields)
+
+    @staticmethod
+    def pack_new(record_id: int, fields: dict):
+        return {**fields, 'id': record_id}
+
+    @staticmethod
+    def replace(record, changes: dict):
+        return {**record, **changes}
+
+    @staticmethod
+    def to_dict(record) -> dict:
+        # Записи не меняются на месте (update собирает новую), поэтому копия не нужна.
+        return record
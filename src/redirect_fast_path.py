@@ -0,0 +1,181 @@
+"""
+Быстрый путь для редиректов по коротким ссылкам (/s/<код>).
+
+Редирект — самый частый запрос портала, а ответ на него для каждого кода
+всегда один и тот же. Поэтому `RedirectFastPath` — WSGI-прослойка перед
+Flask: она узнает путь /s/<код>, берет из кеша заранее собранный ответ
+(статус, заголовки, тело) и отдает его, минуя маршрутизацию Flask, объект
+запроса и сборку Response. Все остальные запросы (и коды, которых нет
+в хранилище) проходят в Flask без изменений.
+
+Журнал переходов пишется не синхронно на каждый запрос, а через
+`BufferedAccessLog`: обработчик только кладет кортеж в очередь, а фоновый
+поток раз в секунду форматирует накопленные записи и пишет их в лог одной
+пачкой. При необходимости записи можно еще и прореживать (sample_rate).
+
+Если передан фильтр выданных кодов (bloom_filter.ShortCodeBloomFilter),
+коды, которых точно нет, получают 404 прямо здесь — с тем же телом, что
+у Flask, но без запроса к хранилищу и без маршрутизации.
+"""
+import atexit
+import collections
+import datetime
+import os
+import random
+import threading
+import time
+
+from werkzeug.utils import redirect
+
+# Сколько записей журнала держать в очереди; при переполнении теряются самые старые.
+ACCESS_LOG_QUEUE_SIZE = 100_000
+# Ответ на код, которого точно нет: тот же 404, что отдает Flask (тело собирает render_not_found).
+NOT_FOUND_STATUS = '404 NOT FOUND'
+SHORT_URL_NOT_FOUND_MESSAGE = 'Короткая ссылка с кодом "{short_code}" не найдена или устарела.'
+
+
+class BufferedAccessLog:
+    """Журнал переходов с буферизацией и записью из фонового потока."""
+
+    def __init__(self, logger, sample_rate: float = 1.0, flush_interval: float = 1.0,
+                 queue_size: int = ACCESS_LOG_QUEUE_SIZE):
+        """
+        Args:
+            logger (logging.Logger): Куда писать журнал.
+            sample_rate (float): Доля записываемых переходов (1.0 — все, 0 — ни одного).
+            flush_interval (float): Раз в сколько секунд сбрасывать очередь в лог.
+            queue_size (int): Максимальная длина очереди.
+        """
+        self._logger = logger
+        self._sample_rate = sample_rate
+        self._flush_interval = flush_interval
+        self._entries = collections.deque(maxlen=queue_size)
+        self._flusher_pid = None
+        self._start_lock = threading.Lock()
+        atexit.register(self.flush)
+
+    def record(self, short_code: str, destination_url: str):
+        """Ставит переход в очередь журнала (с учетом прореживания)."""
+        if self._sample_rate < 1.0 and random.random() >= self._sample_rate:
+            return
+        self._entries.append((datetime.datetime.now(), short_code, destination_url))
+        if self._flusher_pid != os.getpid():
+            self._start_flusher()
+
+    def _start_flusher(self):
+        # Поток запускается при первой записи в каждом процессе: после fork потоки родителя не наследуются.
+        with self._start_lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+            threading.Thread(target=self._flush_periodically, name='redirect-access-log', daemon=True).start()
+
+    def _flush_periodically(self):
+        while True:
+            time.sleep(self._flush_interval)
+            self.flush()
+
+    def flush(self):
+        """Пишет все накопленные записи в лог одним сообщением."""
+        entries = []
+        try:
+            while True:
+                entries.append(self._entries.popleft())
+        except IndexError:
+            pass
+        if not entries:
+            return
+        lines = '\n'.join(
+            f"{moment:%Y-%m-%d %H:%M:%S} '{short_code}' -> '{destination_url}'"
+            for moment, short_code, destination_url in entries
+        )
+        self._logger.info(f"Редиректы по коротким ссылкам ({len(entries)}):\n{lines}")
+
+
+class RedirectFastPath:
+    """WSGI-прослойка, отдающая редиректы /s/<код> из кеша готовых ответов."""
+
+    def __init__(self, wsgi_app, lookup_url, prefix: str = '/s/', cache_size: int = 100_000, access_log=None,
+                 click_recorder=None, code_filter=None, touch_code=None, render_not_found=None):
+        """
+        Args:
+            wsgi_app: Приложение, которому передаются все остальные запросы.
+            lookup_url: Функция код -> URL (или None), например ShortUrlStore.get.
+            prefix (str): Префикс пути коротких ссылок.
+            cache_size (int): Сколько готовых ответов держать в кеше.
+            access_log (BufferedAccessLog | None): Журнал переходов.
+            click_recorder (ClickRecorder | None): Учет переходов для статистики.
+            code_filter (ShortCodeBloomFilter | None): Фильтр выданных кодов для
+                быстрых ответов 404.
+            touch_code: Функция код -> bool, вызываемая при ответе из кеша
+                (например, ShortUrlStore.touch): отмечает обращение к ссылке
+                и сообщает, жива ли она еще.
+            render_not_found: Функция код -> тело ответа 404 (bytes, JSON) для
+                кодов, которых по фильтру точно нет. Без нее такие коды тоже
+                проходят в Flask.
+        """
+        self.wsgi_app = wsgi_app
+        self._lookup_url = lookup_url
+        self._prefix = prefix
+        self._cache_size = cache_size
+        self._access_log = access_log
+        self._click_recorder = click_recorder
+        self._code_filter = code_filter
+        self._touch_code = touch_code
+        self._render_not_found = render_not_found
+        # Код -> (статус, заголовки, тело, URL). Порядок вставки служит очередью вытеснения.
+        self._responses = {}
+        self._cache_lock = threading.Lock()
+
+    def _build_response(self, short_code, environ):
+        destination_url = self._lookup_url(short_code)
+        if destination_url is None:
+            return None
+        # Тот же ответ, что собрал бы Flask через redirect(): 302, Location и короткое HTML-тело.
+        # get_wsgi_headers кодирует не-ASCII символы адреса в Location (IRI -> URI).
+        response = redirect(destination_url, code=302)
+        headers = tuple(response.get_wsgi_headers(environ).to_wsgi_list())
+        prebuilt = (response.status, headers, response.get_data(), destination_url)
+        with self._cache_lock:
+            if len(self._responses) >= self._cache_size:
+                del self._responses[next(iter(self._responses))]
+            self._responses[short_code] = prebuilt
+        return prebuilt
+
+    def invalidate(self, short_code: str):
+        """Убирает готовый ответ для кода из кеша (например, если ссылка удалена)."""
+        with self._cache_lock:
+            self._responses.pop(short_code, None)
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        if path.startswith(self._prefix):
+            short_code = path[len(self._prefix):]
+            method = environ.get('REQUEST_METHOD')
+            if short_code and '/' not in short_code and method in ('GET', 'HEAD'):
+                prebuilt = self._responses.get(short_code)
+                if prebuilt is not None and self._touch_code is not None and not self._touch_code(short_code):
+                    # Ссылка истекла или вытеснена: готовый ответ больше не годится, 404 отдаст Flask.
+                    self.invalidate(short_code)
+                    return self.wsgi_app(environ, start_response)
+                if prebuilt is None:
+                    code_filter = self._code_filter
+                    if (code_filter is not None and self._render_not_found is not None
+                            and not code_filter.might_contain(short_code)):
+                        code_filter.definite_misses += 1
+                        body = self._render_not_found(short_code)
+                        start_response(NOT_FOUND_STATUS, [('Content-Type', 'application/json'),
+                                                          ('Content-Length', str(len(body)))])
+                        return [] if method == 'HEAD' else [body]
+                    prebuilt = self._build_response(short_code, environ)
+                    if prebuilt is None and code_filter is not None:
+                        code_filter.false_positives += 1
+                if prebuilt is not None:
+                    status, headers, body, destination_url = prebuilt
+                    if self._click_recorder is not None:
+                        self._click_recorder.record(short_code)
+                    if self._access_log is not None:
+                        self._access_log.record(short_code, destination_url)
+                    start_response(status, list(headers))
+                    return [] if method == 'HEAD' else [body]
+        return self.wsgi_app(environ, start_response)
@@ -0,0 +1,143 @@
+"""
+Криптографически стойкая генерация паролей и случайных чисел пачками.
+
+Источник случайности — os.urandom (тот же, что у модуля secrets), но байты
+запрашиваются у ОС крупными кусками и раздаются из буфера, поэтому пакет
+из тысяч паролей стоит нескольких системных вызовов, а не тысяч.
+
+Чтобы распределение было равномерным, используется выборка с отклонением:
+- символ пароля: байт b принимается, только если b < 256 - 256 % len(pool),
+  и превращается в pool[b % len(pool)]. Отбор и отображение делает один вызов
+  bytes.translate с таблицей, где "лишние" байты удаляются;
+- число из диапазона размера n: 32-битное слово w принимается, только если
+  w < 2**32 - 2**32 % n, и дает min + w % n.
+"""
+import os
+import threading
+
+# Сколько байт запрашивать у ОС за один раз.
+RANDOM_BUFFER_SIZE = 64 * 1024
+# Сколько значений генерировать за один захват блокировки при потоковой выдаче.
+GENERATION_BLOCK_SIZE = 256
+_WORD_SIZE = 4
+_WORD_RANGE = 2 ** 32
+
+
+class BufferedSecureRandom:
+    """Буферизованный потокобезопасный источник криптографически стойких случайных байт."""
+
+    def __init__(self, buffer_size: int = RANDOM_BUFFER_SIZE):
+        self._buffer_size = buffer_size
+        self._lock = threading.Lock()
+        self._buffer = b''
+        self._position = 0
+        self._translation_tables = {}
+        if hasattr(os, 'register_at_fork'):
+            # Иначе воркеры, порожденные fork'ом, раздали бы одни и те же байты из унаследованного буфера.
+            os.register_at_fork(after_in_child=self._discard_buffer)
+
+    def _discard_buffer(self):
+        self._lock = threading.Lock()
+        self._buffer = b''
+        self._position = 0
+
+    def _take(self, size: int) -> bytes:
+        """Возвращает size случайных байт; вызывается под блокировкой."""
+        if size > self._buffer_size:
+            return os.urandom(size)
+        if self._position + size > len(self._buffer):
+            self._buffer = os.urandom(self._buffer_size)
+            self._position = 0
+        chunk = self._buffer[self._position:self._position + size]
+        self._position += size
+        return chunk
+
+    def random_bytes(self, size: int) -> bytes:
+        """Возвращает size криптографически стойких случайных байт."""
+        with self._lock:
+            return self._take(size)
+
+    def _translation_table(self, pool: str):
+        table = self._translation_tables.get(pool)
+        if table is None:
+            if not 0 < len(pool) <= 256 or not pool.isascii():
+                raise ValueError("Набор символов должен состоять из 1-256 символов ASCII.")
+            accepted_limit = 256 - 256 % len(pool)
+            mapping = bytes(ord(pool[byte % len(pool)]) for byte in range(256))
+            table = (mapping, bytes(range(accepted_limit, 256)))
+            self._translation_tables[pool] = table
+        return table
+
+    def _draw_characters(self, pool: str, size: int) -> str:
+        """size равномерно распределенных символов из pool; вызывается под блокировкой."""
+        mapping, rejected_bytes = self._translation_table(pool)
+        # Доля отклоненных байт не больше половины, поэтому обычно хватает одного-двух запросов.
+        characters = b''
+        while len(characters) < size:
+            shortage = size - len(characters)
+            characters += self._take(shortage + shortage // 8 + 16).translate(mapping, rejected_bytes)
+        return characters[:size].decode('ascii')
+
+    def _draw_integers(self, min_value: int, max_value: int, count: int) -> list:
+        """count равномерно распределенных целых из [min_value, max_value]; вызывается под блокировкой."""
+        range_size = max_value - min_value + 1
+        accepted_limit = _WORD_RANGE - _WORD_RANGE % range_size
+        numbers = []
+        while len(numbers) < count:
+            shortage = count - len(numbers)
+            words = memoryview(self._take((shortage + shortage // 8 + 4) * _WORD_SIZE)).cast('I')
+            numbers.extend(min_value + word % range_size for word in words if word < accepted_limit)
+        del numbers[count:]
+        return numbers
+
+    def iter_strings(self, pool: str, length: int, count: int):
+        """
+        Генерирует count случайных строк длины length из символов pool.
+
+        Параметры проверяются сразу, а строки создаются лениво, блоками.
+
+        Args:
+            pool (str): Набор символов ASCII (не более 256).
+            length (int): Длина каждой строки (больше нуля).
+            count (int): Число строк.
+
+        Returns:
+            Iterator[str]: Строки (например, пароли).
+
+        Raises:
+            ValueError: Если pool пуст, длиннее 256 символов или содержит не-ASCII
+                символы, или если length не положительна.
+        """
+        if length <= 0:
+            raise ValueError("Длина строки должна быть больше нуля.")
+        self._translation_table(pool)
+        return self._generate_blocks(count, lambda block_count: self._split_characters(
+            self._draw_characters(pool, length * block_count), length))
+
+    def iter_integers(self, min_value: int, max_value: int, count: int):
+        """
+        Генерирует count случайных целых чисел из диапазона [min_value, max_value].
+
+        Returns:
+            Iterator[int]: Числа, создаваемые лениво, блоками.
+
+        Raises:
+            ValueError: Если диапазон пуст или шире 2**32 значений.
+        """
+        if not 0 < max_value - min_value + 1 <= _WORD_RANGE:
+            raise ValueError("Размер диапазона должен быть от 1 до 2**32.")
+        return self._generate_blocks(count, lambda block_count: self._draw_integers(min_value, max_value, block_count))
+
+    @staticmethod
+    def _split_characters(characters, length):
+        return [characters[offset:offset + length] for offset in range(0, len(characters), length)]
+
+    def _generate_blocks(self, count, draw_block):
+        for block_start in range(0, count, GENERATION_BLOCK_SIZE):
+            with self._lock:
+                block = draw_block(min(GENERATION_BLOCK_SIZE, count - block_start))
+            yield from block
+
+
+# Общий экземпляр для всего процесса.
+secure_random = BufferedSecureRandom()
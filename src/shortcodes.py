@@ -0,0 +1,209 @@
+"""
+Генераторы (аллокаторы) коротких кодов для сервиса сокращения URL.
+
+Аллокатор выдает новый уникальный код методом `allocate()` и сообщает
+заполненность пространства кодов методом `keyspace_stats()`. Доступны два
+варианта:
+
+- `CounterCodeAllocator` — кодирует монотонный счетчик в base62. Коды никогда
+  не повторяются, поэтому цикл повторных попыток не нужен. По желанию номер
+  перед кодированием проходит через биективное "перемешивание", чтобы коды
+  не выглядели последовательными.
+- `RandomCodeAllocator` — прежнее поведение: случайные символы с повторной
+  попыткой при коллизии. Оставлен для совместимости.
+"""
+import functools
+import math
+import random
+import string
+
+# Алфавит кодов: буквы ASCII (верхний и нижний регистр) и цифры — 62 символа.
+BASE62_ALPHABET = string.ascii_letters + string.digits
+DEFAULT_CODE_LENGTH = 6
+# Доля занятого пространства кодов, после которой стоит увеличить длину кода.
+KEYSPACE_WARNING_UTILIZATION = 0.5
+
+# Множитель и сдвиг для перемешивания номеров берутся как доли пространства
+# кодов, равные дробным частям иррациональных чисел (золотое сечение и √2):
+# такие значения хорошо "разбрасывают" соседние номера по всему диапазону.
+_GOLDEN_RATIO_FRACTION = (math.sqrt(5) - 1) / 2
+_SQRT2_FRACTION = math.sqrt(2) - 1
+
+
+class ShortCodeAllocationError(Exception):
+    """Не удалось выделить уникальный короткий код."""
+
+
+def encode_base62(number: int, length: int) -> str:
+    """
+    Кодирует неотрицательное число в base62-строку фиксированной длины.
+
+    Args:
+        number (int): Кодируемое число, 0 <= number < 62 ** length.
+        length (int): Длина результата (дополняется "нулевым" символом слева).
+
+    Returns:
+        str: Код из символов BASE62_ALPHABET.
+    """
+    characters = []
+    for _ in range(length):
+        number, remainder = divmod(number, 62)
+        characters.append(BASE62_ALPHABET[remainder])
+    if number:
+        raise ValueError(f"Число не помещается в {length} символов base62.")
+    return ''.join(reversed(characters))
+
+
+class CounterCodeAllocator:
+    """
+    Выдает коды, кодируя в base62 монотонно растущий счетчик.
+
+    Номера берутся из общей последовательности (`sequence`), поэтому каждый
+    номер соответствует ровно одному коду и коллизии невозможны — даже если
+    коды выдают несколько процессов с общим хранилищем. Первые 62**length
+    номеров дают коды начальной длины, следующие — коды на символ длиннее
+    и т.д.: коды разной длины по определению не пересекаются.
+
+    При `scramble=True` номер n внутри пространства из N = 62**length кодов
+    отображается в (a * n + b) mod N, где a взаимно просто с N. Это биекция:
+    коды по-прежнему уникальны, но соседние номера дают непохожие коды.
+    Перемешивание не является защитой: по нескольким кодам его можно обратить.
+    """
+
+    name = 'counter'
+
+    def __init__(self, sequence, length: int = DEFAULT_CODE_LENGTH, scramble: bool = True):
+        """
+        Args:
+            sequence: Источник номеров с методами `next_value()` (выдает
+                следующий номер, начиная с 0) и `current_value()` (сколько
+                номеров уже выдано).
+            length (int): Начальная длина кода.
+            scramble (bool): Перемешивать ли номера перед кодированием.
+        """
+        self._sequence = sequence
+        self._base_length = length
+        self._scramble = scramble
+
+    def _locate(self, number):
+        """Переводит сквозной номер в (длина кода, номер внутри пространства этой длины, размер пространства)."""
+        length = self._base_length
+        capacity = 62 ** length
+        while number >= capacity:
+            number -= capacity
+            length += 1
+            capacity = 62 ** length
+        return length, number, capacity
+
+    def code_for(self, number: int) -> str:
+        """Возвращает код для сквозного номера последовательности."""
+        length, index, capacity = self._locate(number)
+        if self._scramble:
+            multiplier, offset = _scramble_parameters(capacity)
+            index = (multiplier * index + offset) % capacity
+        return encode_base62(index, length)
+
+    def allocate(self) -> str:
+        """Выдает следующий код. Повторных попыток не бывает."""
+        return self.code_for(self._sequence.next_value())
+
+    def keyspace_stats(self) -> dict:
+        """Метрики заполненности пространства кодов текущей длины."""
+        length, used, capacity = self._locate(self._sequence.current_value())
+        return _build_keyspace_stats(self.name, length, used, capacity)
+
+
+@functools.lru_cache(maxsize=None)
+def _scramble_parameters(capacity):
+    """Множитель (взаимно простой с 62**k) и сдвиг для перемешивания номеров."""
+    multiplier = int(capacity * _GOLDEN_RATIO_FRACTION) | 1  # нечетное: взаимно просто с 2
+    while multiplier % 31 == 0:  # 62 = 2 * 31
+        multiplier += 2
+    return multiplier, int(capacity * _SQRT2_FRACTION)
+
+
+class RandomCodeAllocator:
+    """
+    Выдает случайные коды и повторяет попытку, если код уже занят.
+
+    Чем плотнее заполнено пространство кодов, тем чаще случаются повторы,
+    поэтому аллокатор считает их в метриках.
+    """
+
+    name = 'random'
+
+    def __init__(self, is_taken, length: int = DEFAULT_CODE_LENGTH, max_attempts: int = 10, count_taken=None):
+        """
+        Args:
+            is_taken: Функция, возвращающая True, если код уже занят.
+            length (int): Длина кода.
+            max_attempts (int): Сколько раз пробовать сгенерировать код.
+            count_taken: Функция без аргументов, возвращающая число занятых
+                кодов (для метрик). Если не задана, считаются выданные коды.
+        """
+        self._is_taken = is_taken
+        self._length = length
+        self._max_attempts = max_attempts
+        self._count_taken = count_taken
+        self._capacity = 62 ** length
+        self._allocated_total = 0
+        self._collisions_total = 0
+
+    def allocate(self) -> str:
+        """
+        Выдает случайный свободный код.
+
+        Raises:
+            ShortCodeAllocationError: Если за max_attempts попыток свободный код не найден.
+        """
+        for _ in range(self._max_attempts):
+            code = ''.join(random.choice(BASE62_ALPHABET) for _ in range(self._length))
+            if not self._is_taken(code):
+                self._allocated_total += 1
+                return code
+            self._collisions_total += 1
+        raise ShortCodeAllocationError(
+            f"Не удалось подобрать свободный код длины {self._length} за {self._max_attempts} попыток."
+        )
+
+    def keyspace_stats(self) -> dict:
+        """Метрики заполненности пространства кодов и число коллизий."""
+        allocated = self._count_taken() if self._count_taken else self._allocated_total
+        stats = _build_keyspace_stats(self.name, self._length, allocated, self._capacity)
+        stats['collisions_total'] = self._collisions_total
+        return stats
+
+
+def _build_keyspace_stats(allocator_name, code_length, allocated, capacity):
+    utilization = allocated / capacity
+    return {
+        'allocator': allocator_name,
+        'code_length': code_length,
+        'allocated': allocated,
+        'capacity': capacity,
+        'utilization': utilization,
+        'should_lengthen_codes': utilization >= KEYSPACE_WARNING_UTILIZATION,
+    }
+
+
+def create_code_allocator(kind: str, sequence, is_taken, count_taken=None, length: int = DEFAULT_CODE_LENGTH):
+    """
+    Создает аллокатор по имени из конфигурации.
+
+    Args:
+        kind (str): 'counter', 'counter-sequential' (без перемешивания) или 'random'.
+        sequence: Последовательность номеров для счетчиковых аллокаторов.
+        is_taken: Проверка занятости кода (нужна случайному аллокатору).
+        count_taken: Число занятых кодов для метрик случайного аллокатора.
+        length (int): Длина кода.
+
+    Raises:
+        ValueError: Если имя аллокатора неизвестно.
+    """
+    if kind == 'counter':
+        return CounterCodeAllocator(sequence, length=length, scramble=True)
+    if kind == 'counter-sequential':
+        return CounterCodeAllocator(sequence, length=length, scramble=False)
+    if kind == 'random':
+        return RandomCodeAllocator(is_taken, length=length, count_taken=count_taken)
+    raise ValueError(f"Неизвестный тип аллокатора коротких кодов: '{kind}'.")
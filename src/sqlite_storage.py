@@ -0,0 +1,876 @@
+"""
+SQLite-бэкенд хранилищ портала.
+
+Данные лежат в одном файле базы, поэтому переживают перезапуск сервера
+и доступны сразу нескольким процессам (например, воркерам gunicorn):
+
+- журнал в режиме WAL позволяет читателям не ждать писателя;
+- соединения переиспользуются через небольшой пул, а не открываются
+  на каждый запрос;
+- все SQL-запросы — постоянные строки с параметрами, так что модуль
+  sqlite3 компилирует каждый из них один раз на соединение и дальше
+  берет готовый (prepared) запрос из своего кеша;
+- ID записей выдает сама база (AUTOINCREMENT), а номера для коротких
+  кодов и версии хранилищ — общая таблица последовательностей, поэтому
+  воркеры не выдают одинаковых ID, кодов и версий.
+"""
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from catalog_query import CATALOG_FACET_DEFAULT_LIMIT, CATALOG_FACETS
+from expiry import HierarchicalTimingWheel
+from storage import RecordChanges, normalize_url
+
+# Сколько скомпилированных запросов держать в кеше каждого соединения.
+STATEMENT_CACHE_SIZE = 256
+# Сколько соединений пул держит открытыми про запас.
+DEFAULT_POOL_SIZE = 8
+# Сколько миллисекунд ждать освобождения блокировки записи другим процессом.
+BUSY_TIMEOUT_MS = 5000
+# Размер пачки при построчном обходе таблицы (чтобы не читать ее в память целиком).
+ITERATION_BATCH_SIZE = 1000
+# Как часто (в секундах) проверять версию хранилища в ожидании изменений:
+# изменения могут прийти из другого процесса, поэтому уведомлений нет — только опрос.
+CHANGE_POLL_INTERVAL = 0.5
+# Как часто (в секундах) процесс удаляет из базы все истекшие короткие ссылки, в том числе чужие.
+EXPIRED_SHORT_URLS_PURGE_INTERVAL = 60
+
+_SQL_TYPES = {'text': 'TEXT', 'integer': 'INTEGER', 'boolean': 'INTEGER'}
+
+
+def _lowered(value):
+    """Копия строки в нижнем регистре для поисковых колонок (None остается None)."""
+    return value.lower() if isinstance(value, str) else None
+
+
+class ConnectionPool:
+    """
+    Пул соединений с одной базой SQLite.
+
+    Соединение берется из пула на время одной операции и возвращается
+    обратно. Если свободных соединений нет, открывается новое; лишние
+    соединения сверх `size` при возврате закрываются.
+    """
+
+    def __init__(self, database_path: str, size: int = DEFAULT_POOL_SIZE):
+        self._database_path = database_path
+        self._idle_connections = queue.LifoQueue(maxsize=size)
+
+    def _open_connection(self):
+        # isolation_level=None: автокоммит, транзакции открываем явно там, где они нужны.
+        connection = sqlite3.connect(
+            self._database_path,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE,
+        )
+        connection.execute('PRAGMA journal_mode=WAL')
+        # В режиме WAL synchronous=NORMAL не грозит порчей базы и заметно ускоряет запись.
+        connection.execute('PRAGMA synchronous=NORMAL')
+        connection.execute(f'PRAGMA busy_timeout={BUSY_TIMEOUT_MS}')
+        return connection
+
+    @contextmanager
+    def connection(self):
+        """Контекстный менеджер, выдающий соединение из пула."""
+        try:
+            connection = self._idle_connections.get_nowait()
+        except queue.Empty:
+            connection = self._open_connection()
+        try:
+            yield connection
+        finally:
+            try:
+                self._idle_connections.put_nowait(connection)
+            except queue.Full:
+                connection.close()
+
+    @contextmanager
+    def transaction(self):
+        """Соединение с открытой транзакцией на запись (BEGIN IMMEDIATE)."""
+        with self.connection() as connection:
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                yield connection
+            except BaseException:
+                connection.execute('ROLLBACK')
+                raise
+            connection.execute('COMMIT')
+
+    @contextmanager
+    def read_transaction(self):
+        """Соединение с открытой транзакцией на чтение: все запросы видят один снимок базы."""
+        with self.connection() as connection:
+            connection.execute('BEGIN')
+            try:
+                yield connection
+            finally:
+                connection.execute('COMMIT')
+
+
+class SQLiteDatabase:
+    """Файл базы данных SQLite и фабрика хранилищ поверх него."""
+
+    def __init__(self, database_path: str, pool_size: int = DEFAULT_POOL_SIZE):
+        self.pool = ConnectionPool(database_path, size=pool_size)
+        with self.pool.connection() as connection:
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS storage_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)'
+            )
+            connection.execute('CREATE TABLE IF NOT EXISTS sequences (name TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+
+    def instance_id(self) -> str:
+        """
+        Случайная метка файла базы: создается при первом запуске и хранится в storage_meta.
+
+        Метка переживает перезапуски и одна у всех воркеров, а у заново созданной
+        базы (где версии хранилищ снова начинаются с нуля) она другая.
+        """
+        with self.pool.transaction() as connection:
+            row = connection.execute("SELECT value FROM storage_meta WHERE key = 'instance_id'").fetchone()
+            if row is not None:
+                return row[0]
+            instance_id = os.urandom(8).hex()
+            connection.execute("INSERT INTO storage_meta (key, value) VALUES ('instance_id', ?)", (instance_id,))
+            return instance_id
+
+    def record_store(self, schema, initial_records=()):
+        """Создает (при необходимости) таблицу по схеме и возвращает хранилище записей."""
+        return SQLiteRecordStore(self.pool, schema, initial_records)
+
+    def catalog_store(self, schema, initial_records=()):
+        """Возвращает хранилище каталога с поисковыми индексами."""
+        return SQLiteCatalogStore(self.pool, schema, initial_records)
+
+    def short_url_store(self):
+        """Возвращает хранилище коротких ссылок."""
+        return SQLiteShortUrlStore(self.pool)
+
+    def click_stats(self):
+        """Возвращает почасовую статистику переходов по коротким ссылкам."""
+        return SQLiteClickStats(self.pool)
+
+    def sequence(self, name: str):
+        """Возвращает именованную последовательность номеров, общую для всех процессов."""
+        return SQLiteSequence(self.pool, name)
+
+
+class SQLiteRecordStore:
+    """
+    Хранилище записей в таблице SQLite с тем же интерфейсом, что и InMemoryRecordStore.
+
+    Логические значения хранятся как 0/1, а пустые (NULL) поля в выдаваемые
+    словари не попадают — так записи выглядят так же, как в памяти (например,
+    у книги нет ключа 'director'). Для полей из `schema.search_fields` рядом
+    хранится колонка `<поле>_lower` с заранее вычисленным нижним регистром
+    (встроенная функция lower() в SQLite понимает только латиницу).
+
+    Версия хранилища — отдельная последовательность в таблице sequences.
+    Каждое изменение в той же транзакции берет следующий номер и записывает
+    его в колонку `version` строки; для удаленных строк номер остается
+    в таблице `<таблица>_deleted`. Дельта "после версии N" — два запроса
+    по индексам на version.
+    """
+
+    _SQL_NEXT_VERSION = (
+        'INSERT INTO sequences (name, value) VALUES (?, 1) '
+        'ON CONFLICT (name) DO UPDATE SET value = value + 1 RETURNING value'
+    )
+    _SQL_ADVANCE_VERSION = (
+        'INSERT INTO sequences (name, value) VALUES (?, ?) '
+        'ON CONFLICT (name) DO UPDATE SET value = value + excluded.value RETURNING value'
+    )
+    _SQL_CURRENT_VERSION = 'SELECT value FROM sequences WHERE name = ?'
+
+    def __init__(self, pool, schema, initial_records=()):
+        self._pool = pool
+        self._schema = schema
+        self._field_names = tuple(schema.fields)
+        self._boolean_fields = frozenset(name for name, kind in schema.fields.items() if kind == 'boolean')
+        self._search_fields = tuple(schema.search_fields)
+        stored_columns = self._field_names + tuple(f'{name}_lower' for name in self._search_fields)
+
+        table = schema.table
+        self._version_name = f'version:{table}'
+        self._deleted_table = f'{table}_deleted'
+        selected_columns = ', '.join(('id',) + self._field_names)
+        self._sql_insert = (
+            f"INSERT INTO {table} ({', '.join(stored_columns)}, version) "
+            f"VALUES ({', '.join('?' for _ in stored_columns)}, ?)"
+        )
+        self._sql_insert_with_id = (
+            f"INSERT INTO {table} (id, {', '.join(stored_columns)}) "
+            f"VALUES (?, {', '.join('?' for _ in stored_columns)})"
+        )
+        self._sql_select_one = f"SELECT {selected_columns} FROM {table} WHERE id = ?"
+        self._sql_select_batch = f"SELECT {selected_columns} FROM {table} WHERE id > ? ORDER BY id LIMIT ?"
+        self._sql_select_random = (
+            f"SELECT {selected_columns} FROM {table} "
+            f"WHERE id >= (SELECT abs(random()) % max(id) + 1 FROM {table}) ORDER BY id LIMIT 1"
+        )
+        self._sql_select_changed = f"SELECT {selected_columns} FROM {table} WHERE version > ? ORDER BY version"
+        self._sql_select_deleted = f"SELECT id FROM {self._deleted_table} WHERE version > ? ORDER BY version"
+        self._sql_insert_deleted = f"INSERT OR REPLACE INTO {self._deleted_table} (id, version) VALUES (?, ?)"
+        self._sql_delete = f"DELETE FROM {table} WHERE id = ?"
+        self._sql_count = f"SELECT COUNT(*) FROM {table}"
+        self._sql_exists = f"SELECT 1 FROM {table} WHERE id = ?"
+
+        self._create_table(initial_records)
+
+    def _create_table(self, initial_records):
+        schema = self._schema
+        column_types = {name: _SQL_TYPES[kind] for name, kind in schema.fields.items()}
+        column_types.update({f'{name}_lower': 'TEXT' for name in self._search_fields})
+        # Строки из таблиц прежней версии схемы получают версию 0.
+        column_types['version'] = 'INTEGER NOT NULL DEFAULT 0'
+        column_definitions = ', '.join(f'{name} {sql_type}' for name, sql_type in column_types.items())
+        seed_marker = f'seeded:{schema.table}'
+        with self._pool.transaction() as connection:
+            connection.execute(
+                f'CREATE TABLE IF NOT EXISTS {schema.table} (id INTEGER PRIMARY KEY AUTOINCREMENT, {column_definitions})'
+            )
+            self._add_missing_columns(connection, column_types)
+            connection.execute(f'CREATE INDEX IF NOT EXISTS idx_{schema.table}_version ON {schema.table} (version)')
+            connection.execute(
+                f'CREATE TABLE IF NOT EXISTS {self._deleted_table} (id INTEGER PRIMARY KEY, version INTEGER NOT NULL)'
+            )
+            connection.execute(
+                f'CREATE INDEX IF NOT EXISTS idx_{self._deleted_table}_version ON {self._deleted_table} (version)'
+            )
+            for field_name in schema.indexed_fields:
+                # Поиск по текстовым полям идет по копии в нижнем регистре — ее и индексируем.
+                indexed_column = f'{field_name}_lower' if field_name in self._search_fields else field_name
+                connection.execute(
+                    f'CREATE INDEX IF NOT EXISTS idx_{schema.table}_{indexed_column} ON {schema.table} ({indexed_column})'
+                )
+            # Стартовые записи добавляются один раз за жизнь базы, а не при каждом запуске.
+            already_seeded = connection.execute(
+                'SELECT 1 FROM storage_meta WHERE key = ?', (seed_marker,)
+            ).fetchone()
+            if not already_seeded:
+                connection.executemany(
+                    self._sql_insert_with_id,
+                    [(record['id'],) + self._values_for(record) for record in initial_records],
+                )
+                connection.execute('INSERT INTO storage_meta (key, value) VALUES (?, ?)', (seed_marker, '1'))
+
+    def _add_missing_columns(self, connection, column_types):
+        """Добавляет колонки, которых нет в таблице, созданной прежней версией схемы."""
+        existing_columns = {row[1] for row in connection.execute(f'PRAGMA table_info({self._schema.table})')}
+        missing_columns = [name for name in column_types if name not in existing_columns]
+        for name in missing_columns:
+            connection.execute(f'ALTER TABLE {self._schema.table} ADD COLUMN {name} {column_types[name]}')
+        backfilled_fields = [name for name in self._search_fields if f'{name}_lower' in missing_columns]
+        if backfilled_fields:
+            rows = connection.execute(f"SELECT id, {', '.join(backfilled_fields)} FROM {self._schema.table}").fetchall()
+            assignments = ', '.join(f'{name}_lower = ?' for name in backfilled_fields)
+            connection.executemany(
+                f'UPDATE {self._schema.table} SET {assignments} WHERE id = ?',
+                [tuple(_lowered(value) for value in row[1:]) + (row[0],) for row in rows],
+            )
+
+    def _values_for(self, fields):
+        values = tuple(fields.get(name) for name in self._field_names)
+        return values + tuple(_lowered(fields.get(name)) for name in self._search_fields)
+
+    def _row_to_record(self, row):
+        record = {'id': row[0]}
+        for name, value in zip(self._field_names, row[1:]):
+            if value is None:
+                continue
+            record[name] = bool(value) if name in self._boolean_fields else value
+        return record
+
+    def _next_version(self, connection):
+        """Следующая версия хранилища; вызывается внутри транзакции изменения."""
+        return connection.execute(self._SQL_NEXT_VERSION, (self._version_name,)).fetchall()[0][0]
+
+    def create(self, fields: dict) -> dict:
+        """Добавляет запись; ID выдает база. Возвращает запись вместе с 'id'."""
+        with self._pool.transaction() as connection:
+            version = self._next_version(connection)
+            cursor = connection.execute(self._sql_insert, self._values_for(fields) + (version,))
+        return {'id': cursor.lastrowid, **fields}
+
+    def create_many(self, fields_list) -> list:
+        """
+        Добавляет пачку записей одной транзакцией (см. InMemoryRecordStore.create_many).
+
+        Returns:
+            list[int]: ID созданных записей в том же порядке.
+        """
+        fields_list = list(fields_list)
+        if not fields_list:
+            return []
+        with self._pool.transaction() as connection:
+            # Пачка берет сразу len(fields_list) версий — по одной на запись, как при поштучном create.
+            last_version = connection.execute(
+                self._SQL_ADVANCE_VERSION, (self._version_name, len(fields_list))
+            ).fetchall()[0][0]
+            first_version = last_version - len(fields_list) + 1
+            connection.executemany(self._sql_insert, [
+                self._values_for(fields) + (first_version + offset,) for offset, fields in enumerate(fields_list)
+            ])
+            last_id = connection.execute('SELECT last_insert_rowid()').fetchone()[0]
+        # Транзакция на запись не пускает других писателей, а AUTOINCREMENT выдает ID по порядку,
+        # так что ID пачки идут подряд и заканчиваются последним вставленным.
+        return list(range(last_id - len(fields_list) + 1, last_id + 1))
+
+    def get(self, record_id: int):
+        """Возвращает запись по ID или None."""
+        with self._pool.connection() as connection:
+            row = connection.execute(self._sql_select_one, (record_id,)).fetchone()
+        return self._row_to_record(row) if row else None
+
+    def update(self, record_id: int, changes: dict):
+        """Применяет изменения к записи. Возвращает обновленную запись или None."""
+        changed_fields = [name for name in self._field_names if name in changes]
+        if not changed_fields:
+            return self.get(record_id)
+        changed_columns = changed_fields + [f'{name}_lower' for name in self._search_fields if name in changes]
+        values = [changes[name] for name in changed_fields]
+        values += [_lowered(changes[name]) for name in self._search_fields if name in changes]
+        assignments = ', '.join(f'{name} = ?' for name in changed_columns + ['version'])
+        # Набор изменяемых полей невелик, так что и вариантов запроса немного — все они попадут в кеш.
+        sql_update = f'UPDATE {self._schema.table} SET {assignments} WHERE id = ?'
+        with self._pool.transaction() as connection:
+            if not connection.execute(self._sql_exists, (record_id,)).fetchone():
+                return None
+            connection.execute(sql_update, values + [self._next_version(connection), record_id])
+            row = connection.execute(self._sql_select_one, (record_id,)).fetchone()
+        return self._row_to_record(row)
+
+    def delete(self, record_id: int) -> bool:
+        """Удаляет запись по ID. Возвращает True, если запись существовала."""
+        with self._pool.transaction() as connection:
+            if connection.execute(self._sql_delete, (record_id,)).rowcount == 0:
+                return False
+            connection.execute(self._sql_insert_deleted, (record_id, self._next_version(connection)))
+        return True
+
+    @property
+    def version(self) -> int:
+        """Текущая версия хранилища (общая для всех процессов)."""
+        with self._pool.connection() as connection:
+            row = connection.execute(self._SQL_CURRENT_VERSION, (self._version_name,)).fetchone()
+        return row[0] if row else 0
+
+    def changes_since(self, version: int):
+        """
+        Собирает изменения, сделанные после указанной версии (см. InMemoryRecordStore.changes_since).
+
+        Удаленные строки помнятся всегда, поэтому None возвращается только
+        для версии "из будущего".
+        """
+        with self._pool.read_transaction() as connection:
+            row = connection.execute(self._SQL_CURRENT_VERSION, (self._version_name,)).fetchone()
+            current_version = row[0] if row else 0
+            if version > current_version:
+                return None
+            changed_rows = connection.execute(self._sql_select_changed, (version,)).fetchall()
+            deleted_ids = [row[0] for row in connection.execute(self._sql_select_deleted, (version,))]
+        return RecordChanges(current_version, [self._row_to_record(row) for row in changed_rows], deleted_ids)
+
+    def wait_for_change(self, version: int, timeout: float) -> int:
+        """Ждет, пока версия хранилища не станет отличной от указанной (опросом базы)."""
+        deadline = time.monotonic() + timeout
+        while True:
+            current_version = self.version
+            remaining = deadline - time.monotonic()
+            if current_version != version or remaining <= 0:
+                return current_version
+            time.sleep(min(CHANGE_POLL_INTERVAL, remaining))
+
+    def random_record(self):
+        """
+        Возвращает случайную запись или None.
+
+        Выбирается первая запись с ID не меньше случайного числа — это один
+        проход по первичному ключу вместо ORDER BY random() по всей таблице.
+        При "дырах" в ID распределение немного неравномерно, для цитат это неважно.
+        """
+        with self._pool.connection() as connection:
+            row = connection.execute(self._sql_select_random).fetchone()
+        return self._row_to_record(row) if row else None
+
+    def all(self) -> list:
+        """Возвращает все записи списком в порядке добавления."""
+        return list(self)
+
+    def __iter__(self):
+        # Обход пачками по первичному ключу: соединение не удерживается между пачками.
+        last_seen_id = 0
+        while True:
+            with self._pool.connection() as connection:
+                rows = connection.execute(self._sql_select_batch, (last_seen_id, ITERATION_BATCH_SIZE)).fetchall()
+            for row in rows:
+                yield self._row_to_record(row)
+            if len(rows) < ITERATION_BATCH_SIZE:
+                return
+            last_seen_id = rows[-1][0]
+
+    def __len__(self):
+        with self._pool.connection() as connection:
+            return connection.execute(self._sql_count).fetchone()[0]
+
+    def __contains__(self, record_id):
+        with self._pool.connection() as connection:
+            return connection.execute(self._sql_exists, (record_id,)).fetchone() is not None
+
+
+class SQLiteCatalogStore(SQLiteRecordStore):
+    """
+    Хранилище каталога в SQLite с поиском по фильтрам и постраничной выдачей.
+
+    Тип и год ищутся по обычным индексам, жанр — по копии в нижнем регистре.
+    Для поиска по части названия, автора и режиссера используется
+    полнотекстовый индекс FTS5 с триграммным токенизатором: он находит
+    подстроки от трех символов без перебора таблицы. Более короткие
+    подстроки (и сборки SQLite без FTS5) ищутся через instr() по копиям
+    полей в нижнем регистре. Счетчики фасетов хранятся в отдельной таблице,
+    которую обновляют триггеры.
+    """
+
+    _SEARCH_COLUMNS = ('title_lower', 'author_lower', 'director_lower')
+    # Фасет -> пары (колонка, выражение значения; {row} — префикс строки вроде 'new.').
+    # Значение учитывается, если колонка заполнена.
+    _FACET_SOURCES = {
+        'type': (('type', '{row}type'),),
+        'genre': (('genre', '{row}genre'),),
+        'year': (('year', '{row}year'),),
+        'decade': (('year', '{row}year / 10 * 10'),),
+        'creator': (('author', '{row}author'), ('director', '{row}director')),
+    }
+
+    def __init__(self, pool, schema, initial_records=()):
+        super().__init__(pool, schema, initial_records)
+        self._search_table = f'{schema.table}_search'
+        self._has_full_text_search = self._create_search_table()
+        self._facet_table = f'{schema.table}_facets'
+        self._create_facet_table()
+        self._sql_select_prefix = f"SELECT {', '.join(('id',) + self._field_names)} FROM {schema.table}"
+        self._sql_top_facet_values = (
+            f"SELECT value, item_count FROM {self._facet_table} WHERE facet = ? "
+            f"ORDER BY item_count DESC, value LIMIT ?"
+        )
+
+    def _create_search_table(self):
+        table, search_table = self._schema.table, self._search_table
+        columns = ', '.join(self._SEARCH_COLUMNS)
+        new_values = ', '.join(f'new.{name}' for name in self._SEARCH_COLUMNS)
+        old_values = ', '.join(f'old.{name}' for name in self._SEARCH_COLUMNS)
+        try:
+            with self._pool.transaction() as connection:
+                already_exists = connection.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (search_table,)
+                ).fetchone()
+                connection.execute(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {search_table} USING fts5("
+                    f"{columns}, content='{table}', content_rowid='id', tokenize='trigram')"
+                )
+                # Индекс поддерживают триггеры, так что он не расходится с таблицей ни в одном процессе.
+                connection.execute(
+                    f"CREATE TRIGGER IF NOT EXISTS {search_table}_after_insert AFTER INSERT ON {table} BEGIN "
+                    f"INSERT INTO {search_table} (rowid, {columns}) VALUES (new.id, {new_values}); END"
+                )
+                connection.execute(
+                    f"CREATE TRIGGER IF NOT EXISTS {search_table}_after_delete AFTER DELETE ON {table} BEGIN "
+                    f"INSERT INTO {search_table} ({search_table}, rowid, {columns}) "
+                    f"VALUES ('delete', old.id, {old_values}); END"
+                )
+                connection.execute(
+                    f"CREATE TRIGGER IF NOT EXISTS {search_table}_after_update AFTER UPDATE ON {table} BEGIN "
+                    f"INSERT INTO {search_table} ({search_table}, rowid, {columns}) "
+                    f"VALUES ('delete', old.id, {old_values}); "
+                    f"INSERT INTO {search_table} (rowid, {columns}) VALUES (new.id, {new_values}); END"
+                )
+                if not already_exists:
+                    # Индекс создан для уже заполненной таблицы — строим его по существующим строкам.
+                    connection.execute(f"INSERT INTO {search_table} ({search_table}) VALUES ('rebuild')")
+        except sqlite3.OperationalError:
+            # SQLite собран без FTS5 или без триграммного токенизатора (версии до 3.34).
+            return False
+        return True
+
+    def _facet_sources(self, row_prefix=''):
+        """Тройки (фасет, условие заполненности, выражение значения) для строки row_prefix (например, 'new.')."""
+        for facet, sources in self._FACET_SOURCES.items():
+            for column, expression in sources:
+                condition = f"{row_prefix}{column} IS NOT NULL AND {row_prefix}{column} != ''"
+                yield facet, condition, expression.format(row=row_prefix)
+
+    def _create_facet_table(self):
+        """Таблица счетчиков фасетов и триггеры, которые обновляют ее при каждом изменении каталога."""
+        table, facet_table = self._schema.table, self._facet_table
+        # Счетчики обновляются теми же транзакциями, что и строки каталога, поэтому во всех процессах
+        # они совпадают с таблицей, а фасеты всего каталога читаются без перебора строк.
+        increments = ' '.join(
+            f"INSERT INTO {facet_table} (facet, value, item_count) SELECT '{facet}', {expression}, 1 "
+            f"WHERE {condition} ON CONFLICT (facet, value) DO UPDATE SET item_count = item_count + 1;"
+            for facet, condition, expression in self._facet_sources('new.')
+        )
+        decrements = ' '.join(
+            f"UPDATE {facet_table} SET item_count = item_count - 1 "
+            f"WHERE facet = '{facet}' AND value = {expression} AND {condition}; "
+            f"DELETE FROM {facet_table} WHERE facet = '{facet}' AND value = {expression} AND item_count <= 0;"
+            for facet, condition, expression in self._facet_sources('old.')
+        )
+        counted_columns = ', '.join(sorted({column for sources in self._FACET_SOURCES.values()
+                                           for column, _ in sources}))
+        with self._pool.transaction() as connection:
+            already_exists = connection.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (facet_table,)
+            ).fetchone()
+            connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {facet_table} ("
+                f"facet TEXT NOT NULL, value NOT NULL, item_count INTEGER NOT NULL, "
+                f"PRIMARY KEY (facet, value)) WITHOUT ROWID"
+            )
+            connection.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {facet_table}_after_insert AFTER INSERT ON {table} "
+                f"BEGIN {increments} END"
+            )
+            connection.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {facet_table}_after_delete AFTER DELETE ON {table} "
+                f"BEGIN {decrements} END"
+            )
+            connection.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {facet_table}_after_update AFTER UPDATE OF {counted_columns} "
+                f"ON {table} BEGIN {decrements} {increments} END"
+            )
+            if not already_exists:
+                # Таблица счетчиков создана для уже заполненного каталога — считаем существующие строки.
+                connection.execute(
+                    f"INSERT INTO {facet_table} (facet, value, item_count) "
+                    f"SELECT facet, value, COUNT(*) FROM ("
+                    + ' UNION ALL '.join(
+                        f"SELECT '{facet}' AS facet, {expression} AS value FROM {table} WHERE {condition}"
+                        for facet, condition, expression in self._facet_sources()
+                    )
+                    + ") GROUP BY facet, value"
+                )
+
+    def _substring_condition(self, columns, needle):
+        """Условие WHERE и параметры для поиска подстроки в одной или нескольких колонках."""
+        if self._has_full_text_search and len(needle) >= 3:
+            # Фраза в кавычках для триграммного токенизатора означает "подстрока"; кавычки внутри удваиваются.
+            phrase = '"' + needle.replace('"', '""') + '"'
+            column_filter = '{' + ' '.join(columns) + '}'
+            return (f'id IN (SELECT rowid FROM {self._search_table} WHERE {self._search_table} MATCH ?)',
+                    [f'{column_filter} : {phrase}'])
+        return '(' + ' OR '.join(f'instr({column}, ?) > 0' for column in columns) + ')', [needle] * len(columns)
+
+    def _filter_conditions(self, catalog_query):
+        """Условия WHERE и параметры для фильтров запроса (без курсора)."""
+        conditions, parameters = [], []
+        if catalog_query.type:
+            conditions.append('type = ?')
+            parameters.append(catalog_query.type)
+        if catalog_query.year is not None:
+            conditions.append('year = ?')
+            parameters.append(catalog_query.year)
+        if catalog_query.genre:
+            conditions.append('instr(genre_lower, ?) > 0')
+            parameters.append(catalog_query.genre)
+        for field in ('title', 'author', 'director'):
+            needle = getattr(catalog_query, field)
+            if needle:
+                condition, condition_parameters = self._substring_condition((f'{field}_lower',), needle)
+                conditions.append(condition)
+                parameters.extend(condition_parameters)
+        if catalog_query.creator:
+            condition, condition_parameters = self._substring_condition(
+                ('author_lower', 'director_lower'), catalog_query.creator
+            )
+            conditions.append(condition)
+            parameters.extend(condition_parameters)
+        return conditions, parameters
+
+    def query(self, catalog_query):
+        """
+        Выполняет запрос к каталогу одним SQL-запросом.
+
+        Returns:
+            tuple[list[dict], int | None]: Элементы страницы и курсор следующей страницы.
+        """
+        conditions, parameters = self._filter_conditions(catalog_query)
+        conditions.insert(0, 'id > ?')
+        parameters.insert(0, catalog_query.after_id)
+        sql = f"{self._sql_select_prefix} WHERE {' AND '.join(conditions)} ORDER BY id"
+        page_size = catalog_query.limit
+        if page_size is not None:
+            # Берем на одну запись больше, чтобы понять, есть ли следующая страница.
+            sql += ' LIMIT ?'
+            parameters.append(page_size + 1)
+        with self._pool.connection() as connection:
+            rows = connection.execute(sql, parameters).fetchall()
+
+        items = [self._row_to_record(row) for row in rows]
+        if page_size is not None and len(items) > page_size:
+            items = items[:page_size]
+            return items, items[-1]['id']
+        return items, None
+
+    def facets(self, catalog_query, facet_names=CATALOG_FACETS, limit: int = CATALOG_FACET_DEFAULT_LIMIT) -> dict:
+        """
+        Считает фасеты элементов, подходящих под фильтры запроса (см. InMemoryCatalogStore.facets).
+
+        Без фильтров читаются счетчики из таблицы фасетов, с фильтрами — GROUP BY по подходящим строкам.
+        """
+        conditions, parameters = self._filter_conditions(catalog_query)
+        table = self._schema.table
+        result = {}
+        with self._pool.connection() as connection:
+            if not conditions:
+                total = connection.execute(self._sql_count).fetchone()[0]
+                for facet in facet_names:
+                    rows = connection.execute(self._sql_top_facet_values, (facet, limit)).fetchall()
+                    result[facet] = [{'value': value, 'count': count} for value, count in rows]
+                return {'total': total, 'facets': result}
+
+            where = ' AND '.join(conditions)
+            total = connection.execute(f'SELECT COUNT(*) FROM {table} WHERE {where}', parameters).fetchone()[0]
+            for facet in facet_names:
+                sources = [(condition, expression) for source_facet, condition, expression in self._facet_sources()
+                           if source_facet == facet]
+                values_sql = ' UNION ALL '.join(
+                    f'SELECT {expression} AS value FROM {table} WHERE {where} AND {condition}'
+                    for condition, expression in sources
+                )
+                rows = connection.execute(
+                    f'SELECT value, COUNT(*) AS item_count FROM ({values_sql}) '
+                    f'GROUP BY value ORDER BY item_count DESC, value LIMIT ?',
+                    parameters * len(sources) + [limit],
+                ).fetchall()
+                result[facet] = [{'value': value, 'count': count} for value, count in rows]
+        return {'total': total, 'facets': result}
+
+
+class SQLiteShortUrlStore:
+    """
+    Хранилище коротких ссылок в SQLite с тем же интерфейсом, что и ShortUrlStore.
+
+    Прямой поиск идет по уникальному индексу на коде, обратный —
+    по индексу на нормализованном URL.
+
+    Истекшие ссылки не выдаются сразу (срок сверяется при чтении), а из базы
+    удаляются одним DELETE по частичному индексу на expires_at — раз в
+    EXPIRED_SHORT_URLS_PURGE_INTERVAL секунд и при срабатывании таймеров.
+    Таймеры (колесо из expiry.py) процесс ставит на ссылки со сроком,
+    которые он создал или прочитал: по ним уведомляются слушатели удаления,
+    например кеш готовых редиректов. Лимита числа записей и вытеснения здесь
+    нет: ссылки лежат на диске, а не в памяти процесса.
+    """
+
+    _SQL_GET = 'SELECT long_url, expires_at FROM short_urls WHERE code = ?'
+    _SQL_FIND_CODE = (
+        'SELECT code FROM short_urls WHERE normalized_url = ? AND expires_at IS NULL ORDER BY id LIMIT 1'
+    )
+    _SQL_INSERT = 'INSERT INTO short_urls (code, long_url, normalized_url, expires_at) VALUES (?, ?, ?, ?)'
+    _SQL_ITEMS = 'SELECT code, long_url FROM short_urls WHERE expires_at IS NULL OR expires_at > ? ORDER BY id'
+    _SQL_COUNT = 'SELECT COUNT(*) FROM short_urls'
+    _SQL_PURGE_EXPIRED = 'DELETE FROM short_urls WHERE expires_at IS NOT NULL AND expires_at <= ?'
+
+    def __init__(self, pool, clock=time.time):
+        self._pool = pool
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._expiry_wheel = HierarchicalTimingWheel(clock())
+        self._expires_at_by_code = {}
+        self._removal_listeners = []
+        self._next_purge_at = 0.0
+        with self._pool.transaction() as connection:
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS short_urls ('
+                'id INTEGER PRIMARY KEY, code TEXT NOT NULL UNIQUE, '
+                'long_url TEXT NOT NULL, normalized_url TEXT NOT NULL, expires_at REAL)'
+            )
+            existing_columns = {row[1] for row in connection.execute('PRAGMA table_info(short_urls)')}
+            if 'expires_at' not in existing_columns:
+                # Таблица создана прежней версией схемы: все ее ссылки бессрочные.
+                connection.execute('ALTER TABLE short_urls ADD COLUMN expires_at REAL')
+            connection.execute(
+                'CREATE INDEX IF NOT EXISTS idx_short_urls_normalized_url ON short_urls (normalized_url)'
+            )
+            connection.execute(
+                'CREATE INDEX IF NOT EXISTS idx_short_urls_expires_at ON short_urls (expires_at) '
+                'WHERE expires_at IS NOT NULL'
+            )
+
+    def add_removal_listener(self, listener):
+        """Регистрирует функцию listener(код), вызываемую при истечении ссылки, известной процессу."""
+        self._removal_listeners.append(listener)
+
+    def _track_expiry(self, short_code, expires_at):
+        with self._lock:
+            if short_code not in self._expires_at_by_code:
+                self._expires_at_by_code[short_code] = expires_at
+                self._expiry_wheel.schedule(short_code, expires_at)
+
+    def get(self, short_code: str):
+        """Возвращает оригинальный URL по короткому коду или None (в том числе для истекших ссылок)."""
+        with self._pool.connection() as connection:
+            row = connection.execute(self._SQL_GET, (short_code,)).fetchone()
+        if not row:
+            return None
+        long_url, expires_at = row
+        if expires_at is not None:
+            if expires_at <= self._clock():
+                return None
+            self._track_expiry(short_code, expires_at)
+        return long_url
+
+    def touch(self, short_code: str) -> bool:
+        """
+        Попутно удаляет истекшие ссылки (не чаще раза в тик колеса).
+
+        Returns:
+            bool: False, если процессу известно, что срок ссылки истек.
+        """
+        now = self._clock()
+        if short_code in self.remove_expired(now):
+            return False
+        expires_at = self._expires_at_by_code.get(short_code)
+        return expires_at is None or expires_at > now
+
+    def expires_at(self, short_code: str):
+        """Момент истечения ссылки (секунды UNIX) или None для бессрочной."""
+        with self._pool.connection() as connection:
+            row = connection.execute(self._SQL_GET, (short_code,)).fetchone()
+        return row[1] if row else None
+
+    def find_code(self, long_url: str):
+        """Возвращает уже выданный бессрочный код для URL (с учетом нормализации) или None."""
+        with self._pool.connection() as connection:
+            row = connection.execute(self._SQL_FIND_CODE, (normalize_url(long_url),)).fetchone()
+        return row[0] if row else None
+
+    def add(self, short_code: str, long_url: str, expires_at: float = None):
+        """
+        Сохраняет соответствие кода и URL.
+
+        Args:
+            short_code (str): Короткий код.
+            long_url (str): Оригинальный URL.
+            expires_at (float | None): Момент истечения (секунды UNIX) или None.
+
+        Raises:
+            ValueError: Если код уже занят.
+        """
+        try:
+            with self._pool.connection() as connection:
+                connection.execute(self._SQL_INSERT, (short_code, long_url, normalize_url(long_url), expires_at))
+        except sqlite3.IntegrityError:
+            raise ValueError(f"Короткий код '{short_code}' уже занят.") from None
+        if expires_at is not None:
+            self._track_expiry(short_code, expires_at)
+
+    def remove_expired(self, now: float = None):
+        """
+        Снимает сработавшие таймеры и при необходимости удаляет истекшие ссылки из базы.
+
+        Returns:
+            list: Коды, чьи таймеры сработали.
+        """
+        now = self._clock() if now is None else now
+        with self._lock:
+            expired_codes = self._expiry_wheel.advance(now)
+            for short_code in expired_codes:
+                del self._expires_at_by_code[short_code]
+            purge_due = bool(expired_codes) or now >= self._next_purge_at
+            if purge_due:
+                self._next_purge_at = now + EXPIRED_SHORT_URLS_PURGE_INTERVAL
+        if purge_due:
+            with self._pool.connection() as connection:
+                connection.execute(self._SQL_PURGE_EXPIRED, (now,))
+        for short_code in expired_codes:
+            for listener in self._removal_listeners:
+                listener(short_code)
+        return expired_codes
+
+    def items(self):
+        """Пары (код, URL) действующих ссылок в порядке создания."""
+        with self._pool.connection() as connection:
+            return connection.execute(self._SQL_ITEMS, (self._clock(),)).fetchall()
+
+    def __contains__(self, short_code):
+        return self.get(short_code) is not None
+
+    def __len__(self):
+        with self._pool.connection() as connection:
+            return connection.execute(self._SQL_COUNT).fetchone()[0]
+
+
+class SQLiteClickStats:
+    """
+    Почасовая статистика переходов в SQLite с тем же интерфейсом, что и InMemoryClickStats.
+
+    Корзины (код, час) общие для всех процессов: каждый воркер добавляет
+    свои переходы к ним через UPSERT, поэтому статистика одинакова, какой
+    бы воркер ни ответил на запрос. Старые корзины не удаляются.
+    """
+
+    _SQL_ADD = (
+        'INSERT INTO short_url_clicks (code, hour, clicks) VALUES (?, ?, ?) '
+        'ON CONFLICT (code, hour) DO UPDATE SET clicks = clicks + excluded.clicks'
+    )
+    _SQL_HOURLY = 'SELECT hour, clicks FROM short_url_clicks WHERE code = ? AND hour >= ? ORDER BY hour'
+    _SQL_TOTAL = 'SELECT COALESCE(SUM(clicks), 0) FROM short_url_clicks WHERE code = ?'
+
+    def __init__(self, pool):
+        self._pool = pool
+        with self._pool.connection() as connection:
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS short_url_clicks ('
+                'code TEXT NOT NULL, hour INTEGER NOT NULL, clicks INTEGER NOT NULL, '
+                'PRIMARY KEY (code, hour)) WITHOUT ROWID'
+            )
+
+    def add_clicks(self, counts: dict):
+        """Добавляет пачку переходов ((код, час) -> число) одной транзакцией."""
+        with self._pool.transaction() as connection:
+            connection.executemany(
+                self._SQL_ADD, [(short_code, hour, clicks) for (short_code, hour), clicks in counts.items()]
+            )
+
+    def hourly_clicks(self, short_code: str, from_hour: int) -> list:
+        """Непустые корзины кода начиная с часа from_hour: список пар (час, переходы)."""
+        with self._pool.connection() as connection:
+            return connection.execute(self._SQL_HOURLY, (short_code, from_hour)).fetchall()
+
+    def total_clicks(self, short_code: str) -> int:
+        """Число переходов по коду за все время."""
+        with self._pool.connection() as connection:
+            return connection.execute(self._SQL_TOTAL, (short_code,)).fetchone()[0]
+
+
+class SQLiteSequence:
+    """Именованная последовательность номеров 0, 1, 2, ..., общая для всех процессов."""
+
+    # Атомарное "увеличить и вернуть" одним запросом (UPSERT ... RETURNING, SQLite >= 3.35).
+    _SQL_NEXT = (
+        'INSERT INTO sequences (name, value) VALUES (?, 1) '
+        'ON CONFLICT (name) DO UPDATE SET value = value + 1 RETURNING value - 1'
+    )
+    _SQL_CURRENT = 'SELECT value FROM sequences WHERE name = ?'
+
+    def __init__(self, pool, name: str):
+        # Таблицу sequences создает SQLiteDatabase.
+        self._pool = pool
+        self._name = name
+
+    def next_value(self) -> int:
+        """Выдает следующий номер."""
+        with self._pool.connection() as connection:
+            # fetchall() доводит запрос до конца, иначе автокоммит не завершится.
+            return connection.execute(self._SQL_NEXT, (self._name,)).fetchall()[0][0]
+
+    def current_value(self) -> int:
+        """Сколько номеров уже выдано."""
+        with self._pool.connection() as connection:
+            row = connection.execute(self._SQL_CURRENT, (self._name,)).fetchone()
+        return row[0] if row else 0
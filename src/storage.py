@@ -0,0 +1,824 @@
+"""
+Хранилища данных для сервисов портала.
+
+Здесь собраны структуры данных, на которые опираются API-обработчики из app.py.
+Каждое хранилище прячет за небольшим набором методов детали того, как именно
+лежат записи, — так обработчикам не нужно знать, словарь это в памяти процесса
+или таблица базы данных.
+
+Поддерживаются три бэкенда (выбираются функцией `create_storage`):
+- 'memory' — всё хранится в памяти процесса и теряется при перезапуске;
+- 'journal' — те же хранилища в памяти, но каждое изменение дописывается
+  в журнал на диске, а состояние периодически сохраняется снимком
+  (см. journal_storage.py): данные переживают перезапуск одного процесса;
+- 'sqlite' — данные лежат в файле SQLite (см. sqlite_storage.py), переживают
+  перезапуск и могут разделяться несколькими процессами-воркерами.
+"""
+import itertools
+import operator
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass
+from urllib.parse import urlsplit, urlunsplit
+
+from catalog_query import (
+    CATALOG_FACET_DEFAULT_LIMIT, CATALOG_FACETS, CATALOG_INDEXED_COLUMNS, CatalogFacetCounts, CatalogIndex,
+)
+from expiry import HierarchicalTimingWheel, create_eviction_policy
+from records import DictLayout, RecordLayout
+
+# Порты по умолчанию, которые не влияют на адрес и отбрасываются при нормализации URL.
+_DEFAULT_PORTS = {'http': ':80', 'https': ':443'}
+# Сколько последних изменений помнит хранилище в памяти для выдачи "дельт".
+CHANGE_LOG_LIMIT = 10_000
+# Число "полос" блокировок записей: изменения записей из разных полос не ждут друг друга.
+RECORD_LOCK_STRIPES = 64
+# Сколько часов почасовой статистики переходов хранить в памяти (неделя).
+CLICK_STATS_RETENTION_HOURS = 7 * 24
+
+
+@dataclass(frozen=True)
+class RecordSchema:
+    """
+    Описание набора записей: имя таблицы, типы полей и индексы.
+
+    SQLite-бэкенд строит по схеме таблицу, бэкенд в памяти — класс
+    компактных записей (см. records.py).
+
+    Attributes:
+        table (str): Имя таблицы.
+        fields (dict): Поле -> тип ('text', 'integer' или 'boolean'), без 'id'.
+        indexed_fields (tuple): Поля, по которым нужен вторичный индекс.
+        search_fields (tuple): Текстовые поля, для которых хранится заранее
+            вычисленная копия в нижнем регистре (для поиска без учета регистра).
+        interned_fields (tuple): Поля с небольшим набором значений, которые
+            бэкенд в памяти хранит одним объектом на значение.
+    """
+    table: str
+    fields: dict
+    indexed_fields: tuple = ()
+    search_fields: tuple = ()
+    interned_fields: tuple = ()
+
+
+TASKS_SCHEMA = RecordSchema('tasks', {'text': 'text', 'done': 'boolean'})
+QUOTES_SCHEMA = RecordSchema('quotes', {'text': 'text', 'author': 'text'})
+CATALOG_SCHEMA = RecordSchema(
+    'catalog_items',
+    {'type': 'text', 'title': 'text', 'year': 'integer', 'genre': 'text', 'author': 'text', 'director': 'text'},
+    indexed_fields=('type', 'year', 'genre'),
+    search_fields=('title', 'author', 'director', 'genre'),
+    interned_fields=('type', 'year', 'genre'),
+)
+
+
+@dataclass(frozen=True)
+class RecordChanges:
+    """
+    Изменения хранилища после некоторой версии.
+
+    Attributes:
+        version (int): Текущая версия хранилища (с нее запрашивать следующую дельту).
+        changed (list): Созданные или измененные записи в порядке изменения.
+        deleted_ids (list): ID удаленных записей.
+    """
+    version: int
+    changed: list
+    deleted_ids: list
+
+
+class InMemoryRecordStore:
+    """
+    Хранилище записей (словарей с полем 'id') с доступом по ID за O(1).
+
+    Записи лежат в словаре ``{id: запись}``. Начиная с Python 3.7 словарь
+    сохраняет порядок вставки, поэтому он одновременно служит и индексом
+    по ID, и упорядоченным списком: выдача всех записей идёт в порядке
+    добавления, а удаление одной записи не требует перестройки коллекции.
+    Для выбора случайной записи за O(1) дополнительно ведется плотный
+    массив ID (удаление из него — перестановкой последнего элемента).
+
+    Каждое изменение (создание, изменение, удаление) увеличивает версию
+    хранилища и попадает в журнал изменений: словарь ``{id: (версия, удалена)}``,
+    где запись при повторном изменении переносится в конец. Так журнал
+    упорядочен по версиям, дельта "после версии N" собирается обходом
+    с конца за время, пропорциональное ее размеру, а сам журнал хранит не
+    больше одной строки на запись и не больше CHANGE_LOG_LIMIT строк.
+
+    Хранилище потокобезопасно и рассчитано на многопоточный WSGI-сервер:
+    - ID выдает itertools.count — в CPython next() для него атомарен, так
+      что два потока никогда не получат один ID и не ждут друг друга;
+    - запись не изменяется на месте: update собирает новый словарь и
+      подменяет им старый (copy-on-write). Читатели берут записи без
+      блокировок и всегда видят целую версию записи, а ранее выданный
+      словарь не меняется, пока его, например, сериализуют в JSON;
+    - изменения одной записи упорядочены блокировкой ее "полосы"
+      (RECORD_LOCK_STRIPES блокировок по ID), а короткая общая блокировка
+      берется только на вставку и удаление — ради плотного массива ID;
+    - коллекция целиком никогда не перестраивается: all() и обход
+      копируют список ссылок на записи, а не сами записи.
+
+    Если задана схема, записи хранятся компактно — именованными кортежами
+    с интернированными значениями перечислимых полей (см. records.py), —
+    и превращаются в словари только на выходе из хранилища.
+    """
+
+    def __init__(self, initial_records=(), next_id=None, schema: RecordSchema = None):
+        """
+        Args:
+            initial_records: Начальные записи (каждая обязана содержать 'id').
+            next_id (int | None): Следующий свободный ID. Если не указан,
+                вычисляется как максимальный ID начальных записей + 1.
+            schema (RecordSchema | None): Схема записей для компактного хранения.
+                Без схемы записи хранятся словарями как есть.
+        """
+        if schema is None:
+            self._layout = DictLayout()
+        else:
+            self._layout = RecordLayout(schema.table, schema.fields, schema.interned_fields)
+        self._records = {}
+        self._dense_ids = []
+        self._dense_positions = {}
+        self._structure_lock = threading.Lock()
+        self._record_locks = [threading.Lock() for _ in range(RECORD_LOCK_STRIPES)]
+        for record in initial_records:
+            self._insert(record['id'], self._layout.pack(record))
+        if next_id is None:
+            next_id = max(self._records, default=0) + 1
+        self._id_counter = itertools.count(next_id)
+        # Начальные записи относятся к версии 0 и в журнал изменений не попадают.
+        self._version = 0
+        self._change_log = {}
+        # Самая поздняя версия, вытесненная из журнала: дельту до нее собрать уже нельзя.
+        self._change_log_floor = 0
+        self._changed = threading.Condition()
+
+    def _record_change(self, record_id, deleted=False):
+        """Увеличивает версию хранилища и отмечает изменение записи в журнале."""
+        with self._changed:
+            self._version += 1
+            change_log = self._change_log
+            change_log.pop(record_id, None)
+            change_log[record_id] = (self._version, deleted)
+            if len(change_log) > CHANGE_LOG_LIMIT:
+                oldest_id = next(iter(change_log))
+                self._change_log_floor = change_log.pop(oldest_id)[0]
+            self._changed.notify_all()
+
+    def _record_creations(self, record_ids):
+        """Как _record_change для пачки новых записей: версия растет на их число, ожидающие будятся один раз."""
+        with self._changed:
+            change_log = self._change_log
+            version = self._version
+            for record_id in record_ids:
+                version += 1
+                change_log[record_id] = (version, False)
+            self._version = version
+            excess = len(change_log) - CHANGE_LOG_LIMIT
+            if excess > 0:
+                # Самые старые строки вытесняются за один проход: начало словаря после удалений
+                # состоит из пустых ячеек, и искать первую строку заново для каждой было бы квадратично.
+                for oldest_id in list(itertools.islice(change_log, excess)):
+                    self._change_log_floor = change_log.pop(oldest_id)[0]
+            self._changed.notify_all()
+
+    @property
+    def version(self) -> int:
+        """Текущая версия хранилища: растет на 1 при каждом изменении."""
+        return self._version
+
+    def changes_since(self, version: int):
+        """
+        Собирает изменения, сделанные после указанной версии.
+
+        Args:
+            version (int): Версия, которую уже видел клиент.
+
+        Returns:
+            RecordChanges | None: Изменения или None, если дельту собрать нельзя
+            (версия старше журнала или из будущего, например после перезапуска
+            сервера) — тогда клиенту нужно перечитать все записи.
+        """
+        with self._changed:
+            if version > self._version or version < self._change_log_floor:
+                return None
+            changed_ids, deleted_ids = [], []
+            for record_id, (change_version, deleted) in reversed(self._change_log.items()):
+                if change_version <= version:
+                    break
+                (deleted_ids if deleted else changed_ids).append(record_id)
+            # Запись могли удалить, но еще не отметить в журнале: удаление придет со следующей дельтой.
+            changed = [self._records.get(record_id) for record_id in reversed(changed_ids)]
+            return RecordChanges(
+                self._version,
+                [self._layout.to_dict(record) for record in changed if record is not None],
+                deleted_ids[::-1],
+            )
+
+    def wait_for_change(self, version: int, timeout: float) -> int:
+        """
+        Ждет, пока версия хранилища не станет отличной от указанной.
+
+        Returns:
+            int: Текущая версия (равна `version`, если за timeout секунд изменений не было).
+        """
+        with self._changed:
+            self._changed.wait_for(lambda: self._version != version, timeout)
+            return self._version
+
+    def _record_lock(self, record_id):
+        return self._record_locks[hash(record_id) % RECORD_LOCK_STRIPES]
+
+    def _restore(self, record_ids, records, next_id: int, version: int):
+        """
+        Заменяет содержимое хранилища записями из снимка (до начала работы).
+
+        Записи не проходят через pack по одной: словари и плотный массив ID
+        строятся целиком, поэтому миллион записей загружается за доли секунды.
+
+        Args:
+            record_ids (list): ID записей в порядке добавления.
+            records (list): Записи в том же порядке — уже в представлении
+                хранилища (кортежи полей схемы или словари).
+            next_id (int): Следующий свободный ID.
+            version (int): Версия хранилища на момент снимка. Журнал изменений
+                не сохраняется, поэтому дельты до этой версии собрать нельзя.
+        """
+        self._records = dict(zip(record_ids, records))
+        self._dense_ids = list(record_ids)
+        self._dense_positions = dict(zip(record_ids, range(len(record_ids))))
+        self._id_counter = itertools.count(next_id)
+        self._version = version
+        self._change_log = {}
+        self._change_log_floor = version
+
+    def _insert(self, record_id, record):
+        """Вставляет новую запись; вызывается под общей блокировкой (или до начала работы)."""
+        self._records[record_id] = record
+        self._dense_positions[record_id] = len(self._dense_ids)
+        self._dense_ids.append(record_id)
+
+    def _insert_many(self, record_ids, records, fields_list):
+        """
+        Вставляет пачку новых записей — как _insert для каждой, но целиком на C.
+
+        fields_list — поля тех же записей исходными словарями (без 'id'): по ним
+        подклассы обновляют свои индексы, не собирая словари из записей заново.
+        Подкласс, переопределяющий _insert, переопределяет и этот метод.
+        """
+        self._records.update(zip(record_ids, records))
+        dense_ids = self._dense_ids
+        first_position = len(dense_ids)
+        self._dense_positions.update(zip(record_ids, range(first_position, first_position + len(record_ids))))
+        dense_ids.extend(record_ids)
+
+    def _replace(self, record_id, old_record, new_record):
+        """Подменяет запись новой версией; вызывается под блокировкой полосы записи."""
+        self._records[record_id] = new_record
+
+    def _remove(self, record_id):
+        """Удаляет запись; вызывается под общей блокировкой. Возвращает удаленную запись или None."""
+        record = self._records.pop(record_id, None)
+        if record is None:
+            return None
+        # Переносим последний ID на место удаленного, чтобы массив оставался плотным.
+        position = self._dense_positions.pop(record_id)
+        last_id = self._dense_ids.pop()
+        if last_id != record_id:
+            self._dense_ids[position] = last_id
+            self._dense_positions[last_id] = position
+        return record
+
+    def create(self, fields: dict) -> dict:
+        """
+        Добавляет новую запись, присваивая ей очередной ID.
+
+        Args:
+            fields (dict): Поля записи (без 'id').
+
+        Returns:
+            dict: Созданная запись вместе с присвоенным 'id'.
+        """
+        record_id = next(self._id_counter)
+        new_record = self._layout.pack({**fields, 'id': record_id})
+        with self._structure_lock:
+            self._insert(record_id, new_record)
+        self._record_change(record_id)
+        return self._layout.to_dict(new_record)
+
+    def create_many(self, fields_list) -> list:
+        """
+        Добавляет пачку записей (например, при пакетной загрузке).
+
+        Общая блокировка берется один раз на пачку, а журнал изменений и
+        ожидающие изменений потоки обновляются одним заходом.
+
+        Args:
+            fields_list: Поля записей (без 'id').
+
+        Returns:
+            list[int]: ID созданных записей в том же порядке.
+        """
+        fields_list = list(fields_list)
+        pack_new = self._layout.pack_new
+        id_counter = self._id_counter
+        created_ids, new_records = [], []
+        for fields in fields_list:
+            record_id = next(id_counter)
+            created_ids.append(record_id)
+            new_records.append(pack_new(record_id, fields))
+        with self._structure_lock:
+            self._insert_many(created_ids, new_records, fields_list)
+        self._record_creations(created_ids)
+        return created_ids
+
+    def get(self, record_id: int):
+        """Возвращает запись по ID или None, если такой записи нет."""
+        record = self._records.get(record_id)
+        return None if record is None else self._layout.to_dict(record)
+
+    def update(self, record_id: int, changes: dict):
+        """
+        Применяет изменения к существующей записи.
+
+        Запись не меняется на месте: хранилище сохраняет новый словарь.
+
+        Args:
+            record_id (int): ID изменяемой записи.
+            changes (dict): Новые значения полей.
+
+        Returns:
+            dict | None: Обновлённая запись или None, если запись не найдена.
+        """
+        with self._record_lock(record_id):
+            record = self._records.get(record_id)
+            if record is None:
+                return None
+            updated_record = self._layout.replace(record, changes)
+            self._replace(record_id, record, updated_record)
+            self._record_change(record_id)
+        return self._layout.to_dict(updated_record)
+
+    def delete(self, record_id: int) -> bool:
+        """Удаляет запись по ID. Возвращает True, если запись существовала."""
+        with self._record_lock(record_id):
+            with self._structure_lock:
+                if self._remove(record_id) is None:
+                    return False
+            self._record_change(record_id, deleted=True)
+        return True
+
+    def random_record(self):
+        """Возвращает случайную запись или None, если хранилище пусто."""
+        while self._dense_ids:
+            try:
+                record = self._records.get(random.choice(self._dense_ids))
+            except IndexError:
+                # Массив укоротился между выбором позиции и чтением — пробуем снова.
+                continue
+            if record is not None:
+                return self._layout.to_dict(record)
+        return None
+
+    def all(self) -> list:
+        """Возвращает все записи списком в порядке их добавления."""
+        return list(map(self._layout.to_dict, list(self._records.values())))
+
+    def __iter__(self):
+        # Обходим снимок (список ссылок на записи), чтобы параллельные изменения
+        # хранилища не прерывали обход, например, во время потоковой выдачи.
+        # Словари для выдачи собираются лениво, по мере обхода.
+        return map(self._layout.to_dict, list(self._records.values()))
+
+    def __len__(self):
+        return len(self._records)
+
+    def __contains__(self, record_id):
+        return record_id in self._records
+
+
+class InMemoryCatalogStore(InMemoryRecordStore):
+    """
+    Хранилище каталога в памяти с поисковыми индексами (см. catalog_query.py).
+
+    Индексы (и счетчики фасетов) обновляются при каждом изменении, поэтому
+    запрос с фильтрами не перебирает весь каталог.
+    """
+
+    def __init__(self, initial_records=(), next_id=None, schema: RecordSchema = None):
+        self._index = CatalogIndex()
+        super().__init__(initial_records, next_id, schema)
+
+    def _insert(self, record_id, record):
+        super()._insert(record_id, record)
+        self._index.add(self._layout.to_dict(record))
+
+    def _insert_many(self, record_ids, records, fields_list):
+        super()._insert_many(record_ids, records, fields_list)
+        self._index.add_many(record_ids, fields_list)
+
+    def _replace(self, record_id, old_record, new_record):
+        # Индексы общие для всех записей, поэтому их правка идет под общей блокировкой.
+        with self._structure_lock:
+            self._index.remove(self._layout.to_dict(old_record))
+            super()._replace(record_id, old_record, new_record)
+            self._index.add(self._layout.to_dict(new_record))
+
+    def _remove(self, record_id):
+        record = super()._remove(record_id)
+        if record is not None:
+            self._index.remove(self._layout.to_dict(record))
+        return record
+
+    def _restore(self, record_ids, records, next_id: int, version: int):
+        super()._restore(record_ids, records, next_id, version)
+        self._index = CatalogIndex()
+        if isinstance(self._layout, RecordLayout):
+            # Индексы строятся по столбцам: транспонирование кортежей идет целиком на C.
+            columns = dict(zip(self._layout.field_names, zip(*records))) if records else {}
+        else:
+            columns = {field: [record.get(field) for record in records] for field in CATALOG_INDEXED_COLUMNS}
+        self._index.load_columns(record_ids, columns)
+
+    def query(self, catalog_query):
+        """
+        Выполняет запрос к каталогу.
+
+        Args:
+            catalog_query (CatalogQuery): Фильтры, курсор и размер страницы.
+
+        Returns:
+            tuple[list[dict], int | None]: Элементы страницы и курсор следующей страницы.
+        """
+        # Поиск читает множества индексов, которые меняются при записи, — поэтому под общей блокировкой.
+        with self._structure_lock:
+            page_ids, next_cursor = self._index.search(catalog_query)
+        records = (self._records.get(record_id) for record_id in page_ids)
+        # Запись могли удалить сразу после поиска — такую просто пропускаем.
+        return [self._layout.to_dict(record) for record in records if record is not None], next_cursor
+
+    def facets(self, catalog_query, facet_names=CATALOG_FACETS, limit: int = CATALOG_FACET_DEFAULT_LIMIT) -> dict:
+        """
+        Считает фасеты элементов, подходящих под фильтры запроса (курсор и limit не учитываются).
+
+        Args:
+            catalog_query (CatalogQuery): Фильтры.
+            facet_names: Какие фасеты выдать (из CATALOG_FACETS).
+            limit (int): Сколько самых частых значений выдать на фасет.
+
+        Returns:
+            dict: {"total": число подходящих элементов, "facets": {фасет: [{"value", "count"}, ...]}}.
+        """
+        with self._structure_lock:
+            matched_ids = self._index.matching_ids(catalog_query)
+            if matched_ids is None:
+                # Без фильтров — готовые счетчики индекса: работа по числу различных значений.
+                return {'total': len(self._records), 'facets': self._index.facet_counts.summary(facet_names, limit)}
+            records = [self._records[record_id] for record_id in matched_ids]
+        # С фильтрами считаем только подходящие элементы — по столбцам, как при загрузке индексов.
+        # Столбцы отдаются лениво (map по полю), без промежуточных кортежей на каждый элемент.
+        if isinstance(self._layout, RecordLayout):
+            field_names = self._layout.field_names
+            columns = {field: map(operator.itemgetter(field_names.index(field)), records)
+                       for field in CATALOG_INDEXED_COLUMNS if field in field_names}
+        else:
+            columns = {field: (record.get(field) for record in records) for field in CATALOG_INDEXED_COLUMNS}
+        facet_counts = CatalogFacetCounts()
+        facet_counts.load_columns(columns)
+        return {'total': len(records), 'facets': facet_counts.summary(facet_names, limit)}
+
+
+def normalize_url(url: str) -> str:
+    """
+    Приводит URL к каноническому виду для поиска дубликатов.
+
+    Схема и хост не чувствительны к регистру, порт по умолчанию (80 для http,
+    443 для https) ничего не меняет, а пустой путь равнозначен '/'. Путь,
+    параметры запроса и якорь остаются как есть — они могут различаться
+    по регистру на стороне сайта.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    netloc = parts.netloc.lower()
+    default_port = _DEFAULT_PORTS.get(scheme)
+    if default_port and netloc.endswith(default_port):
+        netloc = netloc[:-len(default_port)]
+    return urlunsplit((scheme, netloc, parts.path or '/', parts.query, parts.fragment))
+
+
+class ShortUrlStore:
+    """
+    Хранилище коротких ссылок с прямым и обратным индексами.
+
+    Прямой индекс (код -> URL) обслуживает редиректы, обратный
+    (нормализованный URL -> код) — проверку, не сокращали ли этот URL раньше.
+    Оба индекса обновляются только вместе, поэтому обе операции стоят O(1).
+
+    Ссылка может иметь срок жизни: истекшие ссылки удаляются иерархическим
+    колесом таймеров (см. expiry.py), которое продвигается попутно с
+    обычными операциями, без обхода всех записей. Обратный индекс хранит
+    только бессрочные ссылки, чтобы повторное сокращение не вернуло
+    ссылку, которая скоро исчезнет. Если задан max_entries, при превышении
+    лимита вытесняется давно не использованная ('lru') или реже всех
+    используемая ('lfu') ссылка.
+    """
+
+    def __init__(self, max_entries: int = None, eviction_policy: str = 'lru', clock=time.time):
+        """
+        Args:
+            max_entries (int | None): Лимит числа ссылок (None — без лимита).
+            eviction_policy (str): Политика вытеснения при превышении лимита: 'lru' или 'lfu'.
+            clock: Источник текущего времени (секунды UNIX).
+
+        Raises:
+            ValueError: Если лимит не положителен или политика неизвестна.
+        """
+        if max_entries is not None and max_entries <= 0:
+            raise ValueError("Лимит числа коротких ссылок должен быть больше нуля.")
+        self._url_by_code = {}
+        self._code_by_url = {}
+        self._expires_at_by_code = {}
+        self._clock = clock
+        self._expiry_wheel = HierarchicalTimingWheel(clock())
+        self._max_entries = max_entries
+        self._eviction = create_eviction_policy(eviction_policy) if max_entries is not None else None
+        self._lock = threading.Lock()
+        self._removal_listeners = []
+
+    def add_removal_listener(self, listener):
+        """Регистрирует функцию listener(код), вызываемую при истечении или вытеснении ссылки."""
+        self._removal_listeners.append(listener)
+
+    def get(self, short_code: str):
+        """Возвращает оригинальный URL по короткому коду или None (в том числе для истекших ссылок)."""
+        destination_url = self._url_by_code.get(short_code)
+        if destination_url is not None and (self._expires_at_by_code or self._eviction is not None) \
+                and not self.touch(short_code):
+            return None
+        return destination_url
+
+    def touch(self, short_code: str) -> bool:
+        """
+        Отмечает обращение к ссылке (для вытеснения) и попутно удаляет истекшие.
+
+        Returns:
+            bool: Жива ли ссылка с этим кодом.
+        """
+        if not self._expires_at_by_code and self._eviction is None:
+            return short_code in self._url_by_code
+        now = self._clock()
+        with self._lock:
+            self._remove_expired(now)
+            if short_code not in self._url_by_code:
+                return False
+            expires_at = self._expires_at_by_code.get(short_code)
+            if expires_at is not None and expires_at <= now:
+                # Срок уже вышел, но колесо удалит ссылку только на следующем тике.
+                return False
+            if self._eviction is not None:
+                self._eviction.record_access(short_code)
+            return True
+
+    def expires_at(self, short_code: str):
+        """Момент истечения ссылки (секунды UNIX) или None для бессрочной."""
+        return self._expires_at_by_code.get(short_code)
+
+    def find_code(self, long_url: str):
+        """Возвращает уже выданный бессрочный код для URL (с учетом нормализации) или None."""
+        return self._code_by_url.get(normalize_url(long_url))
+
+    def add(self, short_code: str, long_url: str, expires_at: float = None):
+        """
+        Сохраняет соответствие кода и URL.
+
+        Args:
+            short_code (str): Короткий код.
+            long_url (str): Оригинальный URL.
+            expires_at (float | None): Момент истечения (секунды UNIX) или None.
+
+        Raises:
+            ValueError: Если код уже занят.
+        """
+        with self._lock:
+            self._remove_expired(self._clock())
+            if short_code in self._url_by_code:
+                raise ValueError(f"Короткий код '{short_code}' уже занят.")
+            if self._eviction is not None:
+                # Место освобождается до вставки: иначе новая ссылка с единственным
+                # обращением сама оказалась бы первым кандидатом на вытеснение (LFU).
+                while len(self._url_by_code) >= self._max_entries:
+                    self._remove(self._eviction.pick_victim())
+            self._insert(short_code, long_url, expires_at)
+
+    def _insert(self, short_code, long_url, expires_at):
+        """Добавляет ссылку во все индексы; вызывается под блокировкой."""
+        if self._eviction is not None:
+            self._eviction.record_insert(short_code)
+        self._url_by_code[short_code] = long_url
+        if expires_at is None:
+            self._code_by_url.setdefault(normalize_url(long_url), short_code)
+        else:
+            self._expires_at_by_code[short_code] = expires_at
+            self._expiry_wheel.schedule(short_code, expires_at)
+
+    def _restore(self, url_by_code: dict, code_by_url: dict, expires_at_by_code: dict):
+        """
+        Заменяет содержимое хранилища ссылками из снимка (до начала работы).
+
+        Обратный индекс берется готовым, чтобы не нормализовать заново каждый URL.
+        История обращений не сохраняется: для вытеснения все ссылки равны
+        и упорядочены по времени создания.
+        """
+        self._url_by_code = url_by_code
+        self._code_by_url = code_by_url
+        self._expires_at_by_code = expires_at_by_code
+        self._expiry_wheel = HierarchicalTimingWheel(self._clock())
+        for short_code, expires_at in expires_at_by_code.items():
+            self._expiry_wheel.schedule(short_code, expires_at)
+        if self._eviction is not None:
+            self._eviction.restore(url_by_code)
+
+    def remove_expired(self):
+        """Удаляет ссылки, чей срок истек к текущему моменту."""
+        with self._lock:
+            self._remove_expired(self._clock())
+
+    def _remove_expired(self, now):
+        """Продвигает колесо таймеров; вызывается под блокировкой."""
+        for short_code in self._expiry_wheel.advance(now):
+            self._remove(short_code)
+
+    def _remove(self, short_code):
+        """Удаляет ссылку из всех индексов; вызывается под блокировкой."""
+        long_url = self._url_by_code.pop(short_code)
+        if self._expires_at_by_code.pop(short_code, None) is not None:
+            self._expiry_wheel.cancel(short_code)
+        else:
+            # В обратном индексе бывают только бессрочные ссылки.
+            normalized_url = normalize_url(long_url)
+            if self._code_by_url.get(normalized_url) == short_code:
+                del self._code_by_url[normalized_url]
+        if self._eviction is not None:
+            self._eviction.discard(short_code)
+        for listener in self._removal_listeners:
+            listener(short_code)
+
+    def items(self):
+        """Пары (код, URL) в порядке создания (снимок, безопасный при одновременных изменениях)."""
+        with self._lock:
+            return list(self._url_by_code.items())
+
+    def __contains__(self, short_code):
+        return short_code in self._url_by_code
+
+    def __len__(self):
+        return len(self._url_by_code)
+
+
+class InMemoryClickStats:
+    """
+    Почасовая статистика переходов по коротким ссылкам в памяти процесса.
+
+    Для каждого кода хранится словарь ``{час: переходы}`` (час — номер часа
+    от начала эпохи UNIX) за последние CLICK_STATS_RETENTION_HOURS часов и
+    общий счетчик за все время.
+    """
+
+    def __init__(self, retention_hours: int = CLICK_STATS_RETENTION_HOURS):
+        self._retention_hours = retention_hours
+        self._lock = threading.Lock()
+        self._hourly_clicks = {}
+        self._total_clicks = {}
+
+    def add_clicks(self, counts: dict):
+        """
+        Добавляет пачку переходов.
+
+        Args:
+            counts (dict): (код, час) -> число переходов.
+        """
+        with self._lock:
+            for (short_code, hour), clicks in counts.items():
+                buckets = self._hourly_clicks.setdefault(short_code, {})
+                buckets[hour] = buckets.get(hour, 0) + clicks
+                self._total_clicks[short_code] = self._total_clicks.get(short_code, 0) + clicks
+                oldest_hour = hour - self._retention_hours
+                if min(buckets) <= oldest_hour:
+                    for expired_hour in [bucket_hour for bucket_hour in buckets if bucket_hour <= oldest_hour]:
+                        del buckets[expired_hour]
+
+    def hourly_clicks(self, short_code: str, from_hour: int) -> list:
+        """Непустые корзины кода начиная с часа from_hour: список пар (час, переходы) по возрастанию часа."""
+        with self._lock:
+            buckets = self._hourly_clicks.get(short_code, {})
+            return sorted((hour, clicks) for hour, clicks in buckets.items() if hour >= from_hour)
+
+    def total_clicks(self, short_code: str) -> int:
+        """Число переходов по коду за все время."""
+        return self._total_clicks.get(short_code, 0)
+
+
+class InMemorySequence:
+    """Потокобезопасная последовательность номеров 0, 1, 2, ... в памяти процесса."""
+
+    def __init__(self, start: int = 0):
+        self._lock = threading.Lock()
+        self._next_value = start
+
+    def next_value(self) -> int:
+        """Выдает следующий номер."""
+        with self._lock:
+            value = self._next_value
+            self._next_value += 1
+            return value
+
+    def current_value(self) -> int:
+        """Сколько номеров уже выдано."""
+        return self._next_value
+
+
+@dataclass
+class PortalStorage:
+    """Набор хранилищ всех сервисов, созданных одним бэкендом."""
+    backend: str
+    tasks: object
+    short_urls: object
+    short_code_sequence: object
+    click_stats: object
+    quotes: object
+    catalog: object
+    # Метка набора версий хранилищ (для ETag): версии в памяти и в журнале начинаются заново с каждым
+    # процессом, поэтому метка своя у каждого запуска; у SQLite она хранится в базе (см. SQLiteDatabase.instance_id).
+    instance_id: str
+
+
+def create_storage(backend: str = 'memory', sqlite_path: str = None,
+                   initial_quotes=(), initial_catalog_items=(),
+                   short_url_max_entries: int = None, short_url_eviction_policy: str = 'lru',
+                   journal_directory: str = None, journal_sync_commits: bool = True) -> PortalStorage:
+    """
+    Создает хранилища всех сервисов на выбранном бэкенде.
+
+    Args:
+        backend (str): 'memory', 'sqlite' или 'journal'.
+        sqlite_path (str): Путь к файлу базы (только для 'sqlite').
+        initial_quotes: Стартовые цитаты. SQLite- и journal-бэкенды добавляют их
+            только в пустую (только что созданную) базу.
+        initial_catalog_items: Стартовые элементы каталога (аналогично).
+        short_url_max_entries (int | None): Лимит числа коротких ссылок в памяти
+            процесса (для 'memory' и 'journal': SQLite хранит ссылки на диске).
+        short_url_eviction_policy (str): Политика вытеснения при превышении лимита: 'lru' или 'lfu'.
+        journal_directory (str): Каталог снимка и журнала (только для 'journal').
+        journal_sync_commits (bool): Ждать ли записи изменения на диск перед ответом (только для 'journal').
+
+    Raises:
+        ValueError: Если бэкенд неизвестен или для SQLite/журнала не указан путь.
+    """
+    if backend == 'memory':
+        return PortalStorage(
+            backend=backend,
+            tasks=InMemoryRecordStore(schema=TASKS_SCHEMA),
+            short_urls=ShortUrlStore(max_entries=short_url_max_entries, eviction_policy=short_url_eviction_policy),
+            short_code_sequence=InMemorySequence(),
+            click_stats=InMemoryClickStats(),
+            quotes=InMemoryRecordStore(initial_quotes, schema=QUOTES_SCHEMA),
+            catalog=InMemoryCatalogStore(initial_catalog_items, schema=CATALOG_SCHEMA),
+            instance_id=os.urandom(8).hex(),
+        )
+    if backend == 'sqlite':
+        if not sqlite_path:
+            raise ValueError("Для бэкенда 'sqlite' необходимо указать путь к файлу базы данных.")
+        # Импорт здесь, чтобы бэкенд в памяти не тянул за собой sqlite3.
+        from sqlite_storage import SQLiteDatabase
+        database = SQLiteDatabase(sqlite_path)
+        return PortalStorage(
+            backend=backend,
+            tasks=database.record_store(TASKS_SCHEMA),
+            short_urls=database.short_url_store(),
+            short_code_sequence=database.sequence('short_codes'),
+            click_stats=database.click_stats(),
+            quotes=database.record_store(QUOTES_SCHEMA, initial_records=initial_quotes),
+            catalog=database.catalog_store(CATALOG_SCHEMA, initial_records=initial_catalog_items),
+            instance_id=database.instance_id(),
+        )
+    if backend == 'journal':
+        if not journal_directory:
+            raise ValueError("Для бэкенда 'journal' необходимо указать каталог данных.")
+        from journal_storage import JournalDatabase
+        database = JournalDatabase(journal_directory, sync_commits=journal_sync_commits)
+        storage = PortalStorage(
+            backend=backend,
+            tasks=database.record_store(TASKS_SCHEMA),
+            short_urls=database.short_url_store(short_url_max_entries, short_url_eviction_policy),
+            short_code_sequence=database.sequence('short_codes'),
+            # Статистика переходов на диск не пишется: после перезапуска она начинается заново.
+            click_stats=InMemoryClickStats(),
+            quotes=database.record_store(QUOTES_SCHEMA, initial_records=initial_quotes),
+            catalog=database.catalog_store(CATALOG_SCHEMA, initial_records=initial_catalog_items),
+            instance_id=os.urandom(8).hex(),
+        )
+        database.recover()
+        return storage
+    raise ValueError(f"Неизвестный бэкенд хранилища: '{backend}'.")
@@ -0,0 +1,144 @@
+"""
+Потоковая (по частям) выдача больших коллекций в JSON и NDJSON.
+
+Вместо того чтобы собирать весь ответ в одну строку, генераторы из этого
+модуля сериализуют элементы пачками и сразу отдают их серверу. Пиковая
+память на запрос определяется размером пачки, а не всей коллекции.
+
+Поддерживаются форматы:
+- JSON-массив (возможно, внутри объекта-"обертки"), отдаваемый частями;
+- NDJSON (по одному JSON-объекту на строку) — его выбирают через заголовок
+  `Accept: application/x-ndjson`;
+- CSV с заголовком — для выгрузки задач и каталога (см. iter_csv).
+
+Здесь же — форматирование событий для потоков Server-Sent Events (text/event-stream).
+"""
+import csv
+import io
+import json
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+CSV_MIMETYPE = 'text/csv'
+EVENT_STREAM_MIMETYPE = 'text/event-stream'
+# Синонимы NDJSON, которые тоже встречаются в заголовке Accept.
+NDJSON_MIMETYPE_ALIASES = (NDJSON_MIMETYPE, 'application/jsonl', 'application/json-seq')
+# Сколько элементов сериализуется и отдается одним куском.
+STREAM_BATCH_SIZE = 256
+
+
+def wants_ndjson(accept_mimetypes) -> bool:
+    """
+    Проверяет, просит ли клиент NDJSON.
+
+    Args:
+        accept_mimetypes: Разобранный заголовок Accept (`request.accept_mimetypes`).
+
+    Returns:
+        bool: True, если NDJSON подходит клиенту лучше, чем application/json.
+    """
+    best_match = accept_mimetypes.best_match(('application/json',) + NDJSON_MIMETYPE_ALIASES)
+    return best_match in NDJSON_MIMETYPE_ALIASES
+
+
+def _batches(items, batch_size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def iter_json_array(items, dumps, prefix: str = '', suffix: str = '', batch_size: int = STREAM_BATCH_SIZE):
+    """
+    Генерирует JSON-массив элементов по частям.
+
+    Args:
+        items: Итерируемая коллекция элементов.
+        dumps: Функция сериализации (см. PortalJSONProvider.item_dumps); вызывается
+            для списка-пачки элементов.
+        prefix (str): Текст перед массивом (например, '{"count": 3, "tasks": ').
+        suffix (str): Текст после массива (например, '}').
+        batch_size (int): Сколько элементов отдавать одним куском.
+
+    Yields:
+        str: Очередной кусок JSON-документа.
+    """
+    yield prefix + '['
+    separator = ''
+    for batch in _batches(items, batch_size):
+        # Один вызов dumps на всю пачку заметно быстрее, чем по вызову на элемент;
+        # квадратные скобки пачки срезаем — массив у нас общий на весь ответ.
+        yield separator + dumps(batch)[1:-1]
+        separator = ','
+    yield ']' + suffix + '\n'
+
+
+def iter_ndjson(items, dumps, batch_size: int = STREAM_BATCH_SIZE):
+    """
+    Генерирует NDJSON: по одному элементу на строку.
+
+    Yields:
+        str: Очередной кусок из нескольких строк.
+    """
+    for batch in _batches(items, batch_size):
+        yield ''.join(dumps(item) + '\n' for item in batch)
+
+
+def _csv_value(value):
+    # Логические значения пишутся так же, как в JSON, — их понимает пакетная загрузка.
+    if value is True:
+        return 'true'
+    if value is False:
+        return 'false'
+    return value
+
+
+def iter_csv(items, columns, batch_size: int = STREAM_BATCH_SIZE):
+    """
+    Генерирует CSV: строку заголовка и по строке на элемент.
+
+    Args:
+        items: Итерируемая коллекция словарей.
+        columns: Колонки (ключи элементов); отсутствующие ключи дают пустые значения.
+        batch_size (int): Сколько элементов отдавать одним куском.
+
+    Yields:
+        str: Очередной кусок CSV.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for batch in _batches(items, batch_size):
+        writer.writerows([_csv_value(item.get(column)) for column in columns] for item in batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # Пустая коллекция: только заголовок.
+        yield buffer.getvalue()
+
+
+def format_server_sent_event(data, event: str = None, event_id=None, ensure_ascii: bool = False) -> str:
+    """
+    Форматирует одно событие Server-Sent Events.
+
+    Args:
+        data: Данные события (сериализуются в JSON одной строкой).
+        event (str | None): Тип события (поле 'event:'); None — обычное 'message'.
+        event_id: ID события. Браузер вернет последний полученный ID в заголовке
+            Last-Event-ID при переподключении.
+        ensure_ascii (bool): Экранировать ли не-ASCII символы.
+
+    Returns:
+        str: Событие, завершенное пустой строкой.
+    """
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    if event:
+        lines.append(f'event: {event}')
+    lines.append('data: ' + json.dumps(data, ensure_ascii=ensure_ascii, separators=(',', ':')))
+    return '\n'.join(lines) + '\n\n'
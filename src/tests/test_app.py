@@ -0,0 +1,204 @@
+"""Тесты HTTP API приложения (app.py) через тестовый клиент Flask."""
+import json
+import time
+
+import pytest
+from werkzeug.test import Client
+
+import app as portal
+from json_provider import available_json_backends
+
+
+@pytest.fixture
+def client():
+    return portal.app.test_client()
+
+
+def test_converter_units_compact_and_pretty_have_own_etags(client):
+    compact = client.get('/api/converter/units?pretty=0')
+    pretty = client.get('/api/converter/units?pretty=1')
+    assert compact.status_code == pretty.status_code == 200
+    assert compact.get_json() == pretty.get_json()
+    assert compact.data != pretty.data
+    assert compact.headers['ETag'] != pretty.headers['ETag']
+    assert 'max-age=' in compact.headers['Cache-Control']
+
+
+def test_converter_units_not_modified(client):
+    for query in ('?pretty=0', '?pretty=1'):
+        etag = client.get('/api/converter/units' + query).headers['ETag']
+        response = client.get('/api/converter/units' + query, headers={'If-None-Match': etag})
+        assert response.status_code == 304
+        assert response.data == b''
+
+
+def test_converter_units_etag_of_other_variant_does_not_match(client):
+    compact_etag = client.get('/api/converter/units?pretty=0').headers['ETag']
+    response = client.get('/api/converter/units?pretty=1', headers={'If-None-Match': compact_etag})
+    assert response.status_code == 200
+    assert response.data == portal.CONVERTER_UNITS_BODIES[True]
+
+
+def test_tasks_since_returns_delta(client):
+    version = client.get('/api/tasks').get_json()['version']
+    created = client.post('/api/tasks', json={'text': 'Проверить дельту'}).get_json()['task']
+    client.put(f"/api/tasks/{created['id']}", json={'done': True})
+    delta = client.get(f'/api/tasks?since={version}').get_json()
+    assert delta['since'] == version
+    assert delta['version'] == version + 2
+    assert delta['changed'] == [{**created, 'done': True}]
+    assert delta['deleted'] == []
+
+    client.delete(f"/api/tasks/{created['id']}")
+    delta = client.get(f"/api/tasks?since={delta['version']}").get_json()
+    assert (delta['changed'], delta['deleted']) == ([], [created['id']])
+
+
+def test_tasks_since_from_future_resets_to_full_list(client):
+    full = client.get('/api/tasks').get_json()
+    response = client.get(f"/api/tasks?since={full['version'] + 100}").get_json()
+    assert response['reset'] is True
+    assert response['tasks'] == full['tasks']
+
+
+@pytest.mark.parametrize('since', ['-1', 'abc'])
+def test_tasks_since_rejects_invalid_version(client, since):
+    assert client.get(f'/api/tasks?since={since}').status_code == 400
+
+
+def test_fast_path_not_found_matches_flask(client):
+    assert portal.short_code_filter is not None
+    misses_before = portal.short_code_filter.definite_misses
+    fast_response = client.get('/s/nosuchcode')
+    assert portal.short_code_filter.definite_misses == misses_before + 1
+    # Тот же запрос мимо быстрого пути — его обрабатывает сам Flask.
+    flask_response = Client(portal.redirect_fast_path.wsgi_app).get('/s/nosuchcode')
+    assert fast_response.status_code == flask_response.status_code == 404
+    assert fast_response.data == flask_response.data
+    assert fast_response.headers['Content-Type'] == flask_response.headers['Content-Type']
+    assert fast_response.headers['Content-Length'] == flask_response.headers['Content-Length']
+
+
+def test_metrics_endpoint_counts_requests_by_route(client):
+    client.get('/api/tasks/999999')
+    text = client.get('/metrics').get_data(as_text=True)
+    assert 'portal_http_responses_total{method="GET",route="/api/tasks/<int:task_id>",status="404"}' in text
+    assert 'portal_store_records{store="tasks"}' in text
+
+
+def test_tasks_bulk_import_and_export(client):
+    body = '{"text": "Импорт 1"}\n{"text": ""}\n{"text": "Импорт 2", "done": true}\n'.encode('utf-8')
+    summary = client.post('/api/tasks/bulk', data=body, content_type='application/x-ndjson').get_json()
+    assert (summary['succeeded'], summary['failed']) == (2, 1)
+    assert summary['errors'][0]['line'] == 2
+
+    exported = client.get('/api/tasks/export?format=csv')
+    assert exported.mimetype == 'text/csv'
+    lines = exported.get_data(as_text=True).splitlines()
+    assert lines[0] == 'id,text,done'
+    assert lines[-1].endswith(',Импорт 2,true')
+    ndjson_lines = client.get('/api/tasks/export').get_data(as_text=True).splitlines()
+    assert len(ndjson_lines) == len(lines) - 1
+
+
+def test_bulk_import_rejects_unknown_format_and_oversized_body(client, monkeypatch):
+    assert client.post('/api/tasks/bulk', data=b'{}', content_type='application/json').status_code == 415
+    monkeypatch.setitem(portal.app.config, 'MAX_CONTENT_LENGTH', 10)
+    response = client.post('/api/tasks/bulk', data=b'{"text": "a"}\n' * 10, content_type='application/x-ndjson')
+    assert response.status_code == 413
+    assert 'error' in response.get_json()
+
+
+def test_store_reads_answer_not_modified_until_store_changes(client):
+    first = client.get('/api/tasks')
+    etag = first.headers['ETag']
+    assert etag.startswith('W/')
+    assert 'no-cache' in first.headers['Cache-Control']
+    not_modified = client.get('/api/tasks', headers={'If-None-Match': etag})
+    assert not_modified.status_code == 304
+    assert not_modified.data == b''
+
+    client.post('/api/tasks', json={'text': 'Новая задача'})
+    changed = client.get('/api/tasks', headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+
+
+def test_store_etag_depends_on_query_and_representation(client):
+    etags = {
+        client.get('/api/catalog?type=book&year=1967').headers['ETag'],
+        client.get('/api/catalog?type=book').headers['ETag'],
+        client.get('/api/catalog?type=book&pretty=1').headers['ETag'],
+        client.get('/api/catalog?type=book', headers={'Accept': 'application/x-ndjson'}).headers['ETag'],
+    }
+    assert len(etags) == 4
+    # Порядок параметров не важен.
+    assert (client.get('/api/catalog?year=1967&type=book').headers['ETag']
+            == client.get('/api/catalog?type=book&year=1967').headers['ETag'])
+
+
+def test_store_item_not_modified_and_errors_without_etag(client):
+    etag = client.get('/api/quotes/1').headers['ETag']
+    assert client.get('/api/quotes/1', headers={'If-None-Match': etag}).status_code == 304
+    missing = client.get('/api/catalog/999999')
+    assert missing.status_code == 404
+    assert 'ETag' not in missing.headers
+
+
+@pytest.mark.parametrize('row', [
+    {'num1': 1, 'operation': '+'},
+    {'num2': 1, 'operation': 'add'},
+    {'num1': 1, 'num2': 2},
+    {'num1': 'x', 'num2': 2, 'operation': '*'},
+    {'num1': 1, 'num2': 0, 'operation': '/'},
+    {'num1': 1, 'num2': 2, 'operation': 'power'},
+    {'num1': 'inf', 'num2': 2, 'operation': '+'},
+    {'num1': 1e308, 'num2': 1e308, 'operation': '*'},
+])
+def test_calculator_batch_errors_match_single_endpoint(client, row):
+    single_error = client.post('/api/calculate', json=row).get_json()['error']
+    batch = client.post('/api/calculate/batch', json={'operations': [row]}).get_json()
+    # У одиночного API к ошибке операции добавлен список поддерживаемых операций.
+    assert single_error.startswith(batch['errors'][0]['error'].rstrip('.'))
+
+
+def reject_constant(name):
+    raise ValueError(f'{name} не является JSON')
+
+
+@pytest.mark.parametrize('backend', available_json_backends())
+def test_non_finite_numbers_are_rejected_with_every_backend(client, monkeypatch, backend):
+    monkeypatch.setattr(portal.app.json, 'backend', backend)
+    responses = [
+        client.get('/api/calculate?num1=1e308&num2=1e308&operation=multiply'),
+        client.get('/api/calculate?num1=inf&num2=1&operation=add'),
+        client.get('/api/converter/convert?category=length&from_unit=meter&to_unit=foot&value=inf'),
+        client.get('/api/converter/convert?category=length&from_unit=kilometer&to_unit=millimeter&value=1e304'),
+    ]
+    for response in responses:
+        assert response.status_code == 400
+        assert 'error' in json.loads(response.data, parse_constant=reject_constant)
+    batches = [
+        client.post('/api/calculate/batch', json={'num1': [1e308, 1], 'num2': [1e308, 2], 'operation': '*'}),
+        client.post('/api/converter/convert/batch',
+                    json={'from_unit': 'kilometer', 'to_unit': 'millimeter', 'values': [1e304, 1]}),
+    ]
+    for response in batches:
+        body = json.loads(response.data, parse_constant=reject_constant)
+        assert body['results'][0] is None and body['results'][1] is not None
+        assert body['failed'] == 1
+
+
+def test_task_events_stream_ends_after_its_lifetime(client, monkeypatch):
+    monkeypatch.setitem(portal.app.config, 'TASK_EVENTS_MAX_STREAM_SECONDS', 0.3)
+    monkeypatch.setitem(portal.app.config, 'TASK_EVENTS_KEEPALIVE_SECONDS', 0.1)
+    created = client.post('/api/tasks', json={'text': 'Событие'}).get_json()['task']
+    version = client.get('/api/tasks').get_json()['version']
+    started_at = time.monotonic()
+    # get_data() читает поток до конца — тест завершится, только если поток закроется сам.
+    body = client.get('/api/tasks/events', headers={'Last-Event-ID': str(version - 1)}).get_data(as_text=True)
+    assert time.monotonic() - started_at < 5
+    assert body.startswith('retry: 3000\n\n')
+    assert f'id: {version}\nevent: changes\n' in body
+    assert f'"id":{created["id"]}' in body
+    assert ': keepalive\n\n' in body
@@ -0,0 +1,51 @@
+"""Тесты фильтра Блума по выданным коротким кодам (bloom_filter.py)."""
+import pytest
+
+from bloom_filter import ShortCodeBloomFilter
+
+
+def make_codes(prefix, count):
+    return [f'{prefix}{index:06d}' for index in range(count)]
+
+
+def test_added_codes_are_never_definite_misses():
+    issued = []
+    code_filter = ShortCodeBloomFilter(lambda: issued, capacity=1000)
+    for code in make_codes('a', 1000):
+        issued.append(code)
+        code_filter.add(code)
+    assert all(code_filter.might_contain(code) for code in issued)
+    assert code_filter.stats()['codes'] == 1000
+
+
+def test_false_positive_rate_is_close_to_target():
+    issued = make_codes('a', 10_000)
+    code_filter = ShortCodeBloomFilter(lambda: issued, capacity=10_000, false_positive_rate=0.01)
+    false_positives = sum(code_filter.might_contain(code) for code in make_codes('b', 20_000))
+    assert false_positives / 20_000 < 0.02
+
+
+def test_rebuild_doubles_capacity_and_keeps_all_codes():
+    issued = make_codes('a', 10)
+    code_filter = ShortCodeBloomFilter(lambda: issued, capacity=16)
+    for code in make_codes('c', 100):
+        issued.append(code)
+        code_filter.add(code)
+    stats = code_filter.stats()
+    assert stats['capacity'] == 128
+    assert stats['codes'] == len(issued)
+    assert all(code_filter.might_contain(code) for code in issued)
+    assert stats['estimated_false_positive_rate'] <= 0.01
+
+
+def test_initial_codes_above_capacity_grow_filter():
+    issued = make_codes('a', 1000)
+    code_filter = ShortCodeBloomFilter(lambda: issued, capacity=100)
+    assert code_filter.stats()['capacity'] == 1600
+    assert all(code_filter.might_contain(code) for code in issued)
+
+
+@pytest.mark.parametrize('capacity, rate', [(0, 0.01), (100, 0), (100, 1)])
+def test_invalid_parameters(capacity, rate):
+    with pytest.raises(ValueError):
+        ShortCodeBloomFilter(list, capacity=capacity, false_positive_rate=rate)
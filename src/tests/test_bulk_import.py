@@ -0,0 +1,112 @@
+"""Тесты пакетной загрузки NDJSON и CSV (bulk_import.py)."""
+import io
+import json
+
+import pytest
+
+from bulk_import import (
+    BulkImportError, CatalogItemValidator, TaskValidator, bulk_format_for_mimetype, import_records,
+)
+from storage import TASKS_SCHEMA, InMemoryRecordStore
+
+NDJSON_BODY = '\n'.join([
+    '{"text": "Первая"}',
+    '',
+    '{"text": "  Вторая  ", "done": true}',
+    '{"text": ""}',
+    '[1, 2]',
+    '{"text": "Третья", "done": "да"}',
+    '{не json',
+    '{"text": "Четвертая", "done": "yes"}',
+]).encode('utf-8')
+
+
+def run_import(body, bulk_format='ndjson', validate=None, **options):
+    store = InMemoryRecordStore(schema=TASKS_SCHEMA)
+    summary = import_records(io.BytesIO(body), bulk_format, validate or TaskValidator(), store.create_many,
+                             loads=json.loads, **options)
+    return summary, store.all()
+
+
+def test_ndjson_reports_errors_by_line():
+    summary, tasks = run_import(NDJSON_BODY)
+    assert (summary['count'], summary['succeeded'], summary['failed']) == (7, 3, 4)
+    assert [error['line'] for error in summary['errors']] == [4, 5, 6, 7]
+    assert summary['errors'][0]['error'] == TaskValidator.TEXT_ERROR
+    assert summary['errors'][1]['error'] == 'Строка должна быть JSON-объектом.'
+    assert summary['errors'][2]['error'] == TaskValidator.DONE_ERROR
+    assert summary['errors'][3]['error'].startswith('Некорректный JSON')
+    assert summary['errors_truncated'] is False
+    assert [(task['text'], task['done']) for task in tasks] == [
+        ('Первая', False), ('Вторая', True), ('Четвертая', True)]
+
+
+@pytest.mark.parametrize('chunk_size', [1, 3, 16, 1024])
+def test_result_does_not_depend_on_chunk_size(chunk_size):
+    assert run_import(NDJSON_BODY, chunk_size=chunk_size) == run_import(NDJSON_BODY)
+
+
+def test_reported_errors_are_truncated():
+    body = b'\n'.join([b'{}'] * 10 + [b'{"text": "ok"}'])
+    summary, tasks = run_import(body, max_reported_errors=3)
+    assert (summary['failed'], len(summary['errors']), summary['errors_truncated']) == (10, 3, True)
+    assert len(tasks) == 1
+
+
+def test_records_are_added_in_batches():
+    batches = []
+    body = b'\n'.join(b'{"text": "%d"}' % index for index in range(25))
+    summary = import_records(io.BytesIO(body), 'ndjson', TaskValidator(),
+                             lambda batch: batches.append(len(batch)) or list(range(len(batch))), batch_size=10)
+    assert batches == [10, 10, 5]
+    assert summary['succeeded'] == 25
+
+
+@pytest.mark.parametrize('chunk_size', [5, 1024])
+def test_line_longer_than_cap_is_a_line_error(chunk_size):
+    long_line = json.dumps({'text': 'x' * 200}).encode('utf-8')
+    body = b'{"text": "a"}\n' + long_line + b'\n{"text": "b"}'
+    summary, tasks = run_import(body, chunk_size=chunk_size, max_line_length=100)
+    assert summary['errors'] == [{'line': 2, 'error': 'Строка длиннее 100 байт.'}]
+    assert [task['text'] for task in tasks] == ['a', 'b']
+
+
+def test_csv_with_quoted_newlines_and_missing_values():
+    body = 'text,done\n"Первая\nстрока",true\nВторая,\n,false\n"Третья, с запятой",0,лишнее\n'.encode('utf-8')
+    summary, tasks = run_import(body, 'csv', chunk_size=4)
+    assert [(task['text'], task['done']) for task in tasks] == [('Первая\nстрока', True), ('Вторая', False)]
+    # Номера строк — физические: запись в кавычках занимает строки 2-3.
+    assert [error['line'] for error in summary['errors']] == [5, 6]
+    assert summary['errors'][1]['error'] == 'В строке 3 значений, а в заголовке CSV — 2.'
+
+
+def test_csv_header_problems_reject_whole_upload():
+    with pytest.raises(BulkImportError):
+        run_import(b'title,done\nx,true\n', 'csv')
+    with pytest.raises(BulkImportError):
+        run_import(b'text,' + b'x' * 200 + b'\nok,\n', 'csv', max_line_length=100)
+
+
+def test_csv_long_row_is_a_line_error():
+    body = b'text\nok\n' + b'y' * 200 + b'\nalso ok\n'
+    summary, tasks = run_import(body, 'csv', max_line_length=100)
+    assert summary['errors'] == [{'line': 3, 'error': 'Строка длиннее 100 байт.'}]
+    assert [task['text'] for task in tasks] == ['ok', 'also ok']
+
+
+def test_catalog_validator_normalizes_fields():
+    validate = CatalogItemValidator(current_year=2024)
+    fields, error = validate({'type': 'movie', 'title': ' Сталкер ', 'year': '1979', 'director': ' Тарковский ',
+                              'author': 'лишний'})
+    assert error is None
+    assert fields == {'type': 'movie', 'title': 'Сталкер', 'year': 1979, 'director': 'Тарковский',
+                      'genre': 'Не указан'}
+    assert validate({'type': 'book', 'title': 'a', 'year': 2100, 'author': 'b'})[0] is None
+    assert validate({'type': 'book', 'title': 'a', 'year': 2000})[1] == CatalogItemValidator.CREATOR_FIELDS['book'][1]
+    assert validate({'type': 'comic'})[1] == CatalogItemValidator.TYPE_ERROR
+
+
+def test_format_by_mimetype():
+    assert bulk_format_for_mimetype('application/x-ndjson') == 'ndjson'
+    assert bulk_format_for_mimetype('text/csv') == 'csv'
+    assert bulk_format_for_mimetype('application/json') is None
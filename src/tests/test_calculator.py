@@ -0,0 +1,77 @@
+"""Тесты пакетных вычислений калькулятора (calculator.py)."""
+import operator
+import random
+
+import pytest
+
+from calculator import (
+    DIVISION_BY_ZERO_MESSAGE, INVALID_NUMBER_MESSAGE, RESULT_OVERFLOW_MESSAGE, CalculatorBatchError, evaluate_batch,
+    parse_batch_payload,
+)
+
+SCALAR_OPERATIONS = {'add': operator.add, 'subtract': operator.sub, 'multiply': operator.mul, 'divide': operator.truediv}
+
+
+def test_batch_matches_row_by_row_evaluation():
+    rng = random.Random(7)
+    rows = [(rng.uniform(-100, 100), rng.uniform(1, 100), rng.choice(list(SCALAR_OPERATIONS))) for _ in range(500)]
+    results, errors = evaluate_batch(*map(list, zip(*rows)))
+    assert errors == []
+    assert results == [SCALAR_OPERATIONS[name](a, b) for a, b, name in rows]
+
+
+def test_row_errors_do_not_stop_other_rows():
+    results, errors = evaluate_batch(['1', 'x', 4, 5, 6], [2, 3, 0, 1, 2], ['+', 'add', '/', 'power', None])
+    assert results == [3.0, None, None, None, None]
+    assert errors == [
+        {'index': 1, 'error': INVALID_NUMBER_MESSAGE},
+        {'index': 2, 'error': DIVISION_BY_ZERO_MESSAGE},
+        {'index': 3, 'error': "Недопустимая или неизвестная операция: 'power'."},
+        {'index': 4, 'error': 'Отсутствуют обязательные параметры: operation.'},
+    ]
+
+
+def test_operation_aliases_are_case_insensitive():
+    results, errors = evaluate_batch([6, 6, 6], [3, 3, 3], ['DIVIDE', 'Умножить', '-'])
+    assert errors == []
+    assert results == [2.0, 18.0, 3.0]
+
+
+def test_parse_row_and_column_payloads():
+    rows = parse_batch_payload({'operations': [{'num1': 1, 'num2': 2, 'operation': '+'}, 'не объект']})
+    assert rows == ([1, None], [2, None], ['+', None])
+    assert parse_batch_payload({'num1': [1, 2], 'num2': [3, 4], 'operation': '*'}) == ([1, 2], [3, 4], ['*', '*'])
+
+
+@pytest.mark.parametrize('payload', [
+    [],
+    {'operations': {}},
+    {'num1': [1], 'num2': [2]},
+    {'num1': [1, 2], 'num2': [2], 'operation': '+'},
+    {'num1': 1, 'num2': 2, 'operation': '+'},
+])
+def test_parse_rejects_malformed_payloads(payload):
+    with pytest.raises(CalculatorBatchError):
+        parse_batch_payload(payload)
+
+
+def test_missing_operands_are_reported_like_single_calculation():
+    results, errors = evaluate_batch([1, None, None], [None, 2, None], ['+', '+', None])
+    assert results == [None, None, None]
+    assert errors == [
+        {'index': 0, 'error': 'Отсутствуют обязательные параметры: num2.'},
+        {'index': 1, 'error': 'Отсутствуют обязательные параметры: num1.'},
+        {'index': 2, 'error': 'Отсутствуют обязательные параметры: num1, num2, operation.'},
+    ]
+
+
+def test_non_finite_operands_and_results_are_row_errors():
+    results, errors = evaluate_batch(
+        [1e308, 'inf', float('nan'), 10 ** 400, 2], [1e308, 1, 1, 1, 3], ['*', '+', '+', '+', '*'])
+    assert results == [None, None, None, None, 6.0]
+    assert errors == [
+        {'index': 0, 'error': RESULT_OVERFLOW_MESSAGE},
+        {'index': 1, 'error': INVALID_NUMBER_MESSAGE},
+        {'index': 2, 'error': INVALID_NUMBER_MESSAGE},
+        {'index': 3, 'error': INVALID_NUMBER_MESSAGE},
+    ]
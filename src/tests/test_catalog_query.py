@@ -0,0 +1,154 @@
+"""Тесты поиска по каталогу (catalog_query.py) на хранилище в памяти — сверка с полным перебором."""
+import random
+
+import pytest
+
+from catalog_query import (
+    CATALOG_FACETS, CatalogIndex, CatalogQuery, CatalogQueryError, parse_catalog_query, parse_facet_request,
+)
+from sqlite_storage import SQLiteDatabase
+from storage import CATALOG_SCHEMA, InMemoryCatalogStore
+
+GENRES = ('Роман', 'Антиутопия', 'Драма', 'Научная фантастика')
+NAMES = ('Оруэлл', 'Булгаков', 'Нолан', 'Тарковский', 'Толстой')
+
+
+def random_item(rng):
+    item_type = rng.choice(('book', 'movie'))
+    creator_field = 'author' if item_type == 'book' else 'director'
+    return {'type': item_type, 'title': f'Название {rng.randint(0, 300)}', 'year': rng.randint(1990, 1995),
+            'genre': rng.choice(GENRES), creator_field: rng.choice(NAMES)}
+
+
+def matches(item, query):
+    """Условия фильтров запроса, проверенные напрямую по элементу."""
+    def contains(field, needle):
+        return needle is None or needle in (item.get(field) or '').lower()
+
+    return ((query.type is None or item['type'] == query.type)
+            and (query.year is None or item['year'] == query.year)
+            and contains('genre', query.genre) and contains('title', query.title)
+            and contains('author', query.author) and contains('director', query.director)
+            and (query.creator is None or contains('author', query.creator) or contains('director', query.creator)))
+
+
+def random_query(rng):
+    return CatalogQuery(
+        type=rng.choice((None, 'book', 'movie')),
+        year=rng.choice((None, None, rng.randint(1990, 1995))),
+        genre=rng.choice((None, None, 'ро', 'фантаст')),
+        title=rng.choice((None, None, 'название 1', '2', 'азв')),
+        creator=rng.choice((None, None, 'ол', 'булгаков')),
+    )
+
+
+def all_pages(store, query, page_size):
+    """Обходит выдачу страницами по курсору."""
+    items, after_id = [], 0
+    while True:
+        page, cursor = store.query(CatalogQuery(**{**query.__dict__, 'after_id': after_id, 'limit': page_size}))
+        items += page
+        if cursor is None:
+            return items
+        after_id = cursor
+
+
+def test_queries_match_brute_force_after_changes():
+    rng = random.Random(1)
+    store = InMemoryCatalogStore(schema=CATALOG_SCHEMA)
+    for _ in range(400):
+        store.create(random_item(rng))
+    store.create_many([random_item(rng) for _ in range(100)])
+    live = {record['id']: record for record in store.all()}
+    for record_id in rng.sample(sorted(live), 120):
+        store.delete(record_id)
+        del live[record_id]
+    for record_id in rng.sample(sorted(live), 80):
+        live[record_id] = store.update(record_id, {'title': f'Новое название {record_id}', 'genre': 'Драма'})
+
+    for _ in range(150):
+        query = random_query(rng)
+        expected = [live[record_id] for record_id in sorted(live) if matches(live[record_id], query)]
+        items, cursor = store.query(query)
+        assert (items, cursor) == (expected, None)
+        assert all_pages(store, query, rng.choice((1, 7, 50))) == expected
+
+
+def test_page_cursor_points_at_last_item_of_page():
+    store = InMemoryCatalogStore(schema=CATALOG_SCHEMA)
+    store.create_many([{'type': 'book', 'title': str(index), 'year': 1990, 'genre': 'Роман', 'author': 'А'}
+                       for index in range(5)])
+    store.delete(2)
+    assert store.query(CatalogQuery(limit=2)) == (store.query(CatalogQuery())[0][:2], 3)
+    page, cursor = store.query(CatalogQuery(after_id=3, limit=2))
+    assert [item['id'] for item in page] == [4, 5] and cursor is None
+
+
+def test_parse_catalog_query_lowercases_filters_and_validates_paging():
+    query = parse_catalog_query({'title': 'МАСТЕР', 'year': '1967', 'limit': '10', 'cursor': '5', 'type': 'book'})
+    assert (query.title, query.year, query.limit, query.after_id, query.type) == ('мастер', 1967, 10, 5, 'book')
+    invalid_years = []
+    assert parse_catalog_query({'year': 'abc'}, on_invalid_year=invalid_years.append).year is None
+    assert invalid_years == ['abc']
+    for args in ({'limit': '0'}, {'limit': 'x'}, {'cursor': 'x'}):
+        with pytest.raises(CatalogQueryError):
+            parse_catalog_query(args)
+
+
+def brute_force_facets(items, limit):
+    """Фасеты, посчитанные прямым перебором элементов."""
+    counts = {facet: {} for facet in CATALOG_FACETS}
+    for item in items:
+        values = {'type': [item['type']], 'genre': [item['genre']], 'year': [item['year']],
+                  'decade': [item['year'] // 10 * 10],
+                  'creator': [item[field] for field in ('author', 'director') if item.get(field)]}
+        for facet, facet_values in values.items():
+            for value in facet_values:
+                counts[facet][value] = counts[facet].get(value, 0) + 1
+    return {facet: [{'value': value, 'count': count}
+                    for value, count in sorted(facet_counts.items(), key=lambda pair: (-pair[1], pair[0]))[:limit]]
+            for facet, facet_counts in counts.items()}
+
+
+@pytest.mark.parametrize('backend', ['memory', 'sqlite'])
+def test_facets_match_brute_force_after_changes(backend, tmp_path):
+    rng = random.Random(5)
+    if backend == 'memory':
+        store = InMemoryCatalogStore(schema=CATALOG_SCHEMA)
+    else:
+        store = SQLiteDatabase(str(tmp_path / 'portal.sqlite3')).catalog_store(CATALOG_SCHEMA)
+    for _ in range(150):
+        store.create(random_item(rng))
+    store.create_many([random_item(rng) for _ in range(100)])
+    live = {record['id']: record for record in store.all()}
+    for record_id in rng.sample(sorted(live), 60):
+        store.delete(record_id)
+        del live[record_id]
+    for record_id in rng.sample(sorted(live), 40):
+        live[record_id] = store.update(record_id, {'genre': 'Драма', 'year': 1985})
+
+    for query in [CatalogQuery()] + [random_query(rng) for _ in range(40)]:
+        matched = [item for item in live.values() if matches(item, query)]
+        for limit in (2, 100):
+            assert store.facets(query, limit=limit) == {
+                'total': len(matched), 'facets': brute_force_facets(matched, limit)}
+
+
+def test_parse_facet_request():
+    assert parse_facet_request({}) == (CATALOG_FACETS, 20)
+    assert parse_facet_request({'facets': 'creator, type', 'facet_limit': '5'}) == (('type', 'creator'), 5)
+    for args in ({'facets': 'color'}, {'facet_limit': '0'}, {'facet_limit': 'x'}):
+        with pytest.raises(CatalogQueryError):
+            parse_facet_request(args)
+
+
+def test_index_accepts_explicit_none_genre_in_every_path():
+    index = CatalogIndex()
+    index.add({'id': 1, 'type': 'book', 'title': 'a', 'year': 1990, 'genre': None})
+    index.add_many([2], [{'type': 'book', 'title': 'b', 'year': 1990, 'genre': None}])
+    index.remove({'id': 1, 'type': 'book', 'title': 'a', 'year': 1990, 'genre': None})
+    assert index.search(CatalogQuery(type='book')) == ([2], None)
+    restored = CatalogIndex()
+    restored.load_columns([2, 3], {'type': ['book', 'movie'], 'genre': [None, 'Драма']})
+    restored.remove({'id': 2, 'type': 'book', 'genre': None})
+    assert restored.search(CatalogQuery(genre='драма')) == ([3], None)
@@ -0,0 +1,76 @@
+"""Тесты учета переходов по коротким ссылкам (click_analytics.py)."""
+import threading
+import time
+
+import click_analytics
+from click_analytics import SECONDS_PER_HOUR, ClickRecorder
+from storage import InMemoryClickStats
+
+
+def make_recorder():
+    """Регистратор без фонового сведения: тесты вызывают flush сами."""
+    click_stats = InMemoryClickStats()
+    return ClickRecorder(click_stats, flush_interval=3600), click_stats
+
+
+def test_clicks_are_saved_after_two_flushes():
+    recorder, click_stats = make_recorder()
+    for _ in range(3):
+        recorder.record('abc')
+    recorder.record('xyz')
+    recorder.flush()
+    assert click_stats.total_clicks('abc') == 0
+    recorder.flush()
+    assert click_stats.total_clicks('abc') == 3
+    assert click_stats.total_clicks('xyz') == 1
+
+
+def test_clicks_from_many_threads_are_not_lost():
+    recorder, click_stats = make_recorder()
+    stop = threading.Event()
+
+    def flush_continuously():
+        # Как фоновый агрегатор: между циклами пауза, за которую потоки заканчивают начатые увеличения.
+        while not stop.wait(0.05):
+            recorder.flush()
+
+    def worker():
+        for index in range(5000):
+            recorder.record('abc')
+            if index % 500 == 0:
+                time.sleep(0.01)
+
+    flusher = threading.Thread(target=flush_continuously)
+    flusher.start()
+    workers = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    stop.set()
+    flusher.join()
+    recorder.flush()
+    recorder.flush()
+    assert click_stats.total_clicks('abc') == 8 * 5000
+
+
+def test_clicks_are_bucketed_by_hour(monkeypatch):
+    recorder, click_stats = make_recorder()
+    now = [10 * SECONDS_PER_HOUR + 5]
+    monkeypatch.setattr(click_analytics.time, 'time', lambda: now[0])
+    recorder.record('abc')
+    now[0] += SECONDS_PER_HOUR
+    recorder.record('abc')
+    recorder.record('abc')
+    recorder.flush()
+    recorder.flush()
+    assert click_stats.hourly_clicks('abc', 0) == [(10, 1), (11, 2)]
+    assert click_stats.hourly_clicks('abc', 11) == [(11, 2)]
+
+
+def test_click_stats_drop_buckets_past_retention():
+    click_stats = InMemoryClickStats(retention_hours=2)
+    click_stats.add_clicks({('abc', 1): 1, ('abc', 2): 1})
+    click_stats.add_clicks({('abc', 4): 1})
+    assert click_stats.hourly_clicks('abc', 0) == [(4, 1)]
+    assert click_stats.total_clicks('abc') == 3
@@ -0,0 +1,90 @@
+"""Тесты колеса таймеров и политик вытеснения (expiry.py)."""
+import math
+import random
+
+import pytest
+
+from expiry import HierarchicalTimingWheel, LFUEviction, LRUEviction, create_eviction_policy
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_wheel_matches_brute_force(seed):
+    """Колесо с маленькими кольцами (частые осыпания и переполнение верхнего уровня) против словаря сроков."""
+    rng = random.Random(seed)
+    now = 1000.0
+    wheel = HierarchicalTimingWheel(now, tick_seconds=1.0, slots_per_level=4, level_count=3)
+    deadlines = {}
+    next_key = 0
+    for _ in range(2000):
+        action = rng.random()
+        if action < 0.5:
+            # Сроки от уже прошедших до далеких — дальше оборота верхнего уровня (4**3 тиков).
+            expires_at = now + rng.choice([-5, 0.3, 1, 3.7, 17, 64, 150, 1000]) * rng.random()
+            key = next_key if rng.random() < 0.8 or not deadlines else rng.choice(list(deadlines))
+            next_key += 1
+            wheel.schedule(key, expires_at)
+            deadlines[key] = max(math.ceil(expires_at), int(now) + 1)
+        elif action < 0.6 and deadlines:
+            key = rng.choice(list(deadlines))
+            wheel.cancel(key)
+            del deadlines[key]
+        else:
+            # Обычно шаг в несколько тиков, иногда долгий простой.
+            now += rng.choice([0.4, 1, 2, 5, 300]) * rng.random()
+            expected = {key for key, deadline in deadlines.items() if deadline <= int(now)}
+            assert set(wheel.advance(now)) == expected
+            for key in expected:
+                del deadlines[key]
+        assert len(wheel) == len(deadlines)
+    now += 10_000
+    assert set(wheel.advance(now)) == set(deadlines)
+    assert len(wheel) == 0
+
+
+def test_advance_backwards_or_within_tick_does_nothing():
+    wheel = HierarchicalTimingWheel(100.0)
+    wheel.schedule('a', 102.5)
+    assert wheel.advance(99.0) == []
+    assert wheel.advance(100.9) == []
+    assert wheel.advance(102.9) == []
+    assert wheel.advance(103.0) == ['a']
+
+
+def test_reschedule_replaces_deadline():
+    wheel = HierarchicalTimingWheel(0.0)
+    wheel.schedule('a', 5)
+    wheel.schedule('a', 50)
+    assert wheel.advance(10) == []
+    assert 'a' in wheel
+    assert wheel.advance(50) == ['a']
+
+
+def test_lru_evicts_least_recently_used():
+    policy = LRUEviction()
+    for key in 'abc':
+        policy.record_insert(key)
+    policy.record_access('a')
+    assert policy.pick_victim() == 'b'
+    policy.discard('b')
+    assert policy.pick_victim() == 'c'
+
+
+def test_lfu_evicts_least_frequently_used_then_oldest():
+    policy = LFUEviction()
+    for key in 'abcd':
+        policy.record_insert(key)
+    for key in 'aabbc':
+        policy.record_access(key)
+    assert policy.pick_victim() == 'd'
+    policy.discard('d')
+    assert policy.pick_victim() == 'c'
+    policy.discard('c')
+    assert policy.pick_victim() == 'a'
+    policy.restore(['x', 'y'])
+    assert policy.pick_victim() == 'x'
+
+
+def test_unknown_eviction_policy():
+    assert create_eviction_policy('lfu').name == 'lfu'
+    with pytest.raises(ValueError):
+        create_eviction_policy('fifo')
@@ -0,0 +1,171 @@
+"""Тесты бэкенда 'journal' (journal_storage.py): снимок, журнал и восстановление после сбоя."""
+import os
+import random
+
+import pytest
+
+from catalog_query import CatalogQuery
+from journal_storage import (
+    SNAPSHOT_FILE_NAME, JournalDatabase, JournalStorageError, journal_segment_name, read_journal_segment,
+)
+from storage import CATALOG_SCHEMA, TASKS_SCHEMA
+
+CATALOG_ITEMS = [
+    {'id': 1, 'type': 'book', 'title': 'Мастер и Маргарита', 'year': 1967, 'genre': 'Роман', 'author': 'Булгаков'},
+    {'id': 2, 'type': 'movie', 'title': 'Сталкер', 'year': 1979, 'genre': 'Драма', 'director': 'Тарковский'},
+]
+
+
+class Portal:
+    """Хранилища одного открытия каталога данных."""
+
+    def __init__(self, directory):
+        self.database = JournalDatabase(directory)
+        self.tasks = self.database.record_store(TASKS_SCHEMA)
+        self.catalog = self.database.catalog_store(CATALOG_SCHEMA, CATALOG_ITEMS)
+        self.short_urls = self.database.short_url_store()
+        self.codes = self.database.sequence('short_codes')
+        self.database.recover()
+
+    def state(self):
+        """Все, что должно пережить перезапуск."""
+        return {
+            'tasks': self.tasks.all(),
+            'catalog': self.catalog.all(),
+            'short_urls': self.short_urls.items(),
+            'codes': self.codes.current_value(),
+        }
+
+    def next_task_id(self):
+        return self.tasks.create({'text': 'проба', 'done': False})['id']
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    return str(tmp_path / 'portal_data')
+
+
+def segment_paths(directory):
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory) if name.startswith('journal-'))
+
+
+def make_changes(portal, rng, count):
+    for _ in range(count):
+        action = rng.random()
+        task_ids = [task['id'] for task in portal.tasks.all()]
+        if action < 0.4 or not task_ids:
+            portal.tasks.create({'text': f'Задача {rng.randint(0, 999)}', 'done': False})
+        elif action < 0.6:
+            portal.tasks.update(rng.choice(task_ids), {'done': True, 'text': 'Изменена'})
+        elif action < 0.7:
+            portal.tasks.delete(rng.choice(task_ids))
+        elif action < 0.85:
+            code = f'c{portal.codes.next_value()}'
+            portal.short_urls.add(code, f'https://example.com/{code}')
+        else:
+            portal.catalog.create({'type': 'book', 'title': f'Книга {rng.randint(0, 99)}', 'year': 2000,
+                                   'genre': 'Роман', 'author': 'Автор'})
+
+
+def reopen(portal, directory):
+    """Закрывает и заново открывает каталог; проверяет, что ID задач продолжают выдаваться с прежнего места."""
+    last_task_id = portal.next_task_id()
+    expected_state = portal.state()
+    portal.database.close()
+    reopened = Portal(directory)
+    assert reopened.state() == expected_state
+    assert reopened.next_task_id() == last_task_id + 1
+    return reopened
+
+
+def test_new_directory_gets_initial_records_once(data_dir):
+    portal = Portal(data_dir)
+    assert len(portal.catalog) == 2
+    reopened = reopen(portal, data_dir)
+    assert len(reopened.catalog) == 2
+    reopened.database.close()
+
+
+def test_changes_survive_restart_from_journal(data_dir):
+    portal = Portal(data_dir)
+    make_changes(portal, random.Random(1), 300)
+    reopened = reopen(portal, data_dir)
+    assert reopened.database.recovery_stats['replayed_entries'] > 300
+    reopened.database.close()
+
+
+def test_snapshot_then_journal_tail(data_dir):
+    portal = Portal(data_dir)
+    rng = random.Random(2)
+    make_changes(portal, rng, 200)
+    portal.database.snapshot()
+    # Сегменты, покрытые снимком, удалены: остался только текущий.
+    assert len(segment_paths(data_dir)) == 1
+    make_changes(portal, rng, 50)
+    reopened = reopen(portal, data_dir)
+    assert reopened.database.recovery_stats['snapshot_bytes'] > 0
+    assert reopened.database.recovery_stats['replayed_entries'] < 100
+    reopened.database.close()
+
+
+def test_catalog_index_is_usable_after_restore(data_dir):
+    portal = Portal(data_dir)
+    make_changes(portal, random.Random(3), 200)
+    portal.database.snapshot()
+    queries = [CatalogQuery(), CatalogQuery(type='movie'), CatalogQuery(title='книга 1'), CatalogQuery(year=2000)]
+    expected_results = [portal.catalog.query(query) for query in queries]
+    expected_facets = portal.catalog.facets(CatalogQuery())
+    portal.database.close()
+    reopened = Portal(data_dir)
+    assert [reopened.catalog.query(query) for query in queries] == expected_results
+    assert reopened.catalog.facets(CatalogQuery()) == expected_facets
+    created = reopened.catalog.create({'type': 'movie', 'title': 'Солярис', 'year': 1972, 'genre': 'Драма'})
+    assert reopened.catalog.query(CatalogQuery(title='солярис'))[0] == [created]
+    reopened.database.close()
+
+
+@pytest.mark.parametrize('damage', ['partial_frame', 'bad_checksum'])
+def test_torn_journal_tail_is_dropped(data_dir, damage):
+    portal = Portal(data_dir)
+    for index in range(20):
+        portal.tasks.create({'text': f'Задача {index}', 'done': False})
+    expected_tasks = portal.tasks.all()
+    portal.tasks.create({'text': 'Оборванная запись', 'done': False})
+    portal.database.close()
+
+    last_segment = segment_paths(data_dir)[-1]
+    with open(last_segment, 'rb') as segment_file:
+        data = segment_file.read()
+    intact_entries = len(read_journal_segment(last_segment))
+    if damage == 'partial_frame':
+        # Сбой посреди записи последнего кадра.
+        data = data[:-3]
+    else:
+        data = data[:-1] + bytes([data[-1] ^ 0xFF])
+    with open(last_segment, 'wb') as segment_file:
+        segment_file.write(data)
+
+    reopened = Portal(data_dir)
+    assert reopened.tasks.all() == expected_tasks
+    # Поврежденный хвост отрезан, целые кадры остались.
+    assert len(read_journal_segment(last_segment)) == intact_entries - 1
+    assert reopened.tasks.create({'text': 'После сбоя', 'done': False})['text'] == 'После сбоя'
+    reopened.database.close()
+
+
+def test_damaged_snapshot_is_reported(data_dir):
+    portal = Portal(data_dir)
+    portal.database.close()
+    snapshot_path = os.path.join(data_dir, SNAPSHOT_FILE_NAME)
+    with open(snapshot_path, 'r+b') as snapshot_file:
+        snapshot_file.truncate(os.path.getsize(snapshot_path) - 5)
+    with pytest.raises(JournalStorageError):
+        Portal(data_dir)
+
+
+def test_directory_is_locked_by_one_process(data_dir):
+    portal = Portal(data_dir)
+    with pytest.raises(JournalStorageError):
+        JournalDatabase(data_dir)
+    portal.database.close()
+    assert journal_segment_name(3) == 'journal-00000003.log'
@@ -0,0 +1,74 @@
+"""Тесты провайдера JSON с подключаемым сериализатором (json_provider.py)."""
+import datetime
+import json
+
+import pytest
+from flask import Flask
+
+from json_provider import PortalJSONProvider, available_json_backends
+
+DOCUMENT = {'b': [1, 2, {'z': None, 'a': True}], 'a': 'Привет, "мир"', 'c': 1.5}
+
+
+def make_app(backend):
+    app = Flask(__name__)
+    app.json = PortalJSONProvider(app)
+    app.json.set_backend(backend)
+    app.json.ensure_ascii = False  # Как в app.py (JSON_AS_ASCII = False)
+    return app
+
+
+@pytest.fixture(params=available_json_backends())
+def app(request):
+    return make_app(request.param)
+
+
+def test_compact_output_matches_stdlib(app):
+    expected = json.dumps(DOCUMENT, ensure_ascii=False, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    assert app.json.encode(DOCUMENT) == expected
+    assert json.loads(app.json.encode(DOCUMENT, pretty=True)) == DOCUMENT
+    assert b'\n  "a"' in app.json.encode(DOCUMENT, pretty=True)
+
+
+def test_types_unknown_to_fast_backends(app):
+    moment = datetime.datetime(2024, 5, 1, 12, 30, tzinfo=datetime.timezone.utc)
+    assert json.loads(app.json.encode({'at': moment})) == {'at': 'Wed, 01 May 2024 12:30:00 GMT'}
+    assert json.loads(app.json.encode({'big': 2 ** 70})) == {'big': 2 ** 70}
+
+
+def test_pretty_parameter_and_jsonify(app):
+    @app.route('/data')
+    def data():
+        return app.json.response(DOCUMENT)
+
+    client = app.test_client()
+    compact = client.get('/data').data
+    pretty = client.get('/data?pretty=1').data
+    assert compact.endswith(b'\n') and b'\n' not in compact[:-1]
+    assert json.loads(pretty) == json.loads(compact) == DOCUMENT
+    assert pretty != compact
+
+
+def test_prebuilt_response_is_serialized_once(app):
+    with app.test_request_context('/'):
+        first = app.json.prebuilt_response({'error': 'Ошибка'}, status=400)
+        second = app.json.prebuilt_response({'error': 'Ошибка'}, status=400)
+    assert first.status_code == 400
+    assert first.get_data() == second.get_data() == '{"error":"Ошибка"}\n'.encode('utf-8')
+    assert first is not second
+    assert len(app.json._prebuilt_bodies) == 1
+
+
+def test_item_helpers_round_trip(app):
+    assert app.json.item_loads()(app.json.item_dumps()(DOCUMENT)) == DOCUMENT
+    assert app.json.item_loads()(b'{"a": 1}') == {'a': 1}
+
+
+def test_ensure_ascii_escapes_with_every_backend(app):
+    app.json.ensure_ascii = True
+    assert app.json.encode({'a': 'ё'}) == b'{"a":"\\u0451"}'
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        make_app('simplejson')
@@ -0,0 +1,91 @@
+"""Тесты метрик HTTP-запросов (metrics.py)."""
+import threading
+
+import pytest
+from werkzeug.test import Client
+from werkzeug.wrappers import Response
+
+from metrics import ROUTE_ENVIRON_KEY, UNMATCHED_ROUTE, MetricsMiddleware, RequestMetrics
+
+
+def test_histogram_buckets_are_cumulative():
+    metrics = RequestMetrics(buckets=(0.1, 1.0))
+    for duration in (0.05, 0.1, 0.5, 2.0):
+        metrics.request_started()
+        metrics.request_finished('GET', '/api/tasks', '200', duration)
+    latencies, responses, in_flight = metrics.snapshot()
+    assert latencies[('GET', '/api/tasks')][:2] == [2, 3]
+    assert latencies[('GET', '/api/tasks')][-2] == pytest.approx(2.65)
+    assert latencies[('GET', '/api/tasks')][-1] == 4
+    assert responses == {('GET', '/api/tasks', '200'): 4}
+    assert in_flight == 0
+
+
+def test_counts_from_many_threads_add_up():
+    metrics = RequestMetrics()
+
+    def worker(status):
+        for _ in range(1000):
+            metrics.request_started()
+            metrics.request_finished('GET', '/x', status, 0.001)
+
+    threads = [threading.Thread(target=worker, args=(str(200 + index % 2),)) for index in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    latencies, responses, in_flight = metrics.snapshot()
+    assert responses == {('GET', '/x', '200'): 4000, ('GET', '/x', '201'): 4000}
+    assert latencies[('GET', '/x')][-1] == 8000
+    assert in_flight == 0
+
+
+def test_in_flight_is_not_changed_by_reading():
+    metrics = RequestMetrics()
+    metrics.request_started()
+    for _ in range(3):
+        assert metrics.snapshot()[2] == 1
+
+
+def test_prometheus_text():
+    metrics = RequestMetrics(buckets=(0.5,))
+    metrics.request_started()
+    metrics.request_finished('GET', '/s/<short_code>', '302', 0.25)
+    text = metrics.render_prometheus({'tasks': 3})
+    assert 'portal_http_request_duration_seconds_bucket{method="GET",route="/s/<short_code>",le="0.5"} 1' in text
+    assert 'portal_http_request_duration_seconds_bucket{method="GET",route="/s/<short_code>",le="+Inf"} 1' in text
+    assert 'portal_http_responses_total{method="GET",route="/s/<short_code>",status="302"} 1' in text
+    assert 'portal_http_requests_in_flight 0' in text
+    assert 'portal_store_records{store="tasks"} 3' in text
+
+
+def routed_app(environ, start_response):
+    """Приложение, которое, как Flask, кладет шаблон маршрута в окружение."""
+    if environ['PATH_INFO'].startswith('/api/'):
+        environ[ROUTE_ENVIRON_KEY] = '/api/<name>'
+        return Response(iter([b'a', b'b']))(environ, start_response)
+    if environ['PATH_INFO'] == '/boom':
+        raise RuntimeError('boom')
+    start_response('302 FOUND', [('Location', '/')])
+    return [b'']
+
+
+def test_middleware_records_routes_and_streamed_bodies():
+    metrics = RequestMetrics()
+    client = Client(MetricsMiddleware(routed_app, metrics, prefix_routes=(('/s/', '/s/<short_code>'),)))
+    assert client.get('/api/one').data == b'ab'
+    client.get('/api/two')
+    client.get('/s/abc')
+    client.get('/other')
+    client.open('/s/abc', method='BREW')
+    with pytest.raises(RuntimeError):
+        client.get('/boom')
+    _, responses, in_flight = metrics.snapshot()
+    assert responses == {
+        ('GET', '/api/<name>', '200'): 2,
+        ('GET', '/s/<short_code>', '302'): 1,
+        ('GET', UNMATCHED_ROUTE, '302'): 1,
+        ('OTHER', '/s/<short_code>', '302'): 1,
+        ('GET', UNMATCHED_ROUTE, '500'): 1,
+    }
+    assert in_flight == 0
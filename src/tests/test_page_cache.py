@@ -0,0 +1,74 @@
+"""Тесты кеша отрендеренных страниц (page_cache.py)."""
+import gzip
+
+from flask import Flask, request
+
+from page_cache import MIN_COMPRESSED_SIZE, RenderedPageCache, build_rendered_page
+
+LONG_HTML = '<html><body>' + 'Привет, портал! ' * 100 + '</body></html>'
+
+
+class CountingRender:
+    """Функция рендеринга, считающая вызовы."""
+
+    def __init__(self, html):
+        self.html = html
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.html
+
+
+def test_page_is_rendered_once_per_variant():
+    cache = RenderedPageCache()
+    render = CountingRender(LONG_HTML)
+    first = cache.get_or_render('index', 2024, render)
+    assert cache.get_or_render('index', 2024, render) is first
+    assert render.calls == 1
+    cache.get_or_render('index', 2025, render)
+    assert render.calls == 2
+    assert len(cache) == 1
+    cache.clear()
+    cache.get_or_render('index', 2025, render)
+    assert render.calls == 3
+
+
+def test_gzip_body_is_deterministic_and_skipped_for_small_pages():
+    page = build_rendered_page(LONG_HTML)
+    assert gzip.decompress(page.gzip_body) == LONG_HTML.encode('utf-8')
+    assert build_rendered_page(LONG_HTML).gzip_body == page.gzip_body
+    assert build_rendered_page('x' * (MIN_COMPRESSED_SIZE - 1)).gzip_body is None
+
+
+def make_client(html):
+    app = Flask(__name__)
+    cache = RenderedPageCache()
+
+    @app.route('/')
+    def index():
+        page = cache.get_or_render('index', None, lambda: html)
+        return RenderedPageCache.build_response(page, request, app.response_class)
+
+    return app.test_client()
+
+
+def test_response_negotiates_gzip_with_separate_etags():
+    client = make_client(LONG_HTML)
+    plain = client.get('/', headers={'Accept-Encoding': 'identity'})
+    compressed = client.get('/', headers={'Accept-Encoding': 'gzip, deflate'})
+    assert plain.data.decode('utf-8') == LONG_HTML
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(compressed.data).decode('utf-8') == LONG_HTML
+    assert plain.headers['ETag'] != compressed.headers['ETag']
+    assert plain.headers['Vary'] == compressed.headers['Vary'] == 'Accept-Encoding'
+
+
+def test_matching_etag_gives_not_modified():
+    client = make_client(LONG_HTML)
+    etag = client.get('/', headers={'Accept-Encoding': 'gzip'}).headers['ETag']
+    response = client.get('/', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+    # ETag сжатого варианта не подходит к несжатому.
+    assert client.get('/', headers={'If-None-Match': etag}).status_code == 200
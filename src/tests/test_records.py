@@ -0,0 +1,44 @@
+"""Тесты компактного представления записей (records.py)."""
+from records import DictLayout, RecordLayout
+
+
+def make_layout():
+    return RecordLayout('catalog_items', ('type', 'title', 'year'), interned_fields=('type',))
+
+
+def test_pack_and_to_dict_round_trip():
+    layout = make_layout()
+    record = layout.pack({'id': 1, 'type': 'книга', 'title': 'Мастер и Маргарита', 'year': 1967, 'extra': 'x'})
+    assert type(record).__name__ == 'CatalogItemsRecord'
+    # Поля вне схемы отбрасываются, незаполненные — не попадают в словарь.
+    assert layout.to_dict(record) == {'id': 1, 'type': 'книга', 'title': 'Мастер и Маргарита', 'year': 1967}
+    assert layout.to_dict(layout.pack({'id': 2, 'title': 'Без типа'})) == {'id': 2, 'title': 'Без типа'}
+
+
+def test_pack_new_matches_pack():
+    layout = make_layout()
+    fields = {'type': 'фильм', 'title': 'Сталкер', 'year': 1979}
+    assert layout.pack_new(7, fields) == layout.pack({**fields, 'id': 7})
+    assert 'id' not in fields
+
+
+def test_interned_values_are_shared():
+    layout = make_layout()
+    first = layout.pack({'id': 1, 'type': ''.join(['кни', 'га']), 'title': 'a'})
+    second = layout.pack_new(2, {'type': ''.join(['кн', 'ига']), 'title': 'b'})
+    assert first.type is second.type
+
+
+def test_replace_returns_new_record():
+    layout = make_layout()
+    record = layout.pack({'id': 1, 'type': 'книга', 'title': 'a', 'year': 2000})
+    updated = layout.replace(record, {'title': 'b', 'year': None})
+    assert layout.to_dict(updated) == {'id': 1, 'type': 'книга', 'title': 'b'}
+    assert record.title == 'a'
+
+
+def test_dict_layout_has_same_interface():
+    record = DictLayout.pack_new(3, {'text': 'a'})
+    assert record == {'text': 'a', 'id': 3}
+    updated = DictLayout.replace(record, {'text': 'b'})
+    assert (DictLayout.to_dict(updated), record['text']) == ({'text': 'b', 'id': 3}, 'a')
@@ -0,0 +1,99 @@
+"""Тесты быстрого пути редиректов (redirect_fast_path.py)."""
+from werkzeug.test import Client
+from werkzeug.wrappers import Response
+
+from redirect_fast_path import BufferedAccessLog, RedirectFastPath
+
+URLS = {'abc123': 'https://example.com/путь?q=1', 'xyz789': 'https://example.org/'}
+
+
+def fallback_app(environ, start_response):
+    """Приложение "за" прослойкой: отвечает 418, чтобы было видно, что запрос прошел мимо кеша."""
+    return Response('fallback', status=418)(environ, start_response)
+
+
+class CountingLookup:
+    """Поиск URL по коду, считающий обращения к хранилищу."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, short_code):
+        self.calls += 1
+        return URLS.get(short_code)
+
+
+class ListLogger:
+    def __init__(self):
+        self.messages = []
+
+    def info(self, message):
+        self.messages.append(message)
+
+
+def test_redirect_is_built_once_and_served_from_cache():
+    lookup = CountingLookup()
+    client = Client(RedirectFastPath(fallback_app, lookup))
+    for _ in range(3):
+        response = client.get('/s/abc123')
+        assert response.status_code == 302
+        assert response.headers['Location'] == 'https://example.com/%D0%BF%D1%83%D1%82%D1%8C?q=1'
+    assert lookup.calls == 1
+
+
+def test_head_has_no_body():
+    client = Client(RedirectFastPath(fallback_app, CountingLookup()))
+    response = client.head('/s/xyz789')
+    assert response.status_code == 302
+    assert response.data == b''
+
+
+def test_other_requests_pass_through():
+    client = Client(RedirectFastPath(fallback_app, CountingLookup()))
+    assert client.get('/s/unknown').status_code == 418
+    assert client.get('/s/abc123/extra').status_code == 418
+    assert client.post('/s/abc123').status_code == 418
+    assert client.get('/api/tasks').status_code == 418
+
+
+def test_invalidate_drops_cached_response():
+    urls = dict(URLS)
+    client_app = RedirectFastPath(fallback_app, urls.get)
+    client = Client(client_app)
+    assert client.get('/s/abc123').status_code == 302
+    del urls['abc123']
+    client_app.invalidate('abc123')
+    assert client.get('/s/abc123').status_code == 418
+
+
+def test_cache_is_bounded():
+    lookup = CountingLookup()
+    client = Client(RedirectFastPath(fallback_app, lookup, cache_size=1))
+    client.get('/s/abc123')
+    client.get('/s/xyz789')
+    client.get('/s/abc123')
+    assert lookup.calls == 3
+
+
+def test_access_log_is_written_in_batches():
+    logger = ListLogger()
+    access_log = BufferedAccessLog(logger, flush_interval=3600)
+    client = Client(RedirectFastPath(fallback_app, URLS.get, access_log=access_log))
+    client.get('/s/abc123')
+    client.get('/s/xyz789')
+    assert logger.messages == []
+    access_log.flush()
+    assert len(logger.messages) == 1
+    assert "'abc123' -> 'https://example.com/путь?q=1'" in logger.messages[0]
+    assert "'xyz789' -> 'https://example.org/'" in logger.messages[0]
+    access_log.flush()
+    assert len(logger.messages) == 1
+
+
+def test_access_log_sampling_can_drop_everything():
+    logger = ListLogger()
+    access_log = BufferedAccessLog(logger, sample_rate=0.0, flush_interval=3600)
+    for _ in range(100):
+        access_log.record('abc123', URLS['abc123'])
+    access_log.flush()
+    assert logger.messages == []
@@ -0,0 +1,59 @@
+"""Тесты буферизованного генератора паролей и случайных чисел (secure_random.py)."""
+import collections
+import string
+
+import pytest
+
+import secure_random as secure_random_module
+from secure_random import BufferedSecureRandom
+
+POOL = string.ascii_letters + string.digits + '!@#$%'
+
+
+def test_strings_have_requested_shape():
+    generator = BufferedSecureRandom(buffer_size=128)
+    passwords = list(generator.iter_strings(POOL, 16, 1000))
+    assert len(passwords) == 1000
+    assert all(len(password) == 16 and set(password) <= set(POOL) for password in passwords)
+    assert len(set(passwords)) == 1000
+
+
+def test_integers_stay_in_range_and_cover_it():
+    generator = BufferedSecureRandom(buffer_size=64)
+    numbers = list(generator.iter_integers(-3, 3, 7000))
+    assert len(numbers) == 7000
+    counts = collections.Counter(numbers)
+    assert set(counts) == set(range(-3, 4))
+    # При равномерном распределении каждое значение выпадает ~1000 раз.
+    assert all(700 < count < 1300 for count in counts.values())
+
+
+def test_full_32_bit_range_and_single_value_range():
+    generator = BufferedSecureRandom()
+    assert all(0 <= number < 2 ** 32 for number in generator.iter_integers(0, 2 ** 32 - 1, 100))
+    assert list(generator.iter_integers(5, 5, 3)) == [5, 5, 5]
+
+
+def test_rejected_bytes_are_skipped(monkeypatch):
+    """Байт 255 не делится поровну между тремя символами и должен отбрасываться, а не давать 'a'."""
+    monkeypatch.setattr(secure_random_module.os, 'urandom', lambda size: bytes([255, 1]) * (size // 2 + 1))
+    generator = BufferedSecureRandom(buffer_size=1024)
+    assert ''.join(generator.iter_strings('abc', 1, 1000)) == 'b' * 1000
+
+
+def test_requests_larger_than_buffer():
+    generator = BufferedSecureRandom(buffer_size=16)
+    assert len(generator.random_bytes(100)) == 100
+    assert len(next(generator.iter_strings('ab', 1000, 1))) == 1000
+
+
+@pytest.mark.parametrize('pool, length', [('', 8), ('абв', 8), ('x' * 257, 8), ('ab', 0)])
+def test_invalid_string_parameters(pool, length):
+    with pytest.raises(ValueError):
+        BufferedSecureRandom().iter_strings(pool, length, 1)
+
+
+@pytest.mark.parametrize('min_value, max_value', [(5, 4), (0, 2 ** 32)])
+def test_invalid_integer_range(min_value, max_value):
+    with pytest.raises(ValueError):
+        BufferedSecureRandom().iter_integers(min_value, max_value, 1)
@@ -0,0 +1,98 @@
+"""Тесты хранилища коротких ссылок (storage.ShortUrlStore)."""
+import pytest
+
+from storage import ShortUrlStore, normalize_url
+
+
+def test_normalize_url_ignores_case_of_host_and_default_port():
+    assert normalize_url(' HTTPS://Example.COM:443 ') == 'https://example.com/'
+    assert normalize_url('http://example.com:8080/Path?q=1') == 'http://example.com:8080/Path?q=1'
+
+
+def test_find_code_uses_reverse_index():
+    store = ShortUrlStore()
+    store.add('abc', 'https://example.com/page')
+    assert store.get('abc') == 'https://example.com/page'
+    assert store.find_code('HTTPS://EXAMPLE.COM:443/page') == 'abc'
+    assert store.find_code('https://example.com/other') is None
+
+
+def test_add_rejects_taken_code():
+    store = ShortUrlStore()
+    store.add('abc', 'https://example.com/')
+    with pytest.raises(ValueError):
+        store.add('abc', 'https://example.org/')
+
+
+def test_reverse_index_keeps_first_code_for_url():
+    store = ShortUrlStore()
+    store.add('first', 'https://example.com/')
+    store.add('second', 'https://example.com/')
+    assert store.find_code('https://example.com/') == 'first'
+    assert [code for code, _ in store.items()] == ['first', 'second']
+
+
+class FakeClock:
+    """Управляемые тестом часы для ShortUrlStore."""
+
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_link_expires_and_listeners_are_notified():
+    clock = FakeClock()
+    store = ShortUrlStore(clock=clock)
+    removed = []
+    store.add_removal_listener(removed.append)
+    store.add('temp', 'https://example.com/', expires_at=clock.now + 10)
+    store.add('forever', 'https://example.com/')
+    assert store.find_code('https://example.com/') == 'forever'
+    clock.now += 9.5
+    assert store.get('temp') == 'https://example.com/'
+    clock.now += 0.5
+    # Срок вышел: ссылка уже недоступна, хотя колесо удалит ее на следующем тике.
+    assert store.get('temp') is None
+    clock.now += 1
+    store.remove_expired()
+    assert 'temp' not in store
+    assert removed == ['temp']
+    assert store.get('forever') == 'https://example.com/'
+
+
+def test_expired_code_can_be_reused():
+    clock = FakeClock()
+    store = ShortUrlStore(clock=clock)
+    store.add('abc', 'https://example.com/old', expires_at=clock.now + 1)
+    clock.now += 5
+    store.add('abc', 'https://example.com/new')
+    assert store.get('abc') == 'https://example.com/new'
+
+
+def test_lru_limit_evicts_least_recently_used_link():
+    store = ShortUrlStore(max_entries=2, eviction_policy='lru')
+    store.add('a', 'https://example.com/a')
+    store.add('b', 'https://example.com/b')
+    store.get('a')
+    store.add('c', 'https://example.com/c')
+    assert [code for code, _ in store.items()] == ['a', 'c']
+    assert store.find_code('https://example.com/b') is None
+
+
+def test_lfu_limit_keeps_popular_link():
+    store = ShortUrlStore(max_entries=2, eviction_policy='lfu')
+    store.add('a', 'https://example.com/a')
+    store.add('b', 'https://example.com/b')
+    for _ in range(3):
+        store.get('a')
+    store.get('b')
+    store.add('c', 'https://example.com/c')
+    store.add('d', 'https://example.com/d')
+    assert sorted(code for code, _ in store.items()) == ['a', 'd']
+
+
+def test_invalid_limit():
+    with pytest.raises(ValueError):
+        ShortUrlStore(max_entries=0)
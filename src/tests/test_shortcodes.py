@@ -0,0 +1,64 @@
+"""Тесты аллокаторов коротких кодов (shortcodes.py)."""
+import threading
+
+import pytest
+
+from shortcodes import (
+    BASE62_ALPHABET, CounterCodeAllocator, RandomCodeAllocator, ShortCodeAllocationError, create_code_allocator,
+    encode_base62,
+)
+from storage import InMemorySequence
+
+
+def test_encode_base62_pads_to_length_and_rejects_overflow():
+    assert encode_base62(0, 3) == 'aaa'
+    assert encode_base62(61, 2) == 'a9'
+    with pytest.raises(ValueError):
+        encode_base62(62 ** 2, 2)
+
+
+@pytest.mark.parametrize('scramble', [True, False])
+def test_counter_allocator_never_repeats_across_code_lengths(scramble):
+    # Длина 2 — 3844 кода: пространство заполняется целиком, и выдача переходит на коды длины 3.
+    allocator = CounterCodeAllocator(InMemorySequence(), length=2, scramble=scramble)
+    codes = [allocator.allocate() for _ in range(62 ** 2 + 500)]
+    assert len(set(codes)) == len(codes)
+    assert all(len(code) == 2 for code in codes[:62 ** 2])
+    assert all(len(code) == 3 for code in codes[62 ** 2:])
+    assert set(''.join(codes)) <= set(BASE62_ALPHABET)
+
+
+def test_scrambled_codes_do_not_look_sequential():
+    allocator = CounterCodeAllocator(InMemorySequence(), length=6)
+    first, second = allocator.allocate(), allocator.allocate()
+    assert sum(a != b for a, b in zip(first, second)) > 1
+
+
+def test_counter_allocator_is_collision_free_across_threads():
+    allocator = CounterCodeAllocator(InMemorySequence(), length=3)
+    codes = [[] for _ in range(8)]
+
+    def worker(index):
+        for _ in range(1000):
+            codes[index].append(allocator.allocate())
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    all_codes = [code for thread_codes in codes for code in thread_codes]
+    assert len(set(all_codes)) == len(all_codes) == 8000
+    assert allocator.keyspace_stats()['allocated'] == 8000
+
+
+def test_random_allocator_gives_up_when_every_code_is_taken():
+    allocator = RandomCodeAllocator(lambda code: True, length=2, max_attempts=3)
+    with pytest.raises(ShortCodeAllocationError):
+        allocator.allocate()
+    assert allocator.keyspace_stats()['collisions_total'] == 3
+
+
+def test_create_code_allocator_rejects_unknown_kind():
+    with pytest.raises(ValueError):
+        create_code_allocator('nope', InMemorySequence(), lambda code: False)
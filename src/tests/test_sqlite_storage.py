@@ -0,0 +1,58 @@
+"""Тесты SQLite-бэкенда (sqlite_storage.py): данные в файле, общие для нескольких процессов."""
+import pytest
+
+from sqlite_storage import SQLiteDatabase
+from storage import TASKS_SCHEMA
+
+
+@pytest.fixture
+def database_path(tmp_path):
+    return str(tmp_path / 'portal.sqlite3')
+
+
+def test_record_store_crud_survives_reopen(database_path):
+    tasks = SQLiteDatabase(database_path).record_store(TASKS_SCHEMA)
+    first = tasks.create({'text': 'a', 'done': False})
+    second = tasks.create({'text': 'b', 'done': True})
+    assert tasks.update(first['id'], {'done': True}) == {'id': first['id'], 'text': 'a', 'done': True}
+    assert tasks.delete(second['id']) is True
+    assert tasks.delete(second['id']) is False
+
+    reopened = SQLiteDatabase(database_path).record_store(TASKS_SCHEMA)
+    assert reopened.all() == [{'id': first['id'], 'text': 'a', 'done': True}]
+    assert reopened.get(second['id']) is None
+    assert len(reopened) == 1
+
+
+def test_two_connections_share_ids_and_sequence(database_path):
+    # Два объекта базы на одном файле — как два воркера gunicorn.
+    first_worker, second_worker = SQLiteDatabase(database_path), SQLiteDatabase(database_path)
+    first_tasks, second_tasks = first_worker.record_store(TASKS_SCHEMA), second_worker.record_store(TASKS_SCHEMA)
+    ids = [store.create({'text': 'x', 'done': False})['id'] for store in (first_tasks, second_tasks) * 5]
+    assert len(set(ids)) == 10
+    first_sequence, second_sequence = first_worker.sequence('codes'), second_worker.sequence('codes')
+    values = [sequence.next_value() for sequence in (first_sequence, second_sequence) * 5]
+    assert sorted(values) == list(range(10))
+
+
+def test_create_many_inserts_batch(database_path):
+    tasks = SQLiteDatabase(database_path).record_store(TASKS_SCHEMA)
+    created_ids = tasks.create_many([{'text': str(index), 'done': index % 2 == 0} for index in range(5)])
+    assert len(created_ids) == 5 and created_ids == sorted(created_ids)
+    assert [record['text'] for record in tasks.all()] == ['0', '1', '2', '3', '4']
+
+
+def test_short_url_store_reverse_lookup(database_path):
+    short_urls = SQLiteDatabase(database_path).short_url_store()
+    short_urls.add('abc', 'https://example.com/page')
+    assert short_urls.get('abc') == 'https://example.com/page'
+    assert short_urls.find_code('HTTPS://EXAMPLE.COM/page') == 'abc'
+    with pytest.raises(ValueError):
+        short_urls.add('abc', 'https://example.org/')
+
+
+
+def test_instance_id_is_kept_in_database_and_changes_with_new_file(database_path, tmp_path):
+    instance_id = SQLiteDatabase(database_path).instance_id()
+    assert SQLiteDatabase(database_path).instance_id() == instance_id
+    assert SQLiteDatabase(str(tmp_path / 'other.sqlite3')).instance_id() != instance_id
@@ -0,0 +1,219 @@
+"""Тесты хранилища записей в памяти (storage.InMemoryRecordStore)."""
+import random
+import threading
+
+import storage
+
+from storage import TASKS_SCHEMA, InMemoryRecordStore
+
+
+def make_store(initial_records=()):
+    return InMemoryRecordStore(initial_records, schema=TASKS_SCHEMA)
+
+
+def test_create_assigns_increasing_ids_after_initial_records():
+    store = make_store([{'id': 5, 'text': 'старая', 'done': True}])
+    first = store.create({'text': 'a', 'done': False})
+    second = store.create({'text': 'b', 'done': False})
+    assert (first['id'], second['id']) == (6, 7)
+    assert store.get(6) == {'id': 6, 'text': 'a', 'done': False}
+
+
+def test_update_and_delete_by_id():
+    store = make_store()
+    record = store.create({'text': 'a', 'done': False})
+    assert store.update(record['id'], {'done': True}) == {'id': record['id'], 'text': 'a', 'done': True}
+    assert store.update(999, {'done': True}) is None
+    assert store.delete(record['id']) is True
+    assert store.delete(record['id']) is False
+    assert store.get(record['id']) is None
+    assert len(store) == 0
+
+
+def test_update_does_not_change_previously_returned_record():
+    store = make_store()
+    record = store.create({'text': 'a', 'done': False})
+    before = store.get(record['id'])
+    store.update(record['id'], {'text': 'b'})
+    assert before['text'] == 'a'
+
+
+def test_all_keeps_insertion_order_after_deletes():
+    store = make_store()
+    ids = [store.create({'text': str(index), 'done': False})['id'] for index in range(6)]
+    store.delete(ids[1])
+    store.delete(ids[4])
+    assert [record['id'] for record in store.all()] == [ids[0], ids[2], ids[3], ids[5]]
+    assert [record['id'] for record in store] == [ids[0], ids[2], ids[3], ids[5]]
+
+
+def test_random_record_returns_only_live_records():
+    store = make_store()
+    assert store.random_record() is None
+    ids = [store.create({'text': str(index), 'done': False})['id'] for index in range(20)]
+    for record_id in ids[::2]:
+        store.delete(record_id)
+    live_ids = set(ids[1::2])
+    assert all(store.random_record()['id'] in live_ids for _ in range(200))
+
+
+def test_create_many_returns_ids_in_order():
+    store = make_store()
+    store.create({'text': 'a', 'done': False})
+    created_ids = store.create_many([{'text': 'b', 'done': True}, {'text': 'c', 'done': False}])
+    assert created_ids == [2, 3]
+    assert [record['text'] for record in store.all()] == ['a', 'b', 'c']
+    assert store.get(3) == {'id': 3, 'text': 'c', 'done': False}
+
+
+def test_concurrent_creates_get_unique_ids():
+    store = make_store()
+    created = [[] for _ in range(8)]
+
+    def worker(index):
+        for _ in range(500):
+            created[index].append(store.create({'text': 'x', 'done': False})['id'])
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    all_ids = [record_id for ids in created for record_id in ids]
+    assert len(set(all_ids)) == len(all_ids) == len(store) == 4000
+
+
+def test_changes_since_returns_delta_after_version():
+    store = make_store([{'id': 1, 'text': 'старая', 'done': False}])
+    assert store.version == 0
+    first = store.create({'text': 'a', 'done': False})
+    second = store.create({'text': 'b', 'done': False})
+    seen_version = store.version
+    store.update(first['id'], {'done': True})
+    store.delete(second['id'])
+    third = store.create({'text': 'c', 'done': False})
+    changes = store.changes_since(seen_version)
+    assert changes.version == store.version == 5
+    assert changes.changed == [{'id': first['id'], 'text': 'a', 'done': True}, third]
+    assert changes.deleted_ids == [second['id']]
+    assert store.changes_since(store.version).changed == []
+
+
+def test_changes_since_reports_each_record_once_with_latest_state():
+    store = make_store()
+    record = store.create({'text': 'a', 'done': False})
+    for text in ('b', 'c', 'd'):
+        store.update(record['id'], {'text': text})
+    changes = store.changes_since(0)
+    assert changes.changed == [{'id': record['id'], 'text': 'd', 'done': False}]
+
+
+def test_changes_since_unknown_version_requires_reset(monkeypatch):
+    monkeypatch.setattr(storage, 'CHANGE_LOG_LIMIT', 3)
+    store = make_store()
+    store.create_many([{'text': str(index), 'done': False} for index in range(5)])
+    assert store.changes_since(store.version + 1) is None
+    # Журнал хранит изменения только последних трех записей.
+    assert store.changes_since(1) is None
+    assert [record['text'] for record in store.changes_since(2).changed] == ['2', '3', '4']
+
+
+def test_wait_for_change_wakes_on_update():
+    store = make_store()
+    assert store.wait_for_change(0, timeout=0.01) == 0
+    timer = threading.Timer(0.05, store.create, args=({'text': 'a', 'done': False},))
+    timer.start()
+    try:
+        assert store.wait_for_change(0, timeout=5) == 1
+    finally:
+        timer.join()
+
+
+def run_threads(target, count):
+    threads = [threading.Thread(target=target, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def test_concurrent_create_update_delete_keep_store_consistent():
+    store = make_store([{'id': 1, 'text': 'общая', 'done': False}])
+    expected_by_thread = [{} for _ in range(8)]
+    mutations = [0] * 8
+    created_ids = [[] for _ in range(8)]
+
+    def worker(index):
+        rng = random.Random(index)
+        expected = expected_by_thread[index]
+        for step in range(300):
+            record = store.create({'text': f'{index}-{step}', 'done': False})
+            created_ids[index].append(record['id'])
+            expected[record['id']] = record
+            mutations[index] += 1
+            if step % 2:
+                record_id = rng.choice(list(expected))
+                expected[record_id] = store.update(record_id, {'done': True, 'text': f'{index}-{step}-изм'})
+                mutations[index] += 1
+            if step % 3 == 0:
+                record_id = rng.choice(list(expected))
+                assert store.delete(record_id) is True
+                del expected[record_id]
+                mutations[index] += 1
+            # Общую запись правят все потоки сразу.
+            store.update(1, {'done': bool(step % 2)})
+            mutations[index] += 1
+
+    run_threads(worker, 8)
+    all_ids = [record_id for ids in created_ids for record_id in ids]
+    assert len(set(all_ids)) == len(all_ids) == 8 * 300
+    expected_records = {record_id: record for expected in expected_by_thread for record_id, record in expected.items()}
+    expected_records[1] = store.get(1)
+    assert {record['id']: record for record in store.all()} == expected_records
+    assert len(store) == len(expected_records)
+    assert store.version == sum(mutations)
+
+
+def test_changes_since_stays_consistent_under_contention():
+    store = make_store([{'id': index, 'text': str(index), 'done': False} for index in range(1, 51)])
+    writers_done = threading.Event()
+    mirror_errors = []
+
+    def worker(index):
+        rng = random.Random(100 + index)
+        for step in range(400):
+            action = rng.random()
+            if action < 0.4:
+                store.create({'text': f'{index}-{step}', 'done': False})
+            elif action < 0.8:
+                store.update(rng.randint(1, 50 + step), {'done': True})
+            else:
+                store.delete(rng.randint(1, 50 + step))
+
+    def reader():
+        # Клиент дельт: список на версию, затем только изменения после нее.
+        version = store.version
+        mirror = {record['id']: record for record in store.all()}
+        while True:
+            finished = writers_done.is_set()
+            changes = store.changes_since(version)
+            if changes is None:
+                mirror_errors.append(f'дельта с версии {version} недоступна')
+                return
+            for record in changes.changed:
+                mirror[record['id']] = record
+            for record_id in changes.deleted_ids:
+                mirror.pop(record_id, None)
+            assert changes.version >= version
+            version = changes.version
+            if finished:
+                break
+        if mirror != {record['id']: record for record in store.all()}:
+            mirror_errors.append('копия по дельтам расходится с хранилищем')
+
+    reader_thread = threading.Thread(target=reader)
+    reader_thread.start()
+    run_threads(worker, 8)
+    writers_done.set()
+    reader_thread.join()
+    assert mirror_errors == []
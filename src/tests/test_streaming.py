@@ -0,0 +1,68 @@
+"""Тесты потоковой выдачи коллекций (streaming.py)."""
+import csv
+import io
+import json
+
+import pytest
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header
+
+from streaming import format_server_sent_event, iter_csv, iter_json_array, iter_ndjson, wants_ndjson
+
+ITEMS = [{'id': index, 'text': f'Задача {index}'} for index in range(10)]
+
+
+def compact_dumps(value):
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+
+@pytest.mark.parametrize('batch_size', [1, 3, 10, 100])
+def test_json_array_chunks_join_into_document(batch_size):
+    chunks = list(iter_json_array(iter(ITEMS), compact_dumps, prefix='{"count":10,"tasks":', suffix='}',
+                                  batch_size=batch_size))
+    assert json.loads(''.join(chunks)) == {'count': 10, 'tasks': ITEMS}
+    assert ''.join(chunks).endswith('}\n')
+
+
+def test_json_array_of_empty_collection():
+    assert json.loads(''.join(iter_json_array(iter(()), compact_dumps))) == []
+
+
+def test_json_array_with_pretty_dumps():
+    pretty_dumps = lambda value: json.dumps(value, ensure_ascii=False, indent=2)  # noqa: E731
+    assert json.loads(''.join(iter_json_array(iter(ITEMS), pretty_dumps, batch_size=4))) == ITEMS
+
+
+def test_ndjson_has_one_object_per_line():
+    lines = ''.join(iter_ndjson(iter(ITEMS), compact_dumps, batch_size=4)).splitlines()
+    assert [json.loads(line) for line in lines] == ITEMS
+
+
+@pytest.mark.parametrize('header, expected', [
+    ('application/x-ndjson', True),
+    ('application/jsonl', True),
+    ('application/json', False),
+    ('application/json;q=0.5, application/x-ndjson', True),
+    ('application/x-ndjson;q=0.5, application/json', False),
+    ('*/*', False),
+])
+def test_wants_ndjson(header, expected):
+    assert wants_ndjson(parse_accept_header(header, MIMEAccept)) is expected
+
+
+def test_server_sent_event_format():
+    assert format_server_sent_event({'version': 3, 'text': 'ок'}, event='changes', event_id=3) == (
+        'id: 3\nevent: changes\ndata: {"version":3,"text":"ок"}\n\n')
+    assert format_server_sent_event([1], ensure_ascii=True) == 'data: [1]\n\n'
+
+
+@pytest.mark.parametrize('batch_size', [1, 2, 100])
+def test_csv_round_trips_through_reader(batch_size):
+    items = [{'id': 1, 'text': 'Запятая, "кавычки"\nи перевод строки', 'done': True}, {'id': 2, 'done': False}]
+    text = ''.join(iter_csv(iter(items), ('id', 'text', 'done'), batch_size=batch_size))
+    assert list(csv.reader(io.StringIO(text))) == [
+        ['id', 'text', 'done'], ['1', 'Запятая, "кавычки"\nи перевод строки', 'true'], ['2', '', 'false']]
+
+
+def test_csv_of_empty_collection_has_header_only():
+    assert ''.join(iter_csv(iter(()), ('id', 'text'))) == 'id,text\r\n'
@@ -0,0 +1,107 @@
+"""Тесты пакетной конвертации единиц (unit_conversion.py)."""
+import pytest
+
+from unit_conversion import (
+    CONVERSION_OVERFLOW_MESSAGE, ConversionBatchError, ConversionTable, iter_converted_values, parse_conversion_batch,
+)
+
+CONVERSION_RATES = {
+    'length': {
+        'meter': {'name': 'Метр', 'factor': 1.0},
+        'kilometer': {'name': 'Километр', 'factor': 1000.0},
+        'foot': {'name': 'Фут', 'factor': 0.3048},
+    },
+    'mass': {
+        'kilogram': {'name': 'Килограмм', 'factor': 1.0},
+        'gram': {'name': 'Грамм', 'factor': 0.001},
+    },
+}
+
+
+@pytest.fixture
+def table():
+    return ConversionTable(CONVERSION_RATES)
+
+
+def convert_one(from_unit_id, to_unit_id, value):
+    """Одиночная конвертация через базовую единицу — так, как ее делает приложение."""
+    for units in CONVERSION_RATES.values():
+        if from_unit_id in units:
+            return round(value * units[from_unit_id]['factor'] / units[to_unit_id]['factor'], 6)
+
+
+def test_values_batch_matches_single_conversion(table):
+    values, factors, errors = parse_conversion_batch(
+        {'from_unit': 'foot', 'to_unit': 'kilometer', 'values': [0, 1, 2.5, '10', 12345]}, table)
+    assert errors == []
+    assert list(iter_converted_values(values, factors)) == [
+        convert_one('foot', 'kilometer', value) for value in (0, 1, 2.5, 10, 12345)]
+
+
+def test_triples_batch_reports_row_errors(table):
+    payload = {'conversions': [
+        ['meter', 'foot', 10],
+        {'from_unit': 'gram', 'to_unit': 'kilogram', 'value': 1500},
+        ['meter', 'gram', 1],
+        ['meter', 'parsec', 1],
+        ['meter', 'foot', 'много'],
+        [['meter'], 'foot', 1],
+        'не тройка',
+    ]}
+    values, factors, errors = parse_conversion_batch(payload, table)
+    assert list(iter_converted_values(values, factors)) == [
+        convert_one('meter', 'foot', 10), 1.5, None, None, None, None, None]
+    assert [error['index'] for error in errors] == [2, 3, 4, 5, 6]
+    assert errors[0]['error'] == 'Единицы meter и gram относятся к разным категориям.'
+    assert errors[1]['error'] == 'Неизвестная единица измерения: parsec.'
+
+
+def test_category_restricts_triples(table):
+    values, factors, errors = parse_conversion_batch(
+        {'category': 'mass', 'conversions': [['gram', 'kilogram', 1], ['meter', 'foot', 1]]}, table)
+    assert factors[0] == pytest.approx(0.001)
+    assert factors[1] is None
+    assert errors == [{'index': 1, 'error': 'Единицы meter и foot не найдены в категории mass.'}]
+
+
+def test_invalid_value_in_values_batch(table):
+    values, factors, errors = parse_conversion_batch(
+        {'from_unit': 'meter', 'to_unit': 'meter', 'values': [1, None, 'x']}, table)
+    assert list(iter_converted_values(values, factors)) == [1.0, None, None]
+    assert [error['index'] for error in errors] == [1, 2]
+
+
+@pytest.mark.parametrize('payload', [
+    [],
+    {'conversions': {}},
+    {'from_unit': 'meter', 'values': [1]},
+    {'from_unit': 'meter', 'to_unit': 'gram', 'values': [1]},
+])
+def test_malformed_payloads_are_rejected(table, payload):
+    with pytest.raises(ConversionBatchError):
+        parse_conversion_batch(payload, table)
+
+
+def test_unit_in_two_categories_is_rejected():
+    rates = {'a': {'unit': {'name': 'U', 'factor': 1.0}}, 'b': {'unit': {'name': 'U', 'factor': 2.0}}}
+    with pytest.raises(ValueError):
+        ConversionTable(rates)
+
+
+@pytest.mark.parametrize('bad_value', [True, False, float('inf'), float('-inf'), float('nan'), 'inf', 'nan', 10 ** 400])
+def test_booleans_and_non_finite_values_are_rejected(table, bad_value):
+    values, factors, errors = parse_conversion_batch(
+        {'from_unit': 'meter', 'to_unit': 'foot', 'values': [1, bad_value]}, table)
+    assert errors == [{'index': 1, 'error': 'Значение должно быть числом.'}]
+    assert list(iter_converted_values(values, factors))[1] is None
+    values, factors, errors = parse_conversion_batch({'conversions': [['meter', 'foot', bad_value]]}, table)
+    assert errors == [{'index': 0, 'error': "Значение 'value' должно быть числом."}]
+
+
+def test_overflowing_results_are_row_errors(table):
+    values, factors, errors = parse_conversion_batch(
+        {'from_unit': 'kilometer', 'to_unit': 'meter', 'values': [1e306, 1]}, table)
+    assert errors == [{'index': 0, 'error': CONVERSION_OVERFLOW_MESSAGE}]
+    assert list(iter_converted_values(values, factors)) == [None, 1000.0]
+    values, factors, errors = parse_conversion_batch({'conversions': [['kilometer', 'meter', 1e306]]}, table)
+    assert errors == [{'index': 0, 'error': CONVERSION_OVERFLOW_MESSAGE}]
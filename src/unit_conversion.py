@@ -0,0 +1,178 @@
+"""
+Пакетная конвертация единиц измерения.
+
+Коэффициенты из CONVERSION_RATES заданы относительно базовой единицы
+категории, поэтому одиночная конвертация делает два обращения к вложенному
+словарю, умножение и деление. Для пакетов `ConversionTable` один раз при
+старте строит матрицу коэффициентов для каждой категории: для каждой пары
+единиц (откуда, куда) сразу хранится итоговый множитель. Конвертация
+значения — это одно умножение.
+
+Пакет разбирается в два прохода: сначала для каждой строки проверяются
+значение и пара единиц (ошибки запоминаются построчно), затем множители
+применяются к значениям — этот проход ленивый, чтобы большой ответ можно
+было отдавать потоком. Поэтому уже первый проход отсеивает строки, где
+результат не поместится в float: NaN и бесконечности в JSON не представимы.
+"""
+import math
+
+# Максимальное число значений в одном пакете.
+MAX_CONVERSION_BATCH_SIZE = 1_000_000
+# Точность результата — та же, что у одиночной конвертации.
+RESULT_PRECISION = 6
+CONVERSION_OVERFLOW_MESSAGE = "Результат конвертации выходит за пределы допустимых чисел."
+
+
+class ConversionBatchError(ValueError):
+    """Некорректная структура пакета конвертации (а не ошибка в отдельной строке)."""
+
+
+class ConversionTable:
+    """Матрицы коэффициентов перевода для всех категорий, построенные один раз."""
+
+    def __init__(self, conversion_rates: dict):
+        """
+        Args:
+            conversion_rates (dict): Категория -> {единица: {"name", "factor"}},
+                как CONVERSION_RATES в app.py.
+
+        Raises:
+            ValueError: Если одна и та же единица встречается в нескольких категориях
+                (тогда в пакете из троек нельзя однозначно определить категорию).
+        """
+        self.category_of_unit = {}
+        # (откуда, куда) -> множитель; пары из разных категорий сюда не попадают.
+        self.pair_factors = {}
+        for category, units in conversion_rates.items():
+            for from_unit_id, from_unit_data in units.items():
+                if from_unit_id in self.category_of_unit:
+                    raise ValueError(f"Единица '{from_unit_id}' встречается в нескольких категориях.")
+                self.category_of_unit[from_unit_id] = category
+                for to_unit_id, to_unit_data in units.items():
+                    self.pair_factors[(from_unit_id, to_unit_id)] = from_unit_data["factor"] / to_unit_data["factor"]
+
+    def pair_error(self, from_unit_id, to_unit_id, category=None):
+        """
+        Объясняет, почему пару единиц нельзя сконвертировать.
+
+        Returns:
+            str | None: Текст ошибки или None, если пара допустима.
+        """
+        for unit_id in (from_unit_id, to_unit_id):
+            if not isinstance(unit_id, str) or unit_id not in self.category_of_unit:
+                return f"Неизвестная единица измерения: {unit_id}."
+        if self.category_of_unit[from_unit_id] != self.category_of_unit[to_unit_id]:
+            return f"Единицы {from_unit_id} и {to_unit_id} относятся к разным категориям."
+        if category is not None and self.category_of_unit[from_unit_id] != category:
+            return f"Единицы {from_unit_id} и {to_unit_id} не найдены в категории {category}."
+        return None
+
+
+def _to_float(value):
+    """Число из значения строки пакета или None: логические значения и inf/nan числами не считаются."""
+    if type(value) is bool:
+        return None
+    try:
+        number = float(value)
+    except (ValueError, TypeError, OverflowError):
+        return None
+    return number if math.isfinite(number) else None
+
+
+def _triple_fields(conversion):
+    """Достает (from_unit, to_unit, value) из тройки-массива или объекта."""
+    if isinstance(conversion, dict):
+        return conversion.get('from_unit'), conversion.get('to_unit'), conversion.get('value')
+    if isinstance(conversion, (list, tuple)) and len(conversion) == 3:
+        return tuple(conversion)
+    return None, None, None
+
+
+def parse_conversion_batch(payload, table: ConversionTable):
+    """
+    Разбирает тело пакетного запроса и для каждой строки находит множитель.
+
+    Поддерживаются два формата:
+    - одна пара единиц и массив значений:
+      {"category": "length", "from_unit": "meter", "to_unit": "foot", "values": [1, 2.5, ...]}
+      (category необязательна — она определяется по единицам);
+    - массив троек: {"conversions": [["meter", "foot", 10], {"from_unit": ..., "to_unit": ..., "value": ...}, ...]}.
+
+    Returns:
+        tuple[list, list, list]: Значения (float или None), множители (float или None
+        для строк с ошибкой) и ошибки вида {"index": i, "error": "..."} по возрастанию индекса.
+
+    Raises:
+        ConversionBatchError: Если структура пакета не распознана, пара единиц
+            формата с массивом значений недопустима или пакет слишком велик.
+    """
+    if not isinstance(payload, dict):
+        raise ConversionBatchError("Тело запроса должно быть JSON-объектом.")
+
+    category = payload.get('category')
+    errors = []
+    if 'conversions' in payload:
+        conversions = payload['conversions']
+        if not isinstance(conversions, list):
+            raise ConversionBatchError("Поле 'conversions' должно быть массивом троек (from_unit, to_unit, value).")
+        if len(conversions) > MAX_CONVERSION_BATCH_SIZE:
+            raise ConversionBatchError(f"Пакет слишком большой: не более {MAX_CONVERSION_BATCH_SIZE} значений за запрос.")
+        pair_factors = table.pair_factors
+        values, factors = [], []
+        for index, conversion in enumerate(conversions):
+            # Частый случай — тройка-массив из строк и числа — разбираем без вызовов функций.
+            if type(conversion) is list and len(conversion) == 3:
+                from_unit_id, to_unit_id, raw_value = conversion
+            else:
+                from_unit_id, to_unit_id, raw_value = _triple_fields(conversion)
+            if type(raw_value) is float and math.isfinite(raw_value):
+                value = raw_value
+            else:
+                value = _to_float(raw_value)
+            try:
+                factor = pair_factors.get((from_unit_id, to_unit_id))
+            except TypeError: # Нехешируемая "единица" (например, вложенный массив)
+                factor = None
+            if factor is None or (category is not None and table.category_of_unit[from_unit_id] != category):
+                errors.append({"index": index, "error": table.pair_error(from_unit_id, to_unit_id, category)})
+                factor = None
+            elif value is None:
+                errors.append({"index": index, "error": "Значение 'value' должно быть числом."})
+                factor = None
+            elif not math.isfinite(value * factor):
+                errors.append({"index": index, "error": CONVERSION_OVERFLOW_MESSAGE})
+                factor = None
+            values.append(value)
+            factors.append(factor)
+        return values, factors, errors
+
+    from_unit_id, to_unit_id, raw_values = payload.get('from_unit'), payload.get('to_unit'), payload.get('values')
+    if not from_unit_id or not to_unit_id or not isinstance(raw_values, list):
+        raise ConversionBatchError(
+            "Ожидается поле 'conversions' или поля from_unit, to_unit и массив values."
+        )
+    if len(raw_values) > MAX_CONVERSION_BATCH_SIZE:
+        raise ConversionBatchError(f"Пакет слишком большой: не более {MAX_CONVERSION_BATCH_SIZE} значений за запрос.")
+    pair_error = table.pair_error(from_unit_id, to_unit_id, category)
+    if pair_error:
+        raise ConversionBatchError(pair_error)
+
+    factor = table.pair_factors[(from_unit_id, to_unit_id)]
+    values = list(map(_to_float, raw_values))
+    factors = [factor] * len(values)
+    for index, value in enumerate(values):
+        if value is None:
+            errors.append({"index": index, "error": "Значение должно быть числом."})
+            factors[index] = None
+        elif not math.isfinite(value * factor):
+            errors.append({"index": index, "error": CONVERSION_OVERFLOW_MESSAGE})
+            factors[index] = None
+    return values, factors, errors
+
+
+def iter_converted_values(values, factors):
+    """Лениво применяет множители: результат строки или None для строк с ошибкой."""
+    return (
+        round(value * factor, RESULT_PRECISION) if factor is not None else None
+        for value, factor in zip(values, factors)
+    )